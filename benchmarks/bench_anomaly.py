@@ -0,0 +1,118 @@
+"""
+Benchmark: vectorised anomaly scoring on a synthetic process table.
+
+Simulates --processes processes for --scans scans. Most are idle or
+noisy-but-stable; a few follow scripted behaviours:
+
+    build-server   pinned at ~90% CPU the whole time (should stay quiet
+                   once warmed up; the fixed threshold flags it every scan)
+    creep          CPU creeping from 5% to 60% over the run
+    spike          idle, then suddenly 95% CPU
+    leak           RSS growing steadily after the midpoint
+    fork-bomb      thread count exploding after the midpoint
+
+Reports per-scan scoring cost and which scripted processes each
+detection mode flags.
+
+    python benchmarks/bench_anomaly.py
+    python benchmarks/bench_anomaly.py --processes 20000 --scans 120
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Set
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from guardian.anomaly import AnomalyDetector  # noqa: E402
+
+SCRIPTED = ("build-server", "creep", "spike", "leak", "fork-bomb")
+INTERVAL = 15.0  # seconds between scans, as in the default watchdog config
+
+
+@dataclass
+class FakeSample:
+    pid: int
+    create_time: float
+    name: str
+    cpu_percent: float
+    memory_rss: int
+    num_threads: int
+
+
+def simulate(count: int, scans: int, seed: int = 7):
+    rng = random.Random(seed)
+    base = [(rng.choice((0.0, 0.5, 2.0, 8.0)), rng.randint(5, 400) * 1_048_576, rng.randint(1, 40)) for _ in range(count)]
+    half = scans // 2
+    for tick in range(scans):
+        frac = tick / max(1, scans - 1)
+        table: List[FakeSample] = []
+        for pid, (cpu, rss, threads) in enumerate(base, start=100):
+            noisy_cpu = max(0.0, cpu + rng.gauss(0, cpu * 0.3 + 0.2))
+            table.append(FakeSample(pid, 1.0, f"proc{pid}", noisy_cpu, rss + rng.randint(-1, 1) * 65536, threads))
+        scripted = {
+            "build-server": (90.0 + rng.gauss(0, 3), 800 * 1_048_576, 64),
+            "creep": (5.0 + 55.0 * frac + rng.gauss(0, 1), 200 * 1_048_576, 12),
+            "spike": (95.0 if tick >= half + 5 else 0.5, 50 * 1_048_576, 4),
+            "leak": (3.0, (300 + max(0, tick - half) * 60) * 1_048_576, 20),
+            "fork-bomb": (4.0, 90 * 1_048_576, 8 if tick < half else 8 + (tick - half) * 40),
+        }
+        for i, name in enumerate(SCRIPTED):
+            cpu, rss, threads = scripted[name]
+            table.append(FakeSample(10 + i, 1.0, name, max(0.0, cpu), rss, threads))
+        yield tick * INTERVAL, table
+
+
+def run(count: int, scans: int, threshold: float) -> Dict[str, object]:
+    detector = AnomalyDetector(warmup_scans=10)
+    costs: List[float] = []
+    flagged_anomaly: Set[str] = set()
+    flagged_threshold: Set[str] = set()
+    false_anomaly = 0
+    threshold_alerts = 0
+    for ts, table in simulate(count, scans):
+        started = time.perf_counter()
+        found = detector.score(table, ts)
+        costs.append(time.perf_counter() - started)
+        for a in found:
+            if a.name in SCRIPTED:
+                flagged_anomaly.add(f"{a.name}:{a.reason}")
+            else:
+                false_anomaly += 1
+        for p in table:
+            if p.cpu_percent >= threshold:
+                threshold_alerts += 1
+                flagged_threshold.add(p.name)
+
+    return {
+        "processes": count + len(SCRIPTED),
+        "score_ms_median": statistics.median(costs[1:]) * 1000.0,
+        "score_ms_max": max(costs[1:]) * 1000.0,
+        "anomaly_flagged": ", ".join(sorted(flagged_anomaly)) or "-",
+        "anomaly_false_alerts": false_anomaly,
+        "threshold_flagged": ", ".join(sorted(flagged_threshold)) or "-",
+        "threshold_alerts": threshold_alerts,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=10_000)
+    parser.add_argument("--scans", type=int, default=60)
+    parser.add_argument("--threshold", type=float, default=75.0, help="fixed CPU threshold for comparison")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for key, value in run(args.processes, args.scans, args.threshold).items():
+        print(f"{key:>22}: {value:.3f}" if isinstance(value, float) else f"{key:>22}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: staged audio pipeline vs the old listen -> STT -> handle loop.
+
+Phrases "arrive" every --interval seconds, STT takes --stt-latency and
+each command handler (Omni call, tool, TTS) takes --handler-latency.
+The old single-thread loop cannot listen while it transcribes or
+handles, so any phrase spoken while it is busy is never heard. The
+pipeline keeps capturing, transcribes on a worker pool and hands
+commands to the dispatcher in order.
+
+    python benchmarks/bench_audio_pipeline.py
+    python benchmarks/bench_audio_pipeline.py --handler-latency 2.0 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import speech_recognition as sr  # noqa: E402
+
+from guardian.audio_pipeline import AudioPipeline, RecordedPhraseSource  # noqa: E402
+
+
+class FakeSTT:
+    """
+    Returns the transcript encoded in the clip, after a jittered delay.
+    """
+
+    def __init__(self, latency: float, seed: int = 1) -> None:
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def phrase_to_text(self, audio: sr.AudioData) -> Optional[str]:
+        with self._lock:
+            delay = self.latency * self._rng.uniform(0.5, 1.5)
+        time.sleep(delay)
+        return audio.frame_data.decode("utf-8")
+
+
+def make_clips(count: int) -> List[sr.AudioData]:
+    return [sr.AudioData(f"malcolm command {i}".encode("utf-8"), 16000, 2) for i in range(count)]
+
+
+def run_serial(count: int, interval: float, stt_latency: float, handler_latency: float) -> Dict[str, float]:
+    """
+    Simulated timeline of the old loop: a phrase is heard only if the loop
+    is back to listening when it starts.
+    """
+    busy_until = 0.0
+    handled: List[float] = []
+    for i in range(count):
+        arrival = i * interval
+        if arrival < busy_until:
+            continue
+        finished = arrival + stt_latency + handler_latency
+        handled.append(finished - arrival)
+        busy_until = finished
+    return _summary(count, len(handled), handled, order_ok=True)
+
+
+def run_pipeline(count: int, interval: float, stt_latency: float, handler_latency: float, workers: int) -> Dict[str, float]:
+    seen: List[str] = []
+
+    def handle(command: str) -> None:
+        seen.append(command)
+        time.sleep(handler_latency)
+
+    source = RecordedPhraseSource(make_clips(count), interval_seconds=interval)
+    pipeline = AudioPipeline(
+        source=source,
+        stt=FakeSTT(stt_latency),
+        wake_word="malcolm",
+        on_command=handle,
+        stt_workers=workers,
+        ring_size=count,
+        command_queue=count,
+    )
+    pipeline.start()
+    pipeline.drain(timeout=count * (interval + stt_latency + handler_latency) + 10)
+    stats = pipeline.stats()
+    pipeline.stop()
+
+    expected = [f"command {i}" for i in range(count)]
+    order_ok = seen == [c for c in expected if c in seen]
+    result = _summary(count, len(seen), [], order_ok)
+    result["latency_ms_mean"] = stats["end_to_end"]["avg_ms"]
+    result["latency_ms_max"] = stats["end_to_end"]["max_ms"]
+    result["stt_ms_mean"] = stats["stt"]["avg_ms"]
+    result["queue_wait_ms_max"] = stats["queue_wait"]["max_ms"]
+    result["command_queue_high_water"] = stats["command_queue"]["high_water"]
+    return result
+
+
+def _summary(count: int, handled: int, latencies: List[float], order_ok: bool) -> Dict[str, float]:
+    out: Dict[str, float] = {
+        "phrases": count,
+        "handled": handled,
+        "missed": count - handled,
+        "in_order": order_ok,
+    }
+    if latencies:
+        out["latency_ms_mean"] = statistics.fmean(latencies) * 1000.0
+        out["latency_ms_max"] = max(latencies) * 1000.0
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phrases", type=int, default=12)
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between spoken phrases")
+    parser.add_argument("--stt-latency", type=float, default=0.6)
+    parser.add_argument("--handler-latency", type=float, default=0.4)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for name, result in (
+        ("serial loop", run_serial(args.phrases, args.interval, args.stt_latency, args.handler_latency)),
+        ("pipeline", run_pipeline(args.phrases, args.interval, args.stt_latency, args.handler_latency, args.workers)),
+    ):
+        print(name)
+        for key, value in result.items():
+            print(f"  {key:>26}: {value:.1f}" if isinstance(value, float) else f"  {key:>26}: {value}")
+
+
+if __name__ == "__main__":
+    main()
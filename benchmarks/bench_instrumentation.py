@@ -0,0 +1,131 @@
+"""
+Benchmark: cost of latency instrumentation, plus a traced dry run.
+
+1. Per-call overhead of `metrics.stage()` around an empty block when
+   instrumentation is disabled, enabled without a trace and enabled
+   inside an active trace, against the bare block.
+2. A simulated voice session (recorded phrases, fake STT, a fake Omni
+   call, one tool and a fake TTS backend) run through the real
+   AudioPipeline, ToolExecutor and TTSVoice with instrumentation on.
+   Prints the per-stage summary, the latest trace and a sample of the
+   /metrics output.
+
+    python benchmarks/bench_instrumentation.py
+    python benchmarks/bench_instrumentation.py --calls 2000000 --phrases 20
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import speech_recognition as sr  # noqa: E402
+
+from guardian.audio_pipeline import AudioPipeline, RecordedPhraseSource  # noqa: E402
+from guardian.confirmations import ConfirmationBroker  # noqa: E402
+from guardian.instrumentation import Instrumentation, MetricsServer, metrics  # noqa: E402
+from guardian.policy_engine import ToolDecision  # noqa: E402
+from guardian.tool_executor import ToolExecutor  # noqa: E402
+from guardian.tts import TTSVoice  # noqa: E402
+from guardian.tts_backends import TTSBackend  # noqa: E402
+
+
+class FakeSTT:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def phrase_to_text(self, audio: sr.AudioData) -> Optional[str]:
+        time.sleep(self.latency)
+        return audio.frame_data.decode("utf-8")
+
+
+class FakeBackend(TTSBackend):
+    name = "fake"
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def speak(self, text: str) -> None:
+        time.sleep(self.latency)
+
+
+def overhead(calls: int) -> Dict[str, float]:
+    inst = Instrumentation(enabled=False)
+    results: Dict[str, float] = {}
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        pass
+    bare = time.perf_counter() - started
+
+    for label, enabled, traced in (("disabled", False, False), ("enabled", True, False), ("traced", True, True)):
+        inst.configure(enabled)
+        trace = inst.start_trace() if traced else None
+        with inst.activate(trace):
+            started = time.perf_counter()
+            for _ in range(calls):
+                with inst.stage("x"):
+                    pass
+            elapsed = time.perf_counter() - started
+        if trace is not None:
+            trace.spans.clear()
+        results[f"stage_{label}_ns"] = (elapsed - bare) / calls * 1e9
+    return results
+
+
+def dry_run(phrases: int, stt_latency: float, omni_latency: float, tts_latency: float, port: int) -> None:
+    metrics.configure(enabled=True)
+    server = MetricsServer(metrics, port=port)
+    server.start()
+    tts = TTSVoice(backend=FakeBackend(tts_latency))
+    executor = ToolExecutor(ConfirmationBroker(), execute=lambda tool, args: time.sleep(0.02) or "done")
+
+    def handle(command: str) -> None:
+        with metrics.stage("omni_post"):
+            time.sleep(omni_latency)
+        tts.speak(f"Malcolm says: {command}")
+        executor.run([ToolDecision("describe_top_processes", {}, requires_confirmation=False)], on_outcome=lambda i, o: tts.speak(o.message, interrupt=False))
+
+    clips = [sr.AudioData(f"malcolm command {i}".encode("utf-8"), 16000, 2) for i in range(phrases)]
+    pipeline = AudioPipeline(RecordedPhraseSource(clips, interval_seconds=0.2), FakeSTT(stt_latency), "malcolm", handle)
+    pipeline.start()
+    pipeline.drain(timeout=60)
+    time.sleep(tts_latency * 3 + 0.2)
+    pipeline.stop()
+    tts.shutdown()
+    executor.shutdown()
+
+    for name, s in metrics.summary().items():
+        print(f"{name:>32}: n={s['count']:<3} p50={s['p50_ms']:7.1f}ms p95={s['p95_ms']:7.1f}ms max={s['max_ms']:7.1f}ms")
+    latest = metrics.recent(1)
+    if latest:
+        print("latest trace:", latest[0].describe())
+    body = urllib.request.urlopen(f"http://127.0.0.1:{server.address[1]}/metrics", timeout=5).read().decode()
+    print("\n".join(line for line in body.splitlines() if 'stage="first_audio"' in line))
+    server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--phrases", type=int, default=10)
+    parser.add_argument("--stt-latency", type=float, default=0.3)
+    parser.add_argument("--omni-latency", type=float, default=0.4)
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=0, help="metrics port (0 picks a free one)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for key, value in overhead(args.calls).items():
+        print(f"{key:>18}: {value:.1f}")
+    dry_run(args.phrases, args.stt_latency, args.omni_latency, args.tts_latency, args.port)
+
+
+if __name__ == "__main__":
+    main()
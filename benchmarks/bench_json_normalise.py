@@ -0,0 +1,134 @@
+"""
+Benchmark: reading Omni reply bodies, whole versus incrementally.
+
+"whole" is what MalcolmClient did before json_stream: the full body in
+memory, json.loads over all of it, and a JSON dump as the fallback
+reply. "stream" is MalcolmClient._decode_body today: parse_reply over
+16 KB chunks with the default JsonLimits. Each reply is timed (median
+of --runs) and its peak allocation traced once.
+
+Replies:
+
+    common          a small reply with a tool call (the fast path)
+    diagnostics     several MB of nested diagnostics and no message
+    reply_first     message, tool_calls and actions, then several MB of
+                    trace (reading stops after the actions)
+    reply_then_log  message and tool_calls, then several MB of log; an
+                    "actions" list could still follow, so the body is
+                    read up to max_body_bytes
+    deep            a value nested --depth levels, then the reply
+
+    python benchmarks/bench_json_normalise.py
+    python benchmarks/bench_json_normalise.py --mb 20 --depth 100000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from guardian.json_stream import READ_CHUNK_BYTES, JsonLimits, parse_reply  # noqa: E402
+from guardian.malcolm_client import MalcolmClient  # noqa: E402
+
+# name -> (body, whole path falls back to a JSON dump)
+Payloads = Dict[str, Tuple[bytes, bool]]
+
+
+def _blob(mb: float) -> List[Dict[str, Any]]:
+    entry = {"ts": 1700000000.0, "level": "debug", "module": "omni.planner", "detail": {"step": 0, "note": "x" * 80}}
+    count = max(1, int(mb * 1_000_000 / len(json.dumps(entry))))
+    return [dict(entry, detail={"step": i, "note": "x" * 80}) for i in range(count)]
+
+
+def build_payloads(mb: float, depth: int) -> Payloads:
+    tools = [{"tool": "describe_top_processes", "args": {"limit": 5}}]
+    small = {"reply_text": "Checking your top processes.", "tool_calls": tools}
+    first = {"message": "Checking your top processes.", "tool_calls": tools, "actions": []}
+    blob = _blob(mb)
+    return {
+        "common": (json.dumps(small).encode(), False),
+        "diagnostics": (json.dumps({"diagnostics": {"planner": blob}, "trace_id": "abc"}).encode(), True),
+        "reply_first": (json.dumps(dict(first, trace=blob)).encode(), False),
+        "reply_then_log": (json.dumps({"message": "Done.", "tool_calls": tools, "log": blob}).encode(), False),
+        "deep": (("{\"meta\": " + "[" * depth + "]" * depth + ", " + json.dumps(small)[1:]).encode(), False),
+    }
+
+
+def _chunks(body: bytes) -> Iterator[bytes]:
+    return (body[i:i + READ_CHUNK_BYTES] for i in range(0, len(body), READ_CHUNK_BYTES))
+
+
+def whole(body: bytes, dump: bool) -> str:
+    data = json.loads(b"".join(_chunks(body)))
+    MalcolmClient._extract_tool_calls(data)
+    return json.dumps(data, indent=2) if dump else MalcolmClient._extract_reply_text(data)
+
+
+def stream(body: bytes, limits: JsonLimits) -> str:
+    data = parse_reply(_chunks(body), limits, content_length=len(body)).data
+    MalcolmClient._extract_tool_calls(data)
+    return MalcolmClient._extract_reply_text(data)
+
+
+def _measure(fn: Callable[[], Any], runs: int) -> Dict[str, float]:
+    try:
+        fn()
+    except RecursionError:
+        return {"ms": float("nan"), "peak_kb": float("nan")}
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"ms": statistics.median(samples) * 1000.0, "peak_kb": peak / 1024.0}
+
+
+def run(payloads: Payloads, runs: int) -> Dict[str, Dict[str, float]]:
+    """
+    {reply: {whole_ms, whole_peak_kb, stream_ms, stream_peak_kb, size_kb}};
+    NaN marks a reply the whole path could not read at all.
+    """
+    limits = JsonLimits()
+    results: Dict[str, Dict[str, float]] = {}
+    for name, (body, dump) in payloads.items():
+        old = _measure(lambda: whole(body, dump), runs)
+        new = _measure(lambda: stream(body, limits), runs)
+        results[name] = {
+            "whole_ms": old["ms"],
+            "whole_peak_kb": old["peak_kb"],
+            "stream_ms": new["ms"],
+            "stream_peak_kb": new["peak_kb"],
+            "size_kb": len(body) / 1024.0,
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=5.0, help="size of the large replies")
+    parser.add_argument("--depth", type=int, default=20_000, help="nesting of the deep reply")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for name, r in run(build_payloads(args.mb, args.depth), args.runs).items():
+        print(
+            f"{name:>14} ({r['size_kb']:9.1f} KB): whole {r['whole_ms']:8.2f} ms / {r['whole_peak_kb']:9.1f} KB peak, "
+            f"stream {r['stream_ms']:8.2f} ms / {r['stream_peak_kb']:9.1f} KB peak"
+        )
+
+
+if __name__ == "__main__":
+    main()
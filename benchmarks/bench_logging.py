@@ -0,0 +1,124 @@
+"""
+Benchmark: latency a logging call adds to the caller under a burst.
+
+Several threads each emit a burst of INFO records (the shape of the
+watchdog / audio / client hot-path lines) while the file handler writes
+to a temporary directory. Modes:
+
+    direct      RotatingFileHandler on the calling thread (the old setup)
+    queue       records handed to a listener thread
+    queue+json  as queue, compact JSON lines
+    queue+rate  as queue, with a 50/s token bucket on the chatty logger
+
+--slow-disk-ms adds a delay to every file write to mimic a busy disk or
+antivirus scanning the log.
+
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --records 20000 --threads 8 --slow-disk-ms 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from guardian.utils.logging_utils import setup_logging, stop_logging  # noqa: E402
+
+MODES = ("direct", "queue", "queue+json", "queue+rate")
+
+
+def reset_root() -> None:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def slow_down(delay_seconds: float) -> None:
+    if delay_seconds <= 0:
+        return
+    original = RotatingFileHandler.emit
+
+    def emit(self, record):
+        time.sleep(delay_seconds)
+        original(self, record)
+
+    RotatingFileHandler.emit = emit
+
+
+def burst(records: int, threads: int) -> List[float]:
+    chatty = logging.getLogger("guardian.security_watchdog")
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    start = threading.Barrier(threads)
+
+    def worker(slot: int) -> None:
+        out = latencies[slot]
+        payload = {"pid": 4242, "name": "python.exe", "cpu": 97.5, "tool_calls": [{"tool": "describe_top_processes"}]}
+        start.wait()
+        for i in range(records // threads):
+            t0 = time.perf_counter()
+            chatty.info("High CPU usage by %s (PID %s): %.1f%% %s", "python.exe", 4242 + i, 97.5, payload)
+            out.append(time.perf_counter() - t0)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return [x for chunk in latencies for x in chunk]
+
+
+def run(records: int, threads: int, slow_disk_ms: float) -> Dict[str, Dict[str, float]]:
+    slow_down(slow_disk_ms / 1000.0)
+    results: Dict[str, Dict[str, float]] = {}
+    for mode in MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            reset_root()
+            listener = setup_logging(
+                Path(tmp),
+                mode="direct" if mode == "direct" else "queue",
+                json_format=mode == "queue+json",
+                rate_limits={"guardian.security_watchdog": {"per_second": 50, "burst": 50}} if mode == "queue+rate" else None,
+                queue_size=records * 2,
+                console=False,
+            )
+            started = time.perf_counter()
+            lat = sorted(burst(records, threads))
+            burst_s = time.perf_counter() - started
+            stop_logging(listener, timeout=120.0)
+            drained_s = time.perf_counter() - started
+            reset_root()
+            results[mode] = {
+                "p50_us": statistics.median(lat) * 1e6,
+                "p99_us": lat[int(0.99 * (len(lat) - 1))] * 1e6,
+                "max_us": lat[-1] * 1e6,
+                "burst_ms": burst_s * 1000.0,
+                "drained_ms": drained_s * 1000.0,
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--slow-disk-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    for mode, values in run(args.records, args.threads, args.slow_disk_ms).items():
+        print(mode)
+        for key, value in values.items():
+            print(f"{key:>14}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Benchmark: MalcolmClient transport against a local stub Omni server.
+
+Checks (asserted; the script fails if one does not hold):
+  refused connections are retried; a 502 or a connection dropped after
+  the request went out is sent once only; Retry-After is waited for;
+  the breaker goes open -> half_open -> closed
+
+Scenarios:
+  healthy  - pooled keep-alive session vs. a fresh requests.post per call
+  flaky    - injected 503s / dropped connections, showing retry success rate
+  down     - nothing listening, showing how the circuit breaker stops every
+             command from paying the connect timeout
+
+    python benchmarks/bench_malcolm_client.py
+    python benchmarks/bench_malcolm_client.py --commands 200 --latency 0.02 --failure-rate 0.3
+    python benchmarks/bench_malcolm_client.py --checks-only
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from guardian.circuit_breaker import CircuitBreaker  # noqa: E402
+from guardian.malcolm_client import MalcolmClient  # noqa: E402
+from stub_omni_server import StubOmniServer  # noqa: E402
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": ordered[len(ordered) // 2] * 1000.0,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000.0,
+        "mean_ms": statistics.fmean(ordered) * 1000.0,
+    }
+
+
+def _time_commands(client: MalcolmClient, commands: int) -> List[float]:
+    samples = []
+    for i in range(commands):
+        started = time.perf_counter()
+        client.send_text_to_malcolm(f"status {i}", context={"source": "bench"})
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _free_port() -> int:
+    # Grab a free port and leave nothing listening on it.
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def _client(url: str, **kwargs) -> MalcolmClient:
+    settings = dict(max_retries=2, backoff_base_seconds=0.2, backoff_max_seconds=2.0,
+                    breaker=CircuitBreaker(failure_threshold=1000))
+    settings.update(kwargs)
+    return MalcolmClient(base_url=url, api_key="bench", enabled=True, **settings)
+
+
+def check_retries() -> Dict[str, str]:
+    """
+    Assert the retry rules against the stub server; returns the checks
+    that passed.
+    """
+    passed: Dict[str, str] = {}
+
+    # Nothing listens at first; the stub comes up during the client's backoff
+    # (jittered, hence the spare retries).
+    port = _free_port()
+    servers: List[StubOmniServer] = []
+    starter = threading.Timer(0.05, lambda: servers.append(StubOmniServer(port=port).start()))
+    starter.start()
+    client = _client(f"http://127.0.0.1:{port}", max_retries=5, backoff_base_seconds=0.5)
+    resp = client.send_text_to_malcolm("status", context={})
+    client.close()
+    starter.join()
+    requests_seen = servers[0].requests if servers else 0
+    for server in servers:
+        server.stop()
+    assert resp.source == "live" and requests_seen == 1, f"refused connection not retried ({resp.source}, {requests_seen})"
+    passed["refused_connection_retried"] = "ok"
+
+    for label, action in (("502_not_resent", 502), ("dropped_after_send_not_resent", "drop")):
+        # Retry-After: 0 invites a resend; only the status may rule it out.
+        with StubOmniServer(script=[action], retry_after="0") as server:
+            client = _client(server.url)
+            client.send_text_to_malcolm("kill it", context={})
+            client.close()
+            assert server.requests == 1, f"{action}: sent {server.requests} times"
+        passed[label] = "ok"
+
+    with StubOmniServer(script=[503], retry_after="1") as server:
+        client = _client(server.url, backoff_base_seconds=0.01)
+        resp = client.send_text_to_malcolm("status", context={})
+        client.close()
+        times = server.request_times
+        assert resp.source == "live" and len(times) == 2, f"503 with Retry-After: {len(times)} requests"
+        assert times[1] - times[0] >= 0.95, f"Retry-After: 1 waited only {times[1] - times[0]:.2f}s"
+    passed["retry_after_honoured"] = "ok"
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.3)
+    with StubOmniServer(script=[502, 502]) as server:
+        client = _client(server.url, breaker=breaker)
+        for i in range(2):
+            client.send_text_to_malcolm(f"status {i}", context={})
+        assert breaker.state == CircuitBreaker.OPEN, f"breaker {breaker.state} after 2 failures"
+        client.send_text_to_malcolm("while open", context={})
+        assert server.requests == 2, "an open breaker let a request through"
+        time.sleep(0.35)
+        server.latency_seconds = 0.3
+        probe = threading.Thread(target=client.send_text_to_malcolm, args=("probe", {}))
+        probe.start()
+        time.sleep(0.15)
+        during = breaker.state
+        probe.join()
+        client.close()
+        assert during == CircuitBreaker.HALF_OPEN, f"breaker {during} during the probe"
+        assert breaker.state == CircuitBreaker.CLOSED, f"breaker {breaker.state} after a good probe"
+    passed["breaker_open_half_open_closed"] = "ok"
+    return passed
+
+
+def bench_healthy(commands: int, latency: float) -> Dict[str, Dict[str, float]]:
+    with StubOmniServer(latency_seconds=latency) as server:
+        client = MalcolmClient(base_url=server.url, api_key="bench", enabled=True)
+        pooled = _percentiles(_time_commands(client, commands))
+        pooled["connections"] = server.connections
+        client.close()
+
+        server.connections = 0
+        samples = []
+        for i in range(commands):
+            started = time.perf_counter()
+            requests.post(f"{server.url}/omni/command", json={"command": f"status {i}", "context": {}}, timeout=15)
+            samples.append(time.perf_counter() - started)
+        unpooled = _percentiles(samples)
+        unpooled["connections"] = server.connections
+    return {"pooled": pooled, "per_call_post": unpooled}
+
+
+def bench_flaky(commands: int, latency: float, failure_rate: float) -> Dict[str, float]:
+    with StubOmniServer(latency_seconds=latency, failure_rate=failure_rate, drop_rate=failure_rate / 3, seed=7) as server:
+        client = MalcolmClient(
+            base_url=server.url, api_key="bench", enabled=True,
+            backoff_base_seconds=0.01, backoff_max_seconds=0.05,
+            breaker=CircuitBreaker(failure_threshold=1000),
+        )
+        ok = 0
+        samples = []
+        for i in range(commands):
+            started = time.perf_counter()
+            resp = client.send_text_to_malcolm(f"status {i}", context={})
+            samples.append(time.perf_counter() - started)
+            if "top processes" in resp.reply_text:
+                ok += 1
+        client.close()
+        result = _percentiles(samples)
+        result["success_rate"] = ok / commands
+        result["server_requests"] = server.requests
+    return result
+
+
+def bench_down(commands: int) -> Dict[str, Dict[str, float]]:
+    url = f"http://127.0.0.1:{_free_port()}"
+
+    results = {}
+    for label, threshold in (("no_breaker", 10**9), ("breaker", 3)):
+        client = MalcolmClient(
+            base_url=url, api_key="bench", enabled=True,
+            backoff_base_seconds=0.05, backoff_max_seconds=0.2,
+            breaker=CircuitBreaker(failure_threshold=threshold, reset_timeout=60),
+        )
+        results[label] = _percentiles(_time_commands(client, commands))
+        client.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--checks-only", action="store_true", help="run the retry/breaker checks and stop")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    scenarios = [("checks", check_retries)]
+    if not args.checks_only:
+        scenarios += [
+            ("healthy", lambda: bench_healthy(args.commands, args.latency)),
+            ("flaky", lambda: bench_flaky(args.commands, args.latency, args.failure_rate)),
+            ("down", lambda: bench_down(min(args.commands, 20))),
+        ]
+    for name, scenario in scenarios:
+        print(f"[{name}]")
+        for key, value in scenario().items():
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
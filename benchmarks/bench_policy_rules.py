@@ -0,0 +1,140 @@
+"""
+Benchmark: compiled policy rule evaluation.
+
+Generates --rules rules spread over --tools tool names (plus a few glob
+rules) and measures RuleSet.evaluate() for repeated calls (decision
+cache hit), distinct calls (cache miss; only the tool's own rules are
+walked) and a naive interpreter that re-reads every raw rule dict in
+order on each call.
+
+    python benchmarks/bench_policy_rules.py
+    python benchmarks/bench_policy_rules.py --rules 10000 --tools 200
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import logging
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from guardian.policy_rules import RuleSet  # noqa: E402
+
+
+def make_rules(count: int, tools: int, seed: int = 11) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    rules: List[Dict[str, Any]] = [
+        {"name": "quiet", "tool": "*", "state": {"quiet_mode": True}, "action": "deny"},
+        {"name": "describe-glob", "tool": "describe_*", "args": {"limit": {"max": 50}}, "action": "allow"},
+    ]
+    for i in range(count - len(rules)):
+        tool = f"tool_{rng.randrange(tools)}"
+        kind = rng.random()
+        if kind < 0.4:
+            cond = {"limit": {"min": rng.randint(0, 50), "max": rng.randint(51, 500)}}
+        elif kind < 0.7:
+            cond = {"name": {"regex": f"^svc{rng.randint(0, 99)}"}}
+        else:
+            cond = {"mode": rng.choice(["a", "b", "c", "d"])}
+        rules.append({"name": f"r{i}", "tool": tool, "args": cond, "action": rng.choice(("allow", "confirm", "deny"))})
+    return rules
+
+
+def make_calls(count: int, tools: int, seed: int = 12) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "tool": f"tool_{rng.randrange(tools)}",
+            "args": {"limit": rng.randint(0, 600), "name": f"svc{rng.randint(0, 120)}", "mode": rng.choice("abcde")},
+        }
+        for _ in range(count)
+    ]
+
+
+def naive_evaluate(rules: List[Dict[str, Any]], tool: str, args: Dict[str, Any], state: Dict[str, Any]) -> Optional[str]:
+    for rule in rules:
+        if not fnmatch.fnmatchcase(tool, rule["tool"]):
+            continue
+        ok = True
+        for source, values in (("args", args), ("state", state)):
+            for key, spec in rule.get(source, {}).items():
+                value = values.get(key)
+                if isinstance(spec, dict):
+                    if "min" in spec and not (isinstance(value, (int, float)) and value >= spec["min"]):
+                        ok = False
+                    if "max" in spec and not (isinstance(value, (int, float)) and value <= spec["max"]):
+                        ok = False
+                    if "regex" in spec and not (value is not None and re.search(spec["regex"], str(value))):
+                        ok = False
+                elif value != spec:
+                    ok = False
+        if ok:
+            return rule["name"]
+    return None
+
+
+def per_call_ns(fn, calls, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for call in calls:
+            fn(call)
+    return (time.perf_counter() - started) / (repeat * len(calls)) * 1e9
+
+
+def run(rule_count: int, tools: int, distinct: int) -> Dict[str, float]:
+    rules = make_rules(rule_count, tools)
+    started = time.perf_counter()
+    ruleset = RuleSet(rules, cache_size=distinct * 2)
+    compile_ms = (time.perf_counter() - started) * 1000.0
+    calls = make_calls(distinct, tools)
+    state = {"quiet_mode": False}
+
+    for call in calls:  # build per-tool indexes
+        ruleset.evaluate(call["tool"], call["args"], state)
+    hot = calls[:64]
+    cached_ns = per_call_ns(lambda c: ruleset.evaluate(c["tool"], c["args"], state), hot, 2000)
+
+    uncached = RuleSet(rules, cache_size=0)
+    for call in calls:
+        uncached.evaluate(call["tool"], call["args"], state)
+    uncached_ns = per_call_ns(lambda c: uncached.evaluate(c["tool"], c["args"], state), calls, 3)
+
+    sample = calls[:200]
+    naive_ns = per_call_ns(lambda c: naive_evaluate(rules, c["tool"], c["args"], state), sample, 1)
+    for call in sample:
+        assert naive_evaluate(rules, call["tool"], call["args"], state) == _name(uncached.evaluate(call["tool"], call["args"], state))
+
+    return {
+        "rules": float(len(ruleset)),
+        "compile_ms": compile_ms,
+        "cached_ns": cached_ns,
+        "uncached_ns": uncached_ns,
+        "naive_ns": naive_ns,
+        "rules_per_tool": len(rules) / tools,
+    }
+
+
+def _name(match) -> Optional[str]:
+    return match.rule if match is not None else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--tools", type=int, default=100)
+    parser.add_argument("--distinct", type=int, default=5000, help="distinct calls for the uncached run")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for key, value in run(args.rules, args.tools, args.distinct).items():
+        print(f"{key:>15}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: preference recording and startup load.
+
+Compares the old LearningEngine write path (open, append one JSON line,
+close per confirmation) with PreferenceStore.record(), whose writes are
+batched on a background thread. Then measures startup: replaying the
+whole log versus loading the snapshot plus a short log tail, and the
+cost of the PolicyEngine auto-promote lookup.
+
+    python benchmarks/bench_preferences.py
+    python benchmarks/bench_preferences.py --events 200000 --tail 500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from guardian.learning import PreferenceEvent, PreferenceStore  # noqa: E402
+from guardian.policy_engine import PolicyEngine  # noqa: E402
+
+TOOLS = ("describe_top_processes", "kill_process", "lock_workstation", "process_trend", "enter_quiet_mode")
+
+
+def make_events(count: int, seed: int = 3):
+    rng = random.Random(seed)
+    for _ in range(count):
+        tool = rng.choice(TOOLS)
+        args = {"pid": rng.randint(100, 60000)} if tool == "kill_process" else {"metric": rng.choice(("cpu", "rss"))}
+        yield PreferenceEvent(tool, rng.random() < 0.9, args)
+
+
+def old_record(log_file: Path, event: PreferenceEvent) -> None:
+    with log_file.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"tool": event.tool, "confirmed": event.confirmed}) + "\n")
+
+
+def run(events: int, tail: int, lookups: int) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    sample = list(make_events(min(events, 5000)))
+    with tempfile.TemporaryDirectory() as tmp:
+        old_dir, new_dir = Path(tmp) / "old", Path(tmp) / "new"
+        old_dir.mkdir()
+        new_dir.mkdir()
+
+        started = time.perf_counter()
+        for e in sample:
+            old_record(old_dir / "preferences.log", e)
+        results["old_record_us"] = (time.perf_counter() - started) / len(sample) * 1e6
+
+        store = PreferenceStore(new_dir)
+        store.load()
+        store.start()
+        started = time.perf_counter()
+        for e in sample:
+            store.record(e)
+        results["new_record_us"] = (time.perf_counter() - started) / len(sample) * 1e6
+        for e in make_events(events - tail - len(sample), seed=4):
+            store.record(e)
+        store.close()  # writes the snapshot
+        results["flushes"] = float(store.flushes)
+
+        # Events after the snapshot, then a "crash": the writer flushes but close() never runs.
+        store = PreferenceStore(new_dir)
+        store.load()
+        store.start()
+        for e in make_events(tail, seed=5):
+            store.record(e)
+        store._stop_flag.set()
+        store._queue.put(None)
+        store._thread.join()
+
+        full = PreferenceStore(new_dir)
+        full.snapshot_file = Path(tmp) / "missing.json"
+        started = time.perf_counter()
+        full.load()
+        results["load_full_log_ms"] = (time.perf_counter() - started) * 1000.0
+
+        snap = PreferenceStore(new_dir)
+        started = time.perf_counter()
+        snap.load()
+        results["load_snapshot_ms"] = (time.perf_counter() - started) * 1000.0
+        results["tail_replayed"] = float(snap.replayed)
+        assert snap.counts("kill_process") == full.counts("kill_process")
+
+        policy = PolicyEngine([], list(TOOLS), preferences=snap, promote_after=5)
+        call = {"tool": "kill_process", "args": {"pid": 4242}}
+        started = time.perf_counter()
+        for _ in range(lookups):
+            policy._promoted(call["tool"], call["args"])
+        results["promote_lookup_us"] = (time.perf_counter() - started) / lookups * 1e6
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--tail", type=int, default=200, help="events written after the last snapshot")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for key, value in run(args.events, args.tail, args.lookups).items():
+        print(f"{key:>18}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
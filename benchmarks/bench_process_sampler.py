@@ -0,0 +1,110 @@
+"""
+Benchmark: shared ProcessSampler vs per-call process walks.
+
+Measures on the real host:
+
+  - describe_top_processes() the old way (two walks + 0.2s sleep)
+    against the same call served from the sampler's snapshot;
+  - how many process-table walks happen when several consumers
+    (tools, watchdog, ...) read concurrently for a few sampler ticks.
+
+    python benchmarks/bench_process_sampler.py
+    python benchmarks/bench_process_sampler.py --consumers 8 --seconds 5
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import psutil  # noqa: E402
+
+from guardian import tools  # noqa: E402
+from guardian.process_sampler import ProcessSampler  # noqa: E402
+from guardian.process_scanner import ProcessScanner  # noqa: E402
+
+
+def _time_calls(fn, runs: int) -> List[float]:
+    out = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - started)
+    return out
+
+
+def run(runs: int, consumers: int, seconds: float, interval: float) -> Dict[str, float]:
+    tools.set_process_sampler(None)
+    legacy = _time_calls(lambda: tools.describe_top_processes(5), runs)
+
+    walks = [0]
+
+    def counting_pids() -> List[int]:
+        walks[0] += 1
+        return psutil.pids()
+
+    sampler = ProcessSampler(
+        interval_seconds=interval,
+        scanner=ProcessScanner(pids_fn=counting_pids, collect_memory=True, collect_io=True),
+    )
+    sampler.start()
+    sampler.wait_for_snapshot(timeout=10)
+    tools.set_process_sampler(sampler)
+    shared = _time_calls(lambda: tools.describe_top_processes(5), runs * 100)
+
+    reads = [0]
+    stop = threading.Event()
+
+    def consumer() -> None:
+        while not stop.is_set():
+            snap = sampler.snapshot()
+            snap.top_n(5)
+            snap.top_n(5, "memory_rss")
+            reads[0] += 1
+            time.sleep(0.001)
+
+    walks_before = walks[0]
+    threads = [threading.Thread(target=consumer, daemon=True) for _ in range(consumers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    sampler.stop()
+    tools.set_process_sampler(None)
+
+    snap = sampler.snapshot()
+    return {
+        "processes": len(snap),
+        "legacy_call_ms_p50": statistics.median(legacy) * 1000.0,
+        "shared_call_us_p50": statistics.median(shared) * 1e6,
+        "sampler_scan_ms": snap.scan_ms,
+        "consumer_reads": reads[0],
+        "process_walks": walks[0] - walks_before,
+        "expected_ticks": seconds / interval,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="legacy describe_top_processes calls")
+    parser.add_argument("--consumers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--interval", type=float, default=1.0, help="sampler interval")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for key, value in run(args.runs, args.consumers, args.seconds, args.interval).items():
+        print(f"{key:>20}: {value:.3f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark: incremental ProcessScanner vs. a full per-scan rebuild.
+
+Uses fake process handles so the process count can be scaled well past
+what the host is actually running. Static attribute reads (name/exe) are
+counted so it is visible that the incremental scanner only pays for them
+on process churn, while steady-state scan cost per process stays flat.
+
+    python benchmarks/bench_process_scanner.py
+    python benchmarks/bench_process_scanner.py --counts 1000 5000 10000 --churn 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from guardian.process_scanner import ProcessScanner  # noqa: E402
+
+
+class FakeProcess:
+    static_reads = 0
+
+    def __init__(self, pid: int, create_time: float) -> None:
+        self.pid = pid
+        self._create_time = create_time
+        self._cpu = random.random() * 100.0
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def create_time(self) -> float:
+        return self._create_time
+
+    def name(self) -> str:
+        FakeProcess.static_reads += 1
+        return f"proc{self.pid}.exe"
+
+    def exe(self) -> str:
+        FakeProcess.static_reads += 1
+        return f"C:\\Program Files\\Fake\\proc{self.pid}.exe"
+
+    def cpu_percent(self, interval=None) -> float:
+        self._cpu = (self._cpu * 0.9 + random.random() * 10.0) % 100.0
+        return self._cpu
+
+    def is_running(self) -> bool:
+        return True
+
+
+class FakeProcessTable:
+    def __init__(self, count: int) -> None:
+        self._next_pid = 1
+        self.procs: Dict[int, FakeProcess] = {}
+        for _ in range(count):
+            self.spawn()
+
+    def spawn(self) -> None:
+        pid = self._next_pid
+        self._next_pid += 1
+        self.procs[pid] = FakeProcess(pid, time.time())
+
+    def churn(self, fraction: float) -> None:
+        n = int(len(self.procs) * fraction)
+        for pid in random.sample(list(self.procs), n):
+            del self.procs[pid]
+        for _ in range(n):
+            self.spawn()
+
+    def pids(self) -> List[int]:
+        return list(self.procs)
+
+    def process(self, pid: int) -> FakeProcess:
+        return self.procs[pid]
+
+
+def _legacy_scan(table: FakeProcessTable) -> None:
+    """What process_iter(attrs=[...]) amounts to: fresh handles, every attribute, every scan."""
+    for pid in table.pids():
+        src = table.procs[pid]
+        proc = FakeProcess(pid, src.create_time())
+        proc.name()
+        proc.exe()
+        proc.cpu_percent()
+
+
+def run(counts: List[int], scans: int, churn: float) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for count in counts:
+        table = FakeProcessTable(count)
+        scanner = ProcessScanner(pids_fn=table.pids, process_factory=table.process)
+        scanner.scan()  # warm-up: opens every handle once
+
+        FakeProcess.static_reads = 0
+        started = time.perf_counter()
+        for _ in range(scans):
+            table.churn(churn)
+            scanner.scan()
+        incremental = (time.perf_counter() - started) / scans
+        incremental_reads = FakeProcess.static_reads / scans
+
+        FakeProcess.static_reads = 0
+        started = time.perf_counter()
+        for _ in range(scans):
+            table.churn(churn)
+            _legacy_scan(table)
+        legacy = (time.perf_counter() - started) / scans
+        legacy_reads = FakeProcess.static_reads / scans
+
+        results[str(count)] = {
+            "incremental_ms": incremental * 1000.0,
+            "incremental_us_per_proc": incremental * 1e6 / count,
+            "incremental_static_reads": incremental_reads,
+            "legacy_ms": legacy * 1000.0,
+            "legacy_us_per_proc": legacy * 1e6 / count,
+            "legacy_static_reads": legacy_reads,
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[500, 1000, 2500, 5000, 10000])
+    parser.add_argument("--scans", type=int, default=20)
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction of processes replaced per scan")
+    args = parser.parse_args()
+
+    results = run(args.counts, args.scans, args.churn)
+    print(f"{'procs':>7} {'incr ms':>9} {'us/proc':>8} {'reads':>8} | {'legacy ms':>9} {'us/proc':>8} {'reads':>8}")
+    for count, r in results.items():
+        print(
+            f"{count:>7} {r['incremental_ms']:>9.2f} {r['incremental_us_per_proc']:>8.2f} "
+            f"{r['incremental_static_reads']:>8.0f} | {r['legacy_ms']:>9.2f} "
+            f"{r['legacy_us_per_proc']:>8.2f} {r['legacy_static_reads']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: time-to-first-audio with and without streaming.
+
+A local stub server generates a multi-sentence reply word by word.
+"First audio" is the moment the first sentence would be handed to TTS:
+the first on_sentence callback in streaming mode, or the return of
+send_text_to_malcolm in buffered mode.
+
+    python benchmarks/bench_streaming.py
+    python benchmarks/bench_streaming.py --format ndjson --chunk-delay 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from guardian.malcolm_client import MalcolmClient  # noqa: E402
+from stub_omni_server import StubOmniServer  # noqa: E402
+
+REPLY = (
+    "I have checked your system and everything looks healthy. "
+    "Your CPU load is moderate and no suspicious processes are running. "
+    "The browser is using the most memory at the moment. "
+    "I will keep watching and let you know if anything changes."
+)
+
+
+def run(fmt: str, chunk_delay: float, runs: int) -> Dict[str, Dict[str, float]]:
+    response = {
+        "reply_text": REPLY,
+        "tool_calls": [{"tool": "describe_top_processes", "args": {"limit": 5}}],
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    with StubOmniServer(response=response, stream_format=fmt, chunk_delay_seconds=chunk_delay) as server:
+        client = MalcolmClient(base_url=server.url, api_key="bench", enabled=True)
+
+        first: List[float] = []
+        total: List[float] = []
+        for _ in range(runs):
+            marks: List[float] = []
+            started = time.perf_counter()
+            resp = client.stream_text_to_malcolm("status", {}, on_sentence=lambda s: marks.append(time.perf_counter()))
+            total.append(time.perf_counter() - started)
+            first.append(marks[0] - started)
+            assert resp.streamed and resp.tool_calls
+        results["streaming"] = {
+            "first_audio_ms": statistics.median(first) * 1000.0,
+            "complete_ms": statistics.median(total) * 1000.0,
+        }
+
+        buffered: List[float] = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            client.send_text_to_malcolm("status", {})
+            buffered.append(time.perf_counter() - started)
+        results["buffered"] = {
+            "first_audio_ms": statistics.median(buffered) * 1000.0,
+            "complete_ms": statistics.median(buffered) * 1000.0,
+        }
+        client.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=["sse", "ndjson"], default="sse")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="seconds between streamed words")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    for mode, r in run(args.format, args.chunk_delay, args.runs).items():
+        print(f"{mode:>9}: first audio {r['first_audio_ms']:8.1f} ms, complete {r['complete_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
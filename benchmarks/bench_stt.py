@@ -0,0 +1,142 @@
+"""
+Benchmark: STT backends on a directory of recordings.
+
+Every WAV in the corpus directory is transcribed by each requested
+backend, one phrase at a time and then as a concurrent batch. Reported
+per backend:
+
+    rtf           processing time / audio duration (lower is better)
+    p50_ms/p95_ms per-phrase latency
+    batch_rtf     RTF of transcribe_batch() over the whole corpus
+    wer           word error rate against reference transcripts
+
+References are read from `<name>.txt` next to each `<name>.wav`, or from
+a `transcripts.tsv` file (`<name>.wav<TAB>text`). Clips without a
+reference are timed but left out of the WER.
+
+    python benchmarks/bench_stt.py recordings/ --backends sphinx,vosk --vosk-model models/vosk-small-en
+    python benchmarks/bench_stt.py recordings/ --backends google --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import speech_recognition as sr  # noqa: E402
+
+from guardian.stt_stub import STTEngine  # noqa: E402
+from guardian.wake_gate import load_wav  # noqa: E402
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def load_corpus(directory: Path) -> List[Tuple[str, sr.AudioData, Optional[str]]]:
+    tsv: Dict[str, str] = {}
+    index = directory / "transcripts.tsv"
+    if index.exists():
+        for line in index.read_text(encoding="utf-8").splitlines():
+            if "\t" in line:
+                name, text = line.split("\t", 1)
+                tsv[name.strip()] = text.strip()
+
+    corpus = []
+    for wav in sorted(directory.glob("*.wav")):
+        sidecar = wav.with_suffix(".txt")
+        ref = sidecar.read_text(encoding="utf-8").strip() if sidecar.exists() else tsv.get(wav.name)
+        corpus.append((wav.name, load_wav(wav), ref))
+    return corpus
+
+
+def word_errors(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """
+    (edit distance in words, reference length).
+    """
+    ref = _WORD.findall(reference.lower())
+    hyp = _WORD.findall(hypothesis.lower())
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, start=1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, start=1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1], len(ref)
+
+
+def duration_seconds(audio: sr.AudioData) -> float:
+    return len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+
+
+def run(engine: STTEngine, corpus: List[Tuple[str, sr.AudioData, Optional[str]]]) -> Dict[str, float]:
+    started = time.perf_counter()
+    engine.warm_up()
+    warm_up = time.perf_counter() - started
+
+    audio_total = sum(duration_seconds(audio) for _, audio, _ in corpus)
+    latencies: List[float] = []
+    errors = words = 0
+    for _, audio, ref in corpus:
+        started = time.perf_counter()
+        text = engine.phrase_to_text(audio)
+        latencies.append(time.perf_counter() - started)
+        if ref is not None:
+            e, n = word_errors(ref, text or "")
+            errors += e
+            words += n
+
+    started = time.perf_counter()
+    engine.transcribe_batch([audio for _, audio, _ in corpus])
+    batch = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        "clips": len(corpus),
+        "audio_s": audio_total,
+        "warm_up_ms": warm_up * 1000.0,
+        "rtf": sum(latencies) / audio_total if audio_total else 0.0,
+        "p50_ms": statistics.median(ordered) * 1000.0,
+        "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000.0,
+        "batch_rtf": batch / audio_total if audio_total else 0.0,
+        "wer": errors / words if words else float("nan"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path, help="directory of WAV files (+ reference transcripts)")
+    parser.add_argument("--backends", default="sphinx,vosk,google", help="comma-separated backend names")
+    parser.add_argument("--language", default="en-GB", help="language for cloud backends")
+    parser.add_argument("--sphinx-model", help="PocketSphinx model directory (default: bundled en-US)")
+    parser.add_argument("--vosk-model", help="Vosk model directory")
+    parser.add_argument("--workers", type=int, default=4, help="threads for the batch run")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"no .wav files in {args.corpus}")
+
+    model_dirs = {"sphinx": args.sphinx_model, "vosk": args.vosk_model}
+    for name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        print(name)
+        try:
+            engine = STTEngine(language=args.language, backend=name, batch_workers=args.workers, model_dir=model_dirs.get(name))
+        except (sr.RequestError, ValueError) as e:
+            print(f"  unavailable: {e}")
+            continue
+        try:
+            for key, value in run(engine, corpus).items():
+                print(f"  {key:>12}: {value:.3f}" if isinstance(value, float) else f"  {key:>12}: {value}")
+        finally:
+            engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark: local wake-word gate in front of cloud STT.
+
+Runs every clip of a corpus through WakeWordGate and reports
+false-accept rate (negatives let through), false-reject rate (positives
+blocked), the resulting reduction in STT calls, and gate latency.
+
+Corpus layout (16-bit mono WAV, any sample rate):
+
+    <corpus>/positive/*.wav    phrases starting with the wake word
+    <corpus>/negative/*.wav    silence, room noise, other conversation
+    <corpus>/templates/*.wav   enrolled wake-word recordings (template spotter)
+
+Real recordings give the numbers that matter. `--synthesize DIR` writes a
+synthetic corpus (tone-pattern "wake word", modulated-noise "speech",
+fan noise, silence) that exercises the whole gate end to end and is
+useful for checking regressions in the gate's cost and logic.
+
+    python benchmarks/bench_wake_gate.py --synthesize /tmp/wake_corpus
+    python benchmarks/bench_wake_gate.py --corpus /tmp/wake_corpus --spotter template
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import math
+import random
+import statistics
+import struct
+import sys
+import time
+import wave
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import speech_recognition as sr  # noqa: E402
+
+from guardian.wake_gate import WakeWordGate, build_spotter, load_wav  # noqa: E402
+
+RATE = 16000
+
+
+# ---------------------------------------------------------------------- #
+# Synthetic corpus
+# ---------------------------------------------------------------------- #
+def _tone(freq_from: float, freq_to: float, seconds: float, amp: float, rng: random.Random) -> List[float]:
+    n = int(RATE * seconds)
+    out, phase = [], 0.0
+    for i in range(n):
+        f = freq_from + (freq_to - freq_from) * i / max(1, n - 1)
+        phase += 2 * math.pi * f / RATE
+        env = math.sin(math.pi * i / n)
+        out.append(amp * env * (math.sin(phase) + 0.3 * math.sin(2 * phase)) + rng.gauss(0, amp * 0.05))
+    return out
+
+
+def _speechlike(seconds: float, amp: float, rng: random.Random) -> List[float]:
+    n = int(RATE * seconds)
+    syllable = rng.uniform(0.12, 0.25)
+    return [amp * max(0.0, math.sin(math.pi * i / (RATE * syllable))) * rng.gauss(0, 1) for i in range(n)]
+
+
+def _noise(seconds: float, amp: float, rng: random.Random) -> List[float]:
+    return [rng.gauss(0, amp) for _ in range(int(RATE * seconds))]
+
+
+def _wake(rng: random.Random, amp: float) -> List[float]:
+    k = rng.uniform(0.9, 1.1)  # pitch / tempo variation
+    return (
+        _tone(300 * k, 600 * k, 0.25 / k, amp, rng)
+        + _noise(0.05, amp * 0.01, rng)
+        + _tone(800 * k, 700 * k, 0.3 / k, amp, rng)
+    )
+
+
+def _write(path: Path, samples: List[float]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(b"".join(struct.pack("<h", max(-32767, min(32767, int(x)))) for x in samples))
+
+
+def synthesize(corpus: Path, count: int, seed: int = 3) -> None:
+    rng = random.Random(seed)
+    for i in range(3):
+        _write(corpus / "templates" / f"wake_{i}.wav", _noise(0.1, 20, rng) + _wake(rng, 8000) + _noise(0.1, 20, rng))
+    for i in range(count):
+        amp = rng.uniform(3000, 12000)
+        pre = _noise(rng.uniform(0.2, 0.5), 40, rng)
+        _write(corpus / "positive" / f"pos_{i:03d}.wav", pre + _wake(rng, amp) + _speechlike(1.2, amp * 0.5, rng) + pre)
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            samples = _noise(1.5, 40, rng)  # near silence
+        elif kind == 1:
+            samples = _noise(2.0, 400, rng)  # fan / room noise
+        elif kind == 2:
+            samples = _noise(0.3, 40, rng) + _speechlike(2.0, rng.uniform(2000, 8000), rng)  # conversation
+        else:
+            amp = rng.uniform(3000, 10000)  # other tonal speech
+            samples = _noise(0.3, 40, rng) + _tone(900, 400, 0.4, amp, rng) + _speechlike(1.0, amp * 0.5, rng)
+        _write(corpus / "negative" / f"neg_{i:03d}.wav", samples)
+
+
+# ---------------------------------------------------------------------- #
+# Evaluation
+# ---------------------------------------------------------------------- #
+def run(corpus: Path, spotter_kind: str, threshold: float) -> Dict[str, float]:
+    spotter = build_spotter(
+        spotter_kind, sr.Recognizer(), keyword="malcolm",
+        templates_dir=corpus / "templates", template_threshold=threshold,
+    )
+    gate = WakeWordGate(spotter=spotter)
+
+    results = {"positive": [0, 0], "negative": [0, 0]}  # [passed, total]
+    latencies: List[float] = []
+    for label in ("positive", "negative"):
+        for path in sorted((corpus / label).glob("*.wav")):
+            audio = load_wav(path)
+            started = time.perf_counter()
+            decision = gate.check(audio)
+            latencies.append(time.perf_counter() - started)
+            results[label][0] += int(decision.passed)
+            results[label][1] += 1
+
+    pos_passed, pos_total = results["positive"]
+    neg_passed, neg_total = results["negative"]
+    total = pos_total + neg_total
+    return {
+        "spotter": spotter.name if spotter else "vad-only",
+        "clips": total,
+        "false_accept_rate": neg_passed / neg_total if neg_total else 0.0,
+        "false_reject_rate": (pos_total - pos_passed) / pos_total if pos_total else 0.0,
+        "stt_call_reduction": 1.0 - (pos_passed + neg_passed) / total if total else 0.0,
+        "gate_ms_mean": statistics.fmean(latencies) * 1000.0 if latencies else 0.0,
+        "gate_ms_max": max(latencies) * 1000.0 if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, help="corpus directory to evaluate")
+    parser.add_argument("--synthesize", type=Path, help="write a synthetic corpus here and evaluate it")
+    parser.add_argument("--count", type=int, default=40, help="clips per class when synthesizing")
+    parser.add_argument("--spotter", default="auto", choices=["auto", "sphinx", "template", "none"])
+    parser.add_argument("--threshold", type=float, default=0.8, help="template spotter DTW threshold")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    corpus = args.corpus
+    if args.synthesize:
+        synthesize(args.synthesize, args.count)
+        corpus = args.synthesize
+    if corpus is None:
+        parser.error("pass --corpus or --synthesize")
+
+    for key, value in run(corpus, args.spotter, args.threshold).items():
+        print(f"{key:>20}: {value:.3f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Fakes for running the guardian headless: no real process table,
+microphone, speech engine or Omni service is needed.
+
+    FakeProcessTable    a scalable process table; fake_psutil() patches
+                        psutil.pids / Process / process_iter to read it
+    WavMicrophone       an sr.AudioSource that plays WAV files (with
+                        silence between them) instead of a microphone;
+                        fake_microphone() makes sr.Microphone() return it
+    ToneTranscriber     an STT backend for tone clips written by
+                        write_tone_wav(): each clip's frequency maps to
+                        its transcript, so STT workers may run out of order
+    StubEngineFactory   a pyttsx3-compatible engine that "speaks" at a
+                        configurable speed; fake_pyttsx3() patches
+                        pyttsx3.init and pyttsx3.Engine
+    StubOmniServer      the local Omni stand-in from stub_omni_server.py
+
+    table = FakeProcessTable(5000, churn=0.01)
+    with fake_psutil(table):
+        watchdog = SecurityWatchdog(...)
+"""
+from __future__ import annotations
+
+import contextlib
+import math
+import random
+import struct
+import sys
+import threading
+import time
+import wave
+from array import array
+from collections import namedtuple
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import psutil
+import pyttsx3
+import speech_recognition as sr
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from guardian.stt_stub import STTBackend  # noqa: E402
+from stub_omni_server import StubOmniServer  # noqa: E402,F401
+
+_MemInfo = namedtuple("_MemInfo", "rss vms")
+_IOCounters = namedtuple("_IOCounters", "read_count write_count read_bytes write_bytes")
+
+COMMON_NAMES = (
+    "svchost.exe", "explorer.exe", "chrome.exe", "code.exe", "python.exe",
+    "msedge.exe", "teams.exe", "onedrive.exe", "searchhost.exe", "dwm.exe",
+)
+
+
+@contextlib.contextmanager
+def patched(target: Any, name: str, value: Any) -> Iterator[None]:
+    original = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+
+# ---------------------------------------------------------------------- #
+# psutil
+# ---------------------------------------------------------------------- #
+class FakeProcess:
+    """
+    The parts of psutil.Process the guardian reads. CPU follows a noisy
+    walk; a few "hot" processes sit near 100%.
+    """
+
+    def __init__(self, pid: int, name: str, create_time: float, rng: random.Random, hot: bool = False) -> None:
+        self.pid = pid
+        self.alive = True
+        self.info: Dict[str, Any] = {}
+        self._name = name
+        self._create_time = create_time
+        self._rng = rng
+        self._hot = hot
+        self._cpu = 95.0 if hot else rng.random() * 5.0
+        self._rss = rng.randint(5, 500) * 1_000_000
+        self._read = 0
+        self._write = 0
+
+    def _check(self) -> None:
+        if not self.alive:
+            raise psutil.NoSuchProcess(self.pid)
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def is_running(self) -> bool:
+        return self.alive
+
+    def create_time(self) -> float:
+        self._check()
+        return self._create_time
+
+    def name(self) -> str:
+        self._check()
+        return self._name
+
+    def exe(self) -> str:
+        self._check()
+        return f"C:\\Program Files\\Fake\\{self._name}"
+
+    def username(self) -> str:
+        return "bench"
+
+    def cpu_percent(self, interval: Optional[float] = None) -> float:
+        self._check()
+        base = 95.0 if self._hot else 2.0
+        self._cpu = max(0.0, min(100.0, self._cpu * 0.8 + base * 0.2 + self._rng.gauss(0.0, 1.0)))
+        return self._cpu
+
+    def memory_info(self) -> _MemInfo:
+        self._check()
+        self._rss += self._rng.randint(-4096, 4096)
+        return _MemInfo(self._rss, self._rss * 2)
+
+    def io_counters(self) -> _IOCounters:
+        self._check()
+        self._read += self._rng.randint(0, 65536)
+        self._write += self._rng.randint(0, 16384)
+        return _IOCounters(0, 0, self._read, self._write)
+
+    def num_threads(self) -> int:
+        self._check()
+        return 8
+
+    def terminate(self) -> None:
+        self.alive = False
+
+
+class FakeProcessTable:
+    """
+    `count` live processes. Each tick() replaces `churn` of them with new
+    PIDs, as processes start and exit on a busy machine.
+    """
+
+    def __init__(self, count: int, churn: float = 0.0, hot_fraction: float = 0.01, seed: int = 7) -> None:
+        self.churn = churn
+        self.hot_fraction = hot_fraction
+        self._rng = random.Random(seed)
+        self._next_pid = 100
+        self.procs: Dict[int, FakeProcess] = {}
+        for _ in range(count):
+            self._spawn()
+
+    def _spawn(self) -> None:
+        pid = self._next_pid
+        self._next_pid += 4
+        name = self._rng.choice(COMMON_NAMES)
+        hot = self._rng.random() < self.hot_fraction
+        self.procs[pid] = FakeProcess(pid, name, time.time() - self._rng.random() * 3600, self._rng, hot)
+
+    def tick(self) -> None:
+        for _ in range(int(len(self.procs) * self.churn)):
+            pid = self._rng.choice(list(self.procs))
+            self.procs.pop(pid).alive = False
+            self._spawn()
+
+    def pids(self) -> List[int]:
+        return list(self.procs)
+
+    def process(self, pid: int) -> FakeProcess:
+        proc = self.procs.get(pid)
+        if proc is None:
+            raise psutil.NoSuchProcess(pid)
+        return proc
+
+    def process_iter(self, attrs: Optional[Sequence[str]] = None, ad_value: Any = None) -> Iterator[FakeProcess]:
+        for proc in list(self.procs.values()):
+            if attrs is not None:
+                proc.info = {a: proc.pid if a == "pid" else getattr(proc, a)() for a in attrs}
+            yield proc
+
+
+@contextlib.contextmanager
+def fake_psutil(table: FakeProcessTable) -> Iterator[FakeProcessTable]:
+    """
+    Route psutil.pids / Process / process_iter to `table`. Scanners take
+    their defaults when constructed, so build them inside the block.
+    """
+    with patched(psutil, "pids", table.pids), patched(psutil, "Process", table.process), \
+            patched(psutil, "process_iter", table.process_iter):
+        yield table
+
+
+# ---------------------------------------------------------------------- #
+# Microphone and STT
+# ---------------------------------------------------------------------- #
+def write_tone_wav(path: Path, frequency: float, seconds: float, rate: int = 16000, amplitude: int = 8000) -> Path:
+    """
+    A mono 16-bit sine tone: loud enough to trip the energy threshold,
+    and its frequency identifies the clip.
+    """
+    samples = array("h", (int(amplitude * math.sin(2 * math.pi * frequency * i / rate)) for i in range(int(seconds * rate))))
+    if sys.byteorder != "little":
+        samples.byteswap()
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    return path
+
+
+def tone_frequency(frame_data: bytes, rate: int) -> float:
+    """
+    Estimate the tone frequency of 16-bit audio from its zero crossings,
+    ignoring the silence around the phrase.
+    """
+    count = len(frame_data) // 2
+    samples = struct.unpack(f"<{count}h", frame_data[: count * 2])
+    crossings = 0
+    voiced = 0
+    last = 0
+    for s in samples:
+        if s:
+            voiced += 1
+            if (s > 0) != (last > 0) and last:
+                crossings += 1
+            last = s
+    return crossings * rate / (2.0 * voiced) if voiced else 0.0
+
+
+class WavMicrophone(sr.AudioSource):
+    """
+    Plays WAV files through the sr.AudioSource interface: `lead_seconds`
+    of silence (for adjust_for_ambient_noise), then each file followed by
+    `gap_seconds` of silence, then silence for ever. `speed` paces reads
+    against the wall clock (1.0 is real time, 0 reads as fast as possible).
+    All files must share one sample rate and be 16-bit mono.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[Path],
+        gap_seconds: float = 1.2,
+        lead_seconds: float = 1.0,
+        speed: float = 1.0,
+        chunk_size: int = 1024,
+    ) -> None:
+        chunks: List[bytes] = []
+        rate = None
+        for path in paths:
+            with wave.open(str(path), "rb") as w:
+                if w.getsampwidth() != 2 or w.getnchannels() != 1:
+                    raise ValueError(f"{path}: expected 16-bit mono audio.")
+                if rate is not None and w.getframerate() != rate:
+                    raise ValueError(f"{path}: sample rate {w.getframerate()} differs from {rate}.")
+                rate = w.getframerate()
+                chunks.append(w.readframes(w.getnframes()))
+        self.SAMPLE_RATE = rate or 16000
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = chunk_size
+        silence = bytes(int(gap_seconds * self.SAMPLE_RATE) * 2)
+        self._data = bytes(int(lead_seconds * self.SAMPLE_RATE) * 2) + b"".join(c + silence for c in chunks)
+        self.speed = speed
+        self.exhausted = threading.Event()
+        self.stream = self
+
+    def __enter__(self) -> "WavMicrophone":
+        self._pos = 0
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def read(self, frames: int) -> bytes:
+        size = frames * 2
+        chunk = self._data[self._pos:self._pos + size]
+        if len(chunk) < size:
+            self.exhausted.set()
+            chunk += bytes(size - len(chunk))
+            if not self.speed:
+                time.sleep(frames / self.SAMPLE_RATE)  # do not spin once the files are done
+        self._pos += size
+        if self.speed:
+            due = self._started + self._pos / 2 / self.SAMPLE_RATE / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return chunk
+
+
+@contextlib.contextmanager
+def fake_microphone(mic: WavMicrophone) -> Iterator[WavMicrophone]:
+    with patched(sr, "Microphone", lambda *args, **kwargs: mic):
+        yield mic
+
+
+class ToneTranscriber(STTBackend):
+    """
+    STT backend for clips from write_tone_wav(): returns the transcript
+    whose tone is nearest the phrase's, after `latency_seconds`.
+    """
+
+    name = "tones"
+    offline = True
+
+    def __init__(self, transcripts: Dict[float, str], latency_seconds: float = 0.0) -> None:
+        self.transcripts = dict(transcripts)
+        self.latency_seconds = latency_seconds
+
+    def transcribe(self, audio: sr.AudioData) -> Optional[str]:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        heard = tone_frequency(audio.get_raw_data(convert_width=2), audio.sample_rate)
+        if not heard:
+            return None
+        return self.transcripts[min(self.transcripts, key=lambda f: abs(f - heard))]
+
+
+# ---------------------------------------------------------------------- #
+# pyttsx3
+# ---------------------------------------------------------------------- #
+class _Voice:
+    def __init__(self, voice_id: str, name: str) -> None:
+        self.id = voice_id
+        self.name = name
+
+
+class StubEngine:
+    """
+    pyttsx3 engine look-alike. runAndWait() takes len(text) /
+    chars_per_second (0 means instant) and can be cut short by stop().
+    """
+
+    def __init__(self, factory: "StubEngineFactory") -> None:
+        self._factory = factory
+        self._pending: List[str] = []
+        self._stopped = threading.Event()
+        self._props: Dict[str, Any] = {
+            "rate": 200,
+            "volume": 1.0,
+            "voice": "stub-1",
+            "voices": [_Voice("stub-1", "Stub Hazel"), _Voice("stub-2", "Stub David")],
+        }
+
+    def setProperty(self, name: str, value: Any) -> None:
+        self._props[name] = value
+
+    def getProperty(self, name: str) -> Any:
+        return self._props[name]
+
+    def say(self, text: str) -> None:
+        self._pending.append(text)
+
+    def save_to_file(self, text: str, filename: str) -> None:
+        with wave.open(filename, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(bytes(3200))
+
+    def runAndWait(self) -> None:
+        pending, self._pending = self._pending, []
+        self._stopped.clear()
+        for text in pending:
+            if self._factory.chars_per_second and self._stopped.wait(len(text) / self._factory.chars_per_second):
+                break
+            self._factory.spoken(text)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+class StubEngineFactory:
+    """
+    Drop-in for pyttsx3.init / pyttsx3.Engine (or Pyttsx3Backend's
+    engine_factory) that counts what its engines said.
+    """
+
+    def __init__(self, chars_per_second: float = 0.0, init_seconds: float = 0.0) -> None:
+        self.chars_per_second = chars_per_second
+        self.init_seconds = init_seconds
+        self.engines = 0
+        self.utterances = 0
+        self.characters = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> StubEngine:
+        if self.init_seconds:
+            time.sleep(self.init_seconds)
+        with self._lock:
+            self.engines += 1
+        return StubEngine(self)
+
+    def spoken(self, text: str) -> None:
+        with self._cond:
+            self.utterances += 1
+            self.characters += len(text)
+            self._cond.notify_all()
+
+    def wait_for(self, utterances: int, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.utterances >= utterances, timeout)
+
+
+@contextlib.contextmanager
+def fake_pyttsx3(factory: StubEngineFactory) -> Iterator[StubEngineFactory]:
+    # Pyttsx3Backend builds pyttsx3.Engine directly; init is patched for anything else.
+    with patched(pyttsx3, "init", factory), patched(pyttsx3, "Engine", factory):
+        yield factory
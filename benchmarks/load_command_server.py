@@ -0,0 +1,191 @@
+"""
+Load generator for the headless command server (guardian/command_server.py).
+
+Opens --sessions keep-alive connections, each its own session, and has
+them send POST /command back to back until --requests commands have
+been answered in total (or --duration seconds have passed). Reports
+requests per second and latency percentiles, plus 503 "busy" replies.
+
+Without --url it starts everything in-process: a stub Omni server with
+--omni-latency per call, a real MalcolmClient, PolicyEngine and
+ToolExecutor, and a CommandServer with --omni-workers. With --url it
+drives a running `python src/main.py --headless` instead.
+
+    python benchmarks/load_command_server.py
+    python benchmarks/load_command_server.py --sessions 64 --omni-workers 16 --omni-latency 0.05
+    python benchmarks/load_command_server.py --url http://127.0.0.1:8770 --token-file logs/command_server.token
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from guardian.command_server import CommandServer  # noqa: E402
+from guardian.confirmations import ConfirmationBroker  # noqa: E402
+from guardian.malcolm_client import MalcolmClient  # noqa: E402
+from guardian.policy_engine import PolicyEngine  # noqa: E402
+from guardian.tool_executor import ToolExecutor  # noqa: E402
+from stub_omni_server import StubOmniServer  # noqa: E402
+
+
+@contextmanager
+def local_server(
+    omni_latency: float,
+    omni_workers: int,
+    tool: str = "enter_quiet_mode",
+    max_inflight: int = 256,
+) -> Iterator[Tuple[str, CommandServer]]:
+    """
+    A CommandServer wired to a stub Omni server; yields (url, server).
+    """
+    reply = {"reply_text": "Done.", "tool_calls": [{"tool": tool, "args": {}}] if tool else []}
+    with StubOmniServer(latency_seconds=omni_latency, response=reply) as omni:
+        client = MalcolmClient(base_url=omni.url, api_key="bench", enabled=True, max_retries=0, pool_size=omni_workers)
+        # Every command is distinct, so the response cache would only add work.
+        policy = PolicyEngine(auto_allow=[tool] if tool else [], confirm_tools=[])
+        broker = ConfirmationBroker()
+        executor = ToolExecutor(broker, pool_size=4)
+
+        def decide(command: str, context: Dict[str, Any], state: Dict[str, Any]):
+            response = client.send_text_to_malcolm(command, context=context)
+            return response, [policy.evaluate_tool_call(tc, state) for tc in response.tool_calls]
+
+        server = CommandServer(decide, executor, broker, port=0, omni_workers=omni_workers, max_inflight=max_inflight)
+        server.start()
+        try:
+            host, port = server.address
+            yield f"http://{host}:{port}", server
+        finally:
+            server.stop()
+            executor.shutdown()
+            client.close()
+
+
+async def _post(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, token: str, body: bytes) -> int:
+    writer.write(
+        b"POST /command HTTP/1.1\r\nHost: %s\r\nAuthorization: Bearer %s\r\n"
+        b"Content-Type: application/json\r\nContent-Length: %d\r\n\r\n%s"
+        % (host.encode(), token.encode(), len(body), body)
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _session(
+    index: int,
+    host: str,
+    port: int,
+    token: str,
+    budget: Dict[str, Any],
+    latencies: List[float],
+    counts: Dict[str, int],
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    session = f"load-{index}"
+    n = 0
+    try:
+        while budget["left"] > 0 and time.monotonic() < budget["deadline"]:
+            budget["left"] -= 1
+            n += 1
+            body = json.dumps({"session": session, "command": f"status check {index} {n}"}).encode("utf-8")
+            started = time.perf_counter()
+            try:
+                status = await _post(reader, writer, host, token, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                counts["errors"] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            elif status == 503:
+                counts["busy"] += 1
+                await asyncio.sleep(0.01)
+            else:
+                counts["errors"] += 1
+    finally:
+        writer.close()
+
+
+async def _load(url: str, token: str, sessions: int, requests: int, duration: float) -> Dict[str, float]:
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    budget = {"left": requests, "deadline": time.monotonic() + duration}
+    latencies: List[float] = []
+    counts = {"busy": 0, "errors": 0}
+    started = time.perf_counter()
+    await asyncio.gather(*(_session(i, host, port, token, budget, latencies, counts) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        raise RuntimeError(f"No command succeeded against {url} ({counts}).")
+    ordered = sorted(latencies)
+
+    def pct(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000.0
+
+    return {
+        "requests_per_s": len(ordered) / elapsed,
+        "latency_p50_ms": pct(0.5),
+        "latency_p95_ms": pct(0.95),
+        "latency_p99_ms": pct(0.99),
+        "latency_mean_ms": statistics.fmean(ordered) * 1000.0,
+        "completed": float(len(ordered)),
+        "busy": float(counts["busy"]),
+        "errors": float(counts["errors"]),
+    }
+
+
+def load(url: str, token: str, sessions: int, requests: int, duration: float = 3600.0) -> Dict[str, float]:
+    return asyncio.run(_load(url, token, sessions, requests, duration))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="drive a running headless guardian instead of an in-process one")
+    parser.add_argument("--token-file", type=Path, help="the running guardian's token file (with --url)")
+    parser.add_argument("--sessions", type=int, default=32, help="concurrent sessions (one connection each)")
+    parser.add_argument("--requests", type=int, default=2000, help="total commands to send")
+    parser.add_argument("--duration", type=float, default=3600.0, help="stop after this many seconds")
+    parser.add_argument("--omni-latency", type=float, default=0.01, help="stub Omni latency per call (in-process)")
+    parser.add_argument("--omni-workers", type=int, default=8, help="Omni executor size (in-process)")
+    parser.add_argument("--tool", default="enter_quiet_mode", help="tool call in every stub reply ('' for none)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    if args.url:
+        if args.token_file is None:
+            parser.error("--url needs --token-file")
+        token = args.token_file.read_text(encoding="utf-8").strip()
+        result = load(args.url, token, args.sessions, args.requests, args.duration)
+    else:
+        with local_server(args.omni_latency, args.omni_workers, args.tool) as (url, server):
+            result = load(url, server.token, args.sessions, args.requests, args.duration)
+            result["server_p95_ms"] = server.stats()["latency_p95_ms"]
+        result["omni_bound_per_s"] = args.omni_workers / args.omni_latency if args.omni_latency else float("inf")
+    for key, value in result.items():
+        print(f"{key:>18}: {value:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+"""
+Replay a recording through MalcolmGuardian and compare builds on it.
+
+A recording is made by running the guardian with
+
+    recording:
+      enabled: true          # logs/recordings/<timestamp>-<pid>.mgrec
+
+and holds every command, Omni reply, tool result, confirmation answer,
+security event and process snapshot with its time offset (see
+guardian/recorder.py). Replay builds a MalcolmGuardian from the
+recorded config (API keys are never recorded) and:
+
+  - serves the recorded Omni replies in place of the network, in the
+    order each command received them (--network recorded also waits
+    the recorded round-trip time),
+  - publishes the recorded process snapshots through a stand-in
+    sampler instead of psutil, and runs a watchdog scan every
+    process_scan_interval / sample_interval snapshots,
+  - sends voice commands through handle_voice_command() one at a time,
+    as the microphone pipeline does, and headless commands to the
+    guardian's own command server,
+  - runs the read-only tools for real against the replayed snapshots
+    and answers every other tool with its recorded result, so nothing
+    is killed or locked; confirmations that were answered from the
+    console, the socket or by timeout get the recorded answer.
+
+--speed is 1 (recorded pace), N (N times faster) or max (no waiting).
+Compare builds at --speed max: throughput is then what the build can
+do, not how fast the operator spoke. The report is a run_benchmarks.py
+record with a single "replay" case, so --save / --baseline /
+--threshold / --fail-on-regression work the same way:
+
+    python benchmarks/replay.py logs/recordings/20261016-101500-4242.mgrec --save
+    git checkout my-branch
+    python benchmarks/replay.py logs/recordings/20261016-101500-4242.mgrec --baseline latest
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import hashlib
+import http.client
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+import requests
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import guardian.main as guardian_main  # noqa: E402
+from fakes import patched  # noqa: E402
+from guardian.confirmations import ConfirmationTicket  # noqa: E402
+from guardian.instrumentation import metrics  # noqa: E402
+from guardian.process_sampler import ProcessSnapshot  # noqa: E402
+from guardian.process_scanner import ScanDelta  # noqa: E402
+from guardian.recorder import Record, read_recording, snapshot_from_rows  # noqa: E402
+from guardian.security_watchdog import SecurityWatchdog  # noqa: E402
+from guardian.tools import execute_tool  # noqa: E402
+from run_benchmarks import RESULTS_DIR, _pct, _reset_root_logger, build_record, compare, save  # noqa: E402
+
+Metrics = Dict[str, float]
+
+# Tools that only read the sampler, telemetry or metrics: safe to run for
+# real during a replay, and part of what is being measured.
+LIVE_TOOLS = frozenset({
+    "describe_top_processes", "process_trend", "system_trend", "top_processes_over_window", "latency_report",
+})
+
+# Confirmation answers that a replayed command gives again by itself.
+_COMMAND_SOURCES = ("voice", "headless:")
+
+
+# ---------------------------------------------------------------------- #
+# Stand-ins for the outside world
+# ---------------------------------------------------------------------- #
+class RecordedResponse:
+    """
+    The parts of requests.Response that MalcolmClient reads, filled from
+    an "omni" record.
+    """
+
+    def __init__(self, record: Dict[str, Any]) -> None:
+        self.status_code = record.get("status", 200)
+        self.ok = self.status_code < 400
+        self.headers = {"Content-Type": record.get("content_type", "application/json")}
+        self.encoding = "utf-8"
+        self._lines: Optional[List[str]] = record.get("lines")
+        self.text = record.get("body") if self._lines is None else "\n".join(self._lines)
+        self.headers["Content-Length"] = str(len(self.text.encode("utf-8")))
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def iter_lines(self, decode_unicode: bool = False) -> Iterator[str]:
+        return iter(self._lines if self._lines is not None else self.text.splitlines())
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False) -> Iterator[bytes]:
+        body = self.text.encode("utf-8")
+        return (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "RecordedResponse":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class OmniReplay:
+    """
+    Stands in for MalcolmClient._post_with_retries: each command gets the
+    replies recorded for it, in order. A command the recording never
+    sent (the response cache behaved differently, say) is answered as
+    unreachable, so the client falls back to its offline reply.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], network: bool = False) -> None:
+        self.network = network
+        self._replies: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for record in records:
+            self._replies[record["command"]].append(record)
+        self._lock = threading.Lock()
+        self.served = 0
+        self.missing = 0
+
+    def post(self, url: str, payload: Dict[str, Any], headers: Dict[str, str], stream: bool = False, settings: Any = None) -> RecordedResponse:
+        with self._lock:
+            replies = self._replies.get(payload["command"])
+            record = replies.popleft() if replies else None
+            if record is None:
+                self.missing += 1
+            else:
+                self.served += 1
+        if record is None:
+            raise requests.ConnectionError(f"No recorded reply for {payload['command']!r}.")
+        if self.network:
+            time.sleep(record.get("seconds", 0.0))
+        if "error" in record:
+            raise requests.ConnectionError(record["error"])
+        return RecordedResponse(record)
+
+
+class ReplaySampler:
+    """
+    A ProcessSampler whose snapshots come from the recording: publish()
+    swaps one in and runs the subscribers, as a sampler tick would.
+    """
+
+    def __init__(self) -> None:
+        self._snapshot: Optional[ProcessSnapshot] = None
+        self._subscribers: List[Callable[[ProcessSnapshot, ScanDelta], None]] = []
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def snapshot(self) -> Optional[ProcessSnapshot]:
+        return self._snapshot
+
+    def wait_for_snapshot(self, timeout: Optional[float] = None) -> ProcessSnapshot:
+        return self._snapshot if self._snapshot is not None else ProcessSnapshot.build([], 0.0, 0)
+
+    def subscribe(self, callback: Callable[[ProcessSnapshot, ScanDelta], None]) -> None:
+        self._subscribers.append(callback)
+
+    def publish(self, snapshot: ProcessSnapshot) -> None:
+        self._snapshot = snapshot
+        for callback in self._subscribers:
+            callback(snapshot, ScanDelta())
+
+
+class ToolReplay:
+    """
+    The ToolExecutor's `execute`: LIVE_TOOLS run for real, every other
+    tool returns (or fails with) its next recorded result.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]]) -> None:
+        self._results: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for record in records:
+            if record["status"] in ("ok", "error") and record["tool"] not in LIVE_TOOLS:
+                self._results[record["tool"]].append(record)
+
+    def execute(self, tool: str, args: Dict[str, Any]) -> str:
+        if tool in LIVE_TOOLS:
+            return execute_tool(tool, args)
+        results = self._results.get(tool)
+        record = results.popleft() if results else None
+        if record is None:
+            return f"'{tool}' was replayed without a recorded result."
+        if record["status"] == "error":
+            raise RuntimeError(record["message"])
+        return record["message"]
+
+
+class ConfirmationReplay:
+    """
+    Broker listener giving each ticket its recorded answer when that
+    answer did not come from a command the replay sends anyway.
+    """
+
+    def __init__(self, broker, records: List[Dict[str, Any]]) -> None:
+        self.broker = broker
+        self._answers: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for record in records:
+            self._answers[record["tool"]].append(record)
+
+    def __call__(self, ticket: ConfirmationTicket) -> None:
+        answers = self._answers.get(ticket.tool)
+        record = answers.popleft() if answers else None
+        if record is None or str(record.get("answered_by")).startswith(_COMMAND_SOURCES):
+            return
+        self.broker.answer(bool(record.get("allowed")), ticket.ticket_id, source="replay")
+
+
+class HeadlessClient:
+    """
+    One keep-alive connection per replay thread to the guardian's
+    command server.
+    """
+
+    def __init__(self, address, token: str) -> None:
+        self.host, self.port = address
+        self._headers = {"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+        self._local = threading.local()
+
+    def send(self, session: str, command: str, context: Dict[str, Any]) -> int:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        body = json.dumps({"session": session, "command": command, "context": context or {}})
+        try:
+            conn.request("POST", "/command", body=body, headers=self._headers)
+            resp = conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+        return resp.status
+
+
+# ---------------------------------------------------------------------- #
+# Replay
+# ---------------------------------------------------------------------- #
+def _replay_config(recorded: Dict[str, Any]) -> Dict[str, Any]:
+    cfg = copy.deepcopy(recorded)
+
+    def section(name: str) -> Dict[str, Any]:
+        value = cfg.get(name)
+        cfg[name] = value = dict(value) if isinstance(value, dict) else {}
+        return value
+
+    section("logging").update(console=False)
+    section("instrumentation").update(enabled=True, metrics_endpoint=False)
+    section("tts").update(enabled=False)
+    section("learning").update(enabled=False)
+    section("recording").update(enabled=False)
+    section("config_reload").update(enabled=False)
+    # The recording redacts the token settings; the server makes its own.
+    section("server").update(host="127.0.0.1", port=0, token=None, token_file="logs/command_server.token")
+    section("malcolm_api").update(api_key="replay")
+    tools = section("tools")
+    tools["confirmations"] = {**(tools.get("confirmations") or {}), "console": False, "socket_enabled": False}
+    return cfg
+
+
+def _gather(path: Path) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    First pass: the recorded replies and results, by kind.
+    """
+    found: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in read_recording(path, expand_snapshots=False):
+        if record.kind != "snapshot":
+            found[record.kind].append(record.data)
+    return found
+
+
+def replay(path: Path, speed: float, network: bool = False) -> Metrics:
+    recorded = _gather(path)
+    meta = recorded["meta"][0] if recorded["meta"] else {}
+    commands = recorded["command"]
+    headless = any(c.get("source") == "headless" for c in commands)
+    cfg = _replay_config(meta.get("config", {}))
+    s_cfg = cfg.get("security", {})
+    scan_every = max(1, round(s_cfg.get("process_scan_interval_seconds", 15) / max(s_cfg.get("sample_interval_seconds", 2.0), 1e-3)))
+
+    omni = OmniReplay(recorded["omni"], network=network)
+    sampler = ReplaySampler()
+    outcomes: List[Any] = []
+    delivered: List[Any] = []
+    command_seconds: List[float] = []
+    scan_seconds: List[float] = []
+    publish_seconds: List[float] = []
+    failures = Counter()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "config").mkdir()
+        (root / "config" / "config.yaml").write_text(yaml.safe_dump(cfg))
+        metrics.reset()
+        guardian = guardian_main.MalcolmGuardian(root_dir=root, headless=headless)
+        try:
+            guardian.malcolm = guardian._build_malcolm(cfg.get("malcolm_api", {}))
+            guardian.malcolm._post_with_retries = omni.post
+            with patched(guardian_main, "ProcessSampler", lambda **_: sampler), \
+                    patched(SecurityWatchdog, "start", lambda self: None):
+                guardian._init_watchdog()
+            guardian.tool_executor._execute = ToolReplay(recorded["tool"]).execute
+            guardian.confirmations.add_listener(ConfirmationReplay(guardian.confirmations, recorded["confirmation"]))
+
+            finish = guardian.tool_executor._finish
+            guardian.tool_executor._finish = lambda batch, i, o, cb: (outcomes.append(o), finish(batch, i, o, cb))
+            handler = guardian.security_events.handler
+            guardian.security_events.handler = lambda event: (delivered.append(event), handler(event))
+            guardian.security_events.start()
+            client = None
+            if guardian.command_server:
+                guardian.command_server.start()
+                client = HeadlessClient(guardian.command_server.address, guardian.command_server.token)
+
+            # Voice commands are handled one at a time, as by the audio
+            # pipeline's command worker; headless sessions run side by side.
+            voice = ThreadPoolExecutor(max_workers=1, thread_name_prefix="replay-voice")
+            sessions = ThreadPoolExecutor(max_workers=cfg.get("server", {}).get("omni_workers", 8), thread_name_prefix="replay-headless")
+
+            def timed(fn: Callable[[], Any]) -> None:
+                started = time.perf_counter()
+                try:
+                    status = fn()
+                except Exception:
+                    failures["command"] += 1
+                    return
+                if status not in (None, 200):
+                    failures["command"] += 1
+                command_seconds.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            snapshots = 0
+            for record in read_recording(path):
+                if speed:
+                    delay = started + record.t / speed - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if record.kind == "snapshot":
+                    t0 = time.perf_counter()
+                    sampler.publish(snapshot_from_rows(record.data["rows"], record.data["scan_ms"], record.data["tick"]))
+                    publish_seconds.append(time.perf_counter() - t0)
+                    snapshots += 1
+                    if snapshots % scan_every == 0 and guardian.security_watchdog:
+                        t0 = time.perf_counter()
+                        guardian.security_watchdog._scan_processes()
+                        scan_seconds.append(time.perf_counter() - t0)
+                elif record.kind == "command":
+                    _dispatch(record, guardian, client, voice, sessions, timed)
+
+            voice.shutdown(wait=True)
+            sessions.shutdown(wait=True)
+            # Whatever is still waiting for an answer would only time out.
+            guardian.confirmations.deny_all(source="replay")
+            _settle(guardian, timeout=30.0)
+            elapsed = time.perf_counter() - started
+            stages = metrics.summary()
+        finally:
+            guardian.stop()
+            _reset_root_logger()
+    metrics.configure(enabled=False)
+
+    handled = command_seconds or [0.0]
+    tool_seconds = [o.elapsed for o in outcomes if o.status in ("ok", "error")] or [0.0]
+    result: Metrics = {
+        "commands": float(len(commands)),
+        "commands_per_s": len(command_seconds) / elapsed if elapsed else 0.0,
+        "command_p50_ms": _pct(handled, 0.5) * 1000.0,
+        "command_p95_ms": _pct(handled, 0.95) * 1000.0,
+        "command_max_ms": max(handled) * 1000.0,
+        "tool_p50_ms": _pct(tool_seconds, 0.5) * 1000.0,
+        "tool_p95_ms": _pct(tool_seconds, 0.95) * 1000.0,
+        "snapshots": float(snapshots),
+        "snapshot_publish_p50_ms": _pct(publish_seconds or [0.0], 0.5) * 1000.0,
+        "scan_p50_ms": _pct(scan_seconds or [0.0], 0.5) * 1000.0,
+        "scan_p95_ms": _pct(scan_seconds or [0.0], 0.95) * 1000.0,
+        "wall_seconds": elapsed,
+        "failed_commands": float(failures["command"]),
+        "omni_unmatched": float(omni.missing),
+        # How far this build's behaviour strays from the recording.
+        "tool_results_diff": float(_diff(
+            ((r["tool"], r["status"]) for r in recorded["tool"]), ((o.tool, o.status) for o in outcomes))),
+        "security_events": float(len(delivered)),
+        "security_events_diff": float(_diff(
+            (r["event_type"] for r in recorded["security_event"]), (e.event_type for e in delivered))),
+    }
+    for name, stage in stages.items():
+        result[f"stage.{name}.p50_ms"] = stage["p50_ms"]
+        result[f"stage.{name}.p95_ms"] = stage["p95_ms"]
+    return result
+
+
+def _dispatch(record: Record, guardian, client: Optional[HeadlessClient], voice: ThreadPoolExecutor,
+              sessions: ThreadPoolExecutor, timed: Callable[[Callable[[], Any]], None]) -> None:
+    data = record.data
+    if data.get("source") == "headless" and client is not None:
+        sessions.submit(timed, lambda: client.send(data.get("session") or "replay", data["text"], data.get("context") or {}))
+    else:
+        voice.submit(timed, lambda: guardian.handle_voice_command(data["text"]))
+
+
+def _settle(guardian, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not guardian.tool_executor.stats()["batches_in_flight"] and not guardian.security_events.stats()["pending"]:
+            break
+        time.sleep(0.05)
+    # Let a burst the event pipeline is coalescing reach its handler.
+    time.sleep(min(guardian.security_events.coalesce_seconds, max(0.0, deadline - time.monotonic())) + 0.05)
+
+
+def _diff(recorded: Iterator[Any], replayed: Iterator[Any]) -> int:
+    before, after = Counter(recorded), Counter(replayed)
+    return sum(((before - after) + (after - before)).values())
+
+
+def _digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def _speed(value: str) -> float:
+    if value == "max":
+        return 0.0
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def _latest_replay() -> str:
+    candidates = sorted(RESULTS_DIR.glob("replay-*.json"), key=lambda p: p.stat().st_mtime)
+    if not candidates:
+        raise SystemExit(f"No saved replays in {RESULTS_DIR}.")
+    return str(candidates[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", type=Path)
+    parser.add_argument("--speed", type=_speed, default=0.0, help="1 = recorded pace, N = N times faster, 'max' (default)")
+    parser.add_argument("--network", choices=("none", "recorded"), default="none",
+                        help="wait the recorded Omni round-trip time for each reply")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--save", nargs="?", const="", default=None, metavar="PATH",
+                        help="store the report (default: benchmarks/results/replay-<timestamp>.json)")
+    parser.add_argument("--baseline", metavar="PATH", help="report to compare with, or 'latest'")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    baseline = None
+    if args.baseline:
+        spec = _latest_replay() if args.baseline == "latest" else args.baseline
+        baseline = json.loads(Path(spec).read_text(encoding="utf-8"))
+
+    runs = [replay(args.recording, args.speed, network=args.network == "recorded") for _ in range(args.repeat)]
+    results = {"replay": {key: statistics.median(r.get(key, 0.0) for r in runs) for key in runs[0]}}
+    for key, value in results["replay"].items():
+        print(f"{key:>40}: {value:.3f}")
+
+    params = {"recording": args.recording.name, "digest": _digest(args.recording), "speed": args.speed,
+              "network": args.network, "repeat": args.repeat}
+    regressions: List[str] = []
+    if baseline is not None:
+        if baseline.get("params", {}).get("digest") != params["digest"]:
+            print("\nnote: baseline replayed a different recording:", baseline.get("params"))
+        regressions = compare(baseline, results, args.threshold)
+    if args.save is not None:
+        path = Path(args.save) if args.save else RESULTS_DIR / f"replay-{datetime.now():%Y%m%d-%H%M%S}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        print("\nsaved", save(build_record(results, params), path))
+    if regressions and args.fail_on_regression:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+"""
+Headless benchmark suite, with results kept for comparison between runs.
+
+Cases (all hardware and network is faked, see fakes.py):
+
+    watchdog_scan   SecurityWatchdog._scan_processes over a fake process
+                    table with churn
+    extract         MalcolmClient._extract_reply_text / _extract_tool_calls
+                    over the response shapes the Omni API sends
+    json_normalise  json_stream.parse_reply over small, multi-megabyte
+                    and deeply nested reply bodies (bench_json_normalise.py):
+                    time and peak memory per reply
+    policy          PolicyEngine.evaluate_tool_call with rules: repeated
+                    calls (cache hits), distinct calls, and no rules
+    tts_queue       TTSVoice + Pyttsx3Backend on a stub engine: how fast
+                    the queue drains utterances
+    end_to_end      the real MalcolmGuardian fed WAV phrases through a fake
+                    microphone, talking to a local stub Omni server:
+                    capture -> first audio and capture -> handled, plus
+                    when each subsystem became ready at start-up
+    command_server  the headless CommandServer under concurrent sessions
+                    (load_command_server.py), backed by the stub Omni
+                    server: requests per second and latency
+
+Each case runs --repeat times and the median of each metric is kept.
+--save writes the run to benchmarks/results/<timestamp>.json (or a
+given path); --baseline compares against an earlier file ("latest" picks
+the newest one) and flags metrics more than --threshold worse.
+
+    python benchmarks/run_benchmarks.py --save
+    python benchmarks/run_benchmarks.py --baseline latest --save --fail-on-regression
+    python benchmarks/run_benchmarks.py --only policy extract --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import (  # noqa: E402
+    FakeProcessTable,
+    StubEngineFactory,
+    StubOmniServer,
+    ToneTranscriber,
+    WavMicrophone,
+    fake_microphone,
+    fake_psutil,
+    fake_pyttsx3,
+    write_tone_wav,
+)
+from guardian.instrumentation import metrics  # noqa: E402
+from bench_json_normalise import build_payloads, run as run_json_normalise  # noqa: E402
+from load_command_server import load, local_server  # noqa: E402
+from guardian.malcolm_client import MalcolmClient  # noqa: E402
+from guardian.policy_engine import PolicyEngine  # noqa: E402
+from guardian.security_watchdog import SecurityWatchdog  # noqa: E402
+from guardian.stt_stub import register_backend  # noqa: E402
+from guardian.tts import TTSVoice  # noqa: E402
+from guardian.tts_backends import Pyttsx3Backend  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+FORMAT_VERSION = 1
+
+Metrics = Dict[str, float]
+
+
+def _pct(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _per_call_us(fn: Callable[[], Any], calls: int) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+# ---------------------------------------------------------------------- #
+# Cases
+# ---------------------------------------------------------------------- #
+SUSPICIOUS_NAMES = ["mimikatz", "nc.exe", "ncat", "psexec", "*miner*", "cobalt*", "lazagne", "procdump", "keylog*", "rat.exe"]
+
+
+def case_watchdog_scan(args: argparse.Namespace) -> Metrics:
+    table = FakeProcessTable(args.processes, churn=0.01)
+    events: List[Any] = []
+    with fake_psutil(table):
+        watchdog = SecurityWatchdog(
+            interval_seconds=15,
+            suspicious_cpu_threshold=90.0,
+            suspicious_names=SUSPICIOUS_NAMES,
+            on_event=events.append,
+        )
+        watchdog._scan_processes()  # first scan opens every handle
+        samples = []
+        for _ in range(args.scans):
+            table.tick()
+            started = time.perf_counter()
+            watchdog._scan_processes()
+            samples.append(time.perf_counter() - started)
+    return {
+        "scan_p50_ms": _pct(samples, 0.5) * 1000.0,
+        "scan_p95_ms": _pct(samples, 0.95) * 1000.0,
+        "per_process_us": statistics.median(samples) / args.processes * 1e6,
+        "events": float(len(events)),
+    }
+
+
+REPLY_PAYLOADS: List[Dict[str, Any]] = [
+    {"reply_text": "Checking your top processes.", "tool_calls": [{"tool": "describe_top_processes", "args": {"limit": 5}}]},
+    {"message": "  Quiet mode is on.  ", "actions": [{"type": "enter_quiet_mode", "details": {}}]},
+    {"data": {"text": "Here is a summary of recent activity."}},
+    {"received_command": "activate security", "status": "executed"},
+    {"error": "rate limited"},
+    {"status": "idle"},
+    {"response": "Done."},
+    {
+        "reply_text": "Locking up and checking.",
+        "tool_calls": [{"tool": "lock_workstation", "args": {}}, {"tool": "describe_top_processes", "args": {"limit": 3}}, "bad"],
+        "actions": [{"type": "kill_process", "details": {"pid": 4242}}, {"details": {}}],
+    },
+]
+FALLBACK_PAYLOAD = {"unexpected": {"nested": [{"k": i, "v": "x" * 20} for i in range(20)]}, "meta": {"id": "abc"}}
+
+
+def case_extract(args: argparse.Namespace) -> Metrics:
+    reply = MalcolmClient._extract_reply_text
+    tools = MalcolmClient._extract_tool_calls
+    payloads = REPLY_PAYLOADS
+    loops = max(1, args.calls // len(payloads))
+
+    def replies() -> None:
+        for _ in range(loops):
+            for p in payloads:
+                reply(p)
+
+    def tool_calls() -> None:
+        for _ in range(loops):
+            for p in payloads:
+                tools(p)
+
+    def fallback() -> None:
+        for _ in range(loops):
+            reply(FALLBACK_PAYLOAD)
+
+    return {
+        "reply_text_us": _per_call_us(replies, loops * len(payloads)),
+        "tool_calls_us": _per_call_us(tool_calls, loops * len(payloads)),
+        "reply_fallback_us": _per_call_us(fallback, loops),
+    }
+
+
+def case_json_normalise(args: argparse.Namespace) -> Metrics:
+    results = run_json_normalise(build_payloads(args.json_mb, depth=20_000), runs=5)
+    out: Metrics = {}
+    for name, r in results.items():
+        out[f"{name}_ms"] = r["stream_ms"]
+        out[f"{name}_peak_kb"] = r["stream_peak_kb"]
+    return out
+
+
+POLICY_RULES: List[Dict[str, Any]] = [
+    {"name": "quiet", "tool": "*", "state": {"quiet_mode": True}, "action": "deny"},
+    {"name": "small-describe", "tool": "describe_*", "args": {"limit": {"max": 50}}, "action": "allow"},
+    {"name": "kill-system", "tool": "kill_process", "args": {"pid": {"max": 4}}, "action": "deny"},
+    {"name": "kill-known", "tool": "kill_process", "args": {"name": {"regex": "^(chrome|teams)"}}, "action": "confirm"},
+] + [
+    {"name": f"svc{i}", "tool": f"service_{i % 25}", "args": {"mode": ["start", "stop"]}, "action": "confirm"}
+    for i in range(100)
+]
+POLICY_CALLS: List[Dict[str, Any]] = [
+    {"tool": "describe_top_processes", "args": {"limit": 5}},
+    {"tool": "describe_top_processes", "args": {"limit": 500}},
+    {"tool": "kill_process", "args": {"pid": 4, "name": "system"}},
+    {"tool": "kill_process", "args": {"pid": 9000, "name": "chrome.exe"}},
+    {"tool": "lock_workstation", "args": {}},
+    {"tool": "service_7", "args": {"mode": "start"}},
+    {"tool": "enter_quiet_mode", "args": {}},
+    {"tool": "unknown_tool", "args": {"x": 1}},
+]
+
+
+def case_policy(args: argparse.Namespace) -> Metrics:
+    auto_allow = ["describe_top_processes", "enter_quiet_mode", "exit_quiet_mode"]
+    confirm = ["kill_process", "lock_workstation"]
+    engine = PolicyEngine(auto_allow=auto_allow, confirm_tools=confirm, rules=POLICY_RULES)
+    plain = PolicyEngine(auto_allow=auto_allow, confirm_tools=confirm)
+    state = {"quiet_mode": False}
+    calls = POLICY_CALLS
+    loops = max(1, args.calls // len(calls))
+    distinct = [{"tool": "service_3", "args": {"mode": f"m{i}"}} for i in range(loops * len(calls))]
+
+    def repeated(target: PolicyEngine) -> Callable[[], None]:
+        def run() -> None:
+            evaluate = target.evaluate_tool_call
+            for _ in range(loops):
+                for call in calls:
+                    evaluate(call, state)
+        return run
+
+    def unique() -> None:
+        evaluate = engine.evaluate_tool_call
+        for call in distinct:
+            evaluate(call, state)
+
+    return {
+        "cached_us": _per_call_us(repeated(engine), loops * len(calls)),
+        "distinct_us": _per_call_us(unique, len(distinct)),
+        "no_rules_us": _per_call_us(repeated(plain), loops * len(calls)),
+    }
+
+
+def case_tts_queue(args: argparse.Namespace) -> Metrics:
+    factory = StubEngineFactory()
+    backend = Pyttsx3Backend(engine_factory=factory)
+    voice = TTSVoice(backend=backend, max_backlog=args.utterances)
+    try:
+        voice.speak("Warming up.")
+        factory.wait_for(1, timeout=10)
+        started = time.perf_counter()
+        for i in range(args.utterances):
+            voice.speak(f"Process number {i} is using a lot of CPU.", interrupt=False)
+        enqueued = time.perf_counter() - started
+        if not factory.wait_for(args.utterances + 1, timeout=60):
+            raise RuntimeError(f"TTS queue drained only {factory.utterances - 1} of {args.utterances} utterances.")
+        elapsed = time.perf_counter() - started
+    finally:
+        voice.shutdown()
+    return {
+        "utterances_per_s": args.utterances / elapsed,
+        "per_utterance_us": elapsed / args.utterances * 1e6,
+        "speak_call_us": enqueued / args.utterances * 1e6,
+    }
+
+
+def _guardian_config(server_url: str, phrases: int) -> Dict[str, Any]:
+    return {
+        "logging": {"mode": "queue", "console": False},
+        "instrumentation": {"enabled": True, "metrics_endpoint": False, "recent_traces": phrases},
+        "tts": {"phrase_cache": {"enabled": False}},
+        "malcolm_api": {"enabled": True, "base_url": server_url, "api_key": "bench", "max_retries": 0},
+        "policy": {"auto_allow_tools": ["describe_top_processes"]},
+        "tools": {"confirmations": {"console": False}},
+        "audio": {"wake_word": "malcolm", "wake_gate": {"enabled": False}},
+        "stt": {"backend": "bench-tones"},
+        "learning": {"enabled": False},
+        "security": {"sample_interval_seconds": 0.5, "process_scan_interval_seconds": 5},
+    }
+
+
+def case_end_to_end(args: argparse.Namespace) -> Metrics:
+    from guardian.main import MalcolmGuardian
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "config").mkdir()
+        transcripts: Dict[float, str] = {}
+        clips = []
+        for i in range(args.phrases):
+            frequency = 400.0 + 60.0 * i
+            transcripts[frequency] = f"Malcolm what is using my CPU {i}"
+            clips.append(write_tone_wav(root / f"phrase{i}.wav", frequency, seconds=0.6))
+        register_backend("bench-tones", lambda recognizer, **_: ToneTranscriber(transcripts, args.stt_latency))
+
+        table = FakeProcessTable(args.processes // 4, churn=0.01)
+        tts = StubEngineFactory(chars_per_second=args.tts_chars_per_second)
+        mic = WavMicrophone(clips, lead_seconds=2.0, speed=args.speed)
+        metrics.reset()
+        with StubOmniServer(latency_seconds=args.omni_latency) as server, fake_psutil(table), \
+                fake_pyttsx3(tts), fake_microphone(mic):
+            (root / "config" / "config.yaml").write_text(yaml.safe_dump(_guardian_config(server.url, args.phrases)))
+            guardian = MalcolmGuardian(root_dir=root)
+            guardian.start()
+            try:
+                if not guardian.startup.wait_all(timeout=30):
+                    raise RuntimeError(f"Guardian did not start: {guardian.startup.status()}")
+                ready = {f"ready_{name}_ms": (s.started_at + s.seconds) * 1000.0 for name, s in guardian.startup.status().items()}
+                mic.exhausted.wait(timeout=args.phrases * 10 + 30)
+                guardian.audio_sentinel.pipeline.drain(timeout=30)
+                deadline = time.monotonic() + 30
+                while time.monotonic() < deadline and any(t.first_audio is None for t in metrics.recent(args.phrases)):
+                    time.sleep(0.05)
+                handled = guardian.audio_sentinel.stats()["end_to_end"]
+            finally:
+                guardian.stop()
+                _reset_root_logger()
+
+        traces = metrics.recent(args.phrases)
+        metrics.configure(enabled=False)
+
+    # Histogram quantiles are bucket-coarse; take exact values from the traces.
+    first_audio = [t.first_audio for t in traces if t.first_audio is not None]
+    if not first_audio:
+        raise RuntimeError("No command reached TTS; check the fake microphone and STT.")
+    omni = [seconds for t in traces for name, seconds in t.spans if name == "omni_post"] or [0.0]
+    return {
+        "first_audio_p50_ms": _pct(first_audio, 0.5) * 1000.0,
+        "first_audio_p95_ms": _pct(first_audio, 0.95) * 1000.0,
+        "handled_avg_ms": handled["avg_ms"],
+        "handled_max_ms": handled["max_ms"],
+        "omni_post_p50_ms": _pct(omni, 0.5) * 1000.0,
+        **ready,
+        "commands": float(len(traces)),
+        "lost": float(args.phrases - len(first_audio)),
+    }
+
+
+def case_command_server(args: argparse.Namespace) -> Metrics:
+    with local_server(args.omni_latency, args.omni_workers) as (url, server):
+        result = load(url, server.token, args.sessions, args.server_requests)
+    return {key: result[key] for key in ("requests_per_s", "latency_p50_ms", "latency_p95_ms", "busy", "errors")}
+
+
+def _reset_root_logger() -> None:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+CASES: Dict[str, Callable[[argparse.Namespace], Metrics]] = {
+    "watchdog_scan": case_watchdog_scan,
+    "extract": case_extract,
+    "json_normalise": case_json_normalise,
+    "policy": case_policy,
+    "tts_queue": case_tts_queue,
+    "end_to_end": case_end_to_end,
+    "command_server": case_command_server,
+}
+
+
+# ---------------------------------------------------------------------- #
+# Results
+# ---------------------------------------------------------------------- #
+def run(names: List[str], args: argparse.Namespace) -> Dict[str, Metrics]:
+    results: Dict[str, Metrics] = {}
+    for name in names:
+        runs = [CASES[name](args) for _ in range(args.repeat)]
+        results[name] = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def build_record(results: Dict[str, Metrics], params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "version": FORMAT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "params": params,
+        "results": results,
+    }
+
+
+def save(record: Dict[str, Any], path: Optional[Path]) -> Path:
+    if path is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    path.write_text(json.dumps(record, indent=2, sort_keys=True), encoding="utf-8")
+    return path
+
+
+def load_baseline(spec: str) -> Dict[str, Any]:
+    if spec == "latest":
+        candidates = sorted(RESULTS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        if not candidates:
+            raise SystemExit(f"No saved results in {RESULTS_DIR}.")
+        spec = str(candidates[-1])
+    return json.loads(Path(spec).read_text(encoding="utf-8"))
+
+
+def _direction(metric: str) -> int:
+    """
+    +1 if bigger is better, -1 if smaller is better, 0 if not compared.
+    """
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith(("_ms", "_us", "_kb")):
+        return -1
+    return 0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Metrics], threshold: float) -> List[str]:
+    """
+    Print current vs. baseline and return the regressed metrics.
+    """
+    regressions: List[str] = []
+    old = baseline.get("results", {})
+    print(f"\nvs. baseline {baseline.get('created')} (git {baseline.get('git')}), threshold {threshold:.0%}")
+    for case, values in current.items():
+        for metric, value in values.items():
+            before = old.get(case, {}).get(metric)
+            direction = _direction(metric)
+            if before is None or not direction or not before:
+                continue
+            change = (value - before) / before
+            worse = -change * direction
+            flag = "REGRESSION" if worse > threshold else ("improved" if -worse > threshold else "")
+            print(f"{case + '.' + metric:>36}: {before:12.3f} -> {value:12.3f} ({change:+7.1%}) {flag}")
+            if flag == "REGRESSION":
+                regressions.append(f"{case}.{metric}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="run just these cases")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=2000)
+    parser.add_argument("--scans", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--json-mb", type=float, default=5.0, help="size of the large reply bodies")
+    parser.add_argument("--utterances", type=int, default=2000)
+    parser.add_argument("--phrases", type=int, default=8)
+    parser.add_argument("--speed", type=float, default=2.0, help="fake microphone playback speed (1.0 = real time)")
+    parser.add_argument("--stt-latency", type=float, default=0.05)
+    parser.add_argument("--omni-latency", type=float, default=0.05)
+    parser.add_argument("--tts-chars-per-second", type=float, default=400.0)
+    parser.add_argument("--sessions", type=int, default=32, help="concurrent command server sessions")
+    parser.add_argument("--server-requests", type=int, default=1000)
+    parser.add_argument("--omni-workers", type=int, default=8)
+    parser.add_argument("--save", nargs="?", const="", default=None, metavar="PATH",
+                        help="store the run (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", metavar="PATH", help="results file to compare with, or 'latest'")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    names = args.only or list(CASES)
+    results = run(names, args)
+    for case, values in results.items():
+        print(case)
+        for key, value in values.items():
+            print(f"{key:>22}: {value:.3f}")
+
+    params = {k: v for k, v in vars(args).items() if k not in ("only", "save", "baseline", "threshold", "fail_on_regression")}
+    regressions: List[str] = []
+    if baseline is not None:
+        if baseline.get("params") != params:
+            print("\nnote: baseline was run with different parameters:", baseline.get("params"))
+        regressions = compare(baseline, results, args.threshold)
+    if args.save is not None:
+        print("\nsaved", save(build_record(results, params), Path(args.save) if args.save else None))
+    if regressions and args.fail_on_regression:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Local stand-in for the Malcolm Omni API.
+
+Serves POST /omni/command on 127.0.0.1 with configurable latency and
+failure injection, so MalcolmClient can be exercised without the live
+service. With `stream_format` set ("sse" or "ndjson") and a client that
+asks for it via Accept, the reply is sent as a chunked stream of word
+deltas, `chunk_delay_seconds` apart, followed by the tool calls.
+
+`script` fixes what the next requests get, one entry each, before the
+random failures apply: "ok", "drop" (close the connection after reading
+the request) or an HTTP status, sent with Retry-After if `retry_after`
+is set. `request_times` records when each request arrived.
+
+    with StubOmniServer(latency_seconds=0.05, failure_rate=0.2) as server:
+        client = MalcolmClient(base_url=server.url, api_key="x", enabled=True)
+        ...
+"""
+from __future__ import annotations
+
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Union
+
+
+class StubOmniServer:
+    def __init__(
+        self,
+        latency_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        drop_rate: float = 0.0,
+        response: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None,
+        stream_format: Optional[str] = None,
+        chunk_delay_seconds: float = 0.02,
+        script: Optional[List[Union[int, str]]] = None,
+        retry_after: Optional[str] = None,
+        port: int = 0,
+    ) -> None:
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.drop_rate = drop_rate
+        self.response = response or {
+            "reply_text": "Checking your top processes.",
+            "tool_calls": [{"tool": "describe_top_processes", "args": {"limit": 5}}],
+        }
+        self.stream_format = stream_format
+        self.chunk_delay_seconds = chunk_delay_seconds
+        self.script: List[Union[int, str]] = list(script or [])
+        self.retry_after = retry_after
+        self.requests = 0
+        self.connections = 0
+        self.request_times: List[float] = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOmniServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubOmniServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _next_action(self) -> Union[int, str]:
+        with self._lock:
+            if self.script:
+                return self.script.pop(0)
+        if self._roll(self.drop_rate):
+            return "drop"
+        if self._roll(self.failure_rate):
+            return self.failure_status
+        return "ok"
+
+    def _reply_words(self):
+        text = self.response.get("reply_text") or self.response.get("message") or ""
+        return text.split(" ")
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                # Headers and body go out in separate writes; without this,
+                # Nagle + delayed ACK adds ~40ms to every keep-alive response.
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    server.request_times.append(time.monotonic())
+                if server.latency_seconds:
+                    time.sleep(server.latency_seconds)
+                action = server._next_action()
+                if action == "drop":
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                if action != "ok":
+                    self._send_json(int(action), {"error": "injected failure"})
+                    return
+                accept = self.headers.get("Accept", "")
+                if server.stream_format == "sse" and "text/event-stream" in accept:
+                    self._send_stream("text/event-stream", lambda obj: f"data: {json.dumps(obj)}\n\n")
+                    return
+                if server.stream_format == "ndjson" and "application/x-ndjson" in accept:
+                    self._send_stream("application/x-ndjson", lambda obj: json.dumps(obj) + "\n")
+                    return
+                if server.stream_format:
+                    # Buffered client: it still has to wait for the whole generation.
+                    time.sleep(len(server._reply_words()) * server.chunk_delay_seconds)
+                payload = dict(server.response)
+                payload.setdefault("received_command", body.get("command"))
+                self._send_json(200, payload)
+
+            def _send_stream(self, content_type: str, frame) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                words = server._reply_words()
+                events = [{"delta": w + (" " if i < len(words) - 1 else "")} for i, w in enumerate(words)]
+                if server.response.get("tool_calls"):
+                    events.append({"tool_calls": server.response["tool_calls"]})
+                for event in events:
+                    data = frame(event).encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                    time.sleep(server.chunk_delay_seconds)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if status >= 400 and server.retry_after is not None:
+                    self.send_header("Retry-After", server.retry_after)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .utils.lazy_imports import lazy_import
+
+# Optional dependency (None if missing); the watchdog falls back to thresholds.
+np = lazy_import("numpy", optional=True)
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ("cpu", "rss_growth", "threads")
+
+ProcessKey = Tuple[int, float]
+
+
+@dataclass
+class Anomaly:
+    pid: int
+    create_time: float
+    name: str
+    # Which check fired: a feature name ("cpu", "rss_growth", "threads") or "cpu_creep".
+    reason: str
+    value: float
+    baseline: float
+    z: float
+
+
+class AnomalyDetector:
+    """
+    Rolling per-process baselines scored in one vectorised pass.
+
+    For every process the detector keeps an exponentially weighted mean
+    and variance of three features: CPU %, RSS growth (MB per minute)
+    and thread count. Each scan it builds the feature matrix for the
+    whole process table and computes z-scores against those baselines
+    with NumPy, then folds the new readings into the baselines.
+
+    A feature is anomalous when its z-score is at least `z_threshold`
+    and the process has `warmup_scans` of history. A busy build server
+    that always sits at 90% therefore stops standing out once its
+    baseline has learned that. Slow drifts that the baseline would
+    absorb are caught separately: a long-memory CPU level (`slow_alpha`,
+    seeded with the first reading) is compared with a fast EWMA, and a
+    rise of `creep_delta_cpu` points is reported as "cpu_creep".
+
+    `min_std` floors each feature's standard deviation so a process that
+    has been perfectly flat does not alert on tiny wobbles, and
+    `min_value` ignores readings that are anomalous but unimportant
+    (a jump from 0.1% to 2% CPU).
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.02,
+        fast_alpha: float = 0.3,
+        slow_alpha: float = 0.002,
+        z_threshold: float = 4.0,
+        warmup_scans: int = 10,
+        creep_delta_cpu: float = 30.0,
+        min_std: Optional[Dict[str, float]] = None,
+        min_value: Optional[Dict[str, float]] = None,
+        initial_capacity: int = 1024,
+    ) -> None:
+        if np is None:
+            raise RuntimeError("Anomaly detection needs NumPy (pip install numpy).")
+        self.alpha = alpha
+        self.fast_alpha = fast_alpha
+        self.slow_alpha = slow_alpha
+        self.z_threshold = z_threshold
+        self.warmup_scans = warmup_scans
+        self.creep_delta_cpu = creep_delta_cpu
+        floors = {"cpu": 2.0, "rss_growth": 5.0, "threads": 2.0, **(min_std or {})}
+        minimums = {"cpu": 20.0, "rss_growth": 20.0, "threads": 50.0, **(min_value or {})}
+        self._min_std = np.array([floors[f] for f in FEATURES], dtype=np.float64)
+        self._min_value = np.array([minimums[f] for f in FEATURES], dtype=np.float64)
+
+        self._slots: Dict[ProcessKey, int] = {}
+        self._keys: List[Optional[ProcessKey]] = []
+        self._free: List[int] = []
+        self._tick = 0
+        self._last_ts: Optional[float] = None
+        self._mean = self._var = self._fast_cpu = self._slow_cpu = self._last_rss = self._count = self._seen = None
+        self._allocate(initial_capacity)
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def score(self, processes: Sequence[Any], timestamp: float) -> List[Anomaly]:
+        """
+        Score one scan. `processes` are ProcessSample / ProcessRecord-like
+        objects (pid, create_time, name, cpu_percent, memory_rss,
+        num_threads).
+        """
+        self._tick += 1
+        n = len(processes)
+        if n == 0:
+            return []
+        dt_minutes = (timestamp - self._last_ts) / 60.0 if self._last_ts is not None else 0.0
+        self._last_ts = timestamp
+
+        slots = np.fromiter((self._slot_for((p.pid, p.create_time)) for p in processes), dtype=np.int64, count=n)
+        cpu = np.fromiter((p.cpu_percent for p in processes), dtype=np.float64, count=n)
+        rss = np.fromiter((p.memory_rss for p in processes), dtype=np.float64, count=n) / 1_048_576.0
+        threads = np.fromiter((p.num_threads for p in processes), dtype=np.float64, count=n)
+
+        # RSS growth needs a previous reading; new processes start at 0.
+        prev_rss = self._last_rss[slots]
+        known = self._count[slots] > 0
+        growth = np.where(known & (dt_minutes > 0), (rss - prev_rss) / max(dt_minutes, 1e-9), 0.0)
+
+        x = np.column_stack((cpu, growth, threads))
+        mean = self._mean[slots]
+        var = self._var[slots]
+        std = np.maximum(np.sqrt(var), self._min_std)
+        z = (x - mean) / std
+
+        warmed = self._count[slots] >= self.warmup_scans
+        flags = (z >= self.z_threshold) & (x >= self._min_value) & warmed[:, None]
+
+        fast = self._fast_cpu[slots]
+        fast = np.where(known, fast + self.fast_alpha * (cpu - fast), cpu)
+        slow = self._slow_cpu[slots]
+        slow = np.where(known, slow + self.slow_alpha * (cpu - slow), cpu)
+        creep = warmed & (fast - slow >= self.creep_delta_cpu) & ~flags[:, 0]
+
+        anomalies = self._collect(processes, flags, creep, x, mean, z, fast, slow)
+
+        # Fold this scan into the baselines. Until a process has ~1/alpha
+        # readings the rate is 1/(n+1), i.e. a plain running mean/variance,
+        # so young baselines are not biased towards their first sample.
+        delta = x - mean
+        rate = np.maximum(self.alpha, 1.0 / (self._count[slots] + 1.0))[:, None]
+        self._mean[slots] = mean + rate * delta
+        self._var[slots] = (1.0 - rate) * (var + rate * delta * delta)
+        self._fast_cpu[slots] = fast
+        self._slow_cpu[slots] = slow
+        self._last_rss[slots] = rss
+        self._count[slots] += 1
+        self._seen[slots] = self._tick
+        self._release_unseen()
+        return anomalies
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _collect(self, processes, flags, creep, x, mean, z, fast, slow) -> List[Anomaly]:
+        out: List[Anomaly] = []
+        for i in np.flatnonzero(flags.any(axis=1) | creep):
+            p = processes[i]
+            if creep[i]:
+                out.append(Anomaly(p.pid, p.create_time, p.name, "cpu_creep", float(fast[i]), float(slow[i]), float(z[i, 0])))
+            for f in np.flatnonzero(flags[i]):
+                out.append(Anomaly(p.pid, p.create_time, p.name, FEATURES[f], float(x[i, f]), float(mean[i, f]), float(z[i, f])))
+        return out
+
+    def _slot_for(self, key: ProcessKey) -> int:
+        slot = self._slots.get(key)
+        if slot is not None:
+            return slot
+        if not self._free:
+            self._allocate(len(self._keys))
+        slot = self._free.pop()
+        self._slots[key] = slot
+        self._keys[slot] = key
+        self._count[slot] = 0
+        self._mean[slot] = 0.0
+        self._var[slot] = 0.0
+        self._fast_cpu[slot] = 0.0
+        self._slow_cpu[slot] = 0.0
+        self._last_rss[slot] = 0.0
+        return slot
+
+    def _allocate(self, extra: int) -> None:
+        old = len(self._keys)
+        size = old + max(1, extra)
+
+        def grow(arr, shape, dtype):
+            fresh = np.zeros(shape, dtype=dtype)
+            if arr is not None:
+                fresh[:old] = arr
+            return fresh
+
+        self._mean = grow(self._mean, (size, len(FEATURES)), np.float64)
+        self._var = grow(self._var, (size, len(FEATURES)), np.float64)
+        self._fast_cpu = grow(self._fast_cpu, size, np.float64)
+        self._slow_cpu = grow(self._slow_cpu, size, np.float64)
+        self._last_rss = grow(self._last_rss, size, np.float64)
+        self._count = grow(self._count, size, np.int64)
+        self._seen = grow(self._seen, size, np.int64)
+        self._keys.extend([None] * (size - old))
+        self._free.extend(range(size - 1, old - 1, -1))
+
+    def _release_unseen(self) -> None:
+        """
+        Free the slots of processes missing from this scan (they exited).
+        """
+        if len(self._slots) == 0:
+            return
+        stale = np.flatnonzero((self._seen != self._tick) & (self._count > 0))
+        for slot in stale:
+            key = self._keys[slot]
+            if key is not None:
+                del self._slots[key]
+                self._keys[slot] = None
+            self._count[slot] = 0
+            self._free.append(int(slot))
@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, Iterator, Optional
+
+from .instrumentation import Trace, metrics
+from .utils.lazy_imports import lazy_import
+from .wake_gate import WakeWordGate
+
+sr = lazy_import("speech_recognition")
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------- #
+# Phrase sources
+# ---------------------------------------------------------------------- #
+class PhraseSource:
+    """
+    Produces captured phrases until `stop` is set. `ready` is set once
+    the source is actually listening (after any calibration).
+    """
+
+    def __init__(self) -> None:
+        self.ready = threading.Event()
+
+    def phrases(self, stop: threading.Event) -> Iterator[sr.AudioData]:
+        raise NotImplementedError
+
+
+class MicrophonePhraseSource(PhraseSource):
+    def __init__(self, recognizer: sr.Recognizer, phrase_time_limit: float = 10) -> None:
+        super().__init__()
+        self.recognizer = recognizer
+        self.phrase_time_limit = phrase_time_limit
+
+    def phrases(self, stop: threading.Event) -> Iterator[sr.AudioData]:
+        mic = sr.Microphone()
+        with mic as source:
+            self.recognizer.adjust_for_ambient_noise(source)
+            logger.info("Calibrated microphone for ambient noise.")
+            self.ready.set()
+            while not stop.is_set():
+                try:
+                    logger.debug("Listening for speech...")
+                    with metrics.stage("listen"):
+                        audio = self.recognizer.listen(source, timeout=None, phrase_time_limit=self.phrase_time_limit)
+                    yield audio
+                except Exception as e:
+                    logger.warning("Error while listening: %s", e)
+
+
+class RecordedPhraseSource(PhraseSource):
+    """
+    Replays pre-recorded AudioData instead of the microphone, optionally
+    spaced `interval_seconds` apart to mimic real speech.
+    """
+
+    def __init__(self, clips: Iterable[sr.AudioData], interval_seconds: float = 0.0) -> None:
+        super().__init__()
+        self.clips = list(clips)
+        self.interval_seconds = interval_seconds
+        self.exhausted = threading.Event()
+
+    def phrases(self, stop: threading.Event) -> Iterator[sr.AudioData]:
+        self.ready.set()
+        for clip in self.clips:
+            if stop.is_set():
+                break
+            if self.interval_seconds:
+                stop.wait(self.interval_seconds)
+            yield clip
+        self.exhausted.set()
+
+
+# ---------------------------------------------------------------------- #
+# Stages
+# ---------------------------------------------------------------------- #
+@dataclass
+class _Phrase:
+    audio: sr.AudioData
+    captured_at: float = field(default_factory=time.monotonic)
+    queued_at: float = 0.0
+    seq: int = 0
+    command: Optional[str] = None
+    trace: Optional[Trace] = None
+
+
+class PhraseRing:
+    """
+    Bounded ring buffer between capture and STT. When full, the oldest
+    phrase is overwritten: a fresh utterance matters more than a stale one
+    and capture must never block on the microphone.
+    """
+
+    def __init__(self, capacity: int = 8) -> None:
+        self.capacity = max(1, capacity)
+        self._items: Deque[_Phrase] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._seq = 0
+        self.overwritten = 0
+        self.high_water = 0
+
+    def put(self, phrase: _Phrase) -> None:
+        with self._cond:
+            if len(self._items) >= self.capacity:
+                dropped = self._items.popleft()
+                self.overwritten += 1
+                logger.warning("Audio ring full; dropped phrase captured %.1fs ago.", time.monotonic() - dropped.captured_at)
+            self._items.append(phrase)
+            self.high_water = max(self.high_water, len(self._items))
+            self._cond.notify()
+
+    def take(self) -> Optional[_Phrase]:
+        """
+        Block for the next phrase; None once closed. Sequence numbers are
+        assigned here so overwritten phrases leave no gaps in the order.
+        """
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            if not self._items:
+                return None
+            phrase = self._items.popleft()
+            phrase.seq = self._seq
+            self._seq += 1
+            return phrase
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+class _StageTimer:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": (self.total / self.count * 1000.0) if self.count else 0.0,
+            "max_ms": self.max * 1000.0,
+        }
+
+
+def extract_command(text: str, wake_word: str) -> Optional[str]:
+    """
+    "Malcolm, what's running?" -> ", what's running?" stripped; None if the
+    wake word isn't in the text.
+    """
+    lowered = text.lower()
+    if wake_word not in lowered:
+        return None
+    command = lowered.replace(wake_word, "", 1).strip()
+    return command or text  # fallback: full text
+
+
+# ---------------------------------------------------------------------- #
+# Pipeline
+# ---------------------------------------------------------------------- #
+class AudioPipeline:
+    """
+    capture -> ring buffer -> STT worker pool -> reorder -> dispatcher.
+
+    - The capture thread only listens; it never waits on STT or handlers.
+    - `stt_workers` threads run the wake gate and STT concurrently.
+    - Results are released in capture order, so commands from one session
+      reach `on_command` in the order they were spoken even when STT
+      finishes out of order.
+    - The dispatcher thread runs `on_command` one at a time. Commands wait
+      in a bounded queue; when it is full new commands are dropped and
+      counted.
+
+    `stt` is anything with a `phrase_to_text(audio) -> Optional[str]`
+    method (normally STTEngine).
+    """
+
+    def __init__(
+        self,
+        source: PhraseSource,
+        stt,
+        wake_word: str,
+        on_command: Callable[[str], None],
+        gate: Optional[WakeWordGate] = None,
+        stt_workers: int = 2,
+        ring_size: int = 8,
+        command_queue: int = 16,
+    ) -> None:
+        self.source = source
+        self.stt = stt
+        self.wake_word = wake_word.lower()
+        self.on_command = on_command
+        self.gate = gate
+        self.command_queue = max(1, command_queue)
+
+        self._stop_flag = threading.Event()
+        self._ring = PhraseRing(ring_size)
+
+        # Reorder buffer: seq -> finished phrase (command may be None).
+        self._lock = threading.Lock()
+        self._done: Dict[int, _Phrase] = {}
+        self._next_seq = 0
+        self._commands: Deque[_Phrase] = deque()
+        self._commands_ready = threading.Condition(self._lock)
+
+        self._counts = {
+            "captured": 0,
+            "gate_rejected": 0,
+            "not_understood": 0,
+            "no_wake_word": 0,
+            "commands": 0,
+            "commands_dropped": 0,
+            "handler_errors": 0,
+        }
+        self._timers = {"stt": _StageTimer(), "queue_wait": _StageTimer(), "handler": _StageTimer(), "end_to_end": _StageTimer()}
+        self._command_high_water = 0
+        self._busy_dispatching = False
+
+        self._threads = [threading.Thread(target=self._capture_loop, name="audio-capture", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._stt_loop, name=f"audio-stt-{i}", daemon=True) for i in range(max(1, stt_workers))
+        ]
+        self._threads.append(threading.Thread(target=self._dispatch_loop, name="audio-dispatch", daemon=True))
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        for t in self._threads:
+            t.start()
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+        self._ring.close()
+        with self._commands_ready:
+            self._commands_ready.notify_all()
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until every captured phrase has been handled (used when
+        replaying recordings). Returns False on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        exhausted = getattr(self.source, "exhausted", None)
+        while time.monotonic() < deadline:
+            if exhausted is not None and not exhausted.is_set():
+                time.sleep(0.01)
+                continue
+            with self._lock:
+                idle = not self._done and not self._commands and not self._busy_dispatching
+                processed = self._next_seq
+                captured = self._counts["captured"] - self._ring.overwritten
+            if idle and len(self._ring) == 0 and processed >= captured:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            report: Dict[str, object] = dict(self._counts)
+            report["ring"] = {
+                "depth": len(self._ring),
+                "capacity": self._ring.capacity,
+                "high_water": self._ring.high_water,
+                "overwritten": self._ring.overwritten,
+            }
+            report["command_queue"] = {
+                "depth": len(self._commands),
+                "capacity": self.command_queue,
+                "high_water": self._command_high_water,
+            }
+            report["reorder_pending"] = len(self._done)
+            for name, timer in self._timers.items():
+                report[name] = timer.report()
+        return report
+
+    # ------------------------------------------------------------------ #
+    # Stage loops
+    # ------------------------------------------------------------------ #
+    def _capture_loop(self) -> None:
+        try:
+            for audio in self.source.phrases(self._stop_flag):
+                if self._stop_flag.is_set():
+                    break
+                with self._lock:
+                    self._counts["captured"] += 1
+                phrase = _Phrase(audio)
+                phrase.trace = metrics.start_trace(phrase.captured_at)
+                self._ring.put(phrase)
+        except Exception as e:
+            logger.exception("Audio capture stopped: %s", e)
+
+    def _stt_loop(self) -> None:
+        while not self._stop_flag.is_set():
+            phrase = self._ring.take()
+            if phrase is None:
+                break
+            metrics.observe("ring_wait", time.monotonic() - phrase.captured_at, phrase.trace)
+            try:
+                phrase.command = self._transcribe(phrase)
+            except Exception as e:
+                logger.exception("Error in STT worker: %s", e)
+            self._complete(phrase)
+
+    def _transcribe(self, phrase: _Phrase) -> Optional[str]:
+        if self.gate is not None:
+            with metrics.stage("wake_gate", phrase.trace):
+                decision = self.gate.check(phrase.audio)
+            if not decision.passed:
+                logger.debug("Wake gate rejected phrase (%s).", decision.reason)
+                self._bump("gate_rejected")
+                return None
+
+        started = time.monotonic()
+        text = self.stt.phrase_to_text(phrase.audio)
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._timers["stt"].add(elapsed)
+        metrics.observe("stt", elapsed, phrase.trace)
+        if not text:
+            self._bump("not_understood")
+            return None
+
+        command = extract_command(text, self.wake_word)
+        if command is None:
+            logger.info("Heard speech but no wake word: %s", text)
+            self._bump("no_wake_word")
+            return None
+        logger.info("Wake word detected. Command: %s", command)
+        return command
+
+    def _complete(self, phrase: _Phrase) -> None:
+        """
+        Park a finished phrase and release everything that is now in order.
+        """
+        with self._lock:
+            self._done[phrase.seq] = phrase
+            while self._next_seq in self._done:
+                ready = self._done.pop(self._next_seq)
+                self._next_seq += 1
+                if ready.command is None:
+                    continue
+                if len(self._commands) >= self.command_queue:
+                    self._counts["commands_dropped"] += 1
+                    logger.warning("Command queue full; dropped command: %s", ready.command)
+                    continue
+                ready.queued_at = time.monotonic()
+                self._commands.append(ready)
+                self._command_high_water = max(self._command_high_water, len(self._commands))
+                self._commands_ready.notify()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._commands_ready:
+                while not self._commands and not self._stop_flag.is_set():
+                    self._commands_ready.wait()
+                if self._stop_flag.is_set():
+                    break
+                phrase = self._commands.popleft()
+                self._busy_dispatching = True
+                self._counts["commands"] += 1
+
+            started = time.monotonic()
+            with self._lock:
+                self._timers["queue_wait"].add(started - phrase.queued_at)
+            metrics.observe("command_wait", started - phrase.queued_at, phrase.trace)
+            if phrase.trace is not None:
+                phrase.trace.command = phrase.command
+            try:
+                with metrics.activate(phrase.trace):
+                    self.on_command(phrase.command)
+            except Exception as e:
+                logger.exception("Error handling voice command: %s", e)
+                self._bump("handler_errors")
+            metrics.finish(phrase.trace)
+            finished = time.monotonic()
+            with self._lock:
+                self._busy_dispatching = False
+                self._timers["handler"].add(finished - started)
+                self._timers["end_to_end"].add(finished - phrase.captured_at)
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
@@ -1,60 +1,68 @@
 from __future__ import annotations
 
 import logging
-import threading
-from typing import Callable, Optional
-
-import speech_recognition as sr
+from typing import Callable, Dict, Optional
 
+from .audio_pipeline import AudioPipeline, MicrophonePhraseSource, PhraseSource
 from .stt_stub import STTEngine
+from .wake_gate import WakeWordGate
 
 logger = logging.getLogger(__name__)
 
 class AudioSentinel:
+    """
+    Listens for the wake word and hands commands to `on_command`.
+
+    Capture, STT and command handling run as separate stages (see
+    AudioPipeline), so the microphone keeps listening while a command is
+    being handled. Pass `source` to feed recorded phrases instead of the
+    microphone.
+    """
+
     def __init__(
         self,
         wake_word: str,
         stt_language: str,
         on_command: Callable[[str], None],
+        gate_factory: Optional[Callable[[STTEngine], WakeWordGate]] = None,
+        source: Optional[PhraseSource] = None,
+        stt_workers: int = 2,
+        ring_size: int = 8,
+        command_queue: int = 16,
+        stt: Optional[STTEngine] = None,
     ) -> None:
         self.wake_word = wake_word.lower()
-        self.stt = STTEngine(language=stt_language)
+        self.stt = stt or STTEngine(language=stt_language)
         self.on_command = on_command
-        self._stop_flag = threading.Event()
-        self._thread = threading.Thread(target=self._run, daemon=True)
+        # Local pre-filter so only likely wake-word phrases reach cloud STT.
+        self.gate = gate_factory(self.stt) if gate_factory else None
+        self.pipeline = AudioPipeline(
+            source=source or MicrophonePhraseSource(self.stt.recognizer),
+            stt=self.stt,
+            wake_word=self.wake_word,
+            on_command=on_command,
+            gate=self.gate,
+            stt_workers=stt_workers,
+            ring_size=ring_size,
+            command_queue=command_queue,
+        )
 
     def start(self) -> None:
         logger.info("AudioSentinel starting background listener.")
-        self._thread.start()
+        self.stt.warm_up()
+        self.pipeline.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the phrase source is listening (the microphone has been
+        calibrated for ambient noise).
+        """
+        return self.pipeline.source.ready.wait(timeout)
 
     def stop(self) -> None:
-        logger.info("AudioSentinel stopping.")
-        self._stop_flag.set()
-
-    def _run(self) -> None:
-        recognizer = self.stt.recognizer
-        mic = sr.Microphone()
-        with mic as source:
-            recognizer.adjust_for_ambient_noise(source)
-            logger.info("Calibrated microphone for ambient noise.")
-            while not self._stop_flag.is_set():
-                try:
-                    logger.info("Listening for speech...")
-                    audio = recognizer.listen(source, timeout=None, phrase_time_limit=10)
-                except Exception as e:
-                    logger.warning("Error while listening: %s", e)
-                    continue
-
-                text = self.stt.phrase_to_text(audio)
-                if not text:
-                    continue
-                lowered = text.lower()
-                if self.wake_word in lowered:
-                    # Strip wake word so only the command remains
-                    command = lowered.replace(self.wake_word, "", 1).strip()
-                    if not command:
-                        command = text  # fallback: full text
-                    logger.info("Wake word detected. Command: %s", command)
-                    self.on_command(command)
-                else:
-                    logger.info("Heard speech but no wake word: %s", text)
+        logger.info("AudioSentinel stopping. Pipeline stats: %s", self.pipeline.stats())
+        self.pipeline.stop()
+        self.stt.close()
+
+    def stats(self) -> Dict[str, object]:
+        return self.pipeline.stats()
@@ -0,0 +1,580 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .confirmations import ConfirmationBroker, ConfirmationTicket, parse_answer
+from .instrumentation import Histogram, metrics
+from .policy_engine import ToolDecision
+from .recorder import recorder
+from .tool_executor import ToolExecutor, ToolOutcome
+
+if TYPE_CHECKING:
+    from .malcolm_client import MalcolmResponse
+
+logger = logging.getLogger(__name__)
+
+# (command, context, state) -> the Omni reply and a policy decision per tool call.
+# Blocking; the server runs it on its Omni executor.
+Decide = Callable[[str, Dict[str, Any], Dict[str, Any]], Tuple["MalcolmResponse", List[ToolDecision]]]
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+# Context keys the server sets itself; a client cannot override them.
+RESERVED_CONTEXT_KEYS = frozenset({"source", "session", "quiet_mode"})
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 415: "Unsupported Media Type",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class _HttpError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.headers = headers
+
+
+def write_token_file(path: Path, token: str) -> None:
+    """
+    Write the bearer token where only the current user can read it
+    (mode 0600; on Windows the file inherits the user's profile ACLs).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    os.chmod(path, 0o600)
+
+
+# ---------------------------------------------------------------------- #
+# Sessions
+# ---------------------------------------------------------------------- #
+@dataclass
+class Session:
+    """
+    One client conversation: its own quiet mode, Omni context and
+    confirmation tickets. Commands within a session run one at a time,
+    in order; different sessions run concurrently.
+    """
+
+    session_id: str
+    quiet_mode: bool = False
+    context: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+    commands: int = 0
+    tickets: Dict[str, ConfirmationTicket] = field(default_factory=dict, repr=False)
+    # Tool outcomes that arrived after their command had been answered;
+    # handed back with the session's next reply.
+    outbox: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=32), repr=False)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session": self.session_id,
+            "quiet_mode": self.quiet_mode,
+            "context": dict(self.context),
+            "commands": self.commands,
+            "pending_tickets": sorted(self.tickets),
+            "idle_seconds": round(time.monotonic() - self.last_seen, 3),
+        }
+
+
+class SessionStore:
+    """
+    Sessions by id, least recently used first. Sessions idle for
+    `idle_seconds` are dropped, and the least recently used one goes
+    when `max_sessions` is reached. Only touched from the server's
+    event loop, so it needs no lock.
+    """
+
+    def __init__(self, max_sessions: int = 1000, idle_seconds: float = 900.0) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.created = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: Optional[str], create: bool = True) -> Optional[Session]:
+        now = time.monotonic()
+        self._expire(now)
+        if session_id is None:
+            if not create:
+                return None
+            session_id = uuid.uuid4().hex[:16]
+        session = self._sessions.get(session_id)
+        if session is None:
+            if not create:
+                return None
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            session = self._sessions[session_id] = Session(session_id)
+            self.created += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        return session
+
+    def end(self, session_id: str) -> Optional[Session]:
+        return self._sessions.pop(session_id, None)
+
+    def _expire(self, now: float) -> None:
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_seen < self.idle_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+
+# ---------------------------------------------------------------------- #
+# HTTP plumbing
+# ---------------------------------------------------------------------- #
+@dataclass
+class _Request:
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+async def _read_request(reader: asyncio.StreamReader, max_body_bytes: int) -> Optional[_Request]:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise _HttpError(400, "Incomplete request.") from None
+        return None  # client closed an idle keep-alive connection
+    except asyncio.LimitOverrunError:
+        raise _HttpError(400, "Request headers too large.") from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise _HttpError(400, "Malformed request line.") from None
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise _HttpError(400, "Bad Content-Length.") from None
+    if length > max_body_bytes:
+        raise _HttpError(413, f"Body larger than {max_body_bytes} bytes.")
+    body = await reader.readexactly(length) if length else b""
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return _Request(method.upper(), target.split("?", 1)[0], headers, body, keep_alive)
+
+
+def _render(status: int, payload: Any, keep_alive: bool, extra: Optional[Dict[str, str]] = None) -> bytes:
+    body = json.dumps(payload, default=str).encode("utf-8")
+    head = [
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        "Connection: keep-alive" if keep_alive else "Connection: close",
+    ]
+    head += [f"{k}: {v}" for k, v in (extra or {}).items()]
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _outcome_dict(outcome: ToolOutcome, rule: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "tool": outcome.tool,
+        "args": outcome.args,
+        "status": outcome.status,
+        "message": outcome.message,
+        "elapsed_ms": round(outcome.elapsed * 1000.0, 3),
+        "confirmed_by": outcome.confirmed_by,
+        "rule": rule,
+    }
+
+
+# ---------------------------------------------------------------------- #
+# Server
+# ---------------------------------------------------------------------- #
+class CommandServer:
+    """
+    Headless front-end to the command -> Omni -> policy -> tool pipeline:
+    a small HTTP/1.1 JSON server on a local port, built on asyncio.
+
+        POST   /command          {"command": "...", "session": "id", "context": {...}}
+        GET    /sessions/<id>    the session's state, plus any late tool outcomes
+        DELETE /sessions/<id>
+        GET    /stats
+        GET    /health
+
+    The event loop only parses requests and shuffles results. The Omni
+    call and policy evaluation (requests, psutil-backed facts) run on a
+    bounded Omni executor, and tools run on the ToolExecutor's own
+    bounded pool. Nothing here speaks, so pyttsx3 is never loaded.
+
+    Each session has its own quiet mode and Omni context; `context` in a
+    request is merged into the session's. Tools that need confirmation
+    open a ticket as usual. The reply reports them as "pending" if no
+    answer arrives within `tool_wait_seconds`, and the session can answer
+    with a "yes"/"no [ticket]" command. Outcomes that finish after the
+    reply come back with the session's next one ("earlier").
+
+    When `max_inflight` commands are already being handled, new ones
+    get 503 with Retry-After rather than queueing without bound.
+
+    Every route but /health needs `Authorization: Bearer <token>`. The
+    token comes from config or is generated at start-up and written to
+    `token_file`, readable only by the user. Requests carrying an Origin
+    header (i.e. sent by a web page) are refused, and /command only
+    accepts `Content-Type: application/json`, which a page cannot send
+    without a CORS preflight this server never answers.
+    """
+
+    def __init__(
+        self,
+        decide: Decide,
+        tool_executor: ToolExecutor,
+        broker: Optional[ConfirmationBroker] = None,
+        host: str = "127.0.0.1",
+        port: int = 8770,
+        omni_workers: int = 4,
+        max_inflight: int = 64,
+        max_sessions: int = 1000,
+        session_idle_seconds: float = 900.0,
+        tool_wait_seconds: float = 5.0,
+        max_body_bytes: int = 64 * 1024,
+        max_context_keys: int = 32,
+        on_confirmed: Optional[Callable[[ConfirmationTicket], None]] = None,
+        token: Optional[str] = None,
+        token_file: Optional[Path] = None,
+    ) -> None:
+        self.decide = decide
+        self.tool_executor = tool_executor
+        self.broker = broker
+        self.host = host
+        self.port = port
+        self.omni_workers = max(1, omni_workers)
+        self.max_inflight = max(1, max_inflight)
+        self.tool_wait_seconds = tool_wait_seconds
+        self.max_body_bytes = max_body_bytes
+        self.max_context_keys = max_context_keys
+        self.on_confirmed = on_confirmed
+        self.token = token or secrets.token_urlsafe(32)
+        self.token_file = token_file if not token else None
+        self.sessions = SessionStore(max_sessions=max_sessions, idle_seconds=session_idle_seconds)
+        self.address: Optional[Tuple[str, int]] = None
+
+        self._omni_pool = ThreadPoolExecutor(max_workers=self.omni_workers, thread_name_prefix="omni")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="command-server", daemon=True)
+
+        # Only updated on the event loop.
+        self._inflight = 0
+        self._latency = Histogram()
+        self._stats = {"requests": 0, "commands": 0, "busy": 0, "errors": 0, "connections": 0, "refused": 0}
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self, timeout: float = 10.0) -> None:
+        if self.token_file is not None:
+            write_token_file(self.token_file, self.token)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("Command server did not start in time.")
+        if self._error is not None:
+            raise RuntimeError(f"Command server failed to start: {self._error}")
+        logger.info("Command server listening on http://%s:%s (omni_workers=%d, max_inflight=%d).",
+                    self.address[0], self.address[1], self.omni_workers, self.max_inflight)
+        if self.token_file is not None:
+            logger.info("Command server token written to %s.", self.token_file)
+
+    def stop(self) -> None:
+        loop, stopping = self._loop, self._stopping
+        if loop is not None and stopping is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(stopping.set)
+            except RuntimeError:
+                pass  # loop already finished
+        self._thread.join(timeout=5.0)
+        self._omni_pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        h = self._latency
+        return dict(
+            self._stats,
+            inflight=self._inflight,
+            sessions=len(self.sessions),
+            sessions_created=self.sessions.created,
+            sessions_evicted=self.sessions.evicted,
+            latency_p50_ms=h.quantile(0.5) * 1000.0,
+            latency_p95_ms=h.quantile(0.95) * 1000.0,
+            latency_max_ms=h.max * 1000.0,
+        )
+
+    def _run(self) -> None:
+        try:
+            asyncio.run(self._serve())
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+            logger.exception("Command server stopped with an error: %s", e)
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024)
+        self.address = server.sockets[0].getsockname()[:2]
+        self._ready.set()
+        async with server:
+            await self._stopping.wait()
+        logger.info("Command server stopped.")
+
+    # ------------------------------------------------------------------ #
+    # Connections and routing
+    # ------------------------------------------------------------------ #
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._stats["connections"] += 1
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader, self.max_body_bytes)
+                except _HttpError as e:
+                    writer.write(_render(e.status, {"error": str(e)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                self._stats["requests"] += 1
+                status, payload, extra = await self._dispatch(request)
+                writer.write(_render(status, payload, request.keep_alive, extra))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: _Request) -> Tuple[int, Any, Optional[Dict[str, str]]]:
+        method, path = request.method, request.path.rstrip("/") or "/"
+        try:
+            self._authorise(request, path)
+            if path == "/command":
+                if method != "POST":
+                    raise _HttpError(405, "Use POST.")
+                return await self._command(request)
+            if path.startswith("/sessions/"):
+                return self._session_route(method, path[len("/sessions/"):])
+            if path == "/stats" and method == "GET":
+                return 200, self.stats(), None
+            if path == "/health" and method == "GET":
+                return 200, {"status": "ok"}, None
+            raise _HttpError(404, f"No route for {method} {path}.")
+        except _HttpError as e:
+            return e.status, {"error": str(e)}, e.headers
+        except Exception as e:
+            self._stats["errors"] += 1
+            logger.exception("Command server error on %s %s: %s", method, path, e)
+            return 500, {"error": "internal error"}, None
+
+    def _authorise(self, request: _Request, path: str) -> None:
+        if "origin" in request.headers:
+            # Browsers add Origin to cross-site requests; no page may drive this server.
+            self._stats["refused"] += 1
+            raise _HttpError(403, "Requests from web pages are not accepted.")
+        if path == "/health":
+            return
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), self.token.encode()):
+            self._stats["refused"] += 1
+            raise _HttpError(401, "Missing or wrong bearer token.", {"WWW-Authenticate": "Bearer"})
+
+    def _session_route(self, method: str, session_id: str) -> Tuple[int, Any, Optional[Dict[str, str]]]:
+        if method == "GET":
+            session = self.sessions.get(session_id, create=False)
+            if session is None:
+                raise _HttpError(404, f"No session '{session_id}'.")
+            info = session.describe()
+            info["earlier"] = self._drain(session)
+            return 200, info, None
+        if method == "DELETE":
+            session = self.sessions.end(session_id)
+            if session is None:
+                raise _HttpError(404, f"No session '{session_id}'.")
+            return 200, {"session": session_id, "ended": True}, None
+        raise _HttpError(405, "Use GET or DELETE.")
+
+    # ------------------------------------------------------------------ #
+    # Commands
+    # ------------------------------------------------------------------ #
+    async def _command(self, request: _Request) -> Tuple[int, Any, Optional[Dict[str, str]]]:
+        if request.headers.get("content-type", "").partition(";")[0].strip().lower() != "application/json":
+            raise _HttpError(415, "Content-Type must be application/json.")
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            raise _HttpError(400, "Body must be JSON.") from None
+        if not isinstance(data, dict):
+            raise _HttpError(400, "Body must be a JSON object.")
+        command = data.get("command")
+        if not isinstance(command, str) or not command.strip():
+            raise _HttpError(400, "'command' must be a non-empty string.")
+        session_id = data.get("session") or request.headers.get("x-session")
+        if session_id is not None and (not isinstance(session_id, str) or not _SESSION_ID.match(session_id)):
+            raise _HttpError(400, "'session' must be 1-64 characters of [A-Za-z0-9_.:-].")
+        context = data.get("context") or {}
+        if not isinstance(context, dict):
+            raise _HttpError(400, "'context' must be an object.")
+
+        if self._inflight >= self.max_inflight:
+            self._stats["busy"] += 1
+            return 503, {"error": "busy"}, {"Retry-After": "1"}
+
+        session = self.sessions.get(session_id)
+        self._merge_context(session, context)
+        recorder.record("command", text=command.strip(), source="headless", session=session.session_id, context=context)
+        self._inflight += 1
+        started = time.monotonic()
+        try:
+            async with session.lock:
+                session.commands += 1
+                reply = await self._run_command(session, command.strip())
+        finally:
+            self._inflight -= 1
+        elapsed = time.monotonic() - started
+        self._stats["commands"] += 1
+        self._latency.observe(elapsed)
+        metrics.observe("headless_command", elapsed)
+        reply["elapsed_ms"] = round(elapsed * 1000.0, 3)
+        return 200, reply, None
+
+    def _merge_context(self, session: Session, update: Dict[str, Any]) -> None:
+        for key, value in update.items():
+            if not isinstance(key, str) or key in RESERVED_CONTEXT_KEYS:
+                continue
+            if value is None:
+                session.context.pop(key, None)
+            elif key in session.context or len(session.context) < self.max_context_keys:
+                session.context[key] = value
+            else:
+                raise _HttpError(400, f"A session keeps at most {self.max_context_keys} context keys.")
+
+    async def _run_command(self, session: Session, command: str) -> Dict[str, Any]:
+        reply: Dict[str, Any] = {"session": session.session_id}
+        answer = parse_answer(command)
+        if answer is not None and session.tickets and self.broker is not None:
+            # "yes" / "deny 3" answers one of this session's own tickets.
+            ticket = self._answer(session, *answer)
+            reply.update(
+                reply_text=f"Answered ticket {ticket.ticket_id}." if ticket else "There is nothing waiting for an answer.",
+                answered=ticket.ticket_id if ticket else None,
+                tool_calls=[],
+            )
+        else:
+            context = {**session.context, "source": "headless", "session": session.session_id,
+                       "quiet_mode": session.quiet_mode}
+            state = {"quiet_mode": session.quiet_mode}
+            loop = asyncio.get_running_loop()
+            response, decisions = await loop.run_in_executor(self._omni_pool, self.decide, command, context, state)
+            reply.update(reply_text=response.reply_text, source=response.source)
+            reply["tool_calls"] = await self._run_tools(session, decisions) if decisions else []
+        reply["quiet_mode"] = session.quiet_mode
+        reply["earlier"] = self._drain(session)
+        return reply
+
+    def _answer(self, session: Session, allowed: bool, ticket_id: Optional[str]) -> Optional[ConfirmationTicket]:
+        if ticket_id is None:
+            open_tickets = [t for t in session.tickets.values() if not t.answered]
+            if not open_tickets:
+                return None
+            ticket_id = min(open_tickets, key=lambda t: t.created_at).ticket_id
+        elif ticket_id not in session.tickets:
+            return None
+        return self.broker.answer(allowed, ticket_id, source=f"headless:{session.session_id}")
+
+    async def _run_tools(self, session: Session, decisions: List[ToolDecision]) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(decisions)
+        tickets: Dict[int, str] = {}
+        all_done = loop.create_future()
+        state = {"replied": False}
+
+        def settle(index: int, outcome: ToolOutcome) -> None:  # on the event loop
+            decision = decisions[index]
+            if outcome.status == "ok" and decision.tool in ("enter_quiet_mode", "exit_quiet_mode"):
+                session.quiet_mode = decision.tool == "enter_quiet_mode"
+            ticket_id = tickets.get(index)
+            if ticket_id is not None:
+                session.tickets.pop(ticket_id, None)
+            entry = _outcome_dict(outcome, decision.rule)
+            if state["replied"]:
+                session.outbox.append(entry)
+                return
+            results[index] = entry
+            if all(r is not None for r in results) and not all_done.done():
+                all_done.set_result(None)
+
+        def on_outcome(index: int, outcome: ToolOutcome) -> None:  # any thread
+            try:
+                loop.call_soon_threadsafe(settle, index, outcome)
+            except RuntimeError:
+                pass  # server stopped
+
+        def on_ticket(ticket: ConfirmationTicket) -> None:
+            session.tickets[ticket.ticket_id] = ticket
+
+        batch = self.tool_executor.run(decisions, on_outcome=on_outcome, on_ticket=on_ticket,
+                                       on_confirmed=self.on_confirmed)
+        # Tickets are opened in call order, one per call that needs confirmation.
+        asking = [i for i, d in enumerate(decisions) if d.requires_confirmation and not d.denied]
+        tickets.update(zip(asking, (t.ticket_id for t in batch.tickets())))
+        try:
+            await asyncio.wait_for(asyncio.shield(all_done), self.tool_wait_seconds)
+        except asyncio.TimeoutError:
+            pass
+        state["replied"] = True
+
+        entries = []
+        for index, decision in enumerate(decisions):
+            entry = results[index]
+            if entry is None:
+                entry = {"tool": decision.tool, "args": decision.args, "status": "pending",
+                         "message": "Waiting for confirmation." if index in tickets else "Still running.",
+                         "ticket": tickets.get(index), "rule": decision.rule}
+            entries.append(entry)
+        return entries
+
+    @staticmethod
+    def _drain(session: Session) -> List[Dict[str, Any]]:
+        earlier = list(session.outbox)
+        session.outbox.clear()
+        return earlier
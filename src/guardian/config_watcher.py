@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .malcolm_client import ClientSettings
+from .pattern_matcher import PatternMatcher
+from .policy_engine import PolicySettings
+from .policy_rules import RuleSet
+from .security_watchdog import DETECTION_MODES, WatchdogSettings
+from .tts_backends import VoiceSettings
+from .utils.lazy_imports import lazy_import
+
+yaml = lazy_import("yaml")
+
+logger = logging.getLogger(__name__)
+
+# Keys a running guardian picks up from a reload; a change to anything
+# else is logged as needing a restart.
+HOT_RELOADABLE: Dict[str, Tuple[str, ...]] = {
+    "security": ("process_scan_interval_seconds", "suspicious_cpu_threshold", "suspicious_names", "detection_mode"),
+    "policy": ("auto_allow_tools", "confirm_tools", "auto_promote_after", "never_promote_tools",
+               "rules", "rule_mode", "rule_cache_size"),
+    "tts": ("rate", "volume", "voice_name", "security_note_ttl_seconds"),
+    "malcolm_api": ("base_url", "api_key", "enabled", "timeout_seconds", "connect_timeout_seconds", "max_retries",
+                    "backoff_base_seconds", "backoff_max_seconds", "streaming"),
+    "config_reload": ("interval_seconds",),
+}
+
+
+class ConfigError(ValueError):
+    """
+    config.yaml could not be parsed or failed validation.
+    """
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    One validated version of config.yaml with the hot-reloadable parts
+    already compiled. `raw` is the parsed file and must be treated as
+    read-only; subsystems that are built once read it at start-up.
+    """
+
+    version: int
+    digest: str
+    loaded_at: float
+    raw: Dict[str, Any]
+    watchdog: WatchdogSettings
+    policy: PolicySettings
+    tts: VoiceSettings
+    malcolm: ClientSettings
+
+
+# ---------------------------------------------------------------------- #
+# Validation and compilation
+# ---------------------------------------------------------------------- #
+def _section(raw: Dict[str, Any], name: str) -> Dict[str, Any]:
+    value = raw.get(name)
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ConfigError(f"'{name}' must be a mapping, got {type(value).__name__}.")
+    return value
+
+
+def _number(
+    cfg: Dict[str, Any],
+    where: str,
+    key: str,
+    default: float,
+    minimum: Optional[float] = None,
+    maximum: Optional[float] = None,
+    integer: bool = False,
+) -> Any:
+    value = cfg.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int if integer else (int, float)):
+        raise ConfigError(f"'{where}.{key}' must be {'an integer' if integer else 'a number'}, got {value!r}.")
+    if minimum is not None and value < minimum:
+        raise ConfigError(f"'{where}.{key}' must be at least {minimum}, got {value!r}.")
+    if maximum is not None and value > maximum:
+        raise ConfigError(f"'{where}.{key}' must be at most {maximum}, got {value!r}.")
+    return value
+
+
+def _strings(cfg: Dict[str, Any], where: str, key: str) -> List[str]:
+    value = cfg.get(key)
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ConfigError(f"'{where}.{key}' must be a list of strings.")
+    return value
+
+
+def _string(cfg: Dict[str, Any], where: str, key: str, default: Optional[str]) -> Optional[str]:
+    value = cfg.get(key, default)
+    if value is not None and not isinstance(value, str):
+        raise ConfigError(f"'{where}.{key}' must be a string, got {value!r}.")
+    return value
+
+
+def _flag(cfg: Dict[str, Any], where: str, key: str, default: bool) -> bool:
+    value = cfg.get(key, default)
+    if not isinstance(value, bool):
+        raise ConfigError(f"'{where}.{key}' must be true or false, got {value!r}.")
+    return value
+
+
+def _compile_watchdog(s_cfg: Dict[str, Any]) -> WatchdogSettings:
+    mode = s_cfg.get("detection_mode", "threshold")
+    if mode not in DETECTION_MODES:
+        raise ConfigError(f"'security.detection_mode' must be one of {DETECTION_MODES}, got {mode!r}.")
+    return WatchdogSettings(
+        interval_seconds=_number(s_cfg, "security", "process_scan_interval_seconds", 15, minimum=0.1),
+        suspicious_cpu_threshold=_number(s_cfg, "security", "suspicious_cpu_threshold", 75.0, minimum=0),
+        matcher=PatternMatcher(_strings(s_cfg, "security", "suspicious_names")),
+        detection_mode=mode,
+    )
+
+
+def _compile_policy(p_cfg: Dict[str, Any]) -> PolicySettings:
+    rules = p_cfg.get("rules") or []
+    if not isinstance(rules, list):
+        raise ConfigError("'policy.rules' must be a list.")
+    try:
+        rule_set = RuleSet(
+            rules,
+            mode=p_cfg.get("rule_mode", "first_match"),
+            cache_size=_number(p_cfg, "policy", "rule_cache_size", 4096, minimum=0, integer=True),
+        )
+    except ValueError as e:  # RuleError
+        raise ConfigError(f"'policy.rules': {e}") from None
+    return PolicySettings(
+        auto_allow=frozenset(_strings(p_cfg, "policy", "auto_allow_tools")),
+        confirm_tools=frozenset(_strings(p_cfg, "policy", "confirm_tools")),
+        rules=rule_set,
+        promote_after=_number(p_cfg, "policy", "auto_promote_after", 0, minimum=0, integer=True),
+        never_promote=frozenset(_strings(p_cfg, "policy", "never_promote_tools")),
+    )
+
+
+def _compile_tts(tts_cfg: Dict[str, Any]) -> VoiceSettings:
+    _number(tts_cfg, "tts", "security_note_ttl_seconds", 60, minimum=0)
+    return VoiceSettings(
+        rate=_number(tts_cfg, "tts", "rate", 180, minimum=1, integer=True),
+        volume=_number(tts_cfg, "tts", "volume", 1.0, minimum=0.0, maximum=1.0),
+        voice_name=_string(tts_cfg, "tts", "voice_name", None),
+    )
+
+
+def _compile_malcolm(m_cfg: Dict[str, Any]) -> ClientSettings:
+    return ClientSettings(
+        base_url=_string(m_cfg, "malcolm_api", "base_url", "") or "",
+        api_key=_string(m_cfg, "malcolm_api", "api_key", "") or "",
+        enabled=_flag(m_cfg, "malcolm_api", "enabled", False),
+        timeout_seconds=_number(m_cfg, "malcolm_api", "timeout_seconds", 15, minimum=0.1),
+        connect_timeout_seconds=_number(m_cfg, "malcolm_api", "connect_timeout_seconds", 3.05, minimum=0.1),
+        max_retries=_number(m_cfg, "malcolm_api", "max_retries", 2, minimum=0, integer=True),
+        backoff_base_seconds=_number(m_cfg, "malcolm_api", "backoff_base_seconds", 0.25, minimum=0),
+        backoff_max_seconds=_number(m_cfg, "malcolm_api", "backoff_max_seconds", 2.0, minimum=0),
+        streaming=_flag(m_cfg, "malcolm_api", "streaming", False),
+    )
+
+
+def compile_config(raw: Any, version: int = 1, digest: str = "") -> ConfigSnapshot:
+    """
+    Validate a parsed config.yaml and compile its hot-reloadable parts.
+    Raises ConfigError naming the first bad key. Defaults match the
+    ones MalcolmGuardian uses when it builds each subsystem.
+    """
+    if raw is None:
+        raw = {}
+    if not isinstance(raw, dict):
+        raise ConfigError(f"config must be a mapping, got {type(raw).__name__}.")
+    return ConfigSnapshot(
+        version=version,
+        digest=digest,
+        loaded_at=time.time(),
+        raw=raw,
+        watchdog=_compile_watchdog(_section(raw, "security")),
+        policy=_compile_policy(_section(raw, "policy")),
+        tts=_compile_tts(_section(raw, "tts")),
+        malcolm=_compile_malcolm(_section(raw, "malcolm_api")),
+    )
+
+
+def restart_required(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """
+    Dotted keys that differ between two parsed configs and are not hot
+    reloadable.
+    """
+    changed: List[str] = []
+    for name in sorted(set(old) | set(new)):
+        a, b = old.get(name), new.get(name)
+        if a == b:
+            continue
+        if not isinstance(a, dict) or not isinstance(b, dict):
+            changed.append(name)
+            continue
+        hot = HOT_RELOADABLE.get(name, ())
+        changed += [f"{name}.{k}" for k in sorted(set(a) | set(b)) if k not in hot and a.get(k) != b.get(k)]
+    return changed
+
+
+# ---------------------------------------------------------------------- #
+# Watcher
+# ---------------------------------------------------------------------- #
+class ConfigWatcher:
+    """
+    Polls config.yaml and publishes a new ConfigSnapshot when it changes.
+
+    Each poll is a single stat(). Only when the modification time or
+    size moves is the file read and hashed, and only when the hash
+    differs from the last file seen is it parsed and compiled, so
+    touching the file or saving it unchanged costs nothing. A file that
+    fails to parse or validate is logged and ignored; the last good
+    snapshot stays current until the file changes again.
+
+    Subscribers are called as `callback(old, new)` on the watcher thread
+    after the swap. Readers take `watcher.snapshot` (a single attribute
+    read) and keep that object for as long as they need a consistent
+    view.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        interval_seconds: float = 2.0,
+        parse: Optional[Callable[[str], Any]] = None,
+    ) -> None:
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self._parse = parse or yaml.safe_load
+        self._subscribers: List[Callable[[ConfigSnapshot, ConfigSnapshot], None]] = []
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._stat_key: Optional[Tuple[int, int]] = None
+        self._digest: Optional[str] = None  # last file read, good or bad
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_flag = threading.Event()
+        self.checks = 0
+        self.reloads = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        if self._snapshot is None:
+            raise RuntimeError("ConfigWatcher.load() has not been called.")
+        return self._snapshot
+
+    def subscribe(self, callback: Callable[[ConfigSnapshot, ConfigSnapshot], None]) -> None:
+        self._subscribers.append(callback)
+
+    def load(self) -> ConfigSnapshot:
+        """
+        Read and compile the file now. Raises ConfigError (or OSError)
+        rather than keeping an old snapshot: used at start-up.
+        """
+        with self._lock:
+            st = self.path.stat()
+            data = self.path.read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            version = self._snapshot.version + 1 if self._snapshot is not None else 1
+            snapshot = self._compile(data, version, digest)
+            self._stat_key = (st.st_mtime_ns, st.st_size)
+            self._digest = digest
+            self._snapshot = snapshot
+        logger.info("Loaded config version %d from %s.", snapshot.version, self.path)
+        return snapshot
+
+    def check(self) -> bool:
+        """
+        Poll once. Returns True if a new snapshot was published.
+        """
+        with self._lock:
+            self.checks += 1
+            old = self._snapshot
+            if old is None:
+                return False
+            try:
+                st = self.path.stat()
+                key = (st.st_mtime_ns, st.st_size)
+                if key == self._stat_key:
+                    return False
+                data = self.path.read_bytes()
+            except OSError as e:
+                # Editors often replace the file in two steps; try again next poll.
+                logger.debug("Could not read %s: %s", self.path, e)
+                return False
+            self._stat_key = key
+            digest = hashlib.sha256(data).hexdigest()
+            if digest == self._digest:
+                return False
+            self._digest = digest
+            try:
+                new = self._compile(data, old.version + 1, digest)
+            except ConfigError as e:
+                self.rejected += 1
+                self.last_error = str(e)
+                logger.error("Rejected change to %s: %s Keeping config version %d.", self.path, e, old.version)
+                return False
+            self._snapshot = new
+            self.reloads += 1
+            self.last_error = None
+
+        logger.info("Loaded config version %d from %s.", new.version, self.path)
+        for callback in list(self._subscribers):
+            try:
+                callback(old, new)
+            except Exception as e:
+                logger.exception("Config subscriber failed for version %d: %s", new.version, e)
+        return True
+
+    def start(self) -> None:
+        if self._snapshot is None:
+            raise RuntimeError("ConfigWatcher.load() must succeed before start().")
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Watching %s for changes every %ss.", self.path, self.interval_seconds)
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot is not None else 0,
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _run(self) -> None:
+        while not self._stop_flag.wait(self.interval_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                logger.exception("Error checking %s: %s", self.path, e)
+
+    def _compile(self, data: bytes, version: int, digest: str) -> ConfigSnapshot:
+        try:
+            raw = self._parse(data.decode("utf-8"))
+        except Exception as e:
+            raise ConfigError(f"could not parse: {e}") from None
+        return compile_config(raw, version=version, digest=digest)
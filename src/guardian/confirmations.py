@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import re
+import socketserver
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_YES = {"y", "yes", "allow", "approve", "confirm", "ok", "okay", "go ahead", "do it"}
+_NO = {"n", "no", "deny", "reject", "cancel", "stop", "don't", "do not"}
+_ANSWER = re.compile(r"^\s*([a-z' ]+?)[\s,.!]*(?:(?:ticket|number)\s*)?(\d+)?[\s.!]*$")
+
+
+def parse_answer(text: str) -> Optional[Tuple[bool, Optional[str]]]:
+    """
+    "yes" -> (True, None); "deny 3" -> (False, "3"); anything else -> None.
+    """
+    m = _ANSWER.match(text.lower())
+    if not m:
+        return None
+    word, ticket_id = m.group(1).strip(), m.group(2)
+    if word in _YES:
+        return True, ticket_id
+    if word in _NO:
+        return False, ticket_id
+    return None
+
+
+@dataclass
+class ConfirmationTicket:
+    ticket_id: str
+    tool: str
+    args: Dict[str, Any]
+    prompt: str
+    deadline: float
+    created_at: float = field(default_factory=time.monotonic)
+    allowed: Optional[bool] = None
+    answered_by: Optional[str] = None
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+    _callbacks: List[Callable[["ConfirmationTicket"], None]] = field(default_factory=list, repr=False)
+
+    @property
+    def answered(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[bool]:
+        self._done.wait(timeout)
+        return self.allowed
+
+
+class ConfirmationBroker:
+    """
+    Pending yes/no questions about tool calls.
+
+    A ticket can be answered from any channel (console, voice, local
+    socket); the first answer wins. Tickets nobody answers are denied
+    automatically at their deadline. The `on_resolved` callback given
+    to open() runs on whichever thread settled the ticket.
+    """
+
+    def __init__(self, default_timeout: float = 30.0) -> None:
+        self.default_timeout = default_timeout
+        self._lock = threading.Lock()
+        self._pending: Dict[str, ConfirmationTicket] = {}
+        self._ids = itertools.count(1)
+        self._listeners: List[Callable[[ConfirmationTicket], None]] = []
+        self._stats = {"opened": 0, "allowed": 0, "denied": 0, "expired": 0}
+
+    def add_listener(self, listener: Callable[[ConfirmationTicket], None]) -> None:
+        """
+        Call `listener(ticket)` whenever a new ticket is opened (channels
+        use this to show the prompt).
+        """
+        self._listeners.append(listener)
+
+    def open(
+        self,
+        tool: str,
+        args: Dict[str, Any],
+        prompt: str,
+        timeout: Optional[float] = None,
+        on_resolved: Optional[Callable[[ConfirmationTicket], None]] = None,
+    ) -> ConfirmationTicket:
+        timeout = self.default_timeout if timeout is None else timeout
+        with self._lock:
+            ticket = ConfirmationTicket(
+                ticket_id=str(next(self._ids)),
+                tool=tool,
+                args=args,
+                prompt=prompt,
+                deadline=time.monotonic() + timeout,
+            )
+            if on_resolved is not None:
+                ticket._callbacks.append(on_resolved)
+            self._pending[ticket.ticket_id] = ticket
+            self._stats["opened"] += 1
+
+        timer = threading.Timer(timeout, self._expire, args=(ticket.ticket_id,))
+        timer.daemon = True
+        timer.start()
+
+        for listener in self._listeners:
+            try:
+                listener(ticket)
+            except Exception as e:
+                logger.warning("Confirmation listener failed: %s", e)
+        return ticket
+
+    def answer(self, allowed: bool, ticket_id: Optional[str] = None, source: str = "console") -> Optional[ConfirmationTicket]:
+        """
+        Answer a ticket (the oldest pending one if no id is given).
+        Returns the ticket, or None if there was nothing to answer.
+        """
+        with self._lock:
+            if ticket_id is None:
+                ticket = min(self._pending.values(), key=lambda t: t.created_at, default=None)
+            else:
+                ticket = self._pending.get(ticket_id)
+            if ticket is None:
+                return None
+            del self._pending[ticket.ticket_id]
+            self._stats["allowed" if allowed else "denied"] += 1
+        self._resolve(ticket, allowed, source)
+        return ticket
+
+    def pending(self) -> List[ConfirmationTicket]:
+        with self._lock:
+            return sorted(self._pending.values(), key=lambda t: t.created_at)
+
+    def deny_all(self, source: str = "shutdown") -> None:
+        with self._lock:
+            tickets = list(self._pending.values())
+            self._pending.clear()
+            self._stats["denied"] += len(tickets)
+        for ticket in tickets:
+            self._resolve(ticket, False, source)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+    def _expire(self, ticket_id: str) -> None:
+        with self._lock:
+            ticket = self._pending.pop(ticket_id, None)
+            if ticket is None:
+                return
+            self._stats["expired"] += 1
+        logger.info("No answer for '%s' (ticket %s); denying.", ticket.tool, ticket.ticket_id)
+        self._resolve(ticket, False, "timeout")
+
+    @staticmethod
+    def _resolve(ticket: ConfirmationTicket, allowed: bool, source: str) -> None:
+        ticket.allowed = allowed
+        ticket.answered_by = source
+        ticket._done.set()
+        logger.info("Ticket %s (%s) %s via %s.", ticket.ticket_id, ticket.tool, "allowed" if allowed else "denied", source)
+        for callback in ticket._callbacks:
+            try:
+                callback(ticket)
+            except Exception as e:
+                logger.exception("Error in confirmation callback: %s", e)
+
+
+# ---------------------------------------------------------------------- #
+# Channels
+# ---------------------------------------------------------------------- #
+class ConsoleConfirmations:
+    """
+    Prints each prompt and reads answers from stdin on a background
+    thread ("y", "n", "y 3" for a specific ticket), so nothing ever
+    blocks on input().
+    """
+
+    def __init__(self, broker: ConfirmationBroker, stream=None) -> None:
+        self.broker = broker
+        self.stream = stream or sys.stdin
+        self._thread = threading.Thread(target=self._run, name="console-confirmations", daemon=True)
+        broker.add_listener(self._show)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _show(self, ticket: ConfirmationTicket) -> None:
+        print(f"[{ticket.ticket_id}] Allow Malcolm to execute '{ticket.tool}' with args {ticket.args}? [y/n]", flush=True)
+
+    def _run(self) -> None:
+        for line in self.stream:
+            parsed = parse_answer(line)
+            if parsed is None:
+                if line.strip():
+                    print("Please answer y or n (optionally followed by the ticket number).", flush=True)
+                continue
+            allowed, ticket_id = parsed
+            if self.broker.answer(allowed, ticket_id, source="console") is None:
+                print("There is nothing waiting for an answer.", flush=True)
+
+
+class _SocketServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _SocketHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        broker: ConfirmationBroker = self.server.broker  # type: ignore[attr-defined]
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").strip()
+            if not line:
+                continue
+            if line.lower() == "list":
+                reply = "; ".join(f"{t.ticket_id} {t.tool} {t.args}" for t in broker.pending()) or "none"
+            else:
+                parsed = parse_answer(line)
+                if parsed is None:
+                    reply = "error: expected y/n [ticket] or list"
+                else:
+                    ticket = broker.answer(parsed[0], parsed[1], source="socket")
+                    reply = f"ok {ticket.ticket_id}" if ticket else "error: no such ticket"
+            self.wfile.write((reply + "\n").encode("utf-8"))
+
+
+class SocketConfirmations:
+    """
+    Line protocol on a localhost TCP port: "list", "y [ticket]",
+    "n [ticket]". Lets another local tool (tray app, phone bridge)
+    answer prompts.
+    """
+
+    def __init__(self, broker: ConfirmationBroker, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self._server = _SocketServer((host, port), _SocketHandler)
+        self._server.broker = broker  # type: ignore[attr-defined]
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="socket-confirmations", daemon=True)
+
+    def start(self) -> None:
+        logger.info("Confirmation socket listening on %s:%s.", *self.address[:2])
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from .events import SecurityEvent
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = {"info": 0, "warning": 1, "critical": 2}
+
+SUMMARY_TEMPLATES = {
+    "high_cpu_process": "{count} processes over CPU threshold",
+    "suspicious_process_name": "{count} suspicious processes detected",
+    "anomalous_process": "{count} processes behaving unusually",
+}
+
+
+class EventPipeline:
+    """
+    Stage between SecurityWatchdog.on_event and the guardian's handlers.
+
+    - Deduplicates events by (event_type, pid, create_time): once an event
+      has been let through, the same one is suppressed for a configurable
+      window (per event type if needed).
+    - Coalesces bursts: everything that arrives within `coalesce_seconds`
+      is grouped by event type, and groups of `summary_threshold` or more
+      become one summary event ("3 processes over CPU threshold").
+    - Holds pending events in a bounded queue; when it is full new events
+      are dropped and counted rather than growing without limit.
+
+    The handler runs on the pipeline's own worker thread, so a slow
+    consumer (TTS, logging) never stalls the scan that produced the event.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[SecurityEvent], None],
+        suppression_seconds: float = 300.0,
+        suppression_by_type: Optional[Dict[str, float]] = None,
+        coalesce_seconds: float = 2.0,
+        summary_threshold: int = 2,
+        max_queue: int = 100,
+    ) -> None:
+        self.handler = handler
+        self.suppression_seconds = suppression_seconds
+        self.suppression_by_type = dict(suppression_by_type or {})
+        self.coalesce_seconds = coalesce_seconds
+        self.summary_threshold = max(2, summary_threshold)
+        self.max_queue = max_queue
+
+        self._lock = threading.Lock()
+        self._pending: Deque[SecurityEvent] = deque()
+        self._last_emitted: Dict[Hashable, float] = {}
+        self._stats = {"received": 0, "suppressed": 0, "dropped": 0, "emitted": 0, "summaries": 0}
+
+        self._stop_flag = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        logger.info("EventPipeline starting (coalesce=%.1fs, max_queue=%d).", self.coalesce_seconds, self.max_queue)
+        self._thread.start()
+
+    def stop(self) -> None:
+        logger.info("EventPipeline stopping.")
+        self._stop_flag.set()
+        self._wakeup.set()
+
+    # ------------------------------------------------------------------ #
+    # Producer side (called from the watchdog thread)
+    # ------------------------------------------------------------------ #
+    def submit(self, event: SecurityEvent) -> None:
+        key = self._dedup_key(event)
+        window = self.suppression_by_type.get(event.event_type, self.suppression_seconds)
+        with self._lock:
+            self._stats["received"] += 1
+            last = self._last_emitted.get(key)
+            if last is not None and event.timestamp - last < window:
+                self._stats["suppressed"] += 1
+                return
+            if len(self._pending) >= self.max_queue:
+                self._stats["dropped"] += 1
+                return
+            self._last_emitted[key] = event.timestamp
+            self._pending.append(event)
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+    # ------------------------------------------------------------------ #
+    # Worker
+    # ------------------------------------------------------------------ #
+    def _run(self) -> None:
+        while not self._stop_flag.is_set():
+            self._wakeup.wait()
+            if self._stop_flag.is_set():
+                break
+            # Give the rest of the burst a chance to arrive before flushing.
+            self._stop_flag.wait(self.coalesce_seconds)
+            self._wakeup.clear()
+            for event in self._flush():
+                try:
+                    self.handler(event)
+                except Exception as e:
+                    logger.exception("Error in security event handler: %s", e)
+
+    def _flush(self) -> List[SecurityEvent]:
+        now = time.time()
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+            self._prune(now)
+
+        groups: Dict[str, List[SecurityEvent]] = {}
+        for event in batch:
+            groups.setdefault(event.event_type, []).append(event)
+
+        out: List[SecurityEvent] = []
+        for event_type, events in groups.items():
+            if len(events) >= self.summary_threshold:
+                out.append(self._summarise(event_type, events))
+            else:
+                out.extend(events)
+
+        with self._lock:
+            self._stats["emitted"] += len(out)
+            self._stats["summaries"] += sum(1 for e in out if e.data.get("summary"))
+        return out
+
+    def _prune(self, now: float) -> None:
+        """
+        Forget dedup keys whose suppression window has passed (caller holds the lock).
+        """
+        longest = max([self.suppression_seconds, *self.suppression_by_type.values()])
+        expired = [key for key, ts in self._last_emitted.items() if now - ts >= longest]
+        for key in expired:
+            del self._last_emitted[key]
+
+    @staticmethod
+    def _dedup_key(event: SecurityEvent) -> Tuple[Any, ...]:
+        pid = event.data.get("pid")
+        if pid is None:
+            return (event.event_type, event.description)
+        return (event.event_type, pid, event.data.get("create_time"))
+
+    @staticmethod
+    def _summarise(event_type: str, events: List[SecurityEvent]) -> SecurityEvent:
+        count = len(events)
+        template = SUMMARY_TEMPLATES.get(event_type, "{count} " + event_type.replace("_", " ") + " events")
+        names = sorted({str(e.data.get("name") or e.data.get("pid")) for e in events})
+        shown = ", ".join(names[:3])
+        if len(names) > 3:
+            shown += f" and {len(names) - 3} more"
+        severity = max((e.severity for e in events), key=lambda s: SEVERITY_ORDER.get(s, 0))
+        return SecurityEvent(
+            event_type=event_type,
+            description=f"{template.format(count=count)}: {shown}.",
+            severity=severity,
+            data={"summary": True, "count": count, "events": [e.data for e in events]},
+        )
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; the last bucket is +Inf.
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Spans kept per trace; a trace is one command, so this is only a safety cap.
+MAX_SPANS = 64
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("guardian_trace", default=None)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram: constant memory however many
+    observations it sees. Quantiles are interpolated within a bucket.
+    """
+
+    __slots__ = ("bounds", "counts", "total", "count", "max")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class Trace:
+    """
+    One wake-word activation, from the captured phrase to the first
+    spoken audio. Spans are (stage, seconds) in the order they ended.
+    """
+
+    __slots__ = ("trace_id", "started", "wall", "command", "spans", "first_audio", "done")
+
+    def __init__(self, started: Optional[float] = None) -> None:
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.started = started if started is not None else time.monotonic()
+        self.wall = time.time()
+        self.command: Optional[str] = None
+        self.spans: List[Tuple[str, float]] = []
+        self.first_audio: Optional[float] = None
+        self.done = False
+
+    def describe(self) -> str:
+        parts = [f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.spans]
+        if self.first_audio is not None:
+            parts.append(f"first audio at {self.first_audio * 1000:.0f}ms")
+        return f"{self.trace_id} ({self.command or '?'}): " + ", ".join(parts)
+
+
+class _Stage:
+    __slots__ = ("owner", "name", "trace", "started")
+
+    def __init__(self, owner: "Instrumentation", name: str, trace: Optional[Trace]) -> None:
+        self.owner = owner
+        self.name = name
+        self.trace = trace
+        self.started = 0.0
+
+    def __enter__(self) -> "_Stage":
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.owner.observe(self.name, time.monotonic() - self.started, self.trace)
+
+
+class _Activation:
+    __slots__ = ("trace", "token")
+
+    def __init__(self, trace: Trace) -> None:
+        self.trace = trace
+        self.token = None
+
+    def __enter__(self) -> Trace:
+        self.token = _current.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc) -> None:
+        _current.reset(self.token)
+
+
+class _NoOp:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP = _NoOp()
+
+
+class Instrumentation:
+    """
+    Per-stage latency histograms and trace IDs for voice commands.
+
+    The audio pipeline starts a Trace for each captured phrase and
+    activates it (a context variable) while the command is handled, so
+    code further down - the Omni POST, tool execution, TTS - can time
+    itself with `stage()` without being passed anything. Work handed to
+    another thread carries the trace explicitly (see `current()`).
+
+    When disabled every method returns at once and `stage()` hands back
+    a shared no-op context manager, so instrumented code costs one
+    attribute check.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        recent_traces: int = 50,
+        max_stages: int = 128,
+    ) -> None:
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        # Stage names include tool names chosen by the model; cap them.
+        self.max_stages = max_stages
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._recent: Deque[Trace] = deque(maxlen=recent_traces)
+        self.traces_started = 0
+        self.traces_completed = 0
+
+    def configure(self, enabled: bool, recent_traces: Optional[int] = None) -> None:
+        self.enabled = enabled
+        if recent_traces is not None:
+            with self._lock:
+                self._recent = deque(self._recent, maxlen=recent_traces)
+
+    def reset(self) -> None:
+        """
+        Forget every histogram and recent trace (between benchmark runs).
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._recent.clear()
+            self.traces_started = 0
+            self.traces_completed = 0
+
+    # ------------------------------------------------------------------ #
+    # Traces
+    # ------------------------------------------------------------------ #
+    def start_trace(self, started: Optional[float] = None) -> Optional[Trace]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            self.traces_started += 1
+        return Trace(started)
+
+    def activate(self, trace: Optional[Trace]):
+        """
+        Make `trace` current for the calling thread (a context manager).
+        """
+        if trace is None:
+            return _NOOP
+        return _Activation(trace)
+
+    @staticmethod
+    def current() -> Optional[Trace]:
+        return _current.get()
+
+    def finish(self, trace: Optional[Trace]) -> None:
+        """
+        The command handler has returned. The trace stays open for TTS,
+        which reports first audio later.
+        """
+        if trace is None or trace.done:
+            return
+        trace.done = True
+        self.observe("capture_to_handled", time.monotonic() - trace.started, None)
+        with self._lock:
+            self.traces_completed += 1
+            self._recent.append(trace)
+        logger.info("Trace %s", trace.describe())
+
+    def first_audio(self, trace: Optional[Trace]) -> None:
+        """
+        Record time-to-first-audio once per trace.
+        """
+        if trace is None or trace.first_audio is not None:
+            return
+        trace.first_audio = time.monotonic() - trace.started
+        self.observe("first_audio", trace.first_audio, None)
+
+    # ------------------------------------------------------------------ #
+    # Timing
+    # ------------------------------------------------------------------ #
+    def stage(self, name: str, trace: Optional[Trace] = None):
+        """
+        Time a block: `with metrics.stage("omni_post"): ...`. Uses the
+        current trace unless one is given.
+        """
+        if not self.enabled:
+            return _NOOP
+        return _Stage(self, name, trace if trace is not None else _current.get())
+
+    def observe(self, name: str, seconds: float, trace: Optional[Trace] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                if len(self._histograms) >= self.max_stages:
+                    name = "other"
+                hist = self._histograms.get(name) or self._histograms.setdefault(name, Histogram(self.buckets))
+            hist.observe(seconds)
+        if trace is not None and len(trace.spans) < MAX_SPANS:
+            trace.spans.append((name, seconds))
+
+    # ------------------------------------------------------------------ #
+    # Reports
+    # ------------------------------------------------------------------ #
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {
+                    "count": h.count,
+                    "p50_ms": h.quantile(0.5) * 1000.0,
+                    "p95_ms": h.quantile(0.95) * 1000.0,
+                    "max_ms": h.max * 1000.0,
+                }
+                for name, h in sorted(self._histograms.items())
+            }
+
+    def recent(self, n: int = 5) -> List[Trace]:
+        with self._lock:
+            return list(self._recent)[-n:]
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP guardian_stage_seconds Time spent in each stage of handling a voice command.",
+            "# TYPE guardian_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, h in sorted(self._histograms.items()):
+                name = _label_value(name)
+                cumulative = 0
+                for bound, n in zip(self.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'guardian_stage_seconds_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'guardian_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'guardian_stage_seconds_sum{{stage="{name}"}} {h.total:.6f}')
+                lines.append(f'guardian_stage_seconds_count{{stage="{name}"}} {h.count}')
+            lines += [
+                "# HELP guardian_traces_total Voice command traces.",
+                "# TYPE guardian_traces_total counter",
+                f'guardian_traces_total{{state="started"}} {self.traces_started}',
+                f'guardian_traces_total{{state="completed"}} {self.traces_completed}',
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _label_value(value: str) -> str:
+    # Stage names can carry model-chosen tool names; escape them as the
+    # Prometheus text format requires.
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide instance; disabled until main.py configures it.
+metrics = Instrumentation()
+
+
+# ---------------------------------------------------------------------- #
+# Prometheus endpoint
+# ---------------------------------------------------------------------- #
+def _make_handler():
+    # http.server is imported here, not at module load: most runs never
+    # serve metrics and it is one of the slower stdlib imports.
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = self.server.instrumentation.render_prometheus().encode("utf-8")  # type: ignore[attr-defined]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt: str, *args) -> None:
+            logger.debug("metrics %s", fmt % args)
+
+    return Handler
+
+
+class MetricsServer:
+    """
+    Serves GET /metrics in Prometheus text format on a local port.
+    """
+
+    def __init__(self, instrumentation: Instrumentation, host: str = "127.0.0.1", port: int = 9464) -> None:
+        from http.server import ThreadingHTTPServer
+
+        self._server = ThreadingHTTPServer((host, port), _make_handler())
+        self._server.daemon_threads = True
+        self._server.instrumentation = instrumentation  # type: ignore[attr-defined]
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self) -> None:
+        logger.info("Metrics endpoint on http://%s:%s/metrics.", *self.address[:2])
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import codecs
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Top-level keys MalcolmClient reads from a reply, and what it needs of each:
+# True = the value, a dict = only these keys of a nested object,
+# "list" = the items of an array (up to max_list_items).
+Spec = Dict[str, Union[bool, str, "Spec"]]
+REPLY_SPEC: Spec = {
+    "message": True,
+    "reply_text": True,
+    "reply": True,
+    "data": {"message": True, "reply": True, "text": True, "response": True},
+    "received_command": True,
+    "status": True,
+    "error": True,
+    "detail": True,
+    "message_error": True,
+    "response": True,
+    "tool_calls": "list",
+    "actions": "list",
+}
+PREFERRED_REPLY_KEYS = ("message", "reply_text", "reply")
+TOOL_KEYS = ("tool_calls", "actions")
+
+_WS = re.compile(r"[ \t\n\r]*")
+# The rest of a string body: stops at the closing quote, or at a
+# backslash whose escaped character has not arrived yet.
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_SCALAR = re.compile(r"[^,\]}\s]*")
+
+READ_CHUNK_BYTES = 16 * 1024
+# Skipped values are listed by name in a summary; past this many keys
+# an object's remaining keys are read but not listed.
+MAX_LISTED_KEYS = 64
+
+
+@dataclass(frozen=True)
+class JsonLimits:
+    max_body_bytes: int = 2_000_000   # stop reading the body here
+    max_field_bytes: int = 64_000     # a wanted value bigger than this is skipped
+    max_depth: int = 64               # deeper values are skipped, never decoded
+    max_list_items: int = 32          # tool calls / actions kept per list
+    fast_path_bytes: int = 256_000    # a body this small with a Content-Length is parsed in one go
+    max_text_chars: int = 500         # of a non-JSON body
+
+
+class Skipped:
+    """
+    Stands in for a value that was not decoded: not wanted, or over a
+    size or depth limit. `size` is its length in characters.
+    """
+
+    __slots__ = ("size", "reason")
+
+    def __init__(self, size: int, reason: str = "unused") -> None:
+        self.size = size
+        self.reason = reason
+
+    def __repr__(self) -> str:
+        return f"<skipped {self.reason}, {self.size} chars>"
+
+
+@dataclass
+class ParsedBody:
+    data: Dict[str, Any]
+    size: int = 0             # characters read
+    status: str = "complete"  # complete | stopped (early) | truncated (cap or cut-off) | text (not JSON)
+    fast_path: bool = False
+
+    @property
+    def skipped_chars(self) -> int:
+        return sum(v.size for v in self.data.values() if isinstance(v, Skipped))
+
+
+class _Truncated(Exception):
+    pass
+
+
+class _Reader:
+    """
+    Pull reader over a stream of byte chunks. Only the part of the
+    buffer a caller still needs (from `keep`, or else the cursor) is
+    held; a value being kept that grows past `keep_limit` is dropped
+    and the reader carries on skipping it.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], limits: JsonLimits) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        self.limits = limits
+        self.buf = ""
+        self.pos = 0
+        self.offset = 0     # characters dropped from the front of buf
+        self.bytes_read = 0
+        self.eof = False
+        self.capped = False
+        self.keep = -1
+        self.keep_limit = 0
+        self.depth = 0      # of the value being skipped
+
+    def absolute(self) -> int:
+        return self.offset + self.pos
+
+    def more(self) -> bool:
+        while not self.eof:
+            if self.bytes_read >= self.limits.max_body_bytes:
+                self.eof = self.capped = True
+                break
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.eof = True
+                tail = self._decoder.decode(b"", final=True)
+                self.buf += tail
+                return bool(tail)
+            if not chunk:
+                continue
+            chunk = chunk[: self.limits.max_body_bytes - self.bytes_read]
+            self.bytes_read += len(chunk)
+            start = self.keep if self.keep >= 0 else self.pos
+            if self.keep >= 0 and len(self.buf) - self.keep > self.keep_limit:
+                self.keep = -1
+                start = self.pos
+            if start:
+                self.buf = self.buf[start:]
+                self.offset += start
+                self.pos -= start
+                if self.keep >= 0:
+                    self.keep -= start
+            self.buf += self._decoder.decode(chunk)
+            return True
+        return False
+
+    def peek(self) -> str:
+        """
+        The next non-whitespace character ("" at the end of the body).
+        """
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+
+    # ------------------------------------------------------------------ #
+    # Skipping (nothing is decoded)
+    # ------------------------------------------------------------------ #
+    def skip_string(self) -> bool:
+        self.pos += 1
+        while True:
+            self.pos = _STRING_BODY.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) and self.buf[self.pos] == '"':
+                self.pos += 1
+                return True
+            if not self.more():
+                return False
+
+    def skip_value(self) -> bool:
+        """
+        Move past one value; False if the body ended first. Nesting is
+        counted, not recursed into, so any depth is safe to skip.
+        """
+        c = self.peek()
+        self.depth = 0
+        if c == '"':
+            return self.skip_string()
+        if c in ("{", "["):
+            depth = 0
+            while True:
+                m = _STRUCTURAL.search(self.buf, self.pos)
+                if m is None:
+                    self.pos = len(self.buf)
+                    if not self.more():
+                        return False
+                    continue
+                self.pos = m.start()
+                ch = m.group()
+                if ch == '"':
+                    if not self.skip_string():
+                        return False
+                    continue
+                self.pos += 1
+                if ch in "{[":
+                    depth += 1
+                    self.depth = max(self.depth, depth)
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return True
+        if not c:
+            return False
+        while True:
+            self.pos = _SCALAR.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self.more():
+                return True
+
+    # ------------------------------------------------------------------ #
+    # Decoding
+    # ------------------------------------------------------------------ #
+    def value(self, limit: int) -> Any:
+        """
+        Decode the next value if it fits in `limit` characters and
+        `max_depth`, else return a Skipped marker.
+        """
+        self.peek()
+        self.keep, self.keep_limit = self.pos, limit
+        start = self.absolute()
+        done = self.skip_value()
+        kept, self.keep = self.keep, -1
+        size = self.absolute() - start
+        if not done:
+            raise _Truncated()
+        if kept < 0 or size > limit:
+            return Skipped(size, "too large")
+        if self.depth > self.limits.max_depth:
+            return Skipped(size, "too deep")
+        try:
+            return json.loads(self.buf[kept:self.pos])
+        except ValueError:
+            return Skipped(size, "invalid")
+
+    def skip(self) -> Skipped:
+        start = self.absolute()
+        if not self.skip_value():
+            raise _Truncated()
+        return Skipped(self.absolute() - start)
+
+    def key(self) -> str:
+        value = self.value(self.limits.max_field_bytes)
+        if not isinstance(value, str):
+            raise _Truncated()
+        return value
+
+    def object(
+        self,
+        spec: Spec,
+        stop: Optional[Callable[[str, Dict[str, Any]], bool]] = None,
+        out: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Read an object into `out`, decoding only the keys in `spec`.
+        Returns the values read and whether `stop(key, out)` ended it
+        early; if the body is cut off, `out` keeps what came before.
+        """
+        self.pos += 1  # "{"
+        out = {} if out is None else out
+        listed = 0
+        while True:
+            c = self.peek()
+            if c == "}":
+                self.pos += 1
+                return out, False
+            if c == ",":
+                self.pos += 1
+                continue
+            if c != '"':
+                raise _Truncated()
+            key = self.key()
+            if self.peek() != ":":
+                raise _Truncated()
+            self.pos += 1
+            want = spec.get(key)
+            c = self.peek()
+            start = self.absolute()
+            try:
+                if want is None:
+                    skipped = self.skip()
+                    if listed < MAX_LISTED_KEYS:
+                        out[key] = skipped
+                        listed += 1
+                elif isinstance(want, dict) and c == "{":
+                    out[key], _ = self.object(want)
+                elif want == "list" and c == "[":
+                    out[key] = self.items()
+                else:
+                    out[key] = self.value(self.limits.max_field_bytes)
+            except _Truncated:
+                out[key] = Skipped(self.absolute() - start, "over the size limit" if self.capped else "cut off")
+                raise
+            if stop is not None and stop(key, out):
+                return out, True
+
+    def items(self) -> List[Any]:
+        self.pos += 1  # "["
+        out: List[Any] = []
+        while True:
+            c = self.peek()
+            if c == "]":
+                self.pos += 1
+                return out
+            if c == ",":
+                self.pos += 1
+                continue
+            if not c:
+                raise _Truncated()
+            if len(out) < self.limits.max_list_items:
+                item = self.value(self.limits.max_field_bytes)
+                if not isinstance(item, Skipped):
+                    out.append(item)
+            else:
+                self.skip()
+
+
+# ---------------------------------------------------------------------- #
+# Entry points
+# ---------------------------------------------------------------------- #
+def parse_reply(
+    chunks: Iterable[bytes],
+    limits: JsonLimits = JsonLimits(),
+    content_length: Optional[int] = None,
+) -> ParsedBody:
+    """
+    Read an Omni reply body into the top-level fields MalcolmClient uses.
+
+    A body known to be under `fast_path_bytes` is decoded in one go.
+    Anything else is read incrementally: values nobody reads are skipped
+    without being decoded (and show up as Skipped markers), wanted ones
+    are decoded only within the size and depth limits, and reading
+    stops early only once nothing later in the body could change the
+    reply text or tool calls (see _settled); otherwise it goes on to the
+    end of the body or to `max_body_bytes`.
+    """
+    if content_length is not None and content_length <= limits.fast_path_bytes:
+        body = b"".join(chunks)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return _as_text(body.decode("utf-8", "replace"), len(body), limits)
+        except RecursionError:
+            # Small but nested too deep to decode whole; the reader below
+            # skips what it does not want without recursing.
+            chunks = [body]
+        else:
+            if isinstance(data, dict):
+                return ParsedBody(data, size=len(body), fast_path=True)
+            return ParsedBody(_wrap(data, limits), size=len(body), fast_path=True)
+
+    reader = _Reader(chunks, limits)
+    first = reader.peek()
+    if first != "{":
+        return _parse_other(reader, first, limits)
+
+    data: Dict[str, Any] = {}
+    try:
+        _, stopped = reader.object(REPLY_SPEC, lambda key, out: _settled(out), data)
+    except _Truncated:
+        # Keys decoded before the cut-off are still usable.
+        return ParsedBody(data, size=reader.absolute(), status="truncated")
+    if stopped:
+        return ParsedBody(data, size=reader.absolute(), status="stopped")
+    return ParsedBody(data, size=reader.absolute(), status="truncated" if reader.capped else "complete")
+
+
+def _settled(out: Dict[str, Any]) -> bool:
+    """
+    True once the rest of a reply cannot change what MalcolmClient
+    takes from it: both tool lists have been read (their calls are
+    merged), and so has the reply key _extract_reply_text would pick,
+    along with every key it prefers over that one.
+    """
+    if not all(k in out for k in TOOL_KEYS):
+        return False
+    for key in PREFERRED_REPLY_KEYS:
+        if key not in out:
+            return False
+        value = out[key]
+        if isinstance(value, str) and value.strip():
+            return True
+    return False
+
+
+def _parse_other(reader: _Reader, first: str, limits: JsonLimits) -> ParsedBody:
+    if first in ('"', "[", "-", "t", "f", "n") or first.isdigit():
+        try:
+            value = reader.value(limits.max_field_bytes)
+        except _Truncated:
+            value = Skipped(reader.absolute(), "cut off")
+        return ParsedBody(_wrap(value, limits), size=reader.absolute())
+    # Not JSON: keep the start of it for a readable error.
+    text = reader.buf[reader.pos:]
+    while len(text) < limits.max_text_chars and reader.more():
+        text = reader.buf[reader.pos:]
+    return _as_text(text, reader.absolute() + len(text), limits)
+
+
+def _wrap(value: Any, limits: JsonLimits) -> Dict[str, Any]:
+    if isinstance(value, str):
+        return {"message": _clip(value, limits.max_text_chars)}
+    return {"value": value}
+
+
+def _as_text(text: str, size: int, limits: JsonLimits) -> ParsedBody:
+    return ParsedBody({"message": _clip(text.strip(), limits.max_text_chars)}, size=size, status="text")
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def describe_payload(data: Any) -> str:
+    """
+    A short spoken description of a reply with no readable text, in
+    place of reading the JSON out.
+    """
+    if not isinstance(data, dict) or not data:
+        return "Malcolm sent a reply with nothing I can read out."
+    names = [str(k) for k in data]
+    shown = ", ".join(names[:5])
+    if len(names) > 5:
+        shown += f" and {len(names) - 5} more"
+    text = f"Malcolm sent a reply with no message, only data fields: {shown}."
+    skipped = [v for v in data.values() if isinstance(v, Skipped)]
+    size = sum(v.size for v in skipped)
+    if size >= 10_000:
+        about = "over" if any(v.reason == "over the size limit" for v in skipped) else "about"
+        text += f" It was {about} {_human_size(size)}; see the log for details."
+    return text
+
+
+def _human_size(chars: int) -> str:
+    if chars >= 1_000_000:
+        return f"{chars / 1_000_000:.1f} megabytes"
+    return f"{chars // 1000} kilobytes"
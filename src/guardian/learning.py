@@ -2,29 +2,349 @@ from __future__ import annotations
 
 import json
 import logging
-from dataclasses import dataclass
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+SNAPSHOT_VERSION = 1
+
+
 @dataclass
 class PreferenceEvent:
     tool: str
     confirmed: bool
+    args: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+@dataclass
+class PreferenceCounts:
+    approved: int = 0
+    denied: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.approved + self.denied
+
+
+class _Index:
+    """
+    Approve/deny counts keyed by tool and by (tool, argument pattern).
+    """
+
+    __slots__ = ("by_tool", "by_pattern")
+
+    def __init__(self) -> None:
+        self.by_tool: Dict[str, PreferenceCounts] = {}
+        self.by_pattern: Dict[Tuple[str, str], PreferenceCounts] = {}
+
+    def apply(self, tool: str, pattern: str, confirmed: bool) -> None:
+        for index, key in ((self.by_tool, tool), (self.by_pattern, (tool, pattern))):
+            counts = index.get(key)
+            if counts is None:
+                counts = index[key] = PreferenceCounts()
+            if confirmed:
+                counts.approved += 1
+            else:
+                counts.denied += 1
+
+    def copy(self) -> "_Index":
+        other = _Index()
+        other.by_tool = {k: PreferenceCounts(c.approved, c.denied) for k, c in self.by_tool.items()}
+        other.by_pattern = {k: PreferenceCounts(c.approved, c.denied) for k, c in self.by_pattern.items()}
+        return other
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "tools": {t: [c.approved, c.denied] for t, c in self.by_tool.items()},
+            "patterns": [[t, p, c.approved, c.denied] for (t, p), c in self.by_pattern.items()],
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "_Index":
+        index = cls()
+        index.by_tool = {t: PreferenceCounts(a, d) for t, (a, d) in data.get("tools", {}).items()}
+        index.by_pattern = {(t, p): PreferenceCounts(a, d) for t, p, a, d in data.get("patterns", [])}
+        return index
+
+
+def arg_pattern(args: Optional[Dict[str, Any]]) -> str:
+    """
+    Canonical, order-independent form of a tool's arguments.
+
+    Strings are kept (lower-cased, trimmed); numbers collapse to '#'
+    because values like pids or limits change from call to call and
+    would otherwise make every pattern unique.
+    """
+    if not args:
+        return ""
+    parts = []
+    for key in sorted(args):
+        value = args[key]
+        if isinstance(value, bool):
+            text = str(value).lower()
+        elif isinstance(value, (int, float)):
+            text = "#"
+        elif isinstance(value, str):
+            text = value.strip().lower()[:64]
+        else:
+            text = type(value).__name__
+        parts.append(f"{key}={text}")
+    return ",".join(parts)
+
+
+class PreferenceStore:
+    """
+    Approve/deny history per tool and per argument pattern.
+
+    Counts live in an in-memory index, so lookups are O(1) dict reads
+    and record() never touches the disk. A writer thread appends the
+    events to `preferences.log` in batches, flushing when
+    `flush_every` events are queued, after `flush_interval` seconds,
+    or on close().
+
+    Startup does not replay the whole log. Every `snapshot_every`
+    flushed events (and on close) the writer saves the counts covered
+    by the log so far to `preferences.snapshot.json`, with the byte
+    offset they cover. load() reads the snapshot and replays only the
+    log tail after that offset. The log itself is append-only and
+    remains the audit trail.
+    """
+
+    def __init__(
+        self,
+        log_dir: Path,
+        flush_every: int = 32,
+        flush_interval: float = 2.0,
+        snapshot_every: int = 500,
+        max_queue: int = 10_000,
+    ) -> None:
+        self.log_file = log_dir / "preferences.log"
+        self.snapshot_file = log_dir / "preferences.snapshot.json"
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.snapshot_every = max(1, snapshot_every)
+        self._lock = threading.Lock()
+        # `_live` answers queries and includes queued events; `_durable`
+        # is owned by the writer and matches the log up to `_log_offset`,
+        # so a snapshot never counts an event that is not yet on disk.
+        self._live = _Index()
+        self._durable = _Index()
+        self._queue: "queue.Queue[Optional[PreferenceEvent]]" = queue.Queue(maxsize=max_queue)
+        self._stop_flag = threading.Event()
+        self._thread = threading.Thread(target=self._writer, name="preference-writer", daemon=True)
+        self._log_offset = 0
+        self._since_snapshot = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.replayed = 0
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def load(self) -> None:
+        started = time.perf_counter()
+        self._durable, offset = self._load_snapshot()
+        self._log_offset = self._replay_tail(offset)
+        with self._lock:
+            self._live = self._durable.copy()
+        logger.info(
+            "PreferenceStore loaded %d tools, %d patterns (%d log events replayed) in %.1f ms.",
+            len(self._live.by_tool), len(self._live.by_pattern), self.replayed, (time.perf_counter() - started) * 1000.0,
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._stop_flag.set()
+            self._queue.put(None)  # wake the writer
+            self._thread.join(timeout=5.0)
+        if self._since_snapshot:
+            self._write_snapshot()
+
+    # ------------------------------------------------------------------ #
+    # Recording and queries
+    # ------------------------------------------------------------------ #
+    def record(self, event: PreferenceEvent) -> None:
+        """
+        Update the index immediately; the disk write is queued.
+        """
+        with self._lock:
+            self._live.apply(event.tool, arg_pattern(event.args), event.confirmed)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Preference write queue full; event for %s not persisted.", event.tool)
+
+    def counts(self, tool: str, args: Optional[Dict[str, Any]] = None) -> PreferenceCounts:
+        """
+        Counts for the tool, or for one argument pattern when `args` is given.
+        """
+        with self._lock:
+            if args is None:
+                found = self._live.by_tool.get(tool)
+            else:
+                found = self._live.by_pattern.get((tool, arg_pattern(args)))
+            return PreferenceCounts(found.approved, found.denied) if found else PreferenceCounts()
+
+    def always_approved(self, tool: str, args: Optional[Dict[str, Any]] = None, min_approvals: int = 5) -> bool:
+        """
+        True if the operator has approved this tool (or, failing that,
+        this argument pattern) at least `min_approvals` times and never
+        denied it.
+        """
+        with self._lock:
+            candidates = [self._live.by_tool.get(tool)]
+            if args is not None:
+                candidates.append(self._live.by_pattern.get((tool, arg_pattern(args))))
+        return any(c is not None and c.denied == 0 and c.approved >= min_approvals for c in candidates)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "tools": len(self._live.by_tool),
+                "patterns": len(self._live.by_pattern),
+                "queued": self._queue.qsize(),
+                "flushes": self.flushes,
+                "dropped": self.dropped,
+                "replayed": self.replayed,
+            }
+
+    # ------------------------------------------------------------------ #
+    # Writer
+    # ------------------------------------------------------------------ #
+    def _writer(self) -> None:
+        batch: List[PreferenceEvent] = []
+        while True:
+            try:
+                event = self._queue.get(timeout=self.flush_interval if batch else None)
+            except queue.Empty:
+                event = None
+            if event is not None:
+                batch.append(event)
+                if len(batch) < self.flush_every and not self._stop_flag.is_set():
+                    continue
+            # Take whatever else is already queued so one write covers it.
+            while True:
+                try:
+                    extra = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is not None:
+                    batch.append(extra)
+            if batch:
+                self._flush(batch)
+                batch = []
+            if self._stop_flag.is_set():
+                return
+
+    def _flush(self, batch: List[PreferenceEvent]) -> None:
+        lines = "".join(
+            json.dumps({"tool": e.tool, "confirmed": e.confirmed, "args": e.args, "ts": round(e.timestamp, 3)}, default=str) + "\n"
+            for e in batch
+        )
+        try:
+            with self.log_file.open("ab") as f:
+                f.write(lines.encode("utf-8"))
+                self._log_offset = f.tell()
+        except Exception as e:
+            logger.warning("Failed to write %d preference events: %s", len(batch), e)
+            return
+        for e in batch:
+            self._durable.apply(e.tool, arg_pattern(e.args), e.confirmed)
+        self.flushes += 1
+        self._since_snapshot += len(batch)
+        if self._since_snapshot >= self.snapshot_every:
+            self._write_snapshot()
+
+    # ------------------------------------------------------------------ #
+    # Snapshot and replay
+    # ------------------------------------------------------------------ #
+    def _write_snapshot(self) -> None:
+        data = {"version": SNAPSHOT_VERSION, "log_offset": self._log_offset, **self._durable.to_json()}
+        tmp = self.snapshot_file.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp, self.snapshot_file)
+            self._since_snapshot = 0
+        except Exception as e:
+            logger.warning("Failed to write preference snapshot: %s", e)
+
+    def _load_snapshot(self) -> Tuple[_Index, int]:
+        try:
+            data = json.loads(self.snapshot_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return _Index(), 0
+        except Exception as e:
+            logger.warning("Ignoring unreadable preference snapshot (%s); replaying full log.", e)
+            return _Index(), 0
+        if data.get("version") != SNAPSHOT_VERSION:
+            return _Index(), 0
+        return _Index.from_json(data), int(data.get("log_offset", 0))
+
+    def _replay_tail(self, offset: int) -> int:
+        try:
+            size = self.log_file.stat().st_size
+        except FileNotFoundError:
+            return 0
+        if size < offset:
+            # Rotated or truncated after the snapshot: everything in it is new.
+            logger.info("preferences.log is shorter than the snapshot offset; replaying it from the start.")
+            offset = 0
+        with self.log_file.open("rb+") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Torn last line from a crash; drop it so the next append starts clean.
+                    f.truncate(offset)
+                    break
+                offset += len(raw)
+                try:
+                    item = json.loads(raw)
+                except ValueError:
+                    continue
+                self._durable.apply(item.get("tool", ""), arg_pattern(item.get("args")), bool(item.get("confirmed")))
+                self.replayed += 1
+        return offset
+
 
 class LearningEngine:
-    def __init__(self, enabled: bool, log_dir: Path) -> None:
+    def __init__(
+        self,
+        enabled: bool,
+        log_dir: Path,
+        flush_every: int = 32,
+        flush_interval_seconds: float = 2.0,
+        snapshot_every: int = 500,
+    ) -> None:
         self.enabled = enabled
-        self.log_file = log_dir / "preferences.log"
+        self.preferences: Optional[PreferenceStore] = None
+        if enabled:
+            self.preferences = PreferenceStore(
+                log_dir,
+                flush_every=flush_every,
+                flush_interval=flush_interval_seconds,
+                snapshot_every=snapshot_every,
+            )
+            self.preferences.load()
+            self.preferences.start()
         logger.info("LearningEngine initialised. Enabled=%s", self.enabled)
 
     def record_preference(self, event: PreferenceEvent) -> None:
-        if not self.enabled:
+        if self.preferences is None:
             return
-        try:
-            with self.log_file.open("a", encoding="utf-8") as f:
-                f.write(json.dumps({"tool": event.tool, "confirmed": event.confirmed}) + "\n")
-            logger.info("Recorded preference: %s", event)
-        except Exception as e:
-            logger.warning("Failed to record preference: %s", e)
+        self.preferences.record(event)
+        logger.info("Recorded preference: %s %s", event.tool, "approved" if event.confirmed else "denied")
+
+    def close(self) -> None:
+        if self.preferences is not None:
+            self.preferences.close()
@@ -2,50 +2,112 @@ from __future__ import annotations
 
 import logging
 import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
-
-import yaml
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from .audio_sentinel import AudioSentinel
-from .malcolm_client import MalcolmClient
-from .policy_engine import PolicyEngine
+from .circuit_breaker import CircuitBreaker
+from .config_watcher import ConfigSnapshot, ConfigWatcher, restart_required
+from .json_stream import JsonLimits
+from .malcolm_client import MalcolmClient, MalcolmResponse
+from .policy_engine import PolicyEngine, ToolDecision
+from .response_cache import (
+    DEFAULT_CONTEXT_KEYS,
+    DEFAULT_NO_CACHE_COMMANDS,
+    DEFAULT_UNCACHEABLE_TOOLS,
+    ResponseCache,
+)
+from .process_sampler import ProcessSampler
+from .anomaly import AnomalyDetector
 from .security_watchdog import SecurityWatchdog
-from .tools import execute_tool
+from .startup import StartupCoordinator, startup_report
+from .stt_stub import STTEngine
+from .confirmations import ConfirmationBroker, ConfirmationTicket, ConsoleConfirmations, SocketConfirmations, parse_answer
+from .tool_executor import ToolExecutor, ToolOutcome
+from .telemetry import TelemetryStore
+from .tools import set_process_sampler, set_telemetry_store
 from .learning import LearningEngine, PreferenceEvent
+from .speech_queue import Priority
 from .tts import TTSVoice
+from .tts_backends import PhraseCache, Pyttsx3Backend, default_sink
 from .events import SecurityEvent
-from .utils.logging_utils import setup_logging
+from .instrumentation import MetricsServer, metrics
+from .event_pipeline import EventPipeline
+from .recorder import recorder
+from .utils.logging_utils import setup_logging, stop_logging
+from .wake_gate import WakeWordGate, build_spotter
+
+if TYPE_CHECKING:
+    from .command_server import CommandServer
 
 logger = logging.getLogger(__name__)
 
 def load_config(config_path: Path) -> Dict[str, Any]:
-    with config_path.open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    return ConfigWatcher(config_path).load().raw
 
 class MalcolmGuardian:
-    def __init__(self, root_dir: Path) -> None:
+    def __init__(self, root_dir: Path, profile_startup: bool = False, headless: bool = False) -> None:
         self.root_dir = root_dir
-        self.config = load_config(root_dir / "config" / "config.yaml")
+        # Headless: no microphone or speech; commands arrive over the local
+        # command server instead (see start()).
+        self.headless = headless
+        # The watcher validates config.yaml and, while running, swaps a new
+        # compiled snapshot into the hot-reloadable subsystems when the file
+        # changes (see _apply_config). An invalid file fails start-up here.
+        self.config_watcher = ConfigWatcher(root_dir / "config" / "config.yaml")
+        self.config = self.config_watcher.load().raw
+        r_cfg = self.config.get("config_reload", {})
+        self.config_watcher.interval_seconds = r_cfg.get("interval_seconds", 2.0)
+        self._config_reload = r_cfg.get("enabled", True)
+        self.config_watcher.subscribe(self._apply_config)
 
         logs_dir = root_dir / "logs"
-        setup_logging(logs_dir)
-
-        # TTS
-        tts_cfg = self.config.get("tts", {})
-        self.tts = TTSVoice(
-            rate=tts_cfg.get("rate", 180),
-            volume=tts_cfg.get("volume", 1.0),
-            voice_name=tts_cfg.get("voice_name"),
-        ) if tts_cfg.get("enabled", True) else None
-
-        # Malcolm Client
-        m_cfg = self.config.get("malcolm_api", {})
-        self.malcolm = MalcolmClient(
-            base_url=m_cfg.get("base_url", ""),
-            api_key=m_cfg.get("api_key", ""),
-            enabled=m_cfg.get("enabled", False),
-            timeout_seconds=m_cfg.get("timeout_seconds", 15),
+        log_cfg = self.config.get("logging", {})
+        self._log_listener = setup_logging(
+            logs_dir,
+            mode=log_cfg.get("mode", "queue"),
+            json_format=log_cfg.get("json", False),
+            level=log_cfg.get("level", "INFO"),
+            rate_limits=log_cfg.get("rate_limits", {}),
+            queue_size=log_cfg.get("queue_size", 10_000),
+            console=log_cfg.get("console", True),
+        )
+
+        # Latency instrumentation
+        i_cfg = self.config.get("instrumentation", {})
+        metrics.configure(enabled=i_cfg.get("enabled", False), recent_traces=i_cfg.get("recent_traces", 50))
+        self.metrics_server = MetricsServer(
+            metrics,
+            port=i_cfg.get("metrics_port", 9464),
+        ) if metrics.enabled and i_cfg.get("metrics_endpoint", True) else None
+
+        # Startup: TTS, the Omni connection, the watchdog and the microphone
+        # are brought up side by side by start(), and each reports in as soon
+        # as it is ready. Until then their attributes are None.
+        st_cfg = self.config.get("startup", {})
+        self.profile_startup = profile_startup or st_cfg.get("profile", False)
+        self.ready_timeout = st_cfg.get("ready_timeout_seconds", 30)
+        self.startup = StartupCoordinator(on_ready=self._on_subsystem_ready)
+        self.tts: Optional[TTSVoice] = None
+        self.malcolm: Optional[MalcolmClient] = None
+        self.audio_sentinel: Optional[AudioSentinel] = None
+        self.process_sampler: Optional[ProcessSampler] = None
+        self.telemetry: Optional[TelemetryStore] = None
+        self.security_watchdog: Optional[SecurityWatchdog] = None
+        self.security_note_ttl = self.config.get("tts", {}).get("security_note_ttl_seconds", 60)
+
+        # Record-and-replay log (see recorder.py); opened by start().
+        self.recording = self.config.get("recording", {})
+
+        # Learning
+        l_cfg = self.config.get("learning", {})
+        self.learning = LearningEngine(
+            enabled=l_cfg.get("enabled", True),
+            log_dir=logs_dir,
+            flush_every=l_cfg.get("flush_every", 32),
+            flush_interval_seconds=l_cfg.get("flush_interval_seconds", 2.0),
+            snapshot_every=l_cfg.get("snapshot_every", 500),
         )
 
         # Policy Engine
@@ -53,82 +115,377 @@ class MalcolmGuardian:
         self.policy = PolicyEngine(
             auto_allow=p_cfg.get("auto_allow_tools", []),
             confirm_tools=p_cfg.get("confirm_tools", []),
+            preferences=self.learning.preferences,
+            promote_after=p_cfg.get("auto_promote_after", 0),
+            never_promote=p_cfg.get("never_promote_tools", []),
+            rules=p_cfg.get("rules", []),
+            rule_mode=p_cfg.get("rule_mode", "first_match"),
+            rule_cache_size=p_cfg.get("rule_cache_size", 4096),
         )
 
-        # Learning
-        l_cfg = self.config.get("learning", {})
-        self.learning = LearningEngine(
-            enabled=l_cfg.get("enabled", True),
-            log_dir=logs_dir,
+        # Tool execution and confirmations
+        t_cfg = self.config.get("tools", {})
+        tc_cfg = t_cfg.get("confirmations", {})
+        self.confirmations = ConfirmationBroker(default_timeout=tc_cfg.get("timeout_seconds", 30))
+        self.console_confirmations = ConsoleConfirmations(self.confirmations) if tc_cfg.get("console", True) else None
+        self.socket_confirmations = SocketConfirmations(
+            self.confirmations,
+            port=tc_cfg.get("socket_port", 8765),
+        ) if tc_cfg.get("socket_enabled", False) else None
+        self.tool_executor = ToolExecutor(
+            broker=self.confirmations,
+            pool_size=t_cfg.get("pool_size", 4),
+            default_timeout=t_cfg.get("default_timeout_seconds", 20),
+            timeouts_by_tool=t_cfg.get("timeouts_by_tool", {}),
         )
 
-        # Audio
-        a_cfg = self.config.get("audio", {})
-        self.audio_sentinel = AudioSentinel(
-            wake_word=a_cfg.get("wake_word", "malcolm"),
-            stt_language=self.config.get("stt", {}).get("language", "en-GB"),
-            on_command=self.handle_voice_command,
+        # Security events
+        e_cfg = self.config.get("security", {}).get("event_pipeline", {})
+        self.security_events = EventPipeline(
+            handler=self.handle_security_event,
+            suppression_seconds=e_cfg.get("suppression_seconds", 300),
+            suppression_by_type=e_cfg.get("suppression_by_type", {}),
+            coalesce_seconds=e_cfg.get("coalesce_seconds", 2.0),
+            summary_threshold=e_cfg.get("summary_threshold", 2),
+            max_queue=e_cfg.get("max_queue", 100),
         )
 
-        # Security Watchdog
+        # Headless command server
+        self.command_server: Optional[CommandServer] = None
+        if headless:
+            # Imported here: it pulls in asyncio, which a voice-only run never needs.
+            from .command_server import CommandServer
+
+            srv_cfg = self.config.get("server", {})
+            self.command_server = CommandServer(
+                decide=self.decide_command,
+                tool_executor=self.tool_executor,
+                broker=self.confirmations,
+                host=srv_cfg.get("host", "127.0.0.1"),
+                port=srv_cfg.get("port", 8770),
+                # One Omni call per worker; more workers than pooled
+                # connections would only open throwaway connections.
+                omni_workers=srv_cfg.get("omni_workers", self.config.get("malcolm_api", {}).get("pool_size", 4)),
+                max_inflight=srv_cfg.get("max_inflight", 64),
+                max_sessions=srv_cfg.get("max_sessions", 1000),
+                session_idle_seconds=srv_cfg.get("session_idle_seconds", 900),
+                tool_wait_seconds=srv_cfg.get("tool_wait_seconds", 5.0),
+                on_confirmed=self._record_confirmation,
+                # Without a configured token a fresh one is written here on every start.
+                token=srv_cfg.get("token"),
+                token_file=self.root_dir / srv_cfg.get("token_file", "logs/command_server.token"),
+            )
+
+        self._quiet_mode = self.config.get("audio", {}).get("quiet_mode", False)
+        logger.info("MalcolmGuardian initialised (quiet_mode=%s).", self._quiet_mode)
+
+    # --- Subsystem start-up (each runs on its own thread) ---
+
+    def _init_tts(self) -> None:
+        tts = self._build_tts(self.config.get("tts", {}))
+        tts.backend.warm_up()
+        self.tts = tts
+
+    def _init_malcolm(self) -> None:
+        self.malcolm = self._build_malcolm(self.config.get("malcolm_api", {}))
+        self.malcolm.warm_up()
+
+    def _init_watchdog(self) -> None:
         s_cfg = self.config.get("security", {})
+        sampler = ProcessSampler(
+            interval_seconds=s_cfg.get("sample_interval_seconds", 2.0),
+        )
+        set_process_sampler(sampler)
+        tm_cfg = self.config.get("telemetry", {})
+        if tm_cfg.get("enabled", True):
+            self.telemetry = TelemetryStore(max_bytes=int(tm_cfg.get("max_mb", 16) * 1_000_000))
+            sampler.subscribe(self.telemetry.ingest_snapshot)
+            set_telemetry_store(self.telemetry)
+        if recorder.enabled:
+            sampler.subscribe(recorder.record_snapshot)
         self.security_watchdog = SecurityWatchdog(
             interval_seconds=s_cfg.get("process_scan_interval_seconds", 15),
             suspicious_cpu_threshold=s_cfg.get("suspicious_cpu_threshold", 75.0),
             suspicious_names=s_cfg.get("suspicious_names", []),
-            on_event=self.handle_security_event,
+            on_event=self.security_events.submit,
+            sampler=sampler,
+            detection_mode=s_cfg.get("detection_mode", "threshold"),
+            # Built when a mode needs it, so a reload to "anomaly" or "both" works too.
+            detector_factory=lambda: self._build_anomaly_detector(s_cfg.get("anomaly", {})),
         )
+        self.process_sampler = sampler
+        sampler.start()
+        self.security_watchdog.start()
+        if sampler.wait_for_snapshot(timeout=self.ready_timeout) is None:
+            raise RuntimeError(f"no process snapshot after {self.ready_timeout}s")
 
-        self._quiet_mode = a_cfg.get("quiet_mode", False)
-        logger.info("MalcolmGuardian initialised (quiet_mode=%s).", self._quiet_mode)
+    def _init_audio(self) -> None:
+        a_cfg = self.config.get("audio", {})
+        stt_cfg = self.config.get("stt", {})
+        self.audio_sentinel = AudioSentinel(
+            wake_word=a_cfg.get("wake_word", "malcolm"),
+            stt_language=stt_cfg.get("language", "en-GB"),
+            stt=STTEngine(
+                language=stt_cfg.get("language", "en-GB"),
+                backend=stt_cfg.get("backend", "google"),
+                fallback=stt_cfg.get("fallback_backend"),
+                batch_workers=stt_cfg.get("batch_workers", 4),
+                model_dir=str(self.root_dir / stt_cfg["model_dir"]) if stt_cfg.get("model_dir") else None,
+            ),
+            on_command=self.handle_voice_command,
+            gate_factory=self._build_wake_gate if a_cfg.get("wake_gate", {}).get("enabled", True) else None,
+            stt_workers=a_cfg.get("pipeline", {}).get("stt_workers", 2),
+            ring_size=a_cfg.get("pipeline", {}).get("ring_size", 8),
+            command_queue=a_cfg.get("pipeline", {}).get("command_queue", 16),
+        )
+        self.audio_sentinel.start()
+        # Ready once the microphone has been calibrated for ambient noise.
+        if not self.audio_sentinel.wait_ready(self.ready_timeout):
+            raise RuntimeError(f"microphone not listening after {self.ready_timeout}s")
+
+    def _apply_config(self, old: ConfigSnapshot, new: ConfigSnapshot) -> None:
+        """
+        Called on the watcher thread with each new validated snapshot.
+        Every subsystem swaps in its compiled settings with one attribute
+        assignment; nothing on their hot paths takes a lock for it.
+        """
+        self.config = new.raw
+        self.policy.reconfigure(new.policy)
+        if self.security_watchdog:
+            self.security_watchdog.reconfigure(new.watchdog)
+        if self.tts:
+            self.tts.reconfigure(new.tts)
+        if self.malcolm:
+            self.malcolm.reconfigure(new.malcolm)
+        self.security_note_ttl = new.raw.get("tts", {}).get("security_note_ttl_seconds", 60)
+        self.config_watcher.interval_seconds = new.raw.get("config_reload", {}).get("interval_seconds", 2.0)
+        pending = restart_required(old.raw, new.raw)
+        if pending:
+            logger.warning("Config version %d changes %s; restart to apply them.", new.version, ", ".join(pending))
+
+    def _on_subsystem_ready(self, name: str) -> None:
+        if name == "tts" and not self._quiet_mode:
+            self.tts.speak("Malcolm Guardian is now active.", priority=Priority.CONFIRMATION)
+
+    # --- Builders ---
+
+    def _build_malcolm(self, m_cfg: Dict[str, Any]) -> MalcolmClient:
+        c_cfg = m_cfg.get("cache", {})
+        response_cache = ResponseCache(
+            default_ttl=c_cfg.get("default_ttl_seconds", 30),
+            ttl_by_command=c_cfg.get("ttl_by_command", {}),
+            max_entries=c_cfg.get("max_entries", 256),
+            max_bytes=c_cfg.get("max_bytes", 1_000_000),
+            no_cache_commands=c_cfg.get("no_cache_commands", DEFAULT_NO_CACHE_COMMANDS),
+            uncacheable_tools=c_cfg.get("uncacheable_tools", DEFAULT_UNCACHEABLE_TOOLS),
+            context_keys=c_cfg.get("context_keys", DEFAULT_CONTEXT_KEYS),
+        ) if c_cfg.get("enabled", True) else None
+        r_cfg = m_cfg.get("response", {})
+        response_limits = JsonLimits(
+            max_body_bytes=int(r_cfg.get("max_body_mb", 2) * 1_000_000),
+            max_field_bytes=r_cfg.get("max_field_bytes", 64_000),
+            max_depth=r_cfg.get("max_depth", 64),
+            max_list_items=r_cfg.get("max_list_items", 32),
+            fast_path_bytes=r_cfg.get("fast_path_bytes", 256_000),
+        )
+        return MalcolmClient(
+            base_url=m_cfg.get("base_url", ""),
+            api_key=m_cfg.get("api_key", ""),
+            enabled=m_cfg.get("enabled", False),
+            timeout_seconds=m_cfg.get("timeout_seconds", 15),
+            connect_timeout_seconds=m_cfg.get("connect_timeout_seconds", 3.05),
+            max_retries=m_cfg.get("max_retries", 2),
+            backoff_base_seconds=m_cfg.get("backoff_base_seconds", 0.25),
+            backoff_max_seconds=m_cfg.get("backoff_max_seconds", 2.0),
+            pool_size=m_cfg.get("pool_size", 4),
+            breaker=CircuitBreaker(
+                failure_threshold=m_cfg.get("breaker_failure_threshold", 3),
+                reset_timeout=m_cfg.get("breaker_reset_seconds", 30),
+            ),
+            streaming=m_cfg.get("streaming", False),
+            cache=response_cache,
+            response_limits=response_limits,
+        )
+
+    def _build_tts(self, tts_cfg: Dict[str, Any]) -> TTSVoice:
+        rate = tts_cfg.get("rate", 180)
+        volume = tts_cfg.get("volume", 1.0)
+        voice_name = tts_cfg.get("voice_name")
+        backend = Pyttsx3Backend(
+            rate=rate,
+            volume=volume,
+            voice_name=voice_name,
+            hang_timeout_seconds=tts_cfg.get("hang_timeout_seconds", 10.0),
+            idle_probe_seconds=tts_cfg.get("idle_probe_seconds", 60.0),
+        )
+
+        pc_cfg = tts_cfg.get("phrase_cache", {})
+        sink = default_sink() if pc_cfg.get("enabled", True) else None
+        phrase_cache = None
+        if sink is not None:
+            phrase_cache = PhraseCache(
+                cache_dir=self.root_dir / pc_cfg.get("dir", "cache/tts"),
+                prefixes=pc_cfg.get("prefixes", ["Security note:"]),
+                render_after_uses=pc_cfg.get("render_after_uses", 3),
+                max_tracked_phrases=pc_cfg.get("max_tracked_phrases", 1000),
+            )
+
+        return TTSVoice(
+            rate=rate,
+            volume=volume,
+            voice_name=voice_name,
+            backend=backend,
+            phrase_cache=phrase_cache,
+            sink=sink,
+            prerender_phrases=pc_cfg.get("phrases", ["Malcolm Guardian is now active."]),
+            max_backlog=tts_cfg.get("max_backlog", 20),
+            drop_policy=tts_cfg.get("drop_policy", "drop_lowest"),
+        )
+
+    def _build_anomaly_detector(self, an_cfg: Dict[str, Any]) -> Optional[AnomalyDetector]:
+        try:
+            return AnomalyDetector(
+                alpha=an_cfg.get("baseline_alpha", 0.02),
+                fast_alpha=an_cfg.get("fast_alpha", 0.3),
+                slow_alpha=an_cfg.get("slow_alpha", 0.002),
+                z_threshold=an_cfg.get("z_threshold", 4.0),
+                warmup_scans=an_cfg.get("warmup_scans", 10),
+                creep_delta_cpu=an_cfg.get("creep_delta_cpu", 30.0),
+                min_std=an_cfg.get("min_std", {}),
+                min_value=an_cfg.get("min_value", {}),
+            )
+        except RuntimeError as e:
+            logger.warning("%s", e)
+            return None
+
+    def _build_wake_gate(self, stt) -> WakeWordGate:
+        a_cfg = self.config.get("audio", {})
+        g_cfg = a_cfg.get("wake_gate", {})
+        spotter = build_spotter(
+            g_cfg.get("spotter", "auto"),
+            recognizer=stt.recognizer,
+            keyword=a_cfg.get("wake_word", "malcolm").lower(),
+            templates_dir=self.root_dir / g_cfg.get("templates_dir", "config/wake_word"),
+            sphinx_sensitivity=g_cfg.get("sphinx_sensitivity", 1e-20),
+            template_threshold=g_cfg.get("template_threshold", 0.8),
+        )
+        logger.info("Wake gate spotter: %s", spotter.name if spotter else "VAD only")
+        return WakeWordGate(
+            spotter=spotter,
+            min_rms=g_cfg.get("min_rms", 300.0),
+            voiced_ratio=g_cfg.get("voiced_ratio", 2.5),
+            min_voiced_ms=g_cfg.get("min_voiced_ms", 200),
+        )
 
     # --- Event handlers ---
 
     def handle_voice_command(self, command: str) -> None:
         logger.info("Handling voice command: %s", command)
+        recorder.record("command", text=command, source="voice")
+        answer = parse_answer(command)
+        if answer is not None and self.confirmations.pending():
+            # "Malcolm, yes" / "Malcolm, deny 2" answers a pending confirmation.
+            allowed, ticket_id = answer
+            if self.confirmations.answer(allowed, ticket_id, source="voice") is None and self.tts:
+                self.tts.speak("I couldn't find that request.", priority=Priority.CONFIRMATION)
+            return
+
+        malcolm = self._malcolm_client()
+        if malcolm is None:
+            logger.warning("Malcolm client is not available; dropping command: %s", command)
+            return
+
         context = {
             "source": "voice",
             "quiet_mode": self._quiet_mode,
         }
-        response = self.malcolm.send_text_to_malcolm(command, context=context)
+        if self.tts and malcolm.streaming:
+            # Sentences are spoken as they arrive.
+            response = malcolm.stream_text_to_malcolm(command, context=context, on_sentence=self.tts.speak)
+        else:
+            response = malcolm.send_text_to_malcolm(command, context=context)
 
-        # Speak reply
-                # Speak reply (always, as long as TTS is enabled)
-        if self.tts and response.reply_text:
+        # Speak reply (always, as long as TTS is enabled)
+        if self.tts and response.reply_text and not response.streamed:
             self.tts.speak(response.reply_text)
 
 
-        # Handle tool calls
-        for tc in response.tool_calls:
-            decision = self.policy.evaluate_tool_call(tc)
-            if decision.requires_confirmation:
-                summary = f"Malcolm wants to execute '{decision.tool}'. Allow?"
-                logger.info(summary)
-                if self.tts and not self._quiet_mode:
-                    self.tts.speak(summary + " Please answer in the console with Y or N.")
-                allow = self._ask_console_confirmation(decision)
-                self.learning.record_preference(PreferenceEvent(tool=decision.tool, confirmed=allow))
-                if not allow:
-                    logger.info("User denied tool %s.", decision.tool)
-                    continue
-            result = execute_tool(decision.tool, decision.args)
-            logger.info("Tool result: %s", result)
-            self._maybe_update_local_state(decision.tool)
+        # Handle tool calls (asynchronously; results are spoken in order)
+        state = {"quiet_mode": self._quiet_mode}
+        decisions = [self.policy.evaluate_tool_call(tc, state) for tc in response.tool_calls]
+        if decisions:
+            self.tool_executor.run(
+                decisions,
+                on_outcome=self._handle_tool_outcome,
+                on_ticket=self._announce_confirmation,
+                on_confirmed=self._record_confirmation,
+            )
+
+    def decide_command(
+        self,
+        command: str,
+        context: Dict[str, Any],
+        state: Dict[str, Any],
+    ) -> Tuple[MalcolmResponse, List[ToolDecision]]:
+        """
+        The Omni and policy half of a command, without speech: used by the
+        headless command server, which runs the tools itself.
+        """
+        malcolm = self._malcolm_client()
+        if malcolm is None:
+            return MalcolmResponse("Malcolm is still starting up.", source="local"), []
+        response = malcolm.send_text_to_malcolm(command, context=context)
+        return response, [self.policy.evaluate_tool_call(tc, state) for tc in response.tool_calls]
+
+    def _malcolm_client(self) -> Optional[MalcolmClient]:
+        malcolm = self.malcolm
+        if malcolm is None:
+            # Arrived before the client was built; it is only moments away.
+            self.startup.wait("malcolm", timeout=self.ready_timeout)
+            malcolm = self.malcolm
+        return malcolm
 
     def handle_security_event(self, event: SecurityEvent) -> None:
         logger.info("Security event: %s", event.description)
+        recorder.record("security_event", event_type=event.event_type, description=event.description,
+                        severity=event.severity, data=event.data)
         if self._quiet_mode:
             return
         if self.tts:
-            self.tts.speak(f"Security note: {event.description}")
+            # A newer note replaces a queued one only if it is about the same
+            # process; notes about different processes are all spoken.
+            key = f"security:{event.event_type}"
+            if "pid" in event.data:
+                key += f":{event.data['pid']}:{event.data.get('create_time')}"
+            self.tts.speak(
+                f"Security note: {event.description}",
+                priority=Priority.SECURITY,
+                key=key,
+                ttl_seconds=self.security_note_ttl,
+            )
+
+    def _announce_confirmation(self, ticket: ConfirmationTicket) -> None:
+        logger.info("%s (ticket %s)", ticket.prompt, ticket.ticket_id)
+        if self.tts and not self._quiet_mode:
+            self.tts.speak(
+                ticket.prompt + " Say 'Malcolm, yes' or 'Malcolm, no', or answer in the console.",
+                priority=Priority.CONFIRMATION,
+            )
 
-    def _ask_console_confirmation(self, decision) -> bool:
-        while True:
-            ans = input(f"Allow Malcolm to execute '{decision.tool}' with args {decision.args}? [y/n]: ").strip().lower()
-            if ans in {"y", "yes"}:
-                return True
-            if ans in {"n", "no"}:
-                return False
+    def _record_confirmation(self, ticket: ConfirmationTicket) -> None:
+        if ticket.answered_by in ("timeout", "shutdown"):
+            return  # not a real preference
+        self.learning.record_preference(PreferenceEvent(tool=ticket.tool, confirmed=bool(ticket.allowed), args=ticket.args))
+
+    def _handle_tool_outcome(self, index: int, outcome: ToolOutcome) -> None:
+        logger.info("Tool result (%s, %s): %s", outcome.tool, outcome.status, outcome.message)
+        if outcome.status == "ok":
+            self._maybe_update_local_state(outcome.tool)
+        elif outcome.status == "denied":
+            logger.info("User denied tool %s.", outcome.tool)
+        if self.tts and outcome.status != "cancelled":
+            message = outcome.message if outcome.status != "denied" else f"I didn't run {outcome.tool}. {outcome.message}"
+            self.tts.speak(message, interrupt=False)
 
     def _maybe_update_local_state(self, tool: str) -> None:
         if tool == "enter_quiet_mode":
@@ -140,22 +497,71 @@ class MalcolmGuardian:
 
     def start(self) -> None:
         logger.info("Starting MalcolmGuardian subsystems.")
-        self.audio_sentinel.start()
-        self.security_watchdog.start()
-        if self.tts and not self._quiet_mode:
-            self.tts.speak("Malcolm Guardian is now active.")
+        if self.recording.get("enabled", False):
+            recorder.open(
+                self.root_dir / self.recording.get("dir", "logs/recordings"),
+                config=self.config,
+                snapshots=self.recording.get("snapshots", True),
+                keyframe_every=self.recording.get("keyframe_every", 30),
+                max_mb=self.recording.get("max_mb", 512),
+                max_queue=self.recording.get("queue_size", 10_000),
+            )
+        if self.metrics_server:
+            self.metrics_server.start()
+        if self.console_confirmations:
+            self.console_confirmations.start()
+        if self.socket_confirmations:
+            self.socket_confirmations.start()
+        self.security_events.start()
+        if self._config_reload:
+            self.config_watcher.start()
+        # The slow parts come up concurrently; "now active" is spoken as soon
+        # as TTS is ready (see _on_subsystem_ready).
+        if self.config.get("tts", {}).get("enabled", True) and not self.headless:
+            self.startup.add("tts", self._init_tts)
+        self.startup.add("malcolm", self._init_malcolm)
+        self.startup.add("watchdog", self._init_watchdog)
+        if not self.headless:
+            self.startup.add("audio", self._init_audio)
+        self.startup.start()
+        if self.command_server:
+            self.command_server.start()
 
     def stop(self) -> None:
         logger.info("Stopping MalcolmGuardian.")
-        self.audio_sentinel.stop()
-        self.security_watchdog.stop()
+        self.config_watcher.stop()
+        if self.command_server:
+            self.command_server.stop()
+        if self.audio_sentinel:
+            self.audio_sentinel.stop()
+        if self.security_watchdog:
+            self.security_watchdog.stop()
+        if self.process_sampler:
+            self.process_sampler.stop()
+        self.security_events.stop()
+        self.tool_executor.shutdown()
+        self.confirmations.deny_all()
+        if self.socket_confirmations:
+            self.socket_confirmations.stop()
+        if self.malcolm:
+            self.malcolm.close()
+        self.learning.close()
+        if self.metrics_server:
+            self.metrics_server.stop()
         if self.tts:
             self.tts.shutdown()
+        recorder.close()
+        stop_logging(self._log_listener)
 
-def run_guardian() -> None:
+def run_guardian(profile_startup: bool = False, headless: bool = False) -> None:
     root_dir = Path(__file__).resolve().parents[2]
-    guardian = MalcolmGuardian(root_dir=root_dir)
+    started = time.perf_counter()
+    guardian = MalcolmGuardian(root_dir=root_dir, profile_startup=profile_startup, headless=headless)
+    constructed = time.perf_counter() - started
     guardian.start()
+    if guardian.profile_startup:
+        guardian.startup.wait_all(timeout=guardian.ready_timeout)
+        print("\n".join(startup_report(guardian.startup, phases={"MalcolmGuardian()": constructed})))
     try:
         # Keep main thread alive
         threading.Event().wait()
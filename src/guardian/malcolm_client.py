@@ -1,18 +1,72 @@
 from __future__ import annotations
 
-import json
 import logging
-from typing import Any, Dict, List, Optional
-
-import requests
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .circuit_breaker import CircuitBreaker
+from .instrumentation import metrics
+from .json_stream import READ_CHUNK_BYTES, JsonLimits, describe_payload, parse_reply
+from .recorder import recorder, tee
+from .response_cache import ResponseCache
+from .streaming import DELTA_KEYS, SentenceSplitter, chunk_text, iter_stream_events, stream_format
+from .utils.lazy_imports import lazy_import
+
+requests = lazy_import("requests")
+urllib3 = lazy_import("urllib3")
 
 logger = logging.getLogger(__name__)
 
+# Statuses where the backend tells us the command was not processed, so
+# sending it again is safe: 429 always, 503 only with a Retry-After. A
+# 502/504 (or a connection dropped after the request went out) may come
+# after the command already ran, so those are never resent.
+RETRYABLE_STATUSES = frozenset({429, 503})
+
+
+@dataclass(frozen=True)
+class ClientSettings:
+    """
+    The reloadable part of MalcolmClient's configuration. The client
+    holds one instance and replaces it whole, so a request reads it once
+    and never sees half of an update.
+    """
+
+    base_url: str
+    api_key: str = ""
+    enabled: bool = False
+    timeout_seconds: float = 15
+    connect_timeout_seconds: float = 3.05
+    max_retries: int = 2
+    backoff_base_seconds: float = 0.25
+    backoff_max_seconds: float = 2.0
+    streaming: bool = False
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "base_url", (self.base_url or "").rstrip("/"))
+        object.__setattr__(self, "api_key", self.api_key or "")
+        object.__setattr__(self, "max_retries", max(0, self.max_retries))
+
 
 class MalcolmResponse:
-    def __init__(self, reply_text: str, tool_calls: Optional[List[Dict[str, Any]]] = None) -> None:
+    def __init__(
+        self,
+        reply_text: str,
+        tool_calls: Optional[List[Dict[str, Any]]] = None,
+        streamed: bool = False,
+        source: str = "live",
+    ) -> None:
         self.reply_text = reply_text
         self.tool_calls: List[Dict[str, Any]] = tool_calls or []
+        # True when reply_text has already been delivered sentence by
+        # sentence through a streaming callback.
+        self.streamed = streamed
+        # "live" (Omni API), "offline" (local stub) or "local" (API disabled
+        # or misconfigured). Only live replies are cached.
+        self.source = source
 
 
 class MalcolmClient:
@@ -71,14 +125,109 @@ class MalcolmClient:
         reply_text="Malcolm says: <natural language summary>",
         tool_calls=[{"tool": "...", "args": {...}}, ...]
       )
+
+    Transport:
+    ----------
+    - One keep-alive requests.Session (connection pool) per client.
+    - Separate connect / read timeouts.
+    - Only failures where the command cannot have run are retried, up
+      to `max_retries` times with full-jitter exponential backoff: a
+      connection that was never made, 429, and 503 with a Retry-After.
+    - A circuit breaker skips the network entirely after repeated
+      failures and answers from the offline stub until a half-open probe
+      succeeds.
+
+    Large replies:
+    --------------
+    Buffered replies are parsed incrementally under `response_limits`:
+    only the fields above are decoded, reading stops once nothing later
+    in the body could change the reply text or tool calls, and a reply
+    with no readable text is described in one sentence rather than read
+    out as JSON.
+
+    Streaming (optional):
+    ---------------------
+    With `streaming` enabled, stream_text_to_malcolm() asks for
+    text/event-stream or NDJSON and hands each complete sentence to a
+    callback as it arrives. Servers that ignore the Accept header and
+    answer with plain JSON go through the normal normalisation path.
     """
 
-    def __init__(self, base_url: str, api_key: str, enabled: bool = False, timeout_seconds: int = 15) -> None:
-        self.base_url = base_url.rstrip("/")
-        self.api_key = api_key or ""
-        self.enabled = enabled
-        self.timeout_seconds = timeout_seconds
-        logger.info("MalcolmClient initialised. Enabled=%s, Base URL=%s", self.enabled, self.base_url)
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        enabled: bool = False,
+        timeout_seconds: float = 15,
+        connect_timeout_seconds: float = 3.05,
+        max_retries: int = 2,
+        backoff_base_seconds: float = 0.25,
+        backoff_max_seconds: float = 2.0,
+        pool_size: int = 4,
+        breaker: Optional[CircuitBreaker] = None,
+        streaming: bool = False,
+        cache: Optional[ResponseCache] = None,
+        response_limits: Optional[JsonLimits] = None,
+    ) -> None:
+        self.settings = ClientSettings(
+            base_url=base_url,
+            api_key=api_key,
+            enabled=enabled,
+            timeout_seconds=timeout_seconds,
+            connect_timeout_seconds=connect_timeout_seconds,
+            max_retries=max_retries,
+            backoff_base_seconds=backoff_base_seconds,
+            backoff_max_seconds=backoff_max_seconds,
+            streaming=streaming,
+        )
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache
+        self.response_limits = response_limits or JsonLimits()
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        logger.info("MalcolmClient initialised. Enabled=%s, Base URL=%s", enabled, self.settings.base_url)
+
+    @property
+    def streaming(self) -> bool:
+        return self.settings.streaming
+
+    def reconfigure(self, settings: ClientSettings) -> None:
+        """
+        Swap in new connection settings. Requests already under way finish
+        with the settings they started with. Cached replies are dropped if
+        the endpoint or credentials changed. The pool size and the cache
+        are fixed for the client's lifetime.
+        """
+        old = self.settings
+        self.settings = settings
+        if self.cache is not None and (old.base_url, old.api_key) != (settings.base_url, settings.api_key):
+            self.cache.clear()
+        logger.info("MalcolmClient reconfigured. Enabled=%s, Base URL=%s", settings.enabled, settings.base_url)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def warm_up(self) -> bool:
+        """
+        Open a pooled connection (TCP and TLS) to the Omni host ahead of
+        the first command. Any HTTP answer will do; failures are logged
+        and do not count against the circuit breaker.
+        """
+        s = self.settings
+        if not s.enabled or not s.base_url:
+            return False
+        try:
+            with self.session.head(s.base_url, timeout=(s.connect_timeout_seconds, s.connect_timeout_seconds)):
+                pass
+        except requests.RequestException as e:
+            logger.info("Could not pre-connect to Malcolm Omni API: %s", e)
+            return False
+        logger.info("Pre-connected to Malcolm Omni API.")
+        return True
 
     # ------------------------------------------------------------------ #
     # Public entrypoint used by the guardian
@@ -90,39 +239,179 @@ class MalcolmClient:
         """
         logger.info("Sending to Malcolm Omni API: %s", text)
 
+        if self.cache is not None:
+            return self.cache.get_or_compute(text, context, lambda: self._send_uncached(text, context))
+        return self._send_uncached(text, context)
+
+    def _send_uncached(self, text: str, context: Dict[str, Any]) -> MalcolmResponse:
+        early = self._precheck(text)
+        if early is not None:
+            return early
+
+        resp = None
+        posted = time.monotonic()
+        try:
+            resp = self._post_omni(text, context)
+            raw: Optional[List[bytes]] = [] if recorder.enabled else None
+            # Normal live path (even if status isn't 200, we turn it into a message)
+            response = self._normalise(self._decode_body(resp, raw))
+            if raw is not None:
+                self._record_reply(text, resp, posted, body=b"".join(raw).decode("utf-8", "replace"))
+            if not resp.ok:
+                response.source = "error"
+            return response
+
+        except Exception as e:
+            logger.exception("Error communicating with Malcolm Omni API: %s", e)
+            if resp is None:
+                recorder.record("omni", command=text, error=str(e))
+            # On unexpected communication errors, fall back to a local stub.
+            return self._offline_stub_response(text)
+
+    def stream_text_to_malcolm(
+        self,
+        text: str,
+        context: Dict[str, Any],
+        on_sentence: Callable[[str], None],
+    ) -> MalcolmResponse:
+        """
+        Streaming variant of send_text_to_malcolm().
+
+        Each complete sentence of the reply is passed to `on_sentence` as
+        soon as it has been received; the returned response has
+        streamed=True in that case and its reply_text should not be
+        spoken again. Tool calls are collected as they arrive and
+        returned at the end.
+        """
+        logger.info("Streaming to Malcolm Omni API: %s", text)
+
+        cache_key = self.cache.make_key(text, context) if self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Malcolm reply served from cache.")
+                return cached
+
+        early = self._precheck(text)
+        if early is not None:
+            return early
+
+        spoken: List[str] = []
+        resp = None
+        posted = time.monotonic()
+        try:
+            resp = self._post_omni(text, context, stream=True)
+            fmt = stream_format(resp.headers.get("Content-Type", "")) if resp.ok else None
+            if fmt is None:
+                # Error status or a server that does not stream.
+                raw: Optional[List[bytes]] = [] if recorder.enabled else None
+                response = self._normalise(self._decode_body(resp, raw))
+                if raw is not None:
+                    self._record_reply(text, resp, posted, body=b"".join(raw).decode("utf-8", "replace"))
+                if not resp.ok:
+                    response.source = "error"
+                elif cache_key is not None:
+                    self.cache.put(cache_key, response)
+                return response
+
+            splitter = SentenceSplitter()
+            tool_calls: List[Dict[str, Any]] = []
+            saw_delta = False
+
+            def emit(sentence: str) -> None:
+                if not spoken:
+                    metrics.observe("omni_first_sentence", time.monotonic() - posted, metrics.current())
+                    sentence = f"Malcolm says: {sentence}"
+                spoken.append(sentence)
+                on_sentence(sentence)
+
+            if resp.encoding is None:
+                resp.encoding = "utf-8"
+            captured: List[str] = []
+            with resp:
+                lines = resp.iter_lines(decode_unicode=True)
+                if recorder.enabled:
+                    lines = tee(lines, captured)
+                for chunk in iter_stream_events((line or "" for line in lines), fmt):
+                    piece = chunk_text(chunk, allow_full=not saw_delta)
+                    saw_delta = saw_delta or any(k in chunk for k in DELTA_KEYS)
+                    for sentence in splitter.feed(piece):
+                        emit(sentence)
+                    tool_calls.extend(self._extract_tool_calls(chunk))
+                    for key in ("tool_call", "action"):
+                        single = chunk.get(key)
+                        if isinstance(single, dict):
+                            tool_calls.extend(self._extract_tool_calls({"tool_calls": [single]}))
+            rest = splitter.flush()
+            if rest:
+                emit(rest)
+            if recorder.enabled:
+                self._record_reply(text, resp, posted, lines=captured)
+
+            if not spoken:
+                return MalcolmResponse(reply_text="Malcolm has no reply text for this command.", tool_calls=tool_calls)
+            logger.info("Malcolm streamed reply: %s", " ".join(spoken))
+            logger.info("Malcolm tool_calls: %s", tool_calls)
+            response = MalcolmResponse(reply_text=" ".join(spoken), tool_calls=tool_calls, streamed=True)
+            if cache_key is not None:
+                self.cache.put(cache_key, response)
+            return response
+
+        except Exception as e:
+            logger.exception("Error streaming from Malcolm Omni API: %s", e)
+            if resp is None:
+                recorder.record("omni", command=text, error=str(e))
+            if spoken:
+                # Part of the answer was already spoken; don't start over.
+                return MalcolmResponse(reply_text=" ".join(spoken), tool_calls=[], streamed=True, source="partial")
+            return self._offline_stub_response(text)
+
+    def _precheck(self, text: str) -> Optional[MalcolmResponse]:
+        """
+        Answers that don't need the network: API disabled, misconfigured,
+        or circuit open.
+        """
+        settings = self.settings
         # If disabled in config, behave like a pure local stub.
-        if not self.enabled:
+        if not settings.enabled:
             reply = f"You said: '{text}'. Malcolm API is currently disabled in config."
-            return MalcolmResponse(reply_text=reply, tool_calls=[])
+            return MalcolmResponse(reply_text=reply, tool_calls=[], source="local")
 
-        if not self.base_url:
+        if not settings.base_url:
             logger.error("MalcolmClient is enabled but base_url is empty.")
             return MalcolmResponse(
                 reply_text="Malcolm API base_url is not configured. Please check config.yaml.",
                 tool_calls=[],
+                source="local",
             )
 
-        try:
-            data = self._call_omni_command(text, context)
+        if not self.breaker.allow_request():
+            logger.info("Malcolm API circuit is open; answering locally.")
+            return self._offline_stub_response(text)
+        return None
 
-            # Normal live path (even if status isn't 200, we turn it into a message)
-            reply_text_raw = self._extract_reply_text(data)
-            tool_calls = self._extract_tool_calls(data)
+    def _normalise(self, data: Dict[str, Any]) -> MalcolmResponse:
+        reply_text_raw = self._extract_reply_text(data)
+        tool_calls = self._extract_tool_calls(data)
 
-            # Make it obvious in speech that this is Malcolm talking
-            if reply_text_raw:
-                spoken_reply = f"Malcolm says: {reply_text_raw}"
-            else:
-                spoken_reply = "Malcolm has no reply text for this command."
+        # Make it obvious in speech that this is Malcolm talking
+        if reply_text_raw:
+            spoken_reply = f"Malcolm says: {reply_text_raw}"
+        else:
+            spoken_reply = "Malcolm has no reply text for this command."
 
-            logger.info("Malcolm reply: %s", reply_text_raw)
-            logger.info("Malcolm tool_calls: %s", tool_calls)
-            return MalcolmResponse(reply_text=spoken_reply, tool_calls=tool_calls)
+        logger.info("Malcolm reply: %s", reply_text_raw)
+        logger.info("Malcolm tool_calls: %s", tool_calls)
+        return MalcolmResponse(reply_text=spoken_reply, tool_calls=tool_calls)
 
-        except Exception as e:
-            logger.exception("Error communicating with Malcolm Omni API: %s", e)
-            # On unexpected communication errors, fall back to a local stub.
-            return self._offline_stub_response(text)
+    @staticmethod
+    def _record_reply(text: str, resp: requests.Response, posted: float, **body: Any) -> None:
+        """
+        The raw reply, as benchmarks/replay.py will serve it back: a
+        buffered `body` or the streamed `lines`.
+        """
+        recorder.record("omni", command=text, status=resp.status_code, content_type=resp.headers.get("Content-Type", ""),
+                        seconds=round(time.monotonic() - posted, 6), **body)
 
     # ------------------------------------------------------------------ #
     # Local stub fallback (used when live Malcolm is unreachable)
@@ -148,12 +437,12 @@ class MalcolmClient:
             tool_calls.append({"tool": "describe_top_processes", "args": {"limit": 5}})
             reply += " Let me check your top processes now."
 
-        return MalcolmResponse(reply_text=reply, tool_calls=tool_calls)
+        return MalcolmResponse(reply_text=reply, tool_calls=tool_calls, source="offline")
 
     # ------------------------------------------------------------------ #
     # HTTP helper
     # ------------------------------------------------------------------ #
-    def _auth_headers(self) -> Dict[str, str]:
+    def _auth_headers(self, settings: Optional[ClientSettings] = None) -> Dict[str, str]:
         """
         Build Authorization header.
 
@@ -161,60 +450,153 @@ class MalcolmClient:
         If your backend expects a JWT from /login instead,
         that token should be placed in api_key.
         """
+        api_key = (settings or self.settings).api_key
         headers: Dict[str, str] = {}
-        if self.api_key:
-            headers["Authorization"] = f"Bearer {self.api_key}"
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
         return headers
 
-    def _call_omni_command(self, text: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _post_omni(self, text: str, context: Dict[str, Any], stream: bool = False) -> requests.Response:
         """
-        POST {base_url}/omni/command with JSON payload.
-
-        If the HTTP status is not 2xx, we return a diagnostic JSON so
-        the guardian can speak a clear error instead of a cryptic body.
+        POST {base_url}/omni/command with JSON payload and record the
+        outcome on the circuit breaker.
         """
-        url = f"{self.base_url}/omni/command"
-        payload: Dict[str, Any] = {
-            "command": text,
-            "context": context or {},
-        }
-
-        headers: Dict[str, str] = {
-            "Content-Type": "application/json",
-            **self._auth_headers(),
-        }
-
-        logger.debug("POST %s payload=%s headers=%s", url, payload, headers)
-        resp = requests.post(
-            url,
-            json=payload,
-            headers=headers,
-            timeout=self.timeout_seconds,
-        )
-        logger.info("Malcolm API POST status: %s", resp.status_code)
+        resp = None
+        try:
+            # One read of the settings per request, so a reload can't mix two configs.
+            settings = self.settings
+            url = f"{settings.base_url}/omni/command"
+            payload: Dict[str, Any] = {
+                "command": text,
+                "context": context or {},
+            }
 
-        # If status is not 2xx, turn this into a clear error message
-        if not resp.ok:
-            body_snippet = resp.text.strip()
-            if len(body_snippet) > 200:
-                body_snippet = body_snippet[:200] + "…"
-            return {
-                "message": (
-                    f"Malcolm API error {resp.status_code} when calling /omni/command. "
-                    f"Response was: {body_snippet or 'no body'}."
-                ),
-                "actions": [],
+            headers: Dict[str, str] = {
+                "Content-Type": "application/json",
+                **self._auth_headers(settings),
             }
+            if stream:
+                headers["Accept"] = "text/event-stream, application/x-ndjson;q=0.9, application/json;q=0.5"
+
+            logger.debug("POST %s payload=%s headers=%s", url, payload, headers)
+            # Always streamed: _decode_body reads buffered replies incrementally.
+            with metrics.stage("omni_post"):
+                resp = self._post_with_retries(url, payload, headers, stream=True, settings=settings)
+        finally:
+            # Every outcome settles the breaker, exceptions of any kind
+            # included: a half-open probe left unsettled keeps it shut.
+            if resp is not None and resp.status_code < 500:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        logger.info("Malcolm API POST status: %s", resp.status_code)
+        return resp
 
-        # Normal JSON / text handling
+    def _decode_body(self, resp: requests.Response, raw: Optional[List[bytes]] = None) -> Dict[str, Any]:
+        """
+        Read a buffered (non-streamed) response into the fields
+        _normalise() uses. The body is parsed incrementally (see
+        json_stream.parse_reply), so a huge or deeply nested reply costs
+        at most `max_body_bytes` of reading and only the wanted fields
+        are kept. If the HTTP status is not 2xx, we return a diagnostic
+        JSON so the guardian can speak a clear error instead of a
+        cryptic body. Bytes read are appended to `raw` if given.
+        """
+        limits = self.response_limits
         try:
-            data = resp.json()
-            logger.debug("Raw Malcolm JSON: %s", data)
-            return data
-        except ValueError:
-            text_body = resp.text
-            logger.warning("Malcolm responded with non-JSON body: %s", text_body[:500])
-            return {"message": text_body}
+            chunks = resp.iter_content(chunk_size=READ_CHUNK_BYTES)
+            if raw is not None:
+                chunks = tee(chunks, raw)
+            # If status is not 2xx, turn this into a clear error message
+            if not resp.ok:
+                head = b""
+                for chunk in chunks:
+                    head += chunk
+                    if len(head) >= 1024:
+                        break
+                body_snippet = head.decode("utf-8", "replace").strip()
+                if len(body_snippet) > 200:
+                    body_snippet = body_snippet[:200] + "…"
+                return {
+                    "message": (
+                        f"Malcolm API error {resp.status_code} when calling /omni/command. "
+                        f"Response was: {body_snippet or 'no body'}."
+                    ),
+                    "actions": [],
+                }
+
+            length = resp.headers.get("Content-Length", "")
+            parsed = parse_reply(chunks, limits, content_length=int(length) if length.isdigit() else None)
+        finally:
+            # Releases the connection, or drops it if the body was not read to the end.
+            resp.close()
+
+        if parsed.status == "text":
+            logger.warning("Malcolm responded with non-JSON body: %s", parsed.data["message"])
+        elif parsed.status == "truncated":
+            logger.warning("Malcolm reply was cut off after %d characters (limit %d bytes).", parsed.size, limits.max_body_bytes)
+        logger.debug("Malcolm reply: %d characters, %s, keys %s (%d characters skipped).",
+                     parsed.size, parsed.status, list(parsed.data)[:20], parsed.skipped_chars)
+        return parsed.data
+
+    def _post_with_retries(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        stream: bool = False,
+        settings: Optional[ClientSettings] = None,
+    ) -> requests.Response:
+        """
+        POST through the pooled session, retrying only failures where the
+        command cannot have been processed: the connection was never made
+        (refused, unresolvable, connect timeout), or the backend answered
+        429, or 503 with a Retry-After. A dropped connection after the
+        request went out, a read timeout or a 502/504 is not retried,
+        since the command may already have run. A Retry-After longer than
+        `backoff_max_seconds` is not waited for.
+        """
+        s = settings or self.settings
+        attempt = 0
+        while True:
+            try:
+                resp = self.session.post(
+                    url,
+                    json=payload,
+                    headers=headers,
+                    timeout=(s.connect_timeout_seconds, s.timeout_seconds),
+                    stream=stream,
+                )
+            except requests.ConnectionError as e:
+                if attempt >= s.max_retries or not _never_sent(e):
+                    raise
+                logger.warning("Malcolm API connection failed (attempt %d): %s", attempt + 1, e)
+                delay = self._backoff_delay(attempt, s)
+            else:
+                delay = self._retry_delay(resp, attempt, s)
+                if delay is None or attempt >= s.max_retries:
+                    return resp
+                logger.warning("Malcolm API returned %s (attempt %d); retrying.", resp.status_code, attempt + 1)
+                resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, resp: requests.Response, attempt: int, settings: ClientSettings) -> Optional[float]:
+        """
+        Seconds to wait before sending again after `resp`, or None if it
+        must not be resent.
+        """
+        if resp.status_code not in RETRYABLE_STATUSES:
+            return None
+        after = _retry_after(resp)
+        if after is None:
+            return self._backoff_delay(attempt, settings) if resp.status_code == 429 else None
+        return after if after <= settings.backoff_max_seconds else None
+
+    def _backoff_delay(self, attempt: int, settings: Optional[ClientSettings] = None) -> float:
+        s = settings or self.settings
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)].
+        return random.uniform(0, min(s.backoff_max_seconds, s.backoff_base_seconds * (2 ** attempt)))
 
     # ------------------------------------------------------------------ #
     # Normalisation helpers
@@ -230,7 +612,7 @@ class MalcolmClient:
         3. special acknowledgement shapes like {"received_command": "...", "status": "..."}
         4. error / status-only responses
         5. data["response"] (string)
-        6. JSON-dumped fallback (for debugging)
+        6. a short description of the fields (see json_stream.describe_payload)
         """
         # 1. Top-level preferred keys (most conversational)
         for key in ("message", "reply_text", "reply"):
@@ -266,11 +648,8 @@ class MalcolmClient:
         if isinstance(resp, str) and resp.strip():
             return resp.strip()
 
-        # 6. Fallback: JSON dump (for debugging, still speakable)
-        try:
-            return json.dumps(data, indent=2)
-        except Exception:
-            return str(data)
+        # 6. Fallback: a short description of what was sent, never the JSON itself
+        return describe_payload(data)
 
     @staticmethod
     def _extract_tool_calls(data: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -325,3 +704,27 @@ class MalcolmClient:
                 tool_calls.append({"tool": tool, "args": args})
 
         return tool_calls
+
+
+def _never_sent(error: requests.ConnectionError) -> bool:
+    """
+    True if the request failed before any of it reached the server.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)  # urllib3's MaxRetryError wraps the cause
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After", "").strip()
+    if value.isdigit():
+        return float(value)
+    if not value:
+        return None
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
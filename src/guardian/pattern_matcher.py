@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PatternMatcher:
+    """
+    Case-insensitive substring matcher for many patterns at once.
+
+    The pattern list is compiled once into an Aho-Corasick automaton, so
+    matching one string costs O(len(text)) regardless of how many
+    patterns there are. When several patterns match, the one listed
+    first in the configuration wins, mirroring the old
+    "for pattern in suspicious_names" loop.
+
+    Results are memoised per distinct (name, exe) pair, so the hundreds of
+    identical processes on a typical host (svchost.exe, chrome.exe...)
+    are only matched once.
+    """
+
+    def __init__(self, patterns: Iterable[str], memo_size: int = 50_000) -> None:
+        self.patterns: List[str] = []
+        self.memo_size = memo_size
+
+        # Automaton: goto transitions, failure links and, per state, the
+        # lowest pattern index ending there (including via failure links).
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[int] = [-1]
+        self._memo: Dict[Tuple[str, str], Optional[str]] = {}
+
+        seen = set()
+        for pattern in patterns:
+            lowered = (pattern or "").lower()
+            # An empty pattern would flag every process; ignore it.
+            if not lowered or lowered in seen:
+                continue
+            seen.add(lowered)
+            self._add(lowered, len(self.patterns))
+            self.patterns.append(pattern)
+        self._build()
+        logger.info("PatternMatcher compiled %d patterns into %d states.", len(self.patterns), len(self._goto))
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def search(self, text: str) -> Optional[str]:
+        """
+        Return the highest-priority pattern contained in `text`
+        (which must already be lower-cased), or None.
+        """
+        index = self._search_index(text)
+        return self.patterns[index] if index >= 0 else None
+
+    def match_process(self, name_lower: str, exe_lower: str) -> Optional[str]:
+        """
+        Return the pattern matching either the process name or exe path.
+        """
+        key = (name_lower, exe_lower)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+
+        best = _min_index(self._search_index(name_lower), self._search_index(exe_lower))
+        result = self.patterns[best] if best >= 0 else None
+
+        if len(self._memo) >= self.memo_size:
+            self._memo.clear()
+        self._memo[key] = result
+        return result
+
+    # ------------------------------------------------------------------ #
+    # Automaton construction / search
+    # ------------------------------------------------------------------ #
+    def _add(self, pattern: str, index: int) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(-1)
+                self._goto[state][ch] = nxt
+            state = nxt
+        if self._out[state] < 0:
+            self._out[state] = index
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = _min_index(self._out[nxt], self._out[self._fail[nxt]])
+
+    def _search_index(self, text: str) -> int:
+        if not text or not self.patterns:
+            return -1
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        best = -1
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found = out[state]
+            if found >= 0 and (best < 0 or found < best):
+                best = found
+                if best == 0:
+                    break
+        return best
+
+
+def _min_index(a: int, b: int) -> int:
+    if a < 0:
+        return b
+    if b < 0:
+        return a
+    return a if a < b else b
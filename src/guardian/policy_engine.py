@@ -2,7 +2,12 @@ from __future__ import annotations
 
 import logging
 from dataclasses import dataclass
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, FrozenSet, List, Optional
+
+from .policy_rules import RuleSet
+
+if TYPE_CHECKING:
+    from .learning import PreferenceStore
 
 logger = logging.getLogger(__name__)
 
@@ -11,21 +16,92 @@ class ToolDecision:
     tool: str
     args: Dict[str, Any]
     requires_confirmation: bool
+    # True when confirmation was skipped because the operator has always approved this tool.
+    auto_promoted: bool = False
+    # True when a policy rule forbids the call outright; it is never run or offered for confirmation.
+    denied: bool = False
+    # Name of the policy rule that decided, if any.
+    rule: Optional[str] = None
+
+@dataclass(frozen=True)
+class PolicySettings:
+    """
+    The tool lists and compiled rules PolicyEngine decides with. The
+    engine holds one instance and replaces it whole on reload, so an
+    evaluation reads it once and never sees half of an update.
+    """
+
+    auto_allow: FrozenSet[str]
+    confirm_tools: FrozenSet[str]
+    rules: RuleSet
+    promote_after: int = 0
+    never_promote: FrozenSet[str] = frozenset()
 
 class PolicyEngine:
-    def __init__(self, auto_allow: List[str], confirm_tools: List[str]) -> None:
-        self.auto_allow = set(auto_allow)
-        self.confirm_tools = set(confirm_tools)
-        logger.info("PolicyEngine initialised. Auto=%s Confirm=%s", self.auto_allow, self.confirm_tools)
+    def __init__(
+        self,
+        auto_allow: List[str],
+        confirm_tools: List[str],
+        preferences: Optional["PreferenceStore"] = None,
+        promote_after: int = 0,
+        never_promote: Optional[List[str]] = None,
+        rules: Optional[List[Dict[str, Any]]] = None,
+        rule_mode: str = "first_match",
+        rule_cache_size: int = 4096,
+    ) -> None:
+        # Declarative rules from config.yaml are checked before the two tool
+        # lists. Tools the operator has approved `promote_after` times
+        # without a single denial stop asking for confirmation (0 disables
+        # this).
+        self.settings = PolicySettings(
+            auto_allow=frozenset(auto_allow),
+            confirm_tools=frozenset(confirm_tools),
+            rules=RuleSet(rules or [], mode=rule_mode, cache_size=rule_cache_size),
+            promote_after=promote_after,
+            never_promote=frozenset(never_promote or []),
+        )
+        self.preferences = preferences
+        logger.info("PolicyEngine initialised. Auto=%s Confirm=%s Rules=%d",
+                    set(auto_allow), set(confirm_tools), len(self.settings.rules))
+
+    def reconfigure(self, settings: PolicySettings) -> None:
+        """
+        Swap in new tool lists and rules. Calls being evaluated finish
+        with the old ones.
+        """
+        self.settings = settings
+        logger.info("PolicyEngine reconfigured. Auto=%s Confirm=%s Rules=%d",
+                    set(settings.auto_allow), set(settings.confirm_tools), len(settings.rules))
 
-    def evaluate_tool_call(self, tool_call: Dict[str, Any]) -> ToolDecision:
+    def evaluate_tool_call(self, tool_call: Dict[str, Any], state: Optional[Dict[str, Any]] = None) -> ToolDecision:
+        """
+        `state` is guardian state the rules can match on (e.g. quiet_mode).
+        """
         tool = tool_call.get("tool")
         args = tool_call.get("args", {})
         logger.info("Evaluating tool call: %s %s", tool, args)
-        if tool in self.auto_allow:
+        settings = self.settings
+        match = settings.rules.evaluate(tool, args, state) if len(settings.rules) and isinstance(tool, str) else None
+        if match is not None:
+            logger.info("Tool %s matched policy rule '%s' (%s).", tool, match.rule, match.action)
+            if match.action == "deny":
+                return ToolDecision(tool=tool, args=args, requires_confirmation=False, denied=True, rule=match.rule)
+            if match.action == "allow":
+                return ToolDecision(tool=tool, args=args, requires_confirmation=False, rule=match.rule)
+            return ToolDecision(tool=tool, args=args, requires_confirmation=True, rule=match.rule)
+        if tool in settings.auto_allow:
             return ToolDecision(tool=tool, args=args, requires_confirmation=False)
-        if tool in self.confirm_tools:
+        if self._promoted(tool, args, settings):
+            logger.info("Tool %s is always approved by the operator; skipping confirmation.", tool)
+            return ToolDecision(tool=tool, args=args, requires_confirmation=False, auto_promoted=True)
+        if tool in settings.confirm_tools:
             return ToolDecision(tool=tool, args=args, requires_confirmation=True)
         # Default: be conservative
         logger.info("Tool %s is unknown; requiring confirmation.", tool)
         return ToolDecision(tool=tool, args=args, requires_confirmation=True)
+
+    def _promoted(self, tool: str, args: Dict[str, Any], settings: Optional[PolicySettings] = None) -> bool:
+        s = settings or self.settings
+        if self.preferences is None or s.promote_after <= 0 or tool in s.never_promote:
+            return False
+        return self.preferences.always_approved(tool, args, min_approvals=s.promote_after)
@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import fnmatch
+import getpass
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .utils.lazy_imports import lazy_import
+
+psutil = lazy_import("psutil")
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("allow", "confirm", "deny")
+MODES = ("first_match", "priority")
+SOURCES = ("args", "state", "facts")
+
+_MISSING = object()
+
+Predicate = Callable[[Any], bool]
+
+
+class RuleError(ValueError):
+    """
+    A policy rule in config.yaml could not be compiled.
+    """
+
+
+# ---------------------------------------------------------------------- #
+# Facts: values derived from the arguments (looked up only when a rule needs them)
+# ---------------------------------------------------------------------- #
+SYSTEM_USERS = {"root", "system", "nt authority\\system", "local service", "nt authority\\local service",
+                "network service", "nt authority\\network service"}
+
+
+def _pid_owner(args: Dict[str, Any]) -> Optional[str]:
+    """
+    'self', 'system', 'other' or None for the owner of args['pid'].
+    """
+    try:
+        user = (psutil.Process(int(args["pid"])).username() or "").lower()
+    except (KeyError, TypeError, ValueError, psutil.Error):
+        return None
+    if user in SYSTEM_USERS:
+        return "system"
+    current = getpass.getuser().lower()
+    return "self" if user == current or user.endswith("\\" + current) else "other"
+
+
+def _pid_name(args: Dict[str, Any]) -> Optional[str]:
+    try:
+        return psutil.Process(int(args["pid"])).name().lower()
+    except (KeyError, TypeError, ValueError, psutil.Error):
+        return None
+
+
+FACTS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "pid_owner": _pid_owner,
+    "pid_name": _pid_name,
+}
+
+
+def register_fact(name: str, resolver: Callable[[Dict[str, Any]], Any]) -> None:
+    FACTS[name] = resolver
+
+
+# ---------------------------------------------------------------------- #
+# Compilation
+# ---------------------------------------------------------------------- #
+def _compile_condition(field: str, spec: Any) -> List[Predicate]:
+    """
+    A scalar means equality and a list means membership. A mapping
+    combines operators: eq, ne, in, not_in, min, max, lt, gt, regex and
+    present. Each operator becomes one predicate; every operator except
+    `present` fails on a missing value.
+    """
+    if isinstance(spec, list):
+        spec = {"in": spec}
+    elif not isinstance(spec, dict):
+        spec = {"eq": spec}
+
+    checks: List[Predicate] = []
+    for op, operand in spec.items():
+        if op == "eq":
+            checks.append(lambda v, o=operand: v == o)
+        elif op == "ne":
+            checks.append(lambda v, o=operand: v is not _MISSING and v != o)
+        elif op in ("in", "not_in"):
+            if not isinstance(operand, list):
+                raise RuleError(f"'{field}': '{op}' needs a list.")
+            try:
+                members = frozenset(operand)
+            except TypeError:
+                members = tuple(operand)
+            if op == "in":
+                checks.append(lambda v, m=members: v in m)
+            else:
+                checks.append(lambda v, m=members: v is not _MISSING and v not in m)
+        elif op in ("min", "max", "lt", "gt"):
+            if not isinstance(operand, (int, float)) or isinstance(operand, bool):
+                raise RuleError(f"'{field}': '{op}' needs a number.")
+            checks.append(_numeric_check(op, operand))
+        elif op == "regex":
+            try:
+                pattern = re.compile(str(operand))
+            except re.error as e:
+                raise RuleError(f"'{field}': bad regex {operand!r}: {e}") from None
+            checks.append(lambda v, p=pattern: v is not _MISSING and v is not None and p.search(str(v)) is not None)
+        elif op == "present":
+            checks.append(lambda v, want=bool(operand): (v is not _MISSING) == want)
+        else:
+            raise RuleError(f"'{field}': unknown operator '{op}'.")
+    return checks
+
+
+def _numeric_check(op: str, bound: float) -> Predicate:
+    def check(v: Any) -> bool:
+        n = _as_number(v)
+        if n is None:
+            return False
+        if op == "min":
+            return n >= bound
+        if op == "max":
+            return n <= bound
+        if op == "lt":
+            return n < bound
+        return n > bound
+
+    return check
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if value is _MISSING:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class CompiledRule:
+    name: str
+    order: int
+    priority: int
+    tools: Tuple[str, ...]
+    action: str
+    arg_checks: Tuple[Tuple[str, Predicate], ...]
+    state_checks: Tuple[Tuple[str, Predicate], ...]
+    fact_checks: Tuple[Tuple[str, Predicate], ...]
+
+    def matches_tool(self, tool: str) -> bool:
+        return any(t == tool or fnmatch.fnmatchcase(tool, t) for t in self.tools)
+
+    def matches(self, args: Dict[str, Any], state: Dict[str, Any], facts: "_Facts") -> bool:
+        for key, check in self.arg_checks:
+            if not check(args.get(key, _MISSING)):
+                return False
+        for key, check in self.state_checks:
+            if not check(state.get(key, _MISSING)):
+                return False
+        for key, check in self.fact_checks:
+            if not check(facts.get(key)):
+                return False
+        return True
+
+
+def compile_rule(raw: Dict[str, Any], order: int) -> CompiledRule:
+    if not isinstance(raw, dict):
+        raise RuleError(f"Rule #{order + 1} must be a mapping.")
+    name = str(raw.get("name") or f"rule{order + 1}")
+    action = raw.get("action")
+    if action not in ACTIONS:
+        raise RuleError(f"Rule '{name}': action must be one of {ACTIONS}, got {action!r}.")
+    tools = raw.get("tool", "*")
+    tools = tuple(str(t) for t in (tools if isinstance(tools, list) else [tools]))
+
+    sections = {}
+    for source in SOURCES:
+        conditions = raw.get(source) or {}
+        if not isinstance(conditions, dict):
+            raise RuleError(f"Rule '{name}': '{source}' must be a mapping.")
+        if source == "facts":
+            unknown = [f for f in conditions if f not in FACTS]
+            if unknown:
+                raise RuleError(f"Rule '{name}': unknown facts {unknown}; known: {sorted(FACTS)}.")
+        sections[source] = tuple(
+            (str(k), check) for k, v in conditions.items() for check in _compile_condition(f"{name}.{source}.{k}", v)
+        )
+
+    unknown_keys = set(raw) - {"name", "tool", "action", "priority", *SOURCES}
+    if unknown_keys:
+        raise RuleError(f"Rule '{name}': unknown keys {sorted(unknown_keys)}.")
+    return CompiledRule(
+        name=name,
+        order=order,
+        priority=int(raw.get("priority", 0)),
+        tools=tools,
+        action=action,
+        arg_checks=sections["args"],
+        state_checks=sections["state"],
+        fact_checks=sections["facts"],
+    )
+
+
+# ---------------------------------------------------------------------- #
+# Evaluation
+# ---------------------------------------------------------------------- #
+class _Facts:
+    """
+    Facts for one evaluation, each resolved at most once and only if a
+    candidate rule asks for it.
+    """
+
+    __slots__ = ("_args", "_values", "used")
+
+    def __init__(self, args: Dict[str, Any]) -> None:
+        self._args = args
+        self._values: Dict[str, Any] = {}
+        self.used = False
+
+    def get(self, name: str) -> Any:
+        self.used = True
+        if name not in self._values:
+            try:
+                value = FACTS[name](self._args)
+            except Exception as e:
+                logger.warning("Policy fact %s failed: %s", name, e)
+                value = None
+            self._values[name] = _MISSING if value is None else value
+        return self._values[name]
+
+
+class _ToolIndex:
+    """
+    The candidate rules for one tool name, in evaluation order, and its
+    decision cache. `key` is generated from the argument and state keys
+    those rules read, so unrelated arguments do not split the cache.
+    """
+
+    __slots__ = ("rules", "key", "cache")
+
+    def __init__(self, rules: Sequence[CompiledRule], cache: bool) -> None:
+        self.rules = tuple(rules)
+        arg_keys = sorted({k for r in rules for k, _ in r.arg_checks})
+        state_keys = sorted({k for r in rules for k, _ in r.state_checks})
+        parts = [f"a.get({k!r}, M)" for k in arg_keys] + [f"s.get({k!r}, M)" for k in state_keys]
+        self.key: Callable[[Dict[str, Any], Dict[str, Any]], Tuple] = eval(
+            f"lambda a, s: ({', '.join(parts)}{',' if parts else ''})", {"M": _MISSING},
+        )
+        self.cache: Optional[Dict[Tuple, Optional[RuleMatch]]] = {} if cache and self.rules else None
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    rule: str
+    action: str
+
+
+class RuleSet:
+    """
+    Declarative tool rules compiled for fast lookup.
+
+    Rules are grouped by tool name when the set is built. Exact names go
+    into a dict, and glob patterns ('*', 'describe_*') are resolved the
+    first time a tool name is seen. Evaluation only walks the rules that
+    can apply to the tool. In "first_match" mode rules run in config
+    order; in "priority" mode higher `priority` runs first, with config
+    order breaking ties. The first rule whose conditions all hold
+    decides.
+
+        policy:
+          rule_mode: first_match
+          rules:
+            - {name: quiet, tool: lock_workstation, state: {quiet_mode: true}, action: deny}
+            - {name: mine, tool: kill_process, facts: {pid_owner: self}, action: allow}
+            - {name: services, tool: kill_process, facts: {pid_owner: system}, action: confirm}
+            - {name: small-top, tool: describe_top_processes, args: {limit: {max: 50}}, action: allow}
+
+    Results are cached per tool, keyed by the argument and state values
+    its rules read; when a tool's cache is full the oldest entry goes.
+    Decisions that consulted facts (live process lookups such as
+    pid_owner) are never cached, since a pid can change hands.
+    """
+
+    def __init__(self, rules: Sequence[Dict[str, Any]], mode: str = "first_match", cache_size: int = 4096) -> None:
+        if mode not in MODES:
+            raise RuleError(f"rule_mode must be one of {MODES}, got {mode!r}.")
+        self.mode = mode
+        compiled = [compile_rule(raw, i) for i, raw in enumerate(rules)]
+        if mode == "priority":
+            compiled.sort(key=lambda r: (-r.priority, r.order))
+        self.rules: Tuple[CompiledRule, ...] = tuple(compiled)
+        self._exact: Dict[str, List[CompiledRule]] = {}
+        self._patterned: List[CompiledRule] = []
+        for rule in self.rules:
+            if any(_is_pattern(t) for t in rule.tools):
+                self._patterned.append(rule)
+            else:
+                for t in rule.tools:
+                    self._exact.setdefault(t, []).append(rule)
+        self._index: Dict[str, _ToolIndex] = {}
+        self._lock = threading.Lock()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def evaluate(self, tool: str, args: Dict[str, Any], state: Optional[Dict[str, Any]] = None) -> Optional[RuleMatch]:
+        index = self._index.get(tool)
+        if index is None:
+            index = self._index.setdefault(tool, self._build_index(tool))
+        if not index.rules:
+            return None
+        if state is None:
+            state = {}
+
+        cache = index.cache
+        key = None
+        if cache is not None:
+            try:
+                key = index.key(args, state)
+                match = cache.get(key, _MISSING)
+            except TypeError:  # unhashable argument value
+                key, match = None, _MISSING
+            if match is not _MISSING:
+                self.hits += 1
+                return match
+
+        self.misses += 1
+        facts = _Facts(args)
+        match = None
+        for rule in index.rules:
+            try:
+                matched = rule.matches(args, state, facts)
+            except TypeError:  # e.g. an unhashable value tested with in/not_in
+                matched = False
+            if matched:
+                match = RuleMatch(rule.name, rule.action)
+                break
+        if key is not None and not facts.used:
+            with self._lock:
+                if len(cache) >= self.cache_size:
+                    del cache[next(iter(cache))]
+                cache[key] = match
+        return match
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "rules": len(self.rules),
+            "tools_indexed": len(self._index),
+            "cached": sum(len(i.cache) for i in list(self._index.values()) if i.cache is not None),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _build_index(self, tool: str) -> _ToolIndex:
+        candidates = list(self._exact.get(tool, ()))
+        candidates += [r for r in self._patterned if r.matches_tool(tool)]
+        if self._patterned:
+            position = {id(r): i for i, r in enumerate(self.rules)}
+            candidates.sort(key=lambda r: position[id(r)])
+        return _ToolIndex(candidates, cache=self.cache_size > 0)
+
+
+def _is_pattern(name: str) -> bool:
+    return any(ch in name for ch in "*?[")
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .process_scanner import ProcessScanner, ScanDelta
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = ("cpu_percent", "memory_rss", "io_rate")
+
+
+@dataclass(frozen=True)
+class ProcessSample:
+    pid: int
+    create_time: float
+    name: str
+    exe: str
+    name_lower: str
+    exe_lower: str
+    cpu_percent: float
+    memory_rss: int
+    io_read_rate: float
+    io_write_rate: float
+    num_threads: int = 0
+
+    @property
+    def io_rate(self) -> float:
+        return self.io_read_rate + self.io_write_rate
+
+
+@dataclass(frozen=True)
+class ProcessSnapshot:
+    """
+    Immutable view of the process table at one sampler tick.
+
+    Orderings for the common top-N keys are built once by the sampler
+    thread, so top_n() is just a slice.
+    """
+
+    timestamp: float
+    processes: Tuple[ProcessSample, ...]
+    scan_ms: float = 0.0
+    tick: int = 0
+    _orders: Dict[str, Tuple[ProcessSample, ...]] = field(default_factory=dict, repr=False, compare=False)
+    _by_pid: Dict[int, ProcessSample] = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def build(cls, samples: List[ProcessSample], scan_ms: float, tick: int) -> "ProcessSnapshot":
+        orders = {key: tuple(sorted(samples, key=_sort_key(key), reverse=True)) for key in SORT_KEYS}
+        return cls(
+            timestamp=time.time(),
+            processes=tuple(samples),
+            scan_ms=scan_ms,
+            tick=tick,
+            _orders=orders,
+            _by_pid={s.pid: s for s in samples},
+        )
+
+    def top_n(self, n: int, key: str = "cpu_percent") -> Tuple[ProcessSample, ...]:
+        order = self._orders.get(key)
+        if order is None:
+            return tuple(sorted(self.processes, key=_sort_key(key), reverse=True)[:n])
+        return order[:n]
+
+    def get(self, pid: int) -> Optional[ProcessSample]:
+        return self._by_pid.get(pid)
+
+    def age(self) -> float:
+        return time.time() - self.timestamp
+
+    def __len__(self) -> int:
+        return len(self.processes)
+
+
+def _sort_key(key: str) -> Callable[[ProcessSample], float]:
+    return lambda s: getattr(s, key)
+
+
+class ProcessSampler:
+    """
+    One background walk of the process table, shared by every consumer.
+
+    Each `interval_seconds` the sampler runs an incremental ProcessScanner
+    pass (CPU, RSS, IO counters and thread counts) and publishes a new ProcessSnapshot by
+    swapping a single reference; readers call snapshot() and never touch
+    psutil or block on the sampler. Callbacks registered with subscribe()
+    run on the sampler thread after each tick with (snapshot, delta).
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 2.0,
+        scanner: Optional[ProcessScanner] = None,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.scanner = scanner if scanner is not None else ProcessScanner(
+            collect_memory=True, collect_io=True, collect_threads=True,
+        )
+        self._snapshot: Optional[ProcessSnapshot] = None
+        self._first = threading.Event()
+        self._subscribers: List[Callable[[ProcessSnapshot, ScanDelta], None]] = []
+        self._stop_flag = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="process-sampler", daemon=True)
+        self._tick = 0
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def start(self) -> None:
+        logger.info("ProcessSampler starting (every %.1fs).", self.interval_seconds)
+        self._thread.start()
+
+    def stop(self) -> None:
+        logger.info("ProcessSampler stopping.")
+        self._stop_flag.set()
+
+    # ------------------------------------------------------------------ #
+    # Readers
+    # ------------------------------------------------------------------ #
+    def snapshot(self) -> Optional[ProcessSnapshot]:
+        return self._snapshot
+
+    def wait_for_snapshot(self, timeout: Optional[float] = None) -> Optional[ProcessSnapshot]:
+        """
+        Block until a snapshot with real CPU figures exists (the first
+        scan only primes the counters).
+        """
+        self._first.wait(timeout)
+        return self._snapshot
+
+    def subscribe(self, callback: Callable[[ProcessSnapshot, ScanDelta], None]) -> None:
+        self._subscribers.append(callback)
+
+    # ------------------------------------------------------------------ #
+    # Sampling
+    # ------------------------------------------------------------------ #
+    def sample_once(self) -> ProcessSnapshot:
+        delta = self.scanner.scan()
+        self._tick += 1
+        snap = ProcessSnapshot.build(
+            [
+                ProcessSample(
+                    pid=r.pid,
+                    create_time=r.create_time,
+                    name=r.name,
+                    exe=r.exe,
+                    name_lower=r.name_lower,
+                    exe_lower=r.exe_lower,
+                    cpu_percent=r.cpu_percent,
+                    memory_rss=r.memory_rss,
+                    io_read_rate=r.io_read_rate,
+                    io_write_rate=r.io_write_rate,
+                    num_threads=r.num_threads,
+                )
+                for r in self.scanner.records()
+            ],
+            scan_ms=delta.duration_seconds * 1000.0,
+            tick=self._tick,
+        )
+        self._snapshot = snap
+        if self._tick >= 2:
+            self._first.set()
+        for callback in self._subscribers:
+            try:
+                callback(snap, delta)
+            except Exception as e:
+                logger.exception("Error in process sampler subscriber: %s", e)
+        return snap
+
+    def _run(self) -> None:
+        # Prime CPU counters, then take the first real reading quickly.
+        self._safe_sample()
+        self._stop_flag.wait(min(1.0, self.interval_seconds))
+        while not self._stop_flag.is_set():
+            self._safe_sample()
+            self._stop_flag.wait(self.interval_seconds)
+
+    def _safe_sample(self) -> None:
+        try:
+            self.sample_once()
+        except Exception as e:
+            logger.exception("Error during process sampling: %s", e)
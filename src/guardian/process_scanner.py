@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .utils.lazy_imports import lazy_import
+
+psutil = lazy_import("psutil")
+
+logger = logging.getLogger(__name__)
+
+ProcessKey = Tuple[int, float]
+
+
+@dataclass
+class ProcessRecord:
+    """
+    One live process as tracked by the scanner.
+
+    Static attributes (name, exe, create_time) are read once when the
+    process is first seen; only the metrics are refreshed on each scan.
+    """
+
+    pid: int
+    create_time: float
+    name: str
+    exe: str
+    proc: Any = field(repr=False, compare=False)
+    name_lower: str = ""
+    exe_lower: str = ""
+    cpu_percent: float = 0.0
+    # Only refreshed when the scanner collects memory / IO.
+    memory_rss: int = 0
+    io_read_bytes: int = 0
+    io_write_bytes: int = 0
+    io_read_rate: float = 0.0
+    io_write_rate: float = 0.0
+    num_threads: int = 0
+    first_seen: float = field(default_factory=time.time)
+    last_seen: float = field(default_factory=time.time)
+
+    def __post_init__(self) -> None:
+        self.name_lower = self.name.lower()
+        self.exe_lower = self.exe.lower()
+
+    @property
+    def key(self) -> ProcessKey:
+        return (self.pid, self.create_time)
+
+
+@dataclass
+class ScanDelta:
+    new: List[ProcessRecord] = field(default_factory=list)
+    exited: List[ProcessRecord] = field(default_factory=list)
+    changed: List[ProcessRecord] = field(default_factory=list)
+    duration_seconds: float = 0.0
+
+
+class ProcessScanner:
+    """
+    Incremental process table.
+
+    Instead of rebuilding every psutil.Process on each interval, the
+    scanner keeps one handle per live process keyed by (pid, create_time)
+    and on each scan only:
+
+      - opens handles for PIDs it has not seen before,
+      - drops handles for PIDs that have gone (or were reused),
+      - refreshes the per-process metrics of everything else.
+
+    Because the handles persist, cpu_percent() is measured against the
+    previous scan rather than returning a meaningless first value. With
+    `collect_memory` / `collect_io` / `collect_threads` the same pass also
+    refreshes RSS, IO byte counters (IO rates are per second since the
+    previous scan) and thread counts.
+    """
+
+    def __init__(
+        self,
+        pids_fn: Optional[Callable[[], Iterable[int]]] = None,
+        process_factory: Optional[Callable[[int], Any]] = None,
+        cpu_change_threshold: float = 1.0,
+        collect_memory: bool = False,
+        collect_io: bool = False,
+        collect_threads: bool = False,
+    ) -> None:
+        self._pids_fn = pids_fn or psutil.pids
+        self._process_factory = process_factory or psutil.Process
+        self.cpu_change_threshold = cpu_change_threshold
+        self.collect_memory = collect_memory
+        self.collect_io = collect_io
+        self.collect_threads = collect_threads
+        self._by_pid: Dict[int, ProcessRecord] = {}
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def scan(self) -> ScanDelta:
+        started = time.perf_counter()
+        now = time.time()
+        delta = ScanDelta()
+        current = set(self._pids_fn())
+
+        for pid in [pid for pid in self._by_pid if pid not in current]:
+            delta.exited.append(self._by_pid.pop(pid))
+
+        for pid in current:
+            rec = self._by_pid.get(pid)
+            if rec is None:
+                rec = self._track(pid, now)
+                if rec is not None:
+                    delta.new.append(rec)
+                continue
+
+            try:
+                if not rec.proc.is_running():
+                    # PID was reused by a different process since the last scan.
+                    delta.exited.append(self._by_pid.pop(pid))
+                    rec = self._track(pid, now)
+                    if rec is not None:
+                        delta.new.append(rec)
+                    continue
+                if self.collect_memory or self.collect_io or self.collect_threads:
+                    with rec.proc.oneshot():
+                        cpu = _read_static(lambda: rec.proc.cpu_percent(interval=None), 0.0)
+                        self._refresh_extra(rec, now)
+                else:
+                    cpu = rec.proc.cpu_percent(interval=None)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                delta.exited.append(self._by_pid.pop(pid))
+                continue
+            except psutil.AccessDenied:
+                cpu = 0.0
+
+            if abs(cpu - rec.cpu_percent) >= self.cpu_change_threshold:
+                delta.changed.append(rec)
+            rec.cpu_percent = cpu
+            rec.last_seen = now
+
+        delta.duration_seconds = time.perf_counter() - started
+        logger.debug(
+            "Process scan: %d live, %d new, %d exited, %d changed in %.1f ms.",
+            len(self._by_pid), len(delta.new), len(delta.exited), len(delta.changed),
+            delta.duration_seconds * 1000.0,
+        )
+        return delta
+
+    def records(self) -> List[ProcessRecord]:
+        return list(self._by_pid.values())
+
+    def get(self, pid: int) -> Optional[ProcessRecord]:
+        return self._by_pid.get(pid)
+
+    def __len__(self) -> int:
+        return len(self._by_pid)
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _track(self, pid: int, now: float) -> Optional[ProcessRecord]:
+        """
+        Open a handle for a newly seen PID and read its static attributes.
+        """
+        try:
+            proc = self._process_factory(pid)
+            with proc.oneshot():
+                create_time = _read_static(proc.create_time, 0.0)
+                name = (_read_static(proc.name, "") or "").strip()
+                exe = _read_static(proc.exe, "") or ""
+                # Prime the CPU counter; the first reading is always 0.0.
+                _read_static(lambda: proc.cpu_percent(interval=None), 0.0)
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+
+        rec = ProcessRecord(
+            pid=pid,
+            create_time=create_time,
+            name=name,
+            exe=exe,
+            proc=proc,
+            first_seen=now,
+            last_seen=now,
+        )
+        if self.collect_memory or self.collect_io or self.collect_threads:
+            try:
+                self._refresh_extra(rec, now)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                return None
+        self._by_pid[pid] = rec
+        return rec
+
+    def _refresh_extra(self, rec: ProcessRecord, now: float) -> None:
+        if self.collect_threads:
+            rec.num_threads = _read_static(rec.proc.num_threads, rec.num_threads)
+        if self.collect_memory:
+            mem = _read_static(rec.proc.memory_info, None)
+            if mem is not None:
+                rec.memory_rss = mem.rss
+        if self.collect_io:
+            try:
+                io = _read_static(rec.proc.io_counters, None)
+            except AttributeError:
+                # Not available on this platform (e.g. macOS).
+                self.collect_io = False
+                return
+            if io is not None:
+                elapsed = now - rec.last_seen
+                if elapsed > 0 and rec.io_read_bytes:
+                    rec.io_read_rate = max(0.0, (io.read_bytes - rec.io_read_bytes) / elapsed)
+                    rec.io_write_rate = max(0.0, (io.write_bytes - rec.io_write_bytes) / elapsed)
+                rec.io_read_bytes = io.read_bytes
+                rec.io_write_bytes = io.write_bytes
+
+
+def _read_static(getter: Callable[[], Any], default: Any) -> Any:
+    """
+    Read one attribute, treating AccessDenied as "unknown" rather than
+    dropping the process (which would make us retry it every scan).
+    """
+    try:
+        return getter()
+    except psutil.AccessDenied:
+        return default
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .process_sampler import ProcessSample, ProcessSnapshot
+from .process_scanner import ScanDelta
+
+logger = logging.getLogger(__name__)
+
+# File layout: MAGIC, then one record after another, each a fixed header
+# (payload length, kind, flags, seconds since the recording started)
+# followed by a compact JSON payload, zlib-compressed when that is smaller.
+MAGIC = b"MGREC\x01\r\n"
+_HEADER = struct.Struct("<IBBd")
+FLAG_ZLIB = 0x01
+COMPRESS_MIN_BYTES = 256
+
+KINDS = ("meta", "command", "omni", "tool", "confirmation", "security_event", "snapshot")
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# Config keys whose values are never written to a recording.
+SECRET_KEYS = ("api_key", "token", "password", "secret")
+
+# Snapshot rows: pid followed by these columns. Deltas carry only the
+# metric columns (from "cpu" on) of processes whose metrics changed.
+SNAPSHOT_COLUMNS = ("create_time", "name", "exe", "cpu", "rss", "io_read", "io_write", "threads")
+_METRICS_FROM = SNAPSHOT_COLUMNS.index("cpu")
+
+Row = Tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Record:
+    t: float  # seconds since the recording started
+    kind: str
+    data: Dict[str, Any]
+
+
+class Recorder:
+    """
+    Append-only log of everything that goes into and comes out of the
+    guardian: commands, Omni replies, tool results and confirmations,
+    security events and process snapshots, each with its time offset.
+    benchmarks/replay.py feeds a recording back through MalcolmGuardian.
+
+    record() is a no-op until open() is called, so the hooks cost one
+    attribute check when recording is off. When it is on, the caller
+    only encodes the payload as JSON; a writer thread compresses it and
+    appends it to the file. Process snapshots are written as deltas
+    against the previous one, with a full keyframe every
+    `keyframe_every` snapshots.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.path: Optional[Path] = None
+        self.snapshots = True
+        self.keyframe_every = 30
+        self.max_bytes = 0
+        self._queue: "queue.Queue[Optional[Tuple[int, float, bytes]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._t0 = 0.0
+        self._rows: Dict[int, Row] = {}
+        self._snapshot_count = 0
+        self._stats = {"records": 0, "bytes": 0, "dropped": 0}
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+    def open(
+        self,
+        directory: Path,
+        config: Optional[Dict[str, Any]] = None,
+        snapshots: bool = True,
+        keyframe_every: int = 30,
+        max_mb: float = 512,
+        max_queue: int = 10_000,
+    ) -> Path:
+        """
+        Start a new recording in `directory`; returns its path. The
+        (redacted) config goes into the first record.
+        """
+        self.close()
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.mgrec"
+        self.snapshots = snapshots
+        self.keyframe_every = max(1, keyframe_every)
+        self.max_bytes = int(max_mb * 1_000_000)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._rows = {}
+        self._snapshot_count = 0
+        self._stats = {"records": 0, "bytes": len(MAGIC), "dropped": 0}
+        self._file = self.path.open("wb")
+        self._file.write(MAGIC)
+        self._t0 = time.monotonic()
+        self._thread = threading.Thread(target=self._writer, name="recorder", daemon=True)
+        self._thread.start()
+        self.enabled = True
+        self.record("meta", version=1, started=time.time(), pid=os.getpid(), config=redact(config or {}))
+        logger.info("Recording to %s.", self.path)
+        return self.path
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self.enabled = False
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+        self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        logger.info("Recording closed: %s (%d records, %d bytes, %d dropped).",
+                    self.path, self._stats["records"], self._stats["bytes"], self._stats["dropped"])
+
+    # ------------------------------------------------------------------ #
+    # Recording
+    # ------------------------------------------------------------------ #
+    def record(self, kind: str, **data: Any) -> None:
+        if not self.enabled:
+            return
+        payload = json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+        try:
+            self._queue.put_nowait((_KIND_CODES[kind], time.monotonic() - self._t0, payload))
+        except queue.Full:
+            self._stats["dropped"] += 1
+
+    def record_snapshot(self, snapshot: ProcessSnapshot, delta: Optional[ScanDelta] = None) -> None:
+        """
+        ProcessSampler subscriber. Metrics are rounded so that idle
+        processes compare equal from one snapshot to the next and drop
+        out of the delta.
+        """
+        if not self.enabled or not self.snapshots:
+            return
+        rows = {
+            s.pid: (s.create_time, s.name, s.exe, round(s.cpu_percent, 1), s.memory_rss,
+                    round(s.io_read_rate), round(s.io_write_rate), s.num_threads)
+            for s in snapshot.processes
+        }
+        last = self._rows
+        self._rows = rows
+        self._snapshot_count += 1
+        if not last or (self._snapshot_count - 1) % self.keyframe_every == 0:
+            self.record("snapshot", tick=snapshot.tick, scan_ms=round(snapshot.scan_ms, 3),
+                        key=[[pid, *row] for pid, row in rows.items()])
+            return
+        new: List[List[Any]] = []
+        changed: List[List[Any]] = []
+        for pid, row in rows.items():
+            old = last.get(pid)
+            if old is None or old[0] != row[0]:
+                new.append([pid, *row])
+            elif old[_METRICS_FROM:] != row[_METRICS_FROM:]:
+                changed.append([pid, *row[_METRICS_FROM:]])
+        gone = [pid for pid in last if pid not in rows]
+        self.record("snapshot", tick=snapshot.tick, scan_ms=round(snapshot.scan_ms, 3), new=new, changed=changed, gone=gone)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats, queued=self._queue.qsize(), path=str(self.path) if self.path else None)
+
+    # ------------------------------------------------------------------ #
+    # Writer
+    # ------------------------------------------------------------------ #
+    def _writer(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Take whatever else is already queued so one write covers it.
+            while item is not None:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            self._write([entry for entry in batch if entry is not None])
+            if batch[-1] is None:
+                return
+
+    def _write(self, batch: List[Tuple[int, float, bytes]]) -> None:
+        chunks = []
+        for code, t, payload in batch:
+            flags = 0
+            if len(payload) >= COMPRESS_MIN_BYTES:
+                packed = zlib.compress(payload, 1)
+                if len(packed) < len(payload):
+                    payload, flags = packed, FLAG_ZLIB
+            chunks.append(_HEADER.pack(len(payload), code, flags, t))
+            chunks.append(payload)
+        data = b"".join(chunks)
+        if self.max_bytes and self._stats["bytes"] + len(data) > self.max_bytes:
+            self._stats["dropped"] += len(batch)
+            if self.enabled:
+                logger.warning("Recording %s reached its size limit; stopping.", self.path)
+                self.enabled = False
+            return
+        try:
+            self._file.write(data)
+            self._file.flush()
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to write %d recorded events: %s", len(batch), e)
+            self._stats["dropped"] += len(batch)
+            return
+        self._stats["records"] += len(batch)
+        self._stats["bytes"] += len(data)
+
+
+# Process-wide recorder; the guardian opens it when recording is enabled.
+recorder = Recorder()
+
+
+# ---------------------------------------------------------------------- #
+# Reading
+# ---------------------------------------------------------------------- #
+def read_recording(path: Path, expand_snapshots: bool = True) -> Iterator[Record]:
+    """
+    Records in file order. Snapshot deltas are expanded, so every
+    "snapshot" record carries the full process table under "rows"
+    (unless `expand_snapshots` is False, when they are passed through
+    as written). A record cut short by a crash ends the recording.
+    """
+    rows: Dict[int, Row] = {}
+    with Path(path).open("rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a guardian recording.")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                if header:
+                    logger.warning("Recording %s ends with a truncated record.", path)
+                return
+            length, code, flags, t = _HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                logger.warning("Recording %s ends with a truncated record.", path)
+                return
+            if flags & FLAG_ZLIB:
+                payload = zlib.decompress(payload)
+            data = json.loads(payload)
+            kind = KINDS[code] if code < len(KINDS) else f"unknown:{code}"
+            if kind == "snapshot" and expand_snapshots:
+                rows = _apply_snapshot(rows, data)
+                data = {"tick": data.get("tick", 0), "scan_ms": data.get("scan_ms", 0.0),
+                        "rows": [[pid, *row] for pid, row in rows.items()]}
+            yield Record(t, kind, data)
+
+
+def _apply_snapshot(rows: Dict[int, Row], data: Dict[str, Any]) -> Dict[int, Row]:
+    if "key" in data:
+        return {r[0]: tuple(r[1:]) for r in data["key"]}
+    rows = dict(rows)
+    for pid in data.get("gone", ()):
+        rows.pop(pid, None)
+    for r in data.get("new", ()):
+        rows[r[0]] = tuple(r[1:])
+    for r in data.get("changed", ()):
+        old = rows.get(r[0])
+        if old is not None:
+            rows[r[0]] = old[:_METRICS_FROM] + tuple(r[1:])
+    return rows
+
+
+def snapshot_from_rows(rows: Iterable[List[Any]], scan_ms: float = 0.0, tick: int = 0) -> ProcessSnapshot:
+    """
+    Rebuild a ProcessSnapshot from a replayed "snapshot" record (its
+    timestamp is now, not the recorded time).
+    """
+    samples = [
+        ProcessSample(
+            pid=pid,
+            create_time=create_time,
+            name=name,
+            exe=exe,
+            name_lower=name.lower(),
+            exe_lower=exe.lower(),
+            cpu_percent=cpu,
+            memory_rss=rss,
+            io_read_rate=float(io_read),
+            io_write_rate=float(io_write),
+            num_threads=threads,
+        )
+        for pid, create_time, name, exe, cpu, rss, io_read, io_write, threads in rows
+    ]
+    return ProcessSnapshot.build(samples, scan_ms=scan_ms, tick=tick)
+
+
+def tee(items: Iterable[Any], into: List[Any]) -> Iterator[Any]:
+    """
+    Pass `items` through unchanged, keeping a copy of each in `into`.
+    """
+    for item in items:
+        into.append(item)
+        yield item
+
+
+def redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: ("<redacted>" if isinstance(k, str) and any(s in k.lower() for s in SECRET_KEYS) and v else redact(v))
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
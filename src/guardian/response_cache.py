@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from .malcolm_client import MalcolmResponse
+
+logger = logging.getLogger(__name__)
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACE = re.compile(r"\s+")
+
+DEFAULT_NO_CACHE_COMMANDS = ("quiet mode", "kill", "terminate", "lock")
+DEFAULT_UNCACHEABLE_TOOLS = ("enter_quiet_mode", "exit_quiet_mode", "kill_process", "lock_workstation")
+DEFAULT_CONTEXT_KEYS = ("source", "quiet_mode")
+
+
+def normalise_command(text: str) -> str:
+    """
+    "  Top processes, please! " -> "top processes please"
+    """
+    return _SPACE.sub(" ", _PUNCT.sub(" ", text.lower())).strip()
+
+
+@dataclass
+class _Entry:
+    response: "MalcolmResponse"
+    expires_at: float
+    size: int
+
+
+class _InFlight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.response: Optional["MalcolmResponse"] = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache for Omni replies.
+
+    Keys are the normalised command text plus a stable hash of the
+    `context_keys` fields of the request context; a context with a
+    `session` (a headless client, see command_server.py) is hashed
+    whole, so one session's reply never answers another session or a
+    different client context. Entries expire after a
+    per-command TTL (falling back to `default_ttl`) and the least recently
+    used ones are evicted once either `max_entries` or the approximate
+    `max_bytes` budget is exceeded.
+
+    Commands containing any `no_cache_commands` phrase, and replies that
+    carry a tool call in `uncacheable_tools`, are never stored, so
+    state-changing requests always reach the backend. Concurrent calls
+    for the same key are collapsed into a single backend call.
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 30.0,
+        ttl_by_command: Optional[Dict[str, float]] = None,
+        max_entries: int = 256,
+        max_bytes: int = 1_000_000,
+        no_cache_commands: Iterable[str] = DEFAULT_NO_CACHE_COMMANDS,
+        uncacheable_tools: Iterable[str] = DEFAULT_UNCACHEABLE_TOOLS,
+        context_keys: Iterable[str] = DEFAULT_CONTEXT_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.default_ttl = default_ttl
+        self.ttl_by_command = {normalise_command(k): float(v) for k, v in (ttl_by_command or {}).items()}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.no_cache_commands = tuple(normalise_command(c) for c in no_cache_commands if c)
+        self.uncacheable_tools = frozenset(uncacheable_tools)
+        self.context_keys = tuple(context_keys)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "collapsed": 0, "bypassed": 0, "evictions": 0, "expired": 0}
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def make_key(self, command: str, context: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Cache key for a request, or None if the command opts out of caching.
+        """
+        norm = normalise_command(command)
+        if not norm or any(phrase in norm for phrase in self.no_cache_commands):
+            return None
+        context = context or {}
+        if context.get("session") is not None:
+            ctx = context
+        else:
+            ctx = {k: context.get(k) for k in self.context_keys}
+        digest = hashlib.sha1(json.dumps(ctx, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        return f"{norm}|{digest}"
+
+    def get(self, key: str) -> Optional["MalcolmResponse"]:
+        with self._lock:
+            return self._get_locked(key)
+
+    def put(self, key: str, response: "MalcolmResponse") -> bool:
+        """
+        Store a response if it is cacheable. Returns True if stored.
+        """
+        if not self._is_cacheable(response):
+            return False
+        norm = key.rsplit("|", 1)[0]
+        ttl = self.ttl_by_command.get(norm, self.default_ttl)
+        if ttl <= 0:
+            return False
+        size = _estimate_size(response)
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = _Entry(response=_copy(response), expires_at=self._clock() + ttl, size=size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+        return True
+
+    def get_or_compute(
+        self,
+        command: str,
+        context: Optional[Dict[str, Any]],
+        compute: Callable[[], "MalcolmResponse"],
+    ) -> "MalcolmResponse":
+        key = self.make_key(command, context)
+        if key is None:
+            with self._lock:
+                self._stats["bypassed"] += 1
+            return compute()
+
+        with self._lock:
+            cached = self._get_locked(key)
+            if cached is not None:
+                return cached
+            waiter = self._in_flight.get(key)
+            if waiter is None:
+                leader = _InFlight()
+                self._in_flight[key] = leader
+            else:
+                self._stats["collapsed"] += 1
+
+        if waiter is not None:
+            waiter.done.wait()
+            if waiter.error is not None:
+                raise waiter.error
+            return _copy(waiter.response)
+
+        try:
+            response = compute()
+            leader.response = response
+            self.put(key, response)
+            return response
+        except BaseException as e:
+            leader.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            leader.done.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _get_locked(self, key: str) -> Optional["MalcolmResponse"]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if entry.expires_at <= self._clock():
+            del self._entries[key]
+            self._bytes -= entry.size
+            self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return _copy(entry.response)
+
+    def _is_cacheable(self, response: "MalcolmResponse") -> bool:
+        if getattr(response, "source", "live") != "live":
+            return False
+        return not any(tc.get("tool") in self.uncacheable_tools for tc in response.tool_calls)
+
+
+def _copy(response: "MalcolmResponse") -> "MalcolmResponse":
+    # Hand out fresh objects so callers can't mutate the cached entry.
+    clone = type(response).__new__(type(response))
+    clone.__dict__.update(response.__dict__)
+    clone.tool_calls = [dict(tc) for tc in response.tool_calls]
+    clone.streamed = False
+    return clone
+
+
+def _estimate_size(response: "MalcolmResponse") -> int:
+    tools: List[Dict[str, Any]] = response.tool_calls
+    return 200 + len(response.reply_text) + len(json.dumps(tools, default=str))
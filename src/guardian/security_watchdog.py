@@ -3,27 +3,82 @@ from __future__ import annotations
 import logging
 import threading
 import time
-from typing import Callable, Dict, Any, List
-
-import psutil
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Any, List, Optional
 
+from .anomaly import Anomaly, AnomalyDetector
 from .events import SecurityEvent
+from .pattern_matcher import PatternMatcher
+from .process_sampler import ProcessSampler
+from .process_scanner import ProcessScanner
 
 logger = logging.getLogger(__name__)
 
+DETECTION_MODES = ("threshold", "anomaly", "both")
+
+_ANOMALY_TEXT = {
+    "cpu": "CPU at {value:.0f}% (usually {baseline:.0f}%)",
+    "cpu_creep": "CPU creeping up to {value:.0f}% (usually {baseline:.0f}%)",
+    "rss_growth": "memory growing by {value:.0f} MB per minute",
+    "threads": "{value:.0f} threads (usually {baseline:.0f})",
+}
+
+
+@dataclass(frozen=True)
+class WatchdogSettings:
+    """
+    The reloadable part of the watchdog's configuration, compiled. The
+    scan loop reads it once per pass, so a reload lands between scans.
+    """
+
+    interval_seconds: float
+    suspicious_cpu_threshold: float
+    matcher: PatternMatcher
+    detection_mode: str = "threshold"
+
+    def __post_init__(self) -> None:
+        if self.detection_mode not in DETECTION_MODES:
+            raise ValueError(f"Unknown detection mode '{self.detection_mode}'; expected one of {DETECTION_MODES}.")
+
+    @property
+    def suspicious_names(self) -> List[str]:
+        return self.matcher.patterns
+
 
 class SecurityWatchdog:
+    """
+    Scans processes for suspicious names, high CPU and (with an
+    AnomalyDetector) unusual behaviour. `detector_factory` builds the
+    detector the first time a mode that needs it is configured, at
+    start-up or on a reload.
+    """
+
     def __init__(
         self,
         interval_seconds: int,
         suspicious_cpu_threshold: float,
         suspicious_names: List[str],
         on_event: Callable[[SecurityEvent], None],
+        scanner: Optional[ProcessScanner] = None,
+        sampler: Optional[ProcessSampler] = None,
+        detection_mode: str = "threshold",
+        detector: Optional[AnomalyDetector] = None,
+        detector_factory: Optional[Callable[[], Optional[AnomalyDetector]]] = None,
     ) -> None:
-        self.interval_seconds = interval_seconds
-        self.suspicious_cpu_threshold = suspicious_cpu_threshold
-        self.suspicious_names = suspicious_names
         self.on_event = on_event
+        self.detector = detector
+        self.detector_factory = detector_factory
+        self.settings = self._checked(WatchdogSettings(
+            interval_seconds=interval_seconds,
+            suspicious_cpu_threshold=suspicious_cpu_threshold,
+            matcher=PatternMatcher(suspicious_names),
+            detection_mode=detection_mode,
+        ))
+        # With a shared sampler the watchdog only reads its snapshots;
+        # otherwise it walks the process table with its own scanner.
+        self.sampler = sampler
+        self.scanner = None if sampler is not None else (scanner if scanner is not None else ProcessScanner())
+        self._last_tick = 0
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._stop_flag = threading.Event()
 
@@ -35,48 +90,103 @@ class SecurityWatchdog:
         logger.info("SecurityWatchdog stopping.")
         self._stop_flag.set()
 
+    def reconfigure(self, settings: WatchdogSettings) -> None:
+        """
+        Swap in new thresholds, patterns and detection mode; the next
+        scan uses them.
+        """
+        self.settings = self._checked(settings)
+        logger.info(
+            "SecurityWatchdog reconfigured (interval=%ss, cpu>=%s, %d patterns, mode=%s).",
+            settings.interval_seconds, settings.suspicious_cpu_threshold,
+            len(settings.matcher), self.settings.detection_mode,
+        )
+
+    def _checked(self, settings: WatchdogSettings) -> WatchdogSettings:
+        if settings.detection_mode != "threshold" and self.detector is None and self.detector_factory is not None:
+            self.detector = self.detector_factory()
+        if settings.detection_mode != "threshold" and self.detector is None:
+            logger.warning("No anomaly detector available; using the CPU threshold only.")
+            return replace(settings, detection_mode="threshold")
+        return settings
+
     def _run(self) -> None:
         while not self._stop_flag.is_set():
             try:
                 self._scan_processes()
             except Exception as e:
                 logger.exception("Error during security scan: %s", e)
-            time.sleep(self.interval_seconds)
+            time.sleep(self.settings.interval_seconds)
 
     def _scan_processes(self) -> None:
-        for proc in psutil.process_iter(attrs=["pid", "name", "cpu_percent", "exe"]):
-            try:
-                info = proc.info
-                pid = info.get("pid")
-                name = (info.get("name") or "").strip()
-                name_lower = name.lower()
-                cpu = info.get("cpu_percent") or 0.0
-                exe = (info.get("exe") or "").lower()
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-
-            # Ignore the Windows "System Idle Process" and PID 0, which can report nonsense CPU.
-            if pid == 0 or name_lower == "system idle process":
-                continue
-
-            for pattern in self.suspicious_names:
-                if pattern.lower() in name_lower or pattern.lower() in exe:
-                    evt = SecurityEvent(
-                        event_type="suspicious_process_name",
-                        description=f"Suspicious process '{name}' (PID {pid}).",
-                        severity="warning",
-                        data={"pid": pid, "name": name, "exe": exe},
-                    )
-                    logger.warning(evt.description)
-                    self.on_event(evt)
-                    break
-
-            if cpu >= self.suspicious_cpu_threshold:
+        settings = self.settings
+        if self.sampler is not None:
+            snapshot = self.sampler.snapshot()
+            # Scanning faster than the sampler ticks would hand the detector
+            # the same readings again (dt == 0), skewing its baselines.
+            if snapshot is None or snapshot.tick == self._last_tick:
+                return
+            self._last_tick = snapshot.tick
+            processes = snapshot.processes
+            timestamp = snapshot.timestamp
+        else:
+            self.scanner.scan()
+            processes = self.scanner.records()
+            timestamp = time.time()
+
+        # Ignore the Windows "System Idle Process" and PID 0, which can report nonsense CPU.
+        processes = [p for p in processes if p.pid != 0 and p.name_lower != "system idle process"]
+        use_threshold = settings.detection_mode in ("threshold", "both")
+        if settings.detection_mode in ("anomaly", "both"):
+            for anomaly in self.detector.score(processes, timestamp):
+                self._report_anomaly(anomaly)
+
+        matcher = settings.matcher
+        cpu_threshold = settings.suspicious_cpu_threshold
+        for rec in processes:
+            pid = rec.pid
+            name = rec.name
+            name_lower = rec.name_lower
+            cpu = rec.cpu_percent
+            exe = rec.exe_lower
+
+            pattern = matcher.match_process(name_lower, exe)
+            if pattern is not None:
+                evt = SecurityEvent(
+                    event_type="suspicious_process_name",
+                    description=f"Suspicious process '{name}' (PID {pid}).",
+                    severity="warning",
+                    data={"pid": pid, "name": name, "exe": exe, "create_time": rec.create_time, "pattern": pattern},
+                )
+                logger.warning(evt.description)
+                self.on_event(evt)
+
+            if use_threshold and cpu >= cpu_threshold:
                 evt = SecurityEvent(
                     event_type="high_cpu_process",
                     description=f"Process '{name}' (PID {pid}) is using high CPU: {cpu:.1f}%.",
                     severity="info",
-                    data={"pid": pid, "name": name, "cpu": cpu},
+                    data={"pid": pid, "name": name, "cpu": cpu, "create_time": rec.create_time},
                 )
-                logger.info(evt.description)
+                # Templated, so logging.rate_limits buckets every high-CPU line together.
+                logger.info("Process '%s' (PID %s) is using high CPU: %.1f%%.", name, pid, cpu)
                 self.on_event(evt)
+
+    def _report_anomaly(self, anomaly: Anomaly) -> None:
+        detail = _ANOMALY_TEXT[anomaly.reason].format(value=anomaly.value, baseline=anomaly.baseline)
+        evt = SecurityEvent(
+            event_type="anomalous_process",
+            description=f"Process '{anomaly.name}' (PID {anomaly.pid}) is behaving unusually: {detail}.",
+            severity="info",
+            data={
+                "pid": anomaly.pid,
+                "name": anomaly.name,
+                "create_time": anomaly.create_time,
+                "reason": anomaly.reason,
+                "value": anomaly.value,
+                "baseline": anomaly.baseline,
+                "z": anomaly.z,
+            },
+        )
+        logger.info("Process '%s' (PID %s) is behaving unusually: %s.", anomaly.name, anomaly.pid, detail)
+        self.on_event(evt)
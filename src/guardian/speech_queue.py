@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """
+    Lower value = spoken first.
+    """
+
+    USER_REPLY = 0
+    CONFIRMATION = 1
+    SECURITY = 2
+
+
+DROP_POLICIES = ("drop_lowest", "drop_oldest", "reject_new")
+
+
+@dataclass
+class Utterance:
+    text: str
+    priority: Priority = Priority.USER_REPLY
+    # Queued utterances with the same key are replaced by the newest one.
+    key: Optional[str] = None
+    # Monotonic deadline; stale utterances are discarded instead of spoken.
+    expires_at: Optional[float] = None
+    # Whether this utterance may cut off a lower-priority one being spoken.
+    interrupt: bool = False
+    enqueued_at: float = field(default_factory=time.monotonic)
+    seq: int = 0
+    # Voice-command trace this reply belongs to, if instrumentation is on.
+    trace: Any = None
+    # Set by the speaker when it takes the utterance off the queue.
+    taken: bool = False
+
+
+class _PriorityStats:
+    __slots__ = ("enqueued", "spoken", "expired", "replaced", "dropped", "interrupted", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.enqueued = 0
+        self.spoken = 0
+        self.expired = 0
+        self.replaced = 0
+        self.dropped = 0
+        self.interrupted = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class UtteranceScheduler:
+    """
+    Bounded priority queue of utterances.
+
+    - get() returns the highest-priority, oldest utterance that has not
+      expired or been replaced.
+    - put() with a key replaces any queued utterance with the same key.
+    - Once `max_backlog` utterances are queued, `drop_policy` decides what
+      gives way:
+        drop_lowest  evict the oldest utterance of the lowest priority,
+                     unless the new one ranks even lower (then it is dropped)
+        drop_oldest  evict the oldest utterance regardless of priority
+        reject_new   drop the new utterance
+    """
+
+    def __init__(
+        self,
+        max_backlog: int = 20,
+        drop_policy: str = "drop_lowest",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown TTS drop policy '{drop_policy}'; expected one of {DROP_POLICIES}.")
+        self.max_backlog = max(1, max_backlog)
+        self.drop_policy = drop_policy
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[int, int]] = []
+        self._live: Dict[int, Utterance] = {}
+        self._by_key: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._closed = False
+        self._stats: Dict[Priority, _PriorityStats] = {p: _PriorityStats() for p in Priority}
+
+    # ------------------------------------------------------------------ #
+    # Producer / consumer
+    # ------------------------------------------------------------------ #
+    def put(self, utt: Utterance) -> bool:
+        """
+        Queue an utterance. Returns False if it was dropped.
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            utt.seq = next(self._seq)
+            utt.enqueued_at = self._clock()
+            stats = self._stats[utt.priority]
+
+            if utt.key is not None:
+                old_seq = self._by_key.get(utt.key)
+                if old_seq is not None and old_seq in self._live:
+                    old = self._live.pop(old_seq)
+                    self._stats[old.priority].replaced += 1
+
+            if len(self._live) >= self.max_backlog and not self._make_room(utt):
+                stats.dropped += 1
+                logger.info("TTS backlog full; dropped: %s", utt.text)
+                return False
+
+            self._live[utt.seq] = utt
+            if utt.key is not None:
+                self._by_key[utt.key] = utt.seq
+            heapq.heappush(self._heap, (int(utt.priority), utt.seq))
+            if len(self._heap) > 4 * self.max_backlog:
+                # Drop heap entries left behind by replaced/evicted utterances.
+                self._heap = [(int(u.priority), u.seq) for u in self._live.values()]
+                heapq.heapify(self._heap)
+            stats.enqueued += 1
+            self._cond.notify()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Utterance]:
+        """
+        Block until an utterance is ready; None on timeout or close.
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, seq = heapq.heappop(self._heap)
+                    utt = self._live.pop(seq, None)
+                    if utt is None:
+                        continue  # replaced or evicted
+                    if utt.key is not None and self._by_key.get(utt.key) == seq:
+                        del self._by_key[utt.key]
+                    now = self._clock()
+                    stats = self._stats[utt.priority]
+                    if utt.expires_at is not None and now >= utt.expires_at:
+                        stats.expired += 1
+                        logger.info("TTS utterance expired before it could be spoken: %s", utt.text)
+                        continue
+                    wait = now - utt.enqueued_at
+                    stats.spoken += 1
+                    stats.wait_total += wait
+                    stats.wait_max = max(stats.wait_max, wait)
+                    return utt
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def record_interrupted(self, utt: Utterance) -> None:
+        with self._cond:
+            self._stats[utt.priority].interrupted += 1
+
+    # ------------------------------------------------------------------ #
+    # Reporting
+    # ------------------------------------------------------------------ #
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            depth = {p: 0 for p in Priority}
+            for utt in self._live.values():
+                depth[utt.priority] += 1
+            report: Dict[str, Dict[str, Any]] = {}
+            for p, s in self._stats.items():
+                report[p.name.lower()] = {
+                    "depth": depth[p],
+                    "enqueued": s.enqueued,
+                    "spoken": s.spoken,
+                    "expired": s.expired,
+                    "replaced": s.replaced,
+                    "dropped": s.dropped,
+                    "interrupted": s.interrupted,
+                    "wait_avg_ms": (s.wait_total / s.spoken * 1000.0) if s.spoken else 0.0,
+                    "wait_max_ms": s.wait_max * 1000.0,
+                }
+            return report
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._live)
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _make_room(self, incoming: Utterance) -> bool:
+        """
+        Apply the drop policy (caller holds the lock). True if there is now room.
+        """
+        if self.drop_policy == "reject_new":
+            return False
+        if self.drop_policy == "drop_oldest":
+            victim = min(self._live.values(), key=lambda u: u.seq)
+        else:
+            victim = max(self._live.values(), key=lambda u: (u.priority, -u.seq))
+            if incoming.priority > victim.priority:
+                return False
+        del self._live[victim.seq]
+        if victim.key is not None and self._by_key.get(victim.key) == victim.seq:
+            del self._by_key[victim.key]
+        self._stats[victim.priority].dropped += 1
+        logger.info("TTS backlog full; dropped queued: %s", victim.text)
+        return True
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .utils.lazy_imports import import_times
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SubsystemStatus:
+    name: str
+    state: str = "pending"
+    started_at: float = 0.0  # seconds since the coordinator started
+    seconds: float = 0.0     # time spent in its init function
+    error: Optional[str] = None
+
+
+class StartupCoordinator:
+    """
+    Initialises independent subsystems concurrently.
+
+    Each subsystem's init function runs on its own thread once the
+    subsystems it depends on are ready, and `on_ready` is called the
+    moment it finishes, so a fast subsystem (TTS, say) does not wait for
+    a slow one (microphone calibration). A failed subsystem is logged and
+    reported; the others carry on, and anything depending on it is not
+    started.
+    """
+
+    def __init__(
+        self,
+        on_ready: Optional[Callable[[str], None]] = None,
+        on_failed: Optional[Callable[[str, BaseException], None]] = None,
+    ) -> None:
+        self.on_ready = on_ready
+        self.on_failed = on_failed
+        self._inits: Dict[str, Callable[[], None]] = {}
+        self._after: Dict[str, Sequence[str]] = {}
+        self._status: Dict[str, SubsystemStatus] = {}
+        self._done: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._t0 = 0.0
+
+    def add(self, name: str, init: Callable[[], None], after: Sequence[str] = ()) -> None:
+        for dep in after:
+            if dep not in self._inits:
+                raise ValueError(f"Subsystem '{name}' depends on unknown subsystem '{dep}'.")
+        self._inits[name] = init
+        self._after[name] = tuple(after)
+        self._status[name] = SubsystemStatus(name)
+        self._done[name] = threading.Event()
+
+    def start(self) -> None:
+        self._t0 = time.monotonic()
+        for name in self._inits:
+            threading.Thread(target=self._run, args=(name,), name=f"init-{name}", daemon=True).start()
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+    def is_ready(self, name: str) -> bool:
+        status = self._status.get(name)
+        return status is not None and status.state == "ready"
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until `name` has finished initialising; True if it is ready.
+        """
+        done = self._done.get(name)
+        if done is None:
+            return False
+        done.wait(timeout)
+        return self.is_ready(name)
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name, done in self._done.items():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not done.wait(remaining):
+                return False
+        return all(s.state == "ready" for s in self._status.values())
+
+    def status(self) -> Dict[str, SubsystemStatus]:
+        with self._lock:
+            return {name: SubsystemStatus(**vars(s)) for name, s in self._status.items()}
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _run(self, name: str) -> None:
+        status = self._status[name]
+        for dep in self._after[name]:
+            if not self.wait(dep):
+                self._settle(name, "failed", 0.0, RuntimeError(f"'{dep}' did not start"))
+                return
+
+        started = time.monotonic()
+        with self._lock:
+            status.state = "starting"
+            status.started_at = started - self._t0
+        try:
+            self._inits[name]()
+        except Exception as e:
+            logger.exception("Subsystem '%s' failed to start: %s", name, e)
+            self._settle(name, "failed", time.monotonic() - started, e)
+            return
+        self._settle(name, "ready", time.monotonic() - started, None)
+
+    def _settle(self, name: str, state: str, seconds: float, error: Optional[BaseException]) -> None:
+        status = self._status[name]
+        with self._lock:
+            status.state = state
+            status.seconds = seconds
+            status.error = str(error) if error is not None else None
+        self._done[name].set()
+        if state == "ready":
+            logger.info("Subsystem '%s' ready after %.0f ms (%.0f ms since startup).",
+                        name, seconds * 1000.0, (time.monotonic() - self._t0) * 1000.0)
+            callback = self.on_ready
+            args = (name,)
+        else:
+            callback = self.on_failed
+            args = (name, error)
+        if callback is not None:
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.exception("Startup callback for '%s' failed: %s", name, e)
+
+
+def startup_report(
+    coordinator: StartupCoordinator,
+    phases: Optional[Dict[str, float]] = None,
+    imports: int = 15,
+) -> List[str]:
+    """
+    Lines for --profile-startup: slowest imports, any synchronous
+    `phases` (name -> seconds), then each subsystem's init time and when
+    it became ready.
+    """
+    lines = ["Startup profile", "  imports (inclusive):"]
+    for module, seconds in import_times(imports):
+        lines.append(f"    {module:<40} {seconds * 1000.0:8.1f} ms")
+    if phases:
+        lines.append("  phases:")
+        for name, seconds in phases.items():
+            lines.append(f"    {name:<40} {seconds * 1000.0:8.1f} ms")
+    lines.append("  subsystems:")
+    for name, s in coordinator.status().items():
+        detail = f"init {s.seconds * 1000.0:8.1f} ms, ready at {(s.started_at + s.seconds) * 1000.0:8.1f} ms"
+        if s.state != "ready":
+            detail = f"{s.state}" + (f" ({s.error})" if s.error else "")
+        lines.append(f"    {name:<40} {detail}")
+    return lines
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# A sentence ends at . ! ? or an ellipsis, optionally followed by closing
+# quotes/brackets, and must be followed by whitespace so "3.5" or "e.g.x"
+# are not split mid-token.
+_SENTENCE_END = re.compile(r"""[.!?…]+["'”’)\]]*\s+""")
+
+SSE_CONTENT_TYPES = ("text/event-stream",)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
+# Keys carrying incremental reply text in a stream chunk.
+DELTA_KEYS = ("delta", "text", "content", "token")
+# Keys carrying a complete reply; only used if no deltas were streamed.
+FULL_TEXT_KEYS = ("message", "reply_text", "reply")
+
+
+class SentenceSplitter:
+    """
+    Accumulates streamed text and hands back complete sentences as soon
+    as they are available, so TTS can start on the first one while the
+    rest is still being generated.
+    """
+
+    def __init__(self, min_chars: int = 12) -> None:
+        # Very short "sentences" ("Hi." "OK.") are merged into the next
+        # one to avoid choppy speech.
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences: List[str] = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest or None
+
+
+def stream_format(content_type: str) -> Optional[str]:
+    """
+    Classify a response Content-Type as "sse", "ndjson" or None (plain body).
+    """
+    ctype = (content_type or "").split(";", 1)[0].strip().lower()
+    if ctype in SSE_CONTENT_TYPES:
+        return "sse"
+    if ctype in NDJSON_CONTENT_TYPES:
+        return "ndjson"
+    return None
+
+
+def iter_stream_events(lines: Iterator[str], fmt: str) -> Iterator[Dict[str, Any]]:
+    """
+    Turn the decoded lines of an SSE or NDJSON body into chunk dicts.
+
+    Non-JSON payloads are wrapped as {"delta": <text>}. An SSE "[DONE]"
+    sentinel ends the stream.
+    """
+    if fmt == "ndjson":
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield _decode_chunk(line)
+        return
+
+    data_lines: List[str] = []
+    for line in lines:
+        if line == "":
+            if data_lines:
+                payload = "\n".join(data_lines)
+                data_lines = []
+                if payload.strip() == "[DONE]":
+                    return
+                yield _decode_chunk(payload)
+            continue
+        if line.startswith(":"):
+            continue  # SSE comment / keep-alive
+        field, _, value = line.partition(":")
+        if field == "data":
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+    if data_lines:
+        payload = "\n".join(data_lines)
+        if payload.strip() != "[DONE]":
+            yield _decode_chunk(payload)
+
+
+def chunk_text(chunk: Dict[str, Any], allow_full: bool) -> str:
+    """
+    Extract the reply text carried by one stream chunk.
+    """
+    for key in DELTA_KEYS:
+        val = chunk.get(key)
+        if isinstance(val, dict):
+            # OpenAI-style {"delta": {"content": "..."}}
+            val = val.get("content") or val.get("text")
+        if isinstance(val, str):
+            return val
+    if allow_full:
+        for key in FULL_TEXT_KEYS:
+            val = chunk.get(key)
+            if isinstance(val, str):
+                return val
+    return ""
+
+
+def _decode_chunk(payload: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return {"delta": payload}
+    if isinstance(data, dict):
+        return data
+    if isinstance(data, str):
+        return {"delta": data}
+    logger.debug("Ignoring non-object stream chunk: %r", data)
+    return {}
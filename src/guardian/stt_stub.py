@@ -1,29 +1,242 @@
+from __future__ import annotations
+
+import json
 import logging
-from typing import Optional
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .utils.lazy_imports import lazy_import
 
-import speech_recognition as sr
+sr = lazy_import("speech_recognition")
 
 logger = logging.getLogger(__name__)
 
+
+# ---------------------------------------------------------------------- #
+# Backends
+# ---------------------------------------------------------------------- #
+class STTBackend:
+    """
+    Turns one AudioData phrase into text.
+
+    transcribe() returns None if nothing intelligible was heard and
+    raises sr.RequestError if the backend itself failed. It may be called
+    from several threads at once. warm_up() loads models ahead of the
+    first phrase.
+    """
+
+    name = "base"
+    offline = False
+
+    def transcribe(self, audio: sr.AudioData) -> Optional[str]:
+        raise NotImplementedError
+
+    def warm_up(self) -> None:
+        pass
+
+
+class GoogleBackend(STTBackend):
+    """
+    Google Web Speech API (free, but cloud-based).
+    """
+
+    name = "google"
+
+    def __init__(self, recognizer: sr.Recognizer, language: str = "en-GB", **_: object) -> None:
+        self.recognizer = recognizer
+        self.language = language
+
+    def transcribe(self, audio: sr.AudioData) -> Optional[str]:
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            return None
+
+
+class SphinxBackend(STTBackend):
+    """
+    CMU PocketSphinx, fully offline.
+
+    SpeechRecognition's recognize_sphinx() builds a new decoder (and
+    reloads the acoustic model) on every call; here each thread keeps its
+    own decoder alive instead. Uses the model shipped with
+    SpeechRecognition (en-US) unless `model_dir` points at a directory
+    with the same acoustic-model / language-model.lm.bin /
+    pronounciation-dictionary.dict layout.
+    """
+
+    name = "sphinx"
+    offline = True
+
+    def __init__(self, recognizer: sr.Recognizer, model_dir: Optional[str] = None, **_: object) -> None:
+        try:
+            from pocketsphinx import pocketsphinx
+        except ImportError as e:
+            raise sr.RequestError("missing PocketSphinx module: pip install pocketsphinx") from e
+        self._ps = pocketsphinx
+        if model_dir:
+            self.model_dir = Path(model_dir)
+        else:
+            # Only en-US ships with SpeechRecognition.
+            self.model_dir = Path(sr.__file__).resolve().parent / "pocketsphinx-data" / "en-US"
+        if not self.model_dir.is_dir():
+            raise sr.RequestError(f"missing PocketSphinx model directory: {self.model_dir}")
+        self._local = threading.local()
+
+    def warm_up(self) -> None:
+        self._decoder()
+
+    def transcribe(self, audio: sr.AudioData) -> Optional[str]:
+        decoder = self._decoder()
+        decoder.start_utt()
+        decoder.process_raw(audio.get_raw_data(convert_rate=16000, convert_width=2), False, True)
+        decoder.end_utt()
+        hypothesis = decoder.hyp()
+        return hypothesis.hypstr if hypothesis is not None and hypothesis.hypstr else None
+
+    def _decoder(self):
+        decoder = getattr(self._local, "decoder", None)
+        if decoder is None:
+            config = self._ps.Config()
+            config.set_string("-hmm", str(self.model_dir / "acoustic-model"))
+            config.set_string("-lm", str(self.model_dir / "language-model.lm.bin"))
+            config.set_string("-dict", str(self.model_dir / "pronounciation-dictionary.dict"))
+            config.set_string("-logfn", os.devnull)
+            decoder = self._ps.Decoder(config)
+            self._local.decoder = decoder
+            logger.info("PocketSphinx decoder loaded from %s.", self.model_dir)
+        return decoder
+
+
+class VoskBackend(STTBackend):
+    """
+    Vosk (Kaldi), fully offline. The model is loaded once and shared by
+    all threads; each phrase gets a cheap KaldiRecognizer of its own.
+    Download a model from https://alphacephei.com/vosk/models and point
+    `model_dir` at the unpacked directory.
+    """
+
+    name = "vosk"
+    offline = True
+    SAMPLE_RATE = 16000
+
+    def __init__(self, recognizer: sr.Recognizer, model_dir: Optional[str] = None, **_: object) -> None:
+        try:
+            import vosk
+        except ImportError as e:
+            raise sr.RequestError("missing Vosk module: pip install vosk") from e
+        if not model_dir or not Path(model_dir).is_dir():
+            raise sr.RequestError(f"missing Vosk model directory: {model_dir!r}")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model_dir = Path(model_dir)
+        self._model = None
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        self._get_model()
+
+    def transcribe(self, audio: sr.AudioData) -> Optional[str]:
+        rec = self._vosk.KaldiRecognizer(self._get_model(), self.SAMPLE_RATE)
+        rec.AcceptWaveform(audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        text = json.loads(rec.FinalResult()).get("text", "")
+        return text or None
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = self._vosk.Model(str(self.model_dir))
+                logger.info("Vosk model loaded from %s.", self.model_dir)
+            return self._model
+
+
+STT_BACKENDS: Dict[str, Callable[..., STTBackend]] = {
+    "google": GoogleBackend,
+    "sphinx": SphinxBackend,
+    "vosk": VoskBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[..., STTBackend]) -> None:
+    STT_BACKENDS[name] = factory
+
+
+def create_backend(name: str, recognizer: sr.Recognizer, **options: object) -> STTBackend:
+    try:
+        factory = STT_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown STT backend '{name}'; expected one of {sorted(STT_BACKENDS)}.") from None
+    return factory(recognizer, **options)
+
+
+# ---------------------------------------------------------------------- #
+# Engine
+# ---------------------------------------------------------------------- #
 class STTEngine:
     """Simple wrapper around SpeechRecognition.
 
     Default backend: Google Web Speech API (free, but cloud-based).
-    You can swap this for another backend if you prefer.
+    Pick another registered backend by name ("sphinx", "vosk") to run
+    offline; backend-specific options (model_dir, ...) are passed through.
+    If the backend cannot be created the engine falls back to
+    `fallback` when one is given.
     """
 
-    def __init__(self, language: str = "en-GB") -> None:
+    def __init__(
+        self,
+        language: str = "en-GB",
+        backend: str = "google",
+        fallback: Optional[str] = None,
+        batch_workers: int = 4,
+        **options: object,
+    ) -> None:
         self.recognizer = sr.Recognizer()
         self.language = language
+        self.batch_workers = max(1, batch_workers)
+        try:
+            self.backend = create_backend(backend, self.recognizer, language=language, **options)
+        except sr.RequestError as e:
+            if not fallback or fallback == backend:
+                raise
+            logger.warning("STT backend '%s' unavailable (%s); falling back to '%s'.", backend, e, fallback)
+            self.backend = create_backend(fallback, self.recognizer, language=language, **options)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        self.backend.warm_up()
 
     def phrase_to_text(self, audio: sr.AudioData) -> Optional[str]:
         try:
-            text = self.recognizer.recognize_google(audio, language=self.language)
-            logger.info("STT recognised: %s", text)
-            return text
-        except sr.UnknownValueError:
-            logger.info("STT could not understand audio.")
-            return None
+            text = self.backend.transcribe(audio)
         except sr.RequestError as e:
             logger.warning("STT request error: %s", e)
             return None
+        if text:
+            logger.info("STT recognised: %s", text)
+        else:
+            logger.info("STT could not understand audio.")
+        return text
+
+    def transcribe_batch(self, clips: Sequence[sr.AudioData]) -> List[Optional[str]]:
+        """
+        Transcribe many phrases concurrently; results are in input order.
+        """
+        if not clips:
+            return []
+        return list(self._executor().map(self.phrase_to_text, clips))
+
+    def close(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.batch_workers, thread_name_prefix="stt")
+            return self._pool
@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+
+from .utils.lazy_imports import lazy_import
+
+if TYPE_CHECKING:
+    from .process_sampler import ProcessSnapshot
+    from .process_scanner import ScanDelta
+
+psutil = lazy_import("psutil")
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("cpu", "rss", "io_read", "io_write")
+STATS = ("avg", "min", "max", "p50", "p95", "last")
+SYSTEM = "system"
+
+SeriesKey = Union[str, Tuple[int, float]]  # "system" or (pid, create_time)
+
+# (resolution seconds, points kept): ~10 min raw, 2 h of minutes, 24 h of 10-minute buckets.
+DEFAULT_TIERS: Tuple[Tuple[float, int], ...] = ((0.0, 300), (60.0, 120), (600.0, 144))
+# Points a tier's columns make room for on their first write.
+INITIAL_POINTS = 8
+# When over budget, memory is freed down to this share of it, so that
+# the next few ticks of growth do not trigger another pass at once.
+RECLAIM_TO = 0.9
+
+
+class _Tier:
+    """
+    Columnar ring buffer: one timestamp column plus an avg and a max
+    column per metric (raw points have one column per metric, their avg
+    and max being the same), all `array('d')`. Columns start small and
+    grow (to INITIAL_POINTS, then doubling up to `capacity`) as points
+    arrive, so a short-lived process costs a few hundred bytes rather
+    than full buffers.
+    """
+
+    __slots__ = ("resolution", "capacity", "ts", "avg", "max", "head", "size", "_bucket", "_acc_sum", "_acc_max", "_acc_n")
+
+    def __init__(self, resolution: float, capacity: int) -> None:
+        self.resolution = resolution
+        self.capacity = capacity
+        self.ts = array("d")
+        self.avg = [array("d") for _ in METRICS]
+        self.max = [array("d") for _ in METRICS] if resolution else self.avg
+        self.head = 0  # next write position
+        self.size = 0
+        # Pending bucket for downsampled tiers.
+        self._bucket: Optional[float] = None
+        self._acc_sum = [0.0] * len(METRICS)
+        self._acc_max = [0.0] * len(METRICS)
+        self._acc_n = 0
+
+    def write(self, ts: float, avg: Sequence[float], mx: Sequence[float]) -> int:
+        """
+        Store a point; returns the bytes the columns grew by.
+        """
+        i = self.head
+        grown = self._grow() if i == len(self.ts) else 0
+        self.ts[i] = ts
+        for m in range(len(METRICS)):
+            self.avg[m][i] = avg[m]
+            self.max[m][i] = mx[m]
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return grown
+
+    def _grow(self) -> int:
+        # Only reached before the first wrap, while every column ends at `head`.
+        before = self.nbytes()
+        extra = bytes(8 * (min(self.capacity, max(INITIAL_POINTS, 2 * len(self.ts))) - len(self.ts)))
+        for column in self._columns():
+            column.frombytes(extra)
+        return self.nbytes() - before
+
+    def _columns(self) -> List[array]:
+        return [self.ts, *self.avg, *(self.max if self.max is not self.avg else ())]
+
+    def accumulate(self, ts: float, avg: Sequence[float], mx: Sequence[float]) -> Optional[Tuple[float, List[float], List[float]]]:
+        """
+        Add a point to the pending bucket. Returns the finished bucket
+        (ts, avg, max) when `ts` starts a new one.
+        """
+        bucket = ts - ts % self.resolution
+        finished = None
+        if self._bucket is not None and bucket != self._bucket and self._acc_n:
+            finished = (self._bucket, [s / self._acc_n for s in self._acc_sum], list(self._acc_max))
+            self._acc_sum = [0.0] * len(METRICS)
+            self._acc_max = [0.0] * len(METRICS)
+            self._acc_n = 0
+        self._bucket = bucket
+        for m in range(len(METRICS)):
+            self._acc_sum[m] += avg[m]
+            if mx[m] > self._acc_max[m]:
+                self._acc_max[m] = mx[m]
+        self._acc_n += 1
+        return finished
+
+    def oldest(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return self.ts[(self.head - self.size) % self.capacity]
+
+    def window(self, metric: int, since: float, use_max: bool) -> List[float]:
+        """
+        Values newer than `since`, oldest first.
+        """
+        column = (self.max if use_max else self.avg)[metric]
+        out: List[float] = []
+        i = self.head
+        for _ in range(self.size):
+            i = (i - 1) % self.capacity
+            if self.ts[i] < since:
+                break
+            out.append(column[i])
+        out.reverse()
+        return out
+
+    def nbytes(self) -> int:
+        return 8 * len(self.ts) * len(self._columns())
+
+
+class _Series:
+    __slots__ = ("label", "tiers", "last_update", "last", "downsampled")
+
+    def __init__(self, label: str, tiers: Sequence[Tuple[float, int]]) -> None:
+        self.label = label
+        self.tiers = [_Tier(res, cap) for res, cap in tiers]
+        self.last_update = 0.0
+        self.last: Sequence[float] = (0.0,) * len(METRICS)
+        self.downsampled = False  # raw tier dropped; answered from buckets
+
+    def append(self, ts: float, values: Sequence[float]) -> int:
+        """
+        Add a point; returns the bytes the series grew by.
+        """
+        self.last_update = ts
+        self.last = values
+        avg, mx = values, values
+        grown = 0
+        for tier in self.tiers:
+            if tier.resolution:
+                finished = tier.accumulate(ts, avg, mx)
+                if finished is None:
+                    break
+                ts, avg, mx = finished
+            grown += tier.write(ts, avg, mx)
+        return grown
+
+    def has_raw(self) -> bool:
+        # A series with only a raw tier keeps it: there is nothing to fall back on.
+        return len(self.tiers) > 1 and not self.tiers[0].resolution
+
+    def drop_raw(self) -> int:
+        """
+        Free the raw tier, keeping the bucketed history; returns the
+        bytes freed.
+        """
+        if not self.has_raw():
+            return 0
+        self.downsampled = True
+        return self.tiers.pop(0).nbytes()
+
+    def restore_raw(self, resolution: float, capacity: int) -> int:
+        self.downsampled = False
+        self.tiers.insert(0, _Tier(resolution, capacity))
+        return self.tiers[0].nbytes()
+
+    def nbytes(self) -> int:
+        return sum(t.nbytes() for t in self.tiers)
+
+
+@dataclass
+class SeriesStat:
+    key: SeriesKey
+    label: str
+    value: float
+    points: int
+
+
+class TelemetryStore:
+    """
+    In-memory time series for system-wide and per-process CPU, RSS and
+    IO rates.
+
+    Each series keeps a few ring-buffer tiers of decreasing resolution
+    (raw ticks, 1-minute and 10-minute buckets by default); buckets store
+    the mean and max of what they cover. A query uses the finest tier that
+    still reaches back over the whole window, so recent windows are exact
+    and long ones are answered from downsampled data.
+
+    Tiers grow as points arrive, and `max_bytes` bounds what they have
+    allocated. The system series is always kept. A new process is never
+    turned away. When the store goes over budget, it frees memory in
+    this order:
+
+    1. series idle for `min_idle_seconds` (typically exited processes)
+       are evicted;
+    2. the coldest processes (smallest share of system CPU, RSS and IO)
+       drop their raw tier and keep only bucketed history;
+    3. if that is not enough, the coldest series are evicted, so the
+       hot ones keep their raw points.
+
+    A downsampled process gets its raw tier back once it is clearly
+    hotter than the ones that were downsampled.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 16_000_000,
+        tiers: Sequence[Tuple[float, int]] = DEFAULT_TIERS,
+        cpu_count: Optional[int] = None,
+        min_idle_seconds: float = 60.0,
+    ) -> None:
+        self.tiers = tuple(tiers)
+        self.max_bytes = max_bytes
+        self.cpu_count = cpu_count or psutil.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._series: Dict[SeriesKey, _Series] = {}
+        self.min_idle_seconds = min_idle_seconds
+        self._latest_by_pid: Dict[int, Tuple[int, float]] = {}
+        self._newest = 0.0
+        self._bytes = 0
+        # Per-core totals of the latest snapshot; a process's share of them is its heat.
+        self._totals: Sequence[float] = (0.0,) * len(METRICS)
+        # Heat of the hottest process the last reclaim downsampled or evicted.
+        self._cold_heat = 0.0
+        self.evictions = 0
+        self.downsamples = 0
+
+    # ------------------------------------------------------------------ #
+    # Ingest
+    # ------------------------------------------------------------------ #
+    def record(self, key: SeriesKey, label: str, values: Sequence[float], ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self._newest = max(self._newest, ts)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(label, self.tiers)
+                self._bytes += series.nbytes()
+                if isinstance(key, tuple):
+                    self._latest_by_pid[key[0]] = key
+            elif series.downsampled and self._heat(values) > 2 * self._cold_heat:
+                # Twice the cut-off, so a process near it does not flip every pass.
+                self._bytes += series.restore_raw(*self.tiers[0])
+            self._bytes += series.append(ts, values)
+            if self._bytes > self.max_bytes:
+                self._reclaim()
+
+    def ingest_snapshot(self, snapshot: "ProcessSnapshot", delta: Optional["ScanDelta"] = None) -> None:
+        """
+        ProcessSampler subscriber: record system totals, then every process.
+        System totals go first so a store under memory pressure never has
+        to make room for them.
+        """
+        ts = snapshot.timestamp
+        rows = [(p, (p.cpu_percent, float(p.memory_rss), p.io_read_rate, p.io_write_rate)) for p in snapshot.processes]
+        total = [0.0, 0.0, 0.0, 0.0]
+        for _, values in rows:
+            for m in range(len(METRICS)):
+                total[m] += values[m]
+        total[0] /= self.cpu_count  # per-process % is per core
+        self.record(SYSTEM, SYSTEM, total, ts)
+        self._totals = (total[0] * self.cpu_count, *total[1:])
+        for p, values in rows:
+            self.record((p.pid, p.create_time), p.name, values, ts)
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+    def key_for_pid(self, pid: int) -> Optional[Tuple[int, float]]:
+        with self._lock:
+            return self._latest_by_pid.get(pid)
+
+    def aggregate(self, key: SeriesKey, metric: str, window_seconds: float, stat: str = "avg", now: Optional[float] = None) -> Optional[SeriesStat]:
+        m, use_max = self._check(metric, stat)
+        since = (time.time() if now is None else now) - window_seconds
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return None
+            values = self._window(series, m, since, use_max)
+            label = series.label
+        if not values:
+            return None
+        return SeriesStat(key, label, _reduce(values, stat), len(values))
+
+    def top(self, metric: str, window_seconds: float, stat: str = "avg", n: int = 10, now: Optional[float] = None) -> List[SeriesStat]:
+        """
+        Processes ranked by `stat` of `metric` over the window.
+        """
+        m, use_max = self._check(metric, stat)
+        since = (time.time() if now is None else now) - window_seconds
+        out: List[SeriesStat] = []
+        with self._lock:
+            for key, series in self._series.items():
+                if key == SYSTEM or series.last_update < since:
+                    continue
+                values = self._window(series, m, since, use_max)
+                if values:
+                    out.append(SeriesStat(key, series.label, _reduce(values, stat), len(values)))
+        out.sort(key=lambda s: s.value, reverse=True)
+        return out[:n]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "series": len(self._series),
+                "downsampled": sum(1 for s in self._series.values() if s.downsampled),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "downsamples": self.downsamples,
+            }
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _check(metric: str, stat: str) -> Tuple[int, bool]:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'; expected one of {METRICS}.")
+        if stat not in STATS:
+            raise ValueError(f"Unknown statistic '{stat}'; expected one of {STATS}.")
+        return METRICS.index(metric), stat == "max"
+
+    @staticmethod
+    def _window(series: _Series, metric: int, since: float, use_max: bool) -> List[float]:
+        tiers = [(t, t.oldest()) for t in series.tiers]
+        tiers = [(t, oldest) for t, oldest in tiers if oldest is not None]
+        for i, (tier, oldest) in enumerate(tiers):
+            if oldest <= since:
+                return tier.window(metric, since, use_max)  # covers the window
+            # Otherwise the finest tier that no coarser one reaches a whole
+            # bucket further back than holds all the history there is (a
+            # raw tier given back to a downsampled series does not).
+            if all(o + t.resolution > oldest for t, o in tiers[i + 1:]):
+                return tier.window(metric, since, use_max)
+        return []
+
+    def _heat(self, values: Sequence[float]) -> float:
+        return max((v / t for v, t in zip(values, self._totals) if t > 0), default=0.0)
+
+    def _reclaim(self) -> None:
+        """
+        Free memory down to RECLAIM_TO of the budget (see the class
+        docstring for the order). The system series is never touched.
+        """
+        target = self.max_bytes * RECLAIM_TO
+        processes = [k for k in self._series if k != SYSTEM]
+        idle = [k for k in processes if self._newest - self._series[k].last_update >= self.min_idle_seconds]
+        for key in sorted(idle, key=lambda k: self._series[k].last_update):
+            if self._bytes <= target:
+                return
+            self._evict(key)
+        if self._bytes <= target:
+            return
+        # Hottest first: every process keeps its buckets while they fit,
+        # then raw tiers go to the hottest with what is left.
+        live = sorted((k for k in processes if k in self._series), key=lambda k: self._heat(self._series[k].last), reverse=True)
+        raw = {k: self._series[k].tiers[0].nbytes() if self._series[k].has_raw() else 0 for k in live}
+        left = target - (self._bytes - sum(self._series[k].nbytes() for k in live))
+        self._cold_heat = 0.0
+        kept = []
+        for key in live:
+            buckets = self._series[key].nbytes() - raw[key]
+            if buckets <= left:
+                left -= buckets
+                kept.append(key)
+            else:
+                self._cold_heat = max(self._cold_heat, self._heat(self._series[key].last))
+                self._evict(key)
+        for key in kept:
+            if raw[key] <= left:
+                left -= raw[key]
+            elif raw[key]:
+                series = self._series[key]
+                self._cold_heat = max(self._cold_heat, self._heat(series.last))
+                self._bytes -= series.drop_raw()
+                self.downsamples += 1
+
+    def _evict(self, key: SeriesKey) -> None:
+        self._bytes -= self._series.pop(key).nbytes()
+        if isinstance(key, tuple) and self._latest_by_pid.get(key[0]) == key:
+            del self._latest_by_pid[key[0]]
+        self.evictions += 1
+
+
+def _reduce(values: List[float], stat: str) -> float:
+    if stat == "avg":
+        return sum(values) / len(values)
+    if stat == "min":
+        return min(values)
+    if stat == "max":
+        return max(values)
+    if stat == "last":
+        return values[-1]
+    ordered = sorted(values)
+    q = 0.5 if stat == "p50" else 0.95
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
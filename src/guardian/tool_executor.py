@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from .confirmations import ConfirmationBroker, ConfirmationTicket
+from .instrumentation import Trace, metrics
+from .policy_engine import ToolDecision
+from .recorder import recorder
+from .tools import execute_tool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolOutcome:
+    tool: str
+    args: Dict[str, Any]
+    # ok | denied | timeout | error | cancelled
+    status: str
+    message: str
+    elapsed: float = 0.0
+    confirmed_by: Optional[str] = None
+
+
+class ToolBatch:
+    """
+    The tool calls from one Omni reply. Outcomes are delivered to
+    `on_outcome` strictly in the order the calls were made, each as soon
+    as it and every call before it have finished.
+    """
+
+    def __init__(self, size: int, on_outcome: Callable[[int, ToolOutcome], None]) -> None:
+        self._on_outcome = on_outcome
+        self._outcomes: List[Optional[ToolOutcome]] = [None] * size
+        self._next = 0
+        self._lock = threading.Lock()
+        self._deliver_lock = threading.Lock()
+        self._done = threading.Event()
+        self._futures: List[Future] = []
+        self._tickets: List[ConfirmationTicket] = []
+        # Voice-command trace the calls belong to (None if not instrumented).
+        self.trace: Optional[Trace] = None
+        if size == 0:
+            self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def outcomes(self) -> List[Optional[ToolOutcome]]:
+        with self._lock:
+            return list(self._outcomes)
+
+    def tickets(self) -> List[ConfirmationTicket]:
+        """
+        Confirmation tickets opened for this batch, in call order.
+        """
+        return list(self._tickets)
+
+    def cancel(self) -> None:
+        """
+        Cancel calls that have not started; running calls finish (or time
+        out) on their own.
+        """
+        for fut in self._futures:
+            fut.cancel()
+
+    def _settle(self, index: int, outcome: ToolOutcome) -> None:
+        with self._lock:
+            if self._outcomes[index] is not None:
+                return  # already timed out / cancelled
+            self._outcomes[index] = outcome
+        self._deliver()
+
+    def _deliver(self) -> None:
+        # One thread at a time walks the ready prefix, keeping callbacks ordered.
+        with self._deliver_lock:
+            while True:
+                with self._lock:
+                    if self._next >= len(self._outcomes) or self._outcomes[self._next] is None:
+                        break
+                    index = self._next
+                    outcome = self._outcomes[index]
+                    self._next += 1
+                try:
+                    self._on_outcome(index, outcome)
+                except Exception as e:
+                    logger.exception("Error in tool outcome handler: %s", e)
+            with self._lock:
+                if self._next >= len(self._outcomes):
+                    self._done.set()
+
+
+class ToolExecutor:
+    """
+    Runs tool calls on a bounded worker pool.
+
+    - Calls that need confirmation open a ticket with the
+      ConfirmationBroker and are only queued once it is allowed; a denied
+      or expired ticket yields a "denied" outcome without using a worker.
+    - Each call has a deadline (`timeouts_by_tool`, falling back to
+      `default_timeout`), counted from when a worker starts it. A call
+      still waiting for a worker after that long is cancelled and never
+      runs. Python threads cannot be killed, so a running call that
+      overruns is reported as "timeout" (saying it may still finish) and
+      its worker is left to finish in the background.
+    - run() returns immediately with a ToolBatch; outcomes arrive in call
+      order via the callback.
+    """
+
+    def __init__(
+        self,
+        broker: ConfirmationBroker,
+        pool_size: int = 4,
+        default_timeout: float = 20.0,
+        timeouts_by_tool: Optional[Dict[str, float]] = None,
+        execute: Callable[[str, Dict[str, Any]], str] = execute_tool,
+    ) -> None:
+        self.broker = broker
+        self.default_timeout = default_timeout
+        self.timeouts_by_tool = dict(timeouts_by_tool or {})
+        self._execute = execute
+        self._pool = ThreadPoolExecutor(max_workers=max(1, pool_size), thread_name_prefix="tool")
+        self._lock = threading.Lock()
+        self._batches: List[ToolBatch] = []
+        self._stats = {"ok": 0, "denied": 0, "timeout": 0, "error": 0, "cancelled": 0}
+        self._closed = False
+
+    def run(
+        self,
+        decisions: List[ToolDecision],
+        on_outcome: Callable[[int, ToolOutcome], None],
+        on_ticket: Optional[Callable[[ConfirmationTicket], None]] = None,
+        on_confirmed: Optional[Callable[[ConfirmationTicket], None]] = None,
+    ) -> ToolBatch:
+        """
+        Start every call in `decisions`. `on_ticket` is told about each
+        confirmation that was opened and `on_confirmed` about each answer.
+        """
+        batch = ToolBatch(len(decisions), lambda i, o: self._finish(batch, i, o, on_outcome))
+        batch.trace = metrics.current()
+        with self._lock:
+            self._batches.append(batch)
+        for index, decision in enumerate(decisions):
+            if self._closed:
+                batch._settle(index, ToolOutcome(decision.tool, decision.args, "cancelled", "Shutting down."))
+            elif decision.denied:
+                batch._settle(index, ToolOutcome(decision.tool, decision.args, "denied", "Policy does not allow it."))
+            elif decision.requires_confirmation:
+                ticket = self.broker.open(
+                    decision.tool,
+                    decision.args,
+                    prompt=f"Malcolm wants to execute '{decision.tool}'. Allow?",
+                    on_resolved=lambda t, i=index, d=decision: self._on_answer(batch, i, d, t, on_confirmed),
+                )
+                batch._tickets.append(ticket)
+                if on_ticket is not None and not ticket.answered:
+                    on_ticket(ticket)
+            else:
+                self._submit(batch, index, decision)
+        return batch
+
+    def shutdown(self) -> None:
+        self._closed = True
+        with self._lock:
+            batches = list(self._batches)
+        for batch in batches:
+            batch.cancel()
+        self._pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, batches_in_flight=len(self._batches))
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _on_answer(
+        self,
+        batch: ToolBatch,
+        index: int,
+        decision: ToolDecision,
+        ticket: ConfirmationTicket,
+        on_confirmed: Optional[Callable[[ConfirmationTicket], None]],
+    ) -> None:
+        metrics.observe("confirmation_wait", time.monotonic() - ticket.created_at, batch.trace)
+        recorder.record("confirmation", tool=ticket.tool, args=ticket.args, allowed=ticket.allowed, answered_by=ticket.answered_by)
+        if on_confirmed is not None:
+            on_confirmed(ticket)
+        if ticket.allowed and not self._closed:
+            self._submit(batch, index, decision, confirmed_by=ticket.answered_by)
+            return
+        reason = "No answer in time." if ticket.answered_by == "timeout" else "Not allowed."
+        batch._settle(index, ToolOutcome(decision.tool, decision.args, "denied", reason, confirmed_by=ticket.answered_by))
+
+    def _submit(self, batch: ToolBatch, index: int, decision: ToolDecision, confirmed_by: Optional[str] = None) -> None:
+        timeout = self.timeouts_by_tool.get(decision.tool, self.default_timeout)
+        queued = time.monotonic()
+        try:
+            fut = self._pool.submit(self._call, batch, index, decision, timeout, queued, confirmed_by)
+        except RuntimeError:  # pool already shut down
+            batch._settle(index, ToolOutcome(decision.tool, decision.args, "cancelled", "Shutting down."))
+            return
+        batch._futures.append(fut)
+        expired = threading.Event()
+
+        def done(f: Future) -> None:
+            try:
+                outcome = f.result()
+            except CancelledError:
+                if expired.is_set():
+                    outcome = ToolOutcome(
+                        decision.tool, decision.args, "timeout",
+                        f"'{decision.tool}' could not start within {timeout:g} seconds, so it was not run.",
+                        elapsed=time.monotonic() - queued,
+                    )
+                else:
+                    outcome = ToolOutcome(decision.tool, decision.args, "cancelled", "Cancelled.")
+            outcome.confirmed_by = confirmed_by
+            batch._settle(index, outcome)
+
+        fut.add_done_callback(done)
+
+        def unstarted() -> None:
+            # Only a call no worker has picked up can be cancelled; a running
+            # one is watched by its own deadline in _call.
+            expired.set()
+            if fut.cancel():
+                logger.warning("Tool %s waited %.1fs for a worker; not running it.", decision.tool, timeout)
+
+        timer = threading.Timer(timeout, unstarted)
+        timer.daemon = True
+        timer.start()
+        fut.add_done_callback(lambda _: timer.cancel())
+
+    def _call(
+        self,
+        batch: ToolBatch,
+        index: int,
+        decision: ToolDecision,
+        timeout: float,
+        queued: float,
+        confirmed_by: Optional[str],
+    ) -> ToolOutcome:
+        started = time.monotonic()
+        metrics.observe("tool_queue_wait", started - queued, batch.trace)
+
+        def overran() -> None:
+            logger.warning("Tool %s did not finish within %.1fs.", decision.tool, timeout)
+            batch._settle(index, ToolOutcome(
+                decision.tool, decision.args, "timeout",
+                f"'{decision.tool}' is taking longer than {timeout:g} seconds; it may still finish.",
+                elapsed=time.monotonic() - queued, confirmed_by=confirmed_by,
+            ))
+
+        timer = threading.Timer(timeout, overran)
+        timer.daemon = True
+        timer.start()
+        try:
+            with metrics.activate(batch.trace), metrics.stage(f"tool:{decision.tool}"):
+                message = self._execute(decision.tool, decision.args)
+            status = "ok"
+        except Exception as e:
+            logger.exception("Tool %s failed: %s", decision.tool, e)
+            message, status = f"'{decision.tool}' failed: {e}", "error"
+        finally:
+            timer.cancel()
+        return ToolOutcome(decision.tool, decision.args, status, message, elapsed=time.monotonic() - queued)
+
+    def _finish(self, batch: ToolBatch, index: int, outcome: ToolOutcome, on_outcome: Callable[[int, ToolOutcome], None]) -> None:
+        recorder.record("tool", tool=outcome.tool, args=outcome.args, status=outcome.status,
+                        message=outcome.message, elapsed=outcome.elapsed)
+        with self._lock:
+            self._stats[outcome.status] += 1
+            if index == len(batch._outcomes) - 1 and batch in self._batches:
+                self._batches.remove(batch)
+        with metrics.activate(batch.trace):  # so a spoken result joins the trace
+            on_outcome(index, outcome)
@@ -1,13 +1,96 @@
 from __future__ import annotations
 
 import logging
-import psutil
 import ctypes
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from .instrumentation import metrics
+from .process_sampler import ProcessSampler
+from .telemetry import SYSTEM, TelemetryStore
+from .utils.lazy_imports import lazy_import
+
+psutil = lazy_import("psutil")
 
 logger = logging.getLogger(__name__)
 
+# Shared background sampler; when set, process tools read its latest
+# snapshot instead of walking the process table themselves.
+_sampler: Optional[ProcessSampler] = None
+
+_telemetry: Optional[TelemetryStore] = None
+
+def set_process_sampler(sampler: Optional[ProcessSampler]) -> None:
+    global _sampler
+    _sampler = sampler
+
+def set_telemetry_store(store: Optional[TelemetryStore]) -> None:
+    global _telemetry
+    _telemetry = store
+
+_METRIC_NAMES = {"cpu": "CPU", "rss": "memory", "io_read": "disk reads", "io_write": "disk writes"}
+_STAT_NAMES = {"avg": "average", "min": "minimum", "max": "peak", "p50": "median", "p95": "95th percentile", "last": "latest"}
+
+def _format_metric(metric: str, value: float) -> str:
+    if metric == "cpu":
+        return f"{value:.1f}%"
+    if metric == "rss":
+        return f"{value / 1_048_576:.0f} MB"
+    return f"{value / 1024:.0f} KB/s"
+
+def _window_phrase(minutes: float) -> str:
+    if minutes >= 60 and minutes % 60 == 0:
+        hours = int(minutes // 60)
+        return "the last hour" if hours == 1 else f"the last {hours} hours"
+    return "the last minute" if minutes == 1 else f"the last {minutes:g} minutes"
+
+def process_trend(pid: int, metric: str = "cpu", window_minutes: float = 5, stat: str = "avg") -> str:
+    if _telemetry is None:
+        return "I'm not keeping any history of process activity."
+    key = _telemetry.key_for_pid(pid)
+    result = _telemetry.aggregate(key, metric, window_minutes * 60, stat) if key else None
+    if result is None:
+        return f"I have no recent history for PID {pid}."
+    return (
+        f"PID {pid} {result.label}: {_STAT_NAMES[stat]} {_METRIC_NAMES[metric]} over "
+        f"{_window_phrase(window_minutes)} was {_format_metric(metric, result.value)}."
+    )
+
+def system_trend(metric: str = "cpu", window_minutes: float = 5, stat: str = "avg") -> str:
+    if _telemetry is None:
+        return "I'm not keeping any history of system activity."
+    result = _telemetry.aggregate(SYSTEM, metric, window_minutes * 60, stat)
+    if result is None:
+        return "I don't have any system history yet."
+    return (
+        f"System {_STAT_NAMES[stat]} {_METRIC_NAMES[metric]} over {_window_phrase(window_minutes)} "
+        f"was {_format_metric(metric, result.value)}."
+    )
+
+def top_processes_over_window(metric: str = "cpu", window_minutes: float = 60, stat: str = "avg", limit: int = 10) -> str:
+    if _telemetry is None:
+        return "I'm not keeping any history of process activity."
+    ranked = _telemetry.top(metric, window_minutes * 60, stat, limit)
+    if not ranked:
+        return "I don't have any process history for that period yet."
+    lines = [f"PID {r.key[0]} {r.label} – {_format_metric(metric, r.value)}" for r in ranked]
+    return (
+        f"Top processes by {_STAT_NAMES[stat]} {_METRIC_NAMES[metric]} over {_window_phrase(window_minutes)}:\n"
+        + "\n".join(lines)
+    )
+
 def describe_top_processes(limit: int = 5) -> str:
+    snapshot = _sampler.snapshot() if _sampler is not None else None
+    if snapshot is not None and snapshot.tick >= 2:
+        lines = [
+            f"PID {p.pid} {p.name} – CPU {p.cpu_percent:.1f}%"
+            for p in snapshot.top_n(limit)
+        ]
+        if not lines:
+            return "I couldn't read any process information."
+        summary = "Top processes by CPU usage:\n" + "\n".join(lines)
+        logger.info(summary)
+        return summary
+
     procs: List[psutil.Process] = []
     for p in psutil.process_iter(attrs=["pid", "name", "cpu_percent"]):
         try:
@@ -60,6 +143,25 @@ def lock_workstation() -> str:
         logger.exception("Failed to lock workstation: %s", e)
         return f"I couldn't lock the workstation: {e}"
 
+def latency_report(traces: int = 3) -> str:
+    """
+    Where recent voice commands spent their time, per stage.
+    """
+    if not metrics.enabled:
+        return "Latency instrumentation is turned off."
+    summary = metrics.summary()
+    if not summary:
+        return "I haven't timed any commands yet."
+    slowest = sorted(summary.items(), key=lambda kv: kv[1]["p95_ms"], reverse=True)
+    lines = [
+        f"{name}: median {s['p50_ms']:.0f} ms, 95th percentile {s['p95_ms']:.0f} ms over {s['count']} runs"
+        for name, s in slowest
+    ]
+    recent = metrics.recent(traces)
+    if recent:
+        lines.append("Recent commands: " + "; ".join(t.describe() for t in reversed(recent)))
+    return "Latency by stage, slowest first. " + ". ".join(lines) + "."
+
 def execute_tool(tool: str, args: Dict[str, Any]) -> str:
     """Dispatch a tool call and return a human-readable summary."""
     logger.info("Executing tool: %s with args %s", tool, args)
@@ -69,6 +171,31 @@ def execute_tool(tool: str, args: Dict[str, Any]) -> str:
         return kill_process(pid=int(args["pid"]))
     if tool == "lock_workstation":
         return lock_workstation()
+    if tool in ("process_trend", "system_trend", "top_processes_over_window"):
+        try:
+            if tool == "process_trend":
+                return process_trend(
+                    pid=int(args["pid"]),
+                    metric=args.get("metric", "cpu"),
+                    window_minutes=float(args.get("window_minutes", 5)),
+                    stat=args.get("stat", "avg"),
+                )
+            if tool == "system_trend":
+                return system_trend(
+                    metric=args.get("metric", "cpu"),
+                    window_minutes=float(args.get("window_minutes", 5)),
+                    stat=args.get("stat", "avg"),
+                )
+            return top_processes_over_window(
+                metric=args.get("metric", "cpu"),
+                window_minutes=float(args.get("window_minutes", 60)),
+                stat=args.get("stat", "avg"),
+                limit=int(args.get("limit", 10)),
+            )
+        except ValueError as e:
+            return f"I couldn't answer that: {e}"
+    if tool == "latency_report":
+        return latency_report(traces=int(args.get("traces", 3)))
     if tool == "enter_quiet_mode":
         return "Entering quiet mode."
     if tool == "exit_quiet_mode":
@@ -1,91 +1,129 @@
 import logging
 import threading
-from queue import Queue, Empty
-from typing import Optional
+import time
+from typing import Any, Dict, Iterable, Optional
 
-import pyttsx3
+from .instrumentation import metrics
+from .speech_queue import Priority, Utterance, UtteranceScheduler
+from .tts_backends import AudioSink, PhraseCache, Pyttsx3Backend, TTSBackend, VoiceSettings
 
 logger = logging.getLogger(__name__)
 
 
 class TTSVoice:
     """
-    Robust, per-utterance TTS wrapper around pyttsx3.
-
-    - Uses a single worker thread and a queue.
-    - For each queued text, the worker creates a *fresh* pyttsx3 engine,
-      speaks the text, then disposes it.
-    - Guarantees only one runAndWait() at a time, avoiding both:
-        * 'run loop already started'
-        * long-lived engine getting stuck forever
+    Queued TTS front-end.
+
+    - Uses a single worker thread fed by a priority scheduler, so only
+      one utterance is spoken at a time and user replies go before
+      confirmations, which go before security notes. Utterances can carry
+      an expiry, a replacement key, and may interrupt a lower-priority
+      utterance that is currently being spoken.
+    - Speech is produced by a pluggable TTSBackend (by default a
+      long-lived, health-checked pyttsx3 engine that is recreated only if
+      it hangs).
+    - With a PhraseCache and an AudioSink, fixed and frequent phrases are
+      played from pre-rendered WAV files instead of being synthesised.
     """
 
-    def __init__(self, rate: int = 180, volume: float = 1.0, voice_name: Optional[str] = None) -> None:
-        self.rate = rate
-        self.volume = volume
-        self.voice_name = voice_name
-
-        self._queue: "Queue[Optional[str]]" = Queue()
+    def __init__(
+        self,
+        rate: int = 180,
+        volume: float = 1.0,
+        voice_name: Optional[str] = None,
+        backend: Optional[TTSBackend] = None,
+        phrase_cache: Optional[PhraseCache] = None,
+        sink: Optional[AudioSink] = None,
+        prerender_phrases: Iterable[str] = (),
+        max_backlog: int = 20,
+        drop_policy: str = "drop_lowest",
+    ) -> None:
+        self.settings = VoiceSettings(rate=rate, volume=volume, voice_name=voice_name)
+        self.backend = backend or Pyttsx3Backend(rate=rate, volume=volume, voice_name=voice_name)
+        # Cached audio is only useful if we have a way to play it.
+        self.phrase_cache = phrase_cache if sink is not None else None
+        self.sink = sink
+        self._prerender_phrases = list(prerender_phrases)
+
+        self._queue = UtteranceScheduler(max_backlog=max_backlog, drop_policy=drop_policy)
+        self._current: Optional[Utterance] = None
+        # An interrupting utterance queued while nothing was current; the
+        # worker checks it as it takes the next utterance.
+        self._interrupt_pending: Optional[Utterance] = None
+        self._current_lock = threading.Lock()
         self._running = True
         self._worker = threading.Thread(target=self._loop, daemon=True)
         self._worker.start()
 
-        logger.info("TTSVoice initialised (per-utterance queued mode).")
+        logger.info(
+            "TTSVoice initialised (backend=%s, phrase_cache=%s).",
+            self.backend.name, self.phrase_cache is not None,
+        )
 
     # ------------------------------------------------------------------ #
     # Worker loop
     # ------------------------------------------------------------------ #
     def _loop(self) -> None:
+        if self.phrase_cache is not None and self._prerender_phrases:
+            self.phrase_cache.prerender(self.backend, self._prerender_phrases)
+
         while self._running:
-            try:
-                text = self._queue.get(timeout=0.5)
-            except Empty:
+            utt = self._queue.get(timeout=0.5)
+            if utt is None:
                 continue
 
-            if text is None:
-                # Shutdown signal
-                break
+            with self._current_lock:
+                utt.taken = True
+                pending, self._interrupt_pending = self._interrupt_pending, None
+                preempted = (
+                    pending is not None and not pending.taken and utt.priority > pending.priority
+                    and (pending.expires_at is None or pending.expires_at > time.monotonic())
+                )
+                if not preempted:
+                    self._current = utt
+            if preempted:
+                # Taken off the queue just before a more urgent reply arrived.
+                logger.info("Skipping lower-priority speech: %s", utt.text)
+                self._queue.record_interrupted(utt)
+                continue
+            metrics.observe("tts_queue_wait", time.monotonic() - utt.enqueued_at, utt.trace)
+            metrics.first_audio(utt.trace)
+            try:
+                with metrics.activate(utt.trace), metrics.stage("tts_speak"):
+                    self._speak_once(utt.text)
+            finally:
+                with self._current_lock:
+                    self._current = None
 
-            self._speak_once(text)
+        self.backend.close()
 
     def _speak_once(self, text: str) -> None:
         """
-        Create a fresh engine, speak the text, then dispose it.
+        Play the text from the phrase cache if possible, otherwise speak
+        it through the backend.
         """
         try:
-            logger.info("pyttsx3 engine BEGIN speaking text: %s", text)
-            engine = pyttsx3.init()
-
-            # Base properties
-            try:
-                engine.setProperty("rate", self.rate)
-            except Exception as e:
-                logger.warning("Could not set TTS rate: %s", e)
-
-            try:
-                engine.setProperty("volume", self.volume)
-            except Exception as e:
-                logger.warning("Could not set TTS volume: %s", e)
-
-            # Optional voice selection
-            if self.voice_name:
-                try:
-                    voices = engine.getProperty("voices")
-                    for v in voices:
-                        if self.voice_name.lower() in v.name.lower():
-                            engine.setProperty("voice", v.id)
-                            break
-                except Exception as e:
-                    logger.warning("Could not set custom voice '%s': %s", self.voice_name, e)
-
-            engine.say(text)
-            engine.runAndWait()
-            logger.info("pyttsx3 engine FINISHED speaking.")
-
-            try:
-                engine.stop()
-            except Exception:
-                pass
+            logger.info("TTS BEGIN speaking text: %s", text)
+            cache = self.phrase_cache
+            if cache is not None:
+                cached = cache.lookup(text, self.backend)
+                if cached is not None:
+                    self.sink.play(cached)
+                    logger.info("TTS FINISHED (cached audio).")
+                    return
+                prefix_wav, rest = cache.split_prefix(text, self.backend)
+                if prefix_wav is not None:
+                    self.sink.play(prefix_wav)
+                    if rest:
+                        self.backend.speak(rest)
+                    logger.info("TTS FINISHED (cached prefix).")
+                    return
+
+            self.backend.speak(text)
+            logger.info("TTS FINISHED speaking.")
+
+            if cache is not None:
+                cache.note_spoken(text, self.backend)
 
         except Exception as e:
             logger.exception("TTS error while speaking: %s", e)
@@ -93,14 +131,78 @@ class TTSVoice:
     # ------------------------------------------------------------------ #
     # Public API used by guardian
     # ------------------------------------------------------------------ #
-    def speak(self, text: str) -> None:
+    def speak(
+        self,
+        text: str,
+        priority: Priority = Priority.USER_REPLY,
+        key: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        interrupt: Optional[bool] = None,
+    ) -> bool:
         """
         Enqueue text to be spoken by the worker thread.
+
+        `interrupt` defaults to True for user replies: if a lower-priority
+        utterance is being spoken it is cut off. Returns False if the
+        utterance was dropped because the backlog is full.
         """
         if not text or not text.strip():
+            return False
+        if interrupt is None:
+            interrupt = priority == Priority.USER_REPLY
+        utt = Utterance(
+            text=text,
+            priority=priority,
+            key=key,
+            expires_at=time.monotonic() + ttl_seconds if ttl_seconds else None,
+            interrupt=interrupt,
+            trace=metrics.current(),
+        )
+        logger.info("TTS speaking (%s): %s", priority.name.lower(), text)
+        if not self._queue.put(utt):
+            return False
+
+        if interrupt:
+            self._interrupt(utt)
+        return True
+
+    def _interrupt(self, utt: Utterance) -> None:
+        # Stops run under the lock the worker takes to change _current, so
+        # they can only cut off the utterance checked here, never the next one.
+        with self._current_lock:
+            if utt.taken:
+                return  # the worker already got to it
+            current = self._current
+            if current is None:
+                pending = self._interrupt_pending
+                if pending is None or pending.taken or utt.priority < pending.priority:
+                    self._interrupt_pending = utt
+                return
+            if current.priority <= utt.priority:
+                return
+            logger.info("Interrupting lower-priority speech: %s", current.text)
+            self._queue.record_interrupted(current)
+            self.backend.stop()
+            if self.sink is not None:
+                self.sink.stop()
+
+    def reconfigure(self, settings: VoiceSettings) -> None:
+        """
+        Change rate, volume or voice without restarting; the utterance
+        being spoken finishes with the old settings.
+        """
+        if settings == self.settings:
             return
-        logger.info("TTS speaking: %s", text)
-        self._queue.put(text)
+        self.settings = settings
+        self.backend.reconfigure(settings)
+        logger.info("TTSVoice reconfigured (rate=%s, volume=%s, voice=%s).",
+                    settings.rate, settings.volume, settings.voice_name or "default")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-priority queue depth, drop/expiry counters and wait times.
+        """
+        return self._queue.stats()
 
     def shutdown(self) -> None:
         """
@@ -108,5 +210,6 @@ class TTSVoice:
         """
         logger.info("TTSVoice shutdown requested.")
         self._running = False
-        self._queue.put(None)
+        self._queue.close()
+        logger.info("TTSVoice queue stats: %s", self._queue.stats())
         logger.info("TTSVoice shut down.")
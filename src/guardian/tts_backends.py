@@ -0,0 +1,484 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from queue import Queue
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .instrumentation import metrics
+from .utils.lazy_imports import lazy_import
+
+pyttsx3 = lazy_import("pyttsx3")
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------- #
+# Backends
+# ---------------------------------------------------------------------- #
+@dataclass(frozen=True)
+class VoiceSettings:
+    rate: int = 180
+    volume: float = 1.0
+    voice_name: Optional[str] = None
+
+    @property
+    def voice_key(self) -> str:
+        return self.voice_name or "default"
+
+
+class TTSBackend:
+    """
+    Something that can turn text into sound.
+
+    speak() blocks until the utterance has finished (or failed). stop()
+    may be called from another thread to cut the current utterance short.
+    render_to_file() is optional and used by the phrase cache.
+    warm_up() does any slow set-up ahead of the first utterance.
+    reconfigure() changes rate, volume and voice where the backend can.
+    """
+
+    name = "base"
+    voice_key = "default"
+    rate: Any = None
+
+    def speak(self, text: str) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        pass
+
+    def render_to_file(self, text: str, path: Path) -> bool:
+        return False
+
+    def warm_up(self) -> None:
+        pass
+
+    def reconfigure(self, settings: VoiceSettings) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class _Job:
+    def __init__(self, fn: Callable[[Any], Any]) -> None:
+        self.fn = fn
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class _EngineRunner:
+    """
+    A thread that owns one engine instance.
+
+    Engines such as pyttsx3's SAPI5 driver are tied to the thread that
+    created them, so every call goes through this thread's job queue.
+    If a job does not finish in time the whole runner is abandoned
+    (it is a daemon thread) and a new one is created on next use.
+    """
+
+    def __init__(self, factory: Callable[[], Any], configure: Callable[[Any], None]) -> None:
+        self.engine: Any = None
+        self.error: Optional[BaseException] = None
+        self._factory = factory
+        self._configure = configure
+        self._jobs: "Queue[Optional[_Job]]" = Queue()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def wait_ready(self, timeout: float) -> bool:
+        return self._ready.wait(timeout) and self.error is None
+
+    def run(self, fn: Callable[[Any], Any], timeout: float) -> bool:
+        """
+        Run fn(engine) on the runner thread. Returns False on timeout;
+        re-raises errors raised by fn.
+        """
+        job = _Job(fn)
+        self._jobs.put(job)
+        if not job.done.wait(timeout):
+            return False
+        if job.error is not None:
+            raise job.error
+        return True
+
+    def submit(self, fn: Callable[[Any], Any]) -> None:
+        """
+        Queue fn(engine) without waiting; it runs after the jobs before it.
+        """
+        self._jobs.put(_Job(fn))
+
+    def close(self) -> None:
+        self._jobs.put(None)
+
+    def _loop(self) -> None:
+        try:
+            self.engine = self._factory()
+            self._configure(self.engine)
+        except Exception as e:
+            self.error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            try:
+                job.fn(self.engine)
+            except Exception as e:
+                job.error = e
+            job.done.set()
+
+        try:
+            self.engine.stop()
+        except Exception:
+            pass
+
+
+def _new_pyttsx3_engine() -> Any:
+    return pyttsx3.Engine()
+
+
+class Pyttsx3Backend(TTSBackend):
+    """
+    Long-lived pyttsx3 engine.
+
+    - The engine is created once and reused; rate, volume and voice are
+      applied at creation time and again, between utterances, when
+      reconfigure() is called.
+    - The voice id matching `voice_name` is resolved once per name and
+      cached, so re-creating the engine does not repeat the linear voice
+      search.
+    - Each utterance has a deadline proportional to its length. If
+      runAndWait() overruns it, the engine is considered hung and is
+      replaced before the next utterance.
+    - After `idle_probe_seconds` without use, the engine is health-checked
+      (healthy()) before it is given the next utterance, and replaced if
+      the probe fails, so a driver that died while idle costs a short
+      probe rather than a full hang timeout.
+
+    `engine_factory` defaults to a new pyttsx3.Engine and can be swapped
+    for a fake engine in tests and benchmarks. pyttsx3.init() is not
+    used: it hands back the engine cached in pyttsx3._activeEngines, so
+    a "replacement" would be the same hung engine, driven from another
+    thread.
+    """
+
+    name = "pyttsx3"
+
+    def __init__(
+        self,
+        rate: int = 180,
+        volume: float = 1.0,
+        voice_name: Optional[str] = None,
+        engine_factory: Optional[Callable[[], Any]] = None,
+        hang_timeout_seconds: float = 10.0,
+        chars_per_second: float = 8.0,
+        idle_probe_seconds: float = 60.0,
+        probe_timeout_seconds: float = 2.0,
+    ) -> None:
+        self.settings = VoiceSettings(rate=rate, volume=volume, voice_name=voice_name)
+        self.hang_timeout_seconds = hang_timeout_seconds
+        self.chars_per_second = chars_per_second
+        self.idle_probe_seconds = idle_probe_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self._last_used = 0.0
+        self._factory = engine_factory or _new_pyttsx3_engine
+        self._voice_ids: Dict[str, Optional[str]] = {}
+        self._runner: Optional[_EngineRunner] = None
+        self._lock = threading.Lock()
+        self.restarts = 0
+
+    @property
+    def rate(self) -> int:  # type: ignore[override]
+        return self.settings.rate
+
+    @property
+    def voice_key(self) -> str:  # type: ignore[override]
+        return self.settings.voice_key
+
+    def speak(self, text: str) -> None:
+        def say(engine: Any) -> None:
+            engine.say(text)
+            engine.runAndWait()
+
+        self._run(say, self.hang_timeout_seconds + len(text) / self.chars_per_second, what="speaking")
+
+    def render_to_file(self, text: str, path: Path) -> bool:
+        def save(engine: Any) -> None:
+            engine.save_to_file(text, str(path))
+            engine.runAndWait()
+
+        self._run(save, self.hang_timeout_seconds + len(text) / self.chars_per_second, what="rendering")
+        return path.exists() and path.stat().st_size > 0
+
+    def stop(self) -> None:
+        runner = self._runner
+        if runner is not None and runner.engine is not None:
+            try:
+                # pyttsx3 allows stop() from another thread to end runAndWait().
+                runner.engine.stop()
+            except Exception as e:
+                logger.debug("TTS engine stop failed: %s", e)
+
+    def warm_up(self) -> None:
+        self._ensure_runner()
+
+    def reconfigure(self, settings: VoiceSettings) -> None:
+        """
+        Use new voice settings. A running engine picks them up after the
+        utterance it is speaking; otherwise they apply when it is created.
+        """
+        if settings == self.settings:
+            return
+        self.settings = settings
+        runner = self._runner
+        if runner is not None:
+            runner.submit(self._configure)
+
+    def healthy(self, timeout: float = 2.0) -> bool:
+        """
+        Cheap liveness probe: a property read must come back promptly.
+        An engine that fails it is discarded, so the next use starts a
+        fresh one.
+        """
+        try:
+            runner = self._ensure_runner()
+        except Exception:
+            return False
+        try:
+            ok = runner.run(lambda engine: engine.getProperty("rate"), timeout)
+        except Exception:
+            ok = False
+        if not ok:
+            logger.warning("TTS engine failed its health check; it will be recreated.")
+            self._discard(runner)
+        return ok
+
+    def close(self) -> None:
+        with self._lock:
+            if self._runner is not None:
+                self._runner.close()
+                self._runner = None
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+    def _run(self, fn: Callable[[Any], Any], timeout: float, what: str) -> None:
+        if (self.idle_probe_seconds > 0 and self._runner is not None
+                and time.monotonic() - self._last_used > self.idle_probe_seconds):
+            self.healthy(self.probe_timeout_seconds)
+        runner = self._ensure_runner()
+        try:
+            finished = runner.run(fn, timeout)
+        except Exception:
+            # A failing engine is as bad as a hung one; start fresh next time.
+            self._discard(runner)
+            raise
+        finally:
+            self._last_used = time.monotonic()
+        if not finished:
+            logger.warning("TTS engine hung while %s (>%.1fs); it will be recreated.", what, timeout)
+            self._discard(runner)
+
+    def _ensure_runner(self) -> _EngineRunner:
+        with self._lock:
+            if self._runner is None:
+                with metrics.stage("tts_init"):
+                    runner = _EngineRunner(self._factory, self._configure)
+                    ready = runner.wait_ready(self.hang_timeout_seconds)
+                if not ready:
+                    raise RuntimeError(f"Could not initialise TTS engine: {runner.error or 'timed out'}")
+                self._runner = runner
+                logger.info("TTS engine initialised (%s).", self.name)
+            return self._runner
+
+    def _discard(self, runner: _EngineRunner) -> None:
+        with self._lock:
+            if self._runner is runner:
+                self._runner = None
+                self.restarts += 1
+        runner.close()
+
+    def _configure(self, engine: Any) -> None:
+        settings = self.settings
+        try:
+            engine.setProperty("rate", settings.rate)
+        except Exception as e:
+            logger.warning("Could not set TTS rate: %s", e)
+
+        try:
+            engine.setProperty("volume", settings.volume)
+        except Exception as e:
+            logger.warning("Could not set TTS volume: %s", e)
+
+        voice_name = settings.voice_name
+        if not voice_name:
+            return
+        if voice_name not in self._voice_ids:
+            self._voice_ids[voice_name] = self._resolve_voice(engine, voice_name)
+        voice_id = self._voice_ids[voice_name]
+        if voice_id:
+            try:
+                engine.setProperty("voice", voice_id)
+            except Exception as e:
+                logger.warning("Could not set custom voice '%s': %s", voice_name, e)
+
+    def _resolve_voice(self, engine: Any, voice_name: str) -> Optional[str]:
+        try:
+            for v in engine.getProperty("voices"):
+                if voice_name.lower() in v.name.lower():
+                    return v.id
+        except Exception as e:
+            logger.warning("Could not list TTS voices: %s", e)
+            return None
+        logger.warning("No TTS voice matching '%s'; using the default.", voice_name)
+        return None
+
+
+# ---------------------------------------------------------------------- #
+# Audio sinks (for playing pre-rendered WAV files)
+# ---------------------------------------------------------------------- #
+class AudioSink:
+    def play(self, path: Path) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        pass
+
+
+class WinsoundSink(AudioSink):
+    """
+    Plays WAV files with the Windows built-in winsound module.
+    """
+
+    def __init__(self) -> None:
+        import winsound
+
+        self._winsound = winsound
+
+    def play(self, path: Path) -> None:
+        self._winsound.PlaySound(str(path), self._winsound.SND_FILENAME)
+
+    def stop(self) -> None:
+        self._winsound.PlaySound(None, self._winsound.SND_PURGE)
+
+
+class WavFileSink(AudioSink):
+    """
+    Records what would have been played; optionally copies the files to
+    `output_dir`. Used for headless tests and benchmarks.
+    """
+
+    def __init__(self, output_dir: Optional[Path] = None) -> None:
+        self.output_dir = output_dir
+        self.played: List[Path] = []
+
+    def play(self, path: Path) -> None:
+        self.played.append(path)
+        if self.output_dir is not None:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copy(path, self.output_dir / f"{len(self.played):05d}_{path.name}")
+
+
+def default_sink() -> Optional[AudioSink]:
+    if sys.platform == "win32":
+        try:
+            return WinsoundSink()
+        except ImportError:
+            pass
+    return None
+
+
+# ---------------------------------------------------------------------- #
+# Phrase cache
+# ---------------------------------------------------------------------- #
+class PhraseCache:
+    """
+    Disk cache of rendered WAVs keyed by (text, voice, rate).
+
+    Fixed phrases are rendered up front; any other phrase is rendered
+    once it has been spoken `render_after_uses` times; use counts are
+    kept for the `max_tracked_phrases` most recently spoken phrases.
+    Prefixes such as "Security note:" are cached on their own so the
+    start of a longer, variable message can be played instantly.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        prefixes: Iterable[str] = (),
+        render_after_uses: int = 3,
+        max_phrase_chars: int = 200,
+        max_tracked_phrases: int = 1000,
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.prefixes = tuple(p for p in prefixes if p)
+        self.render_after_uses = render_after_uses
+        self.max_phrase_chars = max_phrase_chars
+        self.max_tracked_phrases = max_tracked_phrases
+        self._uses: "OrderedDict[str, int]" = OrderedDict()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, text: str, backend: TTSBackend) -> Path:
+        key = f"{text.strip()}\x00{backend.voice_key}\x00{backend.rate}"
+        return self.cache_dir / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".wav")
+
+    def lookup(self, text: str, backend: TTSBackend) -> Optional[Path]:
+        path = self.path_for(text, backend)
+        return path if path.exists() else None
+
+    def split_prefix(self, text: str, backend: TTSBackend) -> Tuple[Optional[Path], str]:
+        """
+        If `text` starts with a cached prefix, return (prefix_wav, remainder).
+        """
+        for prefix in self.prefixes:
+            if text.startswith(prefix):
+                path = self.lookup(prefix, backend)
+                if path is not None:
+                    return path, text[len(prefix):].strip()
+        return None, text
+
+    def prerender(self, backend: TTSBackend, phrases: Iterable[str]) -> None:
+        for phrase in [*phrases, *self.prefixes]:
+            if phrase and self.lookup(phrase, backend) is None:
+                self._render(phrase, backend)
+
+    def note_spoken(self, text: str, backend: TTSBackend) -> None:
+        """
+        Count a live utterance and render it once it has become frequent.
+        """
+        if self.render_after_uses <= 0 or len(text) > self.max_phrase_chars:
+            return
+        uses = self._uses.pop(text, 0) + 1
+        if uses >= self.render_after_uses:
+            # Rendered now, so lookup() finds it from here on.
+            self._render(text, backend)
+            return
+        self._uses[text] = uses
+        if len(self._uses) > self.max_tracked_phrases:
+            self._uses.popitem(last=False)
+
+    def _render(self, text: str, backend: TTSBackend) -> None:
+        path = self.path_for(text, backend)
+        tmp = path.with_suffix(".tmp.wav")
+        try:
+            if backend.render_to_file(text, tmp):
+                tmp.replace(path)
+                logger.info("Cached rendered phrase: %s", text)
+        except Exception as e:
+            logger.warning("Could not render phrase %r: %s", text, e)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
@@ -0,0 +1,107 @@
+import builtins
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+
+_lock = threading.Lock()
+# Module name -> seconds spent importing it (inclusive of what it imports).
+_import_seconds: Dict[str, float] = {}
+_original_import = builtins.__import__
+
+
+class _LazyModule(ModuleType):
+    """
+    Stands in for a module until one of its attributes is read, then
+    imports the real module and forwards every lookup to it (so patches
+    applied to the real module are seen here too).
+    """
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def __getattr__(self, attr: str):
+        module = self._lazy_target
+        if module is None:
+            module = self._lazy_load()
+        return getattr(module, attr)
+
+    def _lazy_load(self) -> ModuleType:
+        started = time.perf_counter()
+        # import_module is thread-safe; the first caller does the work.
+        module = importlib.import_module(self.__name__)
+        with _lock:
+            _import_seconds.setdefault(self.__name__, time.perf_counter() - started)
+        self.__dict__["_lazy_target"] = module
+        return module
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._lazy_target is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str, optional: bool = False) -> Optional[ModuleType]:
+    """
+    `sr = lazy_import("speech_recognition")` instead of `import ... as sr`:
+    the (slow) import happens on first use, not when our module loads.
+
+    A module that is not installed fails here, as a plain import would,
+    unless `optional` is set, in which case None is returned.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        if optional:
+            return None
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return _LazyModule(name)
+
+
+# ---------------------------------------------------------------------- #
+# Import profile
+# ---------------------------------------------------------------------- #
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    full = name
+    if level:
+        # "from .x import y" inside guardian.main -> guardian.x
+        try:
+            full = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__") or "")
+        except (ImportError, ValueError):
+            return _original_import(name, globals, locals, fromlist, level)
+    # "from . import x" loads the submodules named in fromlist.
+    pending = [m for m in ([full] if name else [f"{full}.{item}" for item in fromlist or ()]) if m not in sys.modules]
+    if not pending:
+        return _original_import(name, globals, locals, fromlist, level)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            for module in pending:
+                if module in sys.modules:
+                    _import_seconds.setdefault(module, elapsed)
+
+
+def profile_imports(enabled: bool = True) -> None:
+    """
+    Time every import from now on (not just lazy ones), relative ones
+    included. Call before importing guardian.main to include the
+    guardian's own modules.
+    """
+    builtins.__import__ = _timed_import if enabled else _original_import
+
+
+def import_times(limit: Optional[int] = None) -> List[Tuple[str, float]]:
+    """
+    (module, seconds) slowest first. Times are inclusive, so a package
+    and the modules it pulls in both appear.
+    """
+    with _lock:
+        ranked = sorted(_import_seconds.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:limit] if limit is not None else ranked
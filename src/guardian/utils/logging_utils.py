@@ -1,22 +1,204 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 LOG_FORMAT = "%(asctime)s [%(levelname)s] [%(name)s] %(message)s"
 
-def setup_logging(log_dir: Path) -> None:
+
+class JsonFormatter(logging.Formatter):
+    """
+    One compact JSON object per line: ts, level, logger, thread, msg
+    (plus exc when there is a traceback).
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per-logger token buckets for chatty call sites.
+
+    `limits` maps a logger name (or a dotted prefix, e.g. "guardian.audio_pipeline")
+    to {"per_second": r, "burst": b} and/or {"sample": f}. Each call site
+    (logger name plus message template) gets its own bucket. `sample`
+    keeps roughly that fraction of records, deterministically. WARNING
+    and above always pass. When a site is let through again, the
+    message notes how many records were suppressed.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, float]]) -> None:
+        super().__init__()
+        self.limits = {name: dict(spec) for name, spec in limits.items()}
+        self._resolved: Dict[str, Optional[Dict[str, float]]] = {}
+        self._buckets: Dict[Tuple[str, Any], List[float]] = {}  # [tokens, last_refill, suppressed, seen]
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        decided = getattr(record, "_rate_limited", None)
+        if decided is not None:  # same record seen by another handler
+            return not decided
+        allowed = self._admit(record)
+        record._rate_limited = not allowed
+        return allowed
+
+    def _admit(self, record: logging.LogRecord) -> bool:
+        spec = self._resolved.get(record.name, False)
+        if spec is False:
+            spec = self._resolved[record.name] = self._lookup(record.name)
+        if spec is None:
+            return True
+
+        with self._lock:
+            key = (record.name, record.msg)
+            bucket = self._buckets.get(key)
+            rate = spec.get("per_second")
+            burst = spec.get("burst", max(1.0, rate or 1.0))
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, record.created, 0, 0]
+            bucket[3] += 1
+            allowed = True
+            sample = spec.get("sample")
+            if sample is not None and sample < 1.0:
+                # Keep every (1/sample)-th record of this site.
+                allowed = sample > 0 and int(bucket[3] * sample) != int((bucket[3] - 1) * sample)
+            if allowed and rate is not None:
+                bucket[0] = min(burst, bucket[0] + (record.created - bucket[1]) * rate)
+                bucket[1] = record.created
+                if bucket[0] >= 1.0:
+                    bucket[0] -= 1.0
+                else:
+                    allowed = False
+            if not allowed:
+                bucket[2] += 1
+                self.suppressed += 1
+                return False
+            skipped, bucket[2] = int(bucket[2]), 0
+        if skipped:
+            record.msg = f"{record.msg} [{skipped} similar suppressed]"
+        return True
+
+    def _lookup(self, name: str) -> Optional[Dict[str, float]]:
+        while name:
+            if name in self.limits:
+                return self.limits[name]
+            name = name.rpartition(".")[0]
+        return None
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the logging call: when the queue is
+    full the record is counted and dropped. Only the message is merged
+    on the caller's thread; formatting happens on the listener.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve args now (they may be mutated later), but leave the
+        # expensive formatting to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(
+    log_dir: Path,
+    mode: str = "direct",
+    json_format: bool = False,
+    level: str = "INFO",
+    rate_limits: Optional[Dict[str, Dict[str, float]]] = None,
+    queue_size: int = 10_000,
+    console: bool = True,
+) -> Optional[QueueListener]:
+    """
+    Configure the root logger.
+
+    mode "direct" writes on the calling thread, as before. mode "queue"
+    puts records on a bounded queue that a listener thread drains into
+    the file and console handlers, so a logging call costs the caller
+    roughly one queue put. The listener is returned (and stopped at
+    exit, flushing what is queued).
+    """
     log_dir.mkdir(parents=True, exist_ok=True)
-    log_file = log_dir / "guardian.log"
+    log_file = log_dir / ("guardian.jsonl" if json_format else "guardian.log")
 
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
+    root_logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
 
-    formatter = logging.Formatter(LOG_FORMAT)
+    file_formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT)
 
+    handlers: List[logging.Handler] = []
     file_handler = RotatingFileHandler(log_file, maxBytes=5_000_000, backupCount=3, encoding="utf-8")
-    file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
+    file_handler.setFormatter(file_formatter)
+    handlers.append(file_handler)
+
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(console_handler)
+
+    rate_filter = RateLimitFilter(rate_limits) if rate_limits else None
+
+    if mode != "queue":
+        for handler in handlers:
+            if rate_filter is not None:
+                handler.addFilter(rate_filter)
+            root_logger.addHandler(handler)
+        return None
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    if rate_filter is not None:
+        queue_handler.addFilter(rate_filter)  # drop before anything is queued
+    root_logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
 
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+def stop_logging(listener: Optional[QueueListener], timeout: float = 2.0) -> None:
+    """
+    Stop a queue listener, waiting up to `timeout` for it to drain.
+    """
+    if listener is None:
+        return
+    deadline = time.monotonic() + timeout
+    while not listener.queue.empty() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    atexit.unregister(listener.stop)
+    listener.stop()
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import wave
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .utils.lazy_imports import lazy_import
+
+sr = lazy_import("speech_recognition")
+
+logger = logging.getLogger(__name__)
+
+GATE_RATE = 8000  # Hz; plenty for energy/ZCR features and keeps pure-Python work small
+FRAME_MS = 20
+HOP_MS = 10
+
+
+@dataclass
+class GateDecision:
+    passed: bool
+    reason: str
+    voiced_ms: int = 0
+    score: Optional[float] = None
+
+
+# ---------------------------------------------------------------------- #
+# Feature extraction
+# ---------------------------------------------------------------------- #
+def pcm16(audio: sr.AudioData, rate: int = GATE_RATE) -> array:
+    samples = array("h")
+    samples.frombytes(audio.get_raw_data(convert_rate=rate, convert_width=2))
+    return samples
+
+
+def frame_rms(samples: Sequence[int], rate: int = GATE_RATE) -> List[float]:
+    size = rate * FRAME_MS // 1000
+    hop = rate * HOP_MS // 1000
+    out = []
+    for start in range(0, max(0, len(samples) - size) + 1, hop):
+        frame = samples[start:start + size]
+        out.append(math.sqrt(sum(x * x for x in frame) / size) if frame else 0.0)
+    return out
+
+
+def frame_features(samples: Sequence[int], rate: int = GATE_RATE) -> List[List[float]]:
+    """
+    Per-frame [log energy relative to the clip's loudest frame,
+    zero-crossing rate, high-band to total energy ratio (log)]. None of
+    the three depends on how loud the speaker was.
+    """
+    size = rate * FRAME_MS // 1000
+    hop = rate * HOP_MS // 1000
+    raw: List[Tuple[float, float, float]] = []
+    for start in range(0, max(0, len(samples) - size) + 1, hop):
+        frame = samples[start:start + size]
+        energy = 0.0
+        high = 0.0
+        crossings = 0
+        prev = frame[0]
+        for x in frame[1:]:
+            energy += x * x
+            d = x - prev  # first difference ~ high-pass
+            high += d * d
+            if (x >= 0) != (prev >= 0):
+                crossings += 1
+            prev = x
+        raw.append((math.log1p(energy / size), crossings / size, math.log((high + 1.0) / (energy + 1.0))))
+
+    if not raw:
+        return []
+    loudest = max(r[0] for r in raw)
+    return [[(e - loudest) / 2.0, zcr * 8.0, tilt] for e, zcr, tilt in raw]
+
+
+def trim_quiet(feats: List[List[float]], floor: float = -2.0) -> List[List[float]]:
+    """
+    Drop leading/trailing frames more than ~`floor * 2` log-energy units
+    below the loudest one (enrolment recordings carry some silence).
+    """
+    keep = [i for i, f in enumerate(feats) if f[0] >= floor]
+    return feats[keep[0]:keep[-1] + 1] if keep else []
+
+
+def subsequence_dtw(template: List[List[float]], query: List[List[float]]) -> float:
+    """
+    Best length-normalised DTW distance of `template` against any
+    stretch of `query` (free start and end in the query).
+    """
+    if not template or not query:
+        return math.inf
+    inf = math.inf
+    prev = [0.0] * (len(query) + 1)  # free start: row 0 costs nothing
+    for t in template:
+        cur = [inf] * (len(query) + 1)
+        for j, q in enumerate(query, start=1):
+            cost = abs(t[0] - q[0]) + abs(t[1] - q[1]) + abs(t[2] - q[2])
+            cur[j] = cost + min(prev[j], prev[j - 1], cur[j - 1])
+        prev = cur
+    return min(prev[1:]) / len(template)
+
+
+# ---------------------------------------------------------------------- #
+# Keyword spotters
+# ---------------------------------------------------------------------- #
+class KeywordSpotter:
+    name = "none"
+
+    def spot(self, audio: sr.AudioData) -> Tuple[bool, Optional[float]]:
+        """
+        Return (wake word present?, score). Higher scores are more
+        confident; the score may be None if the spotter has none.
+        """
+        raise NotImplementedError
+
+
+class SphinxKeywordSpotter(KeywordSpotter):
+    """
+    Offline keyword spotting through SpeechRecognition's PocketSphinx
+    binding (keyword_entries mode). Requires the pocketsphinx package.
+    """
+
+    name = "sphinx"
+
+    def __init__(self, recognizer: sr.Recognizer, keyword: str, sensitivity: float = 1e-20) -> None:
+        self.recognizer = recognizer
+        self.keyword = keyword
+        self.sensitivity = sensitivity
+
+    def spot(self, audio: sr.AudioData) -> Tuple[bool, Optional[float]]:
+        try:
+            heard = self.recognizer.recognize_sphinx(audio, keyword_entries=[(self.keyword, self.sensitivity)])
+        except sr.UnknownValueError:
+            return False, None
+        return self.keyword in heard.lower(), None
+
+
+class TemplateKeywordSpotter(KeywordSpotter):
+    """
+    Matches the start of an utterance against a few enrolled recordings
+    of the wake word using subsequence DTW over cheap per-frame features.
+    Entirely local and dependency-free; accuracy depends on enrolling a
+    handful of recordings of the actual speaker(s) and room.
+    """
+
+    name = "template"
+
+    def __init__(self, templates: List[sr.AudioData], threshold: float = 0.8, search_seconds: float = 2.5) -> None:
+        self.threshold = threshold
+        self.search_seconds = search_seconds
+        self._templates = [trim_quiet(frame_features(pcm16(t))) for t in templates]
+        self._templates = [t for t in self._templates if t]
+
+    @classmethod
+    def from_directory(cls, directory: Path, **kwargs) -> Optional["TemplateKeywordSpotter"]:
+        clips = [load_wav(p) for p in sorted(directory.glob("*.wav"))] if directory.is_dir() else []
+        if not clips:
+            return None
+        return cls(clips, **kwargs)
+
+    def spot(self, audio: sr.AudioData) -> Tuple[bool, Optional[float]]:
+        if not self._templates:
+            return True, None
+        head = pcm16(audio)[: int(GATE_RATE * self.search_seconds)]
+        query = frame_features(head)
+        distance = min(subsequence_dtw(t, query) for t in self._templates)
+        return distance <= self.threshold, -distance
+
+
+def load_wav(path: Path) -> sr.AudioData:
+    with wave.open(str(path), "rb") as w:
+        return sr.AudioData(w.readframes(w.getnframes()), w.getframerate(), w.getsampwidth())
+
+
+# ---------------------------------------------------------------------- #
+# Gate
+# ---------------------------------------------------------------------- #
+class WakeWordGate:
+    """
+    Local pre-filter deciding whether a captured phrase is worth sending
+    to cloud STT.
+
+    1. Energy VAD: the phrase must contain at least `min_voiced_ms` of
+       frames louder than both `min_rms` and `voiced_ratio` times the
+       clip's own noise floor.
+    2. Optional keyword spotter: must believe the wake word is present.
+
+    Phrases failing either stage are dropped before any network call.
+    check() may run on several STT workers at once; only the counters
+    are locked.
+    """
+
+    def __init__(
+        self,
+        spotter: Optional[KeywordSpotter] = None,
+        min_rms: float = 300.0,
+        voiced_ratio: float = 2.5,
+        min_voiced_ms: int = 200,
+    ) -> None:
+        self.spotter = spotter
+        self.min_rms = min_rms
+        self.voiced_ratio = voiced_ratio
+        self.min_voiced_ms = min_voiced_ms
+        self._stats = {"checked": 0, "passed": 0, "rejected_silence": 0, "rejected_keyword": 0}
+        self._lock = threading.Lock()
+
+    def check(self, audio: sr.AudioData) -> GateDecision:
+        self._count("checked")
+        rms = frame_rms(pcm16(audio))
+        voiced_ms = self._voiced_ms(rms)
+        if voiced_ms < self.min_voiced_ms:
+            self._count("rejected_silence")
+            return GateDecision(False, "no speech", voiced_ms)
+
+        if self.spotter is not None:
+            found, score = self.spotter.spot(audio)
+            if not found:
+                self._count("rejected_keyword")
+                return GateDecision(False, "no wake word", voiced_ms, score)
+            self._count("passed")
+            return GateDecision(True, "wake word", voiced_ms, score)
+
+        self._count("passed")
+        return GateDecision(True, "speech", voiced_ms)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _voiced_ms(self, rms: List[float]) -> int:
+        if not rms:
+            return 0
+        ordered = sorted(rms)
+        floor = ordered[len(ordered) // 5]
+        level = max(self.min_rms, floor * self.voiced_ratio)
+        return sum(1 for v in rms if v >= level) * HOP_MS
+
+
+def build_spotter(
+    kind: str,
+    recognizer: sr.Recognizer,
+    keyword: str,
+    templates_dir: Optional[Path] = None,
+    sphinx_sensitivity: float = 1e-20,
+    template_threshold: float = 0.8,
+) -> Optional[KeywordSpotter]:
+    """
+    Create the configured spotter. "auto" prefers PocketSphinx, then
+    enrolled templates, and otherwise runs the gate in VAD-only mode.
+    """
+    kind = (kind or "auto").lower()
+    if kind in ("sphinx", "auto"):
+        try:
+            import pocketsphinx  # noqa: F401
+
+            return SphinxKeywordSpotter(recognizer, keyword, sphinx_sensitivity)
+        except ImportError:
+            if kind == "sphinx":
+                logger.warning("pocketsphinx is not installed; wake gate falls back to VAD only.")
+                return None
+    if kind in ("template", "auto") and templates_dir is not None:
+        spotter = TemplateKeywordSpotter.from_directory(templates_dir, threshold=template_threshold)
+        if spotter is not None:
+            return spotter
+        if kind == "template":
+            logger.warning("No wake-word templates in %s; wake gate falls back to VAD only.", templates_dir)
+    return None
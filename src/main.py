@@ -1,4 +1,16 @@
-from guardian.main import run_guardian
+import sys
+
+# --profile-startup times every import, so the hook goes in before the
+# guardian itself is imported.
+PROFILE_STARTUP = "--profile-startup" in sys.argv[1:]
+if PROFILE_STARTUP:
+    from guardian.utils.lazy_imports import profile_imports
+
+    profile_imports()
+
+from guardian.main import run_guardian  # noqa: E402
 
 if __name__ == "__main__":
-    run_guardian()
+    # --headless serves text commands on a local port instead of listening
+    # to the microphone (see guardian/command_server.py).
+    run_guardian(profile_startup=PROFILE_STARTUP, headless="--headless" in sys.argv[1:])